@@ -3,6 +3,8 @@
 Add proper 5e spell/ability progression + Auto-Add More Abilities button
 """
 
+from pagebuild.jsindex import script_index
+
 # Read the file
 with open('test-enhanced-features.html', 'r') as f:
     content = f.read()
@@ -39,21 +41,10 @@ insert_marker = 'const abilityDatabase = {'
 marker_pos = content.find(insert_marker)
 
 if marker_pos != -1:
-    # Find the end of abilityDatabase
-    search_pos = marker_pos
-    brace_count = 0
-    found_opening = False
-    db_end = -1
-
-    for i in range(search_pos, len(content)):
-        if content[i] == '{':
-            found_opening = True
-            brace_count += 1
-        elif content[i] == '}':
-            brace_count -= 1
-            if found_opening and brace_count == 0:
-                db_end = i
-                break
+    # Find the end of abilityDatabase (db_end is just past the statement,
+    # whether or not it ends with a semicolon)
+    span = script_index(content).get('abilityDatabase')
+    db_end = span.end if span else -1
 
     if db_end != -1:
         # Add 5e progression tables after abilityDatabase
@@ -83,7 +74,7 @@ if marker_pos != -1:
       wizard: [0, 3, 3, 3, 4, 4, 4, 4, 4, 4, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5]
     };'''
 
-        content = content[:db_end + 2] + progression_tables + content[db_end + 2:]
+        content = content[:db_end] + progression_tables + content[db_end:]
         print("✅ Added 5e spell progression tables")
     else:
         print("⚠️ Could not find end of abilityDatabase")
@@ -160,20 +151,8 @@ marker_pos = content.find(insert_marker)
 
 if marker_pos != -1:
     # Find the end of autoAddMoreSpells
-    search_pos = marker_pos
-    brace_count = 0
-    found_opening = False
-    func_end = -1
-
-    for i in range(search_pos, len(content)):
-        if content[i] == '{':
-            found_opening = True
-            brace_count += 1
-        elif content[i] == '}':
-            brace_count -= 1
-            if found_opening and brace_count == 0:
-                func_end = i
-                break
+    span = script_index(content).get('autoAddMoreSpells')
+    func_end = span.end - 1 if span else -1
 
     if func_end != -1:
         # Add autoAddMoreAbilities after autoAddMoreSpells
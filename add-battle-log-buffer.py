@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Battle log backed by a bounded ring buffer: entries are appended as nodes
+instead of re-serializing the log through innerHTML, the live DOM is capped,
+and older entries can be paged back in or exported
+"""
+
+from pagebuild.anchors import replace_anchor
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: CSS for log entries and the "older entries" control
+# ============================================================================
+
+old_actions_css = '''    /* Battle Actions */
+    .battle-actions {'''
+
+new_actions_css = '''    /* Battle Log */
+    .battle-log-entry {
+      margin-bottom: 10px;
+      padding: 8px;
+      background: var(--surface-color);
+      border-left: 3px solid var(--accent-color);
+      border-radius: 4px;
+    }
+
+    .battle-log-time {
+      font-size: 0.75rem;
+      color: var(--text-secondary);
+      margin-bottom: 4px;
+    }
+
+    .battle-log-text {
+      color: var(--text-primary);
+    }
+
+    .battle-log-older {
+      display: block;
+      width: 100%;
+      margin-bottom: 10px;
+      padding: 6px;
+      background: transparent;
+      border: 1px dashed var(--border-color);
+      border-radius: 4px;
+      color: var(--text-secondary);
+      font-size: 0.8rem;
+      cursor: pointer;
+    }
+
+    /* Battle Actions */
+    .battle-actions {'''
+
+content, found = replace_anchor(content, old_actions_css, new_actions_css)
+if found:
+    print("✅ Added battle log CSS")
+else:
+    print("⚠️ Could not find Battle Actions CSS")
+
+# ============================================================================
+# PART 2: Mark the placeholder and add an export button
+# ============================================================================
+
+old_log_html = '''            <div style="margin-bottom: 15px;">
+              <strong style="color: var(--text-primary);">Battle Log</strong>
+            </div>
+            <div id="battleLog" style="min-height: 200px; max-height: 300px; overflow-y: auto; background: var(--background-color); border: 2px solid var(--border-color); border-radius: 8px; padding: 15px; margin-bottom: 20px;">
+              <div style="color: var(--text-secondary); font-size: 0.9rem; text-align: center; padding: 20px;">'''
+
+new_log_html = '''            <div style="margin-bottom: 15px; display: flex; justify-content: space-between; align-items: center;">
+              <strong style="color: var(--text-primary);">Battle Log</strong>
+              <button onclick="exportBattleLog()" style="padding: 6px 12px; background: var(--background-color); border: 1px solid var(--border-color); border-radius: 6px; color: var(--text-primary); font-size: 0.85rem; cursor: pointer;">💾 Export</button>
+            </div>
+            <div id="battleLog" style="min-height: 200px; max-height: 300px; overflow-y: auto; background: var(--background-color); border: 2px solid var(--border-color); border-radius: 8px; padding: 15px; margin-bottom: 20px;">
+              <div class="battle-log-placeholder" style="color: var(--text-secondary); font-size: 0.9rem; text-align: center; padding: 20px;">'''
+
+content, found = replace_anchor(content, old_log_html, new_log_html)
+if found:
+    print("✅ Added battle log export button")
+else:
+    print("⚠️ Could not find battle log markup")
+
+# ============================================================================
+# PART 3: Ring buffer + append-only addBattleLog
+# ============================================================================
+
+old_add_log = '''    function addBattleLog(message) {
+      // If in conversation mode, don't add to battle log
+      if (currentChatMode === 'conversation') return;
+
+      const battleLog = document.getElementById('battleLog');
+      if (!battleLog) return;
+
+      // Clear placeholder if this is the first entry
+      if (battleLog.innerHTML.includes('Battle actions and rolls will appear here')) {
+        battleLog.innerHTML = '';
+      }
+
+      const timestamp = new Date().toLocaleTimeString();
+      battleLog.innerHTML += `
+        <div style="margin-bottom: 10px; padding: 8px; background: var(--surface-color); border-left: 3px solid var(--accent-color); border-radius: 4px;">
+          <div style="font-size: 0.75rem; color: var(--text-secondary); margin-bottom: 4px;">${timestamp}</div>
+          <div style="color: var(--text-primary);">${message}</div>
+        </div>
+      `;
+      battleLog.scrollTop = battleLog.scrollHeight;
+    }'''
+
+new_add_log = '''    // Battle log history lives in a fixed-size ring buffer; only the newest
+    // BATTLE_LOG_LIVE entries are kept in the DOM. Older ones are paged back
+    // in on request and all of them can be exported.
+    const BATTLE_LOG_CAPACITY = 2000;
+    const BATTLE_LOG_LIVE = 100;
+    const BATTLE_LOG_PAGE = 50;
+
+    const battleLogHistory = {
+      entries: new Array(BATTLE_LOG_CAPACITY),
+      total: 0,      // entries ever logged; entry n sits at n % capacity
+      shownFrom: 0   // oldest entry currently in the DOM
+    };
+
+    function battleLogOldest() {
+      return Math.max(0, battleLogHistory.total - BATTLE_LOG_CAPACITY);
+    }
+
+    function battleLogEntry(n) {
+      return battleLogHistory.entries[n % BATTLE_LOG_CAPACITY];
+    }
+
+    function createBattleLogNode(entry) {
+      const node = document.createElement('div');
+      node.className = 'battle-log-entry';
+      const time = document.createElement('div');
+      time.className = 'battle-log-time';
+      time.textContent = entry.time;
+      const text = document.createElement('div');
+      text.className = 'battle-log-text';
+      text.textContent = entry.message;
+      node.append(time, text);
+      return node;
+    }
+
+    function updateBattleLogOlderButton(battleLog) {
+      let button = battleLog.querySelector('.battle-log-older');
+      const hidden = battleLogHistory.shownFrom - battleLogOldest();
+      if (hidden <= 0) {
+        if (button) button.remove();
+        return;
+      }
+      if (!button) {
+        button = document.createElement('button');
+        button.className = 'battle-log-older';
+        button.addEventListener('click', showOlderBattleLog);
+        battleLog.prepend(button);
+      }
+      button.textContent = `Show older entries (${hidden} more)`;
+    }
+
+    function addBattleLog(message) {
+      // If in conversation mode, don't add to battle log
+      if (currentChatMode === 'conversation') return;
+
+      const battleLog = document.getElementById('battleLog');
+      if (!battleLog) return;
+
+      const history = battleLogHistory;
+      const entry = { time: new Date().toLocaleTimeString(), message: String(message) };
+      history.entries[history.total % BATTLE_LOG_CAPACITY] = entry;
+      history.total++;
+
+      // Clear placeholder if this is the first entry
+      const placeholder = battleLog.querySelector('.battle-log-placeholder');
+      if (placeholder) placeholder.remove();
+
+      battleLog.appendChild(createBattleLogNode(entry));
+
+      // Trim the oldest live entries down to the cap, walking siblings from
+      // the first entry (it follows the "older entries" button, if shown)
+      const oldest = battleLogOldest();
+      history.shownFrom = Math.max(history.shownFrom, oldest);
+      let first = battleLog.firstElementChild;
+      while (first && !first.classList.contains('battle-log-entry')) first = first.nextElementSibling;
+      while (history.total - history.shownFrom > BATTLE_LOG_LIVE && first) {
+        const next = first.nextElementSibling;
+        first.remove();
+        first = next;
+        history.shownFrom++;
+      }
+
+      updateBattleLogOlderButton(battleLog);
+      battleLog.scrollTop = battleLog.scrollHeight;
+    }
+
+    function showOlderBattleLog() {
+      const battleLog = document.getElementById('battleLog');
+      if (!battleLog) return;
+
+      const history = battleLogHistory;
+      const from = Math.max(battleLogOldest(), history.shownFrom - BATTLE_LOG_PAGE);
+      const page = document.createDocumentFragment();
+      for (let n = from; n < history.shownFrom; n++) {
+        page.appendChild(createBattleLogNode(battleLogEntry(n)));
+      }
+      history.shownFrom = from;
+
+      // Insert above the current entries without moving what's on screen
+      const previousHeight = battleLog.scrollHeight;
+      battleLog.insertBefore(page, battleLog.querySelector('.battle-log-entry'));
+      updateBattleLogOlderButton(battleLog);
+      battleLog.scrollTop += battleLog.scrollHeight - previousHeight;
+    }
+
+    function exportBattleLog() {
+      const lines = [];
+      for (let n = battleLogOldest(); n < battleLogHistory.total; n++) {
+        const entry = battleLogEntry(n);
+        lines.push(`[${entry.time}] ${entry.message}`);
+      }
+      if (lines.length === 0) {
+        alert('The battle log is empty.');
+        return;
+      }
+
+      const blob = new Blob([lines.join('\\n') + '\\n'], { type: 'text/plain' });
+      const link = document.createElement('a');
+      link.href = URL.createObjectURL(blob);
+      link.download = `battle-log-${new Date().toISOString().slice(0, 19).replace(/:/g, '-')}.txt`;
+      link.click();
+      URL.revokeObjectURL(link.href);
+    }'''
+
+content, found = replace_anchor(content, old_add_log, new_add_log)
+if found:
+    print("✅ addBattleLog appends to a bounded ring buffer")
+else:
+    print("⚠️ Could not find addBattleLog")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Character rendering with cached element handles and dirty fields:
+updateCharacterDisplay(...fields) redraws only the widget groups whose
+character fields changed (an HP click no longer touches stats, spells or
+inventory), and looks each element up once instead of on every call
+"""
+
+from pagebuild.anchors import replace_anchor
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: Element registry and dirty-field tracking
+# ============================================================================
+
+old_initialize = '''    // Initialize
+    console.log('=== INITIALIZING PAGE ===');
+    console.log('Total characters:', characters.length);
+    console.log('Current character:', currentCharacter.name);
+    console.log('Current character has spells:', !!currentCharacter.spells);
+    updateCharacterDisplay();
+    populateCharacterMenu();
+    updateSpellsTab();
+    updateAbilitiesTab();
+    console.log('=== INITIALIZATION COMPLETE ===');'''
+
+new_initialize = '''    // Character rendering. Element handles are looked up once and reused
+    // while they stay in the document. Each widget group redraws only when
+    // one of its character fields changed:
+    //   updateCharacterDisplay()             everything (switching character, long rest)
+    //   updateCharacterDisplay('hp')         the HP bars and numbers, plus anything marked dirty
+    //   markCharacterDirty('inventory')      include a group in the next render
+    const CHARACTER_FIELDS = ['identity', 'hp', 'stats', 'ac', 'location', 'turn', 'abilities', 'spells', 'inventory'];
+    const CHARACTER_STATS = ['str', 'dex', 'con', 'int', 'wis', 'cha'];
+    const CANTRIP_CLASSES = new Set(['bard', 'cleric', 'druid', 'sorcerer', 'warlock', 'wizard']);
+    const characterElements = new Map();
+    const characterRender = { character: null, dirty: new Set(CHARACTER_FIELDS) };
+
+    function characterElement(id) {
+      let element = characterElements.get(id);
+      if (!element || !element.isConnected) {
+        element = document.getElementById(id);
+        if (element) characterElements.set(id, element);
+      }
+      return element;
+    }
+
+    // Writes only when the text differs, so unchanged widgets are not touched
+    function setCharacterText(id, value) {
+      const element = characterElement(id);
+      const text = String(value);
+      if (element && element.textContent !== text) element.textContent = text;
+    }
+
+    function markCharacterDirty(...fields) {
+      fields.forEach(field => characterRender.dirty.add(field));
+    }
+
+    function formatModifier(modifier) {
+      return (modifier >= 0 ? '+' : '') + modifier;
+    }
+
+    // Initialize
+    console.log('=== INITIALIZING PAGE ===');
+    console.log('Total characters:', characters.length);
+    console.log('Current character:', currentCharacter.name);
+    console.log('Current character has spells:', !!currentCharacter.spells);
+    updateCharacterDisplay();
+    populateCharacterMenu();
+    console.log('=== INITIALIZATION COMPLETE ===');'''
+
+content, found = replace_anchor(content, old_initialize, new_initialize)
+if found:
+    print("✅ Added the character element registry")
+else:
+    print("⚠️ Could not find the page initialization")
+
+# ============================================================================
+# PART 2: updateCharacterDisplay renders dirty groups only
+# ============================================================================
+
+old_update_display = '''    function updateCharacterDisplay() {
+      // Update header (portrait and name)
+      document.getElementById('currentCharName').textContent = currentCharacter.name;
+      document.getElementById('charAlignment').textContent = currentCharacter.alignment || 'Neutral';
+      document.getElementById('charLevel').textContent = currentCharacter.level;
+      document.getElementById('charRace').textContent = currentCharacter.race || 'Human';
+      document.getElementById('charClass').textContent = currentCharacter.class;
+      document.getElementById('characterNameHeader').textContent = currentCharacter.name;
+
+      // Update portraits
+      document.getElementById('headerPortrait').textContent = currentCharacter.emoji;
+      document.getElementById('footerPortrait').textContent = currentCharacter.emoji;
+      document.getElementById('fullsizePortrait').textContent = currentCharacter.emoji;
+
+      // Update stats
+      const stats = currentCharacter.stats;
+      ['str', 'dex', 'con', 'int', 'wis', 'cha'].forEach(stat => {
+        const value = stats[stat];
+        const modifier = Math.floor((value - 10) / 2);
+        document.getElementById(stat + 'Value').textContent = value;
+        document.getElementById(stat + 'Mod').textContent = (modifier >= 0 ? '+' : '') + modifier;
+      });
+
+      // Update HP (stats tab - may not exist if removed)
+      const hpPercent = (currentCharacter.hp.current / currentCharacter.hp.max) * 100;
+      const hpFillEl = document.getElementById('hpFill');
+      const hpTextEl = document.getElementById('hpText');
+      const hpCurrentEditEl = document.getElementById('hpCurrentEdit');
+      const hpMaxEditEl = document.getElementById('hpMaxEdit');
+
+      if (hpFillEl) hpFillEl.style.width = hpPercent + '%';
+      if (hpTextEl) hpTextEl.textContent = `${currentCharacter.hp.current} / ${currentCharacter.hp.max}`;
+      if (hpCurrentEditEl) hpCurrentEditEl.textContent = currentCharacter.hp.current;
+      if (hpMaxEditEl) hpMaxEditEl.textContent = currentCharacter.hp.max;
+
+      // Update Header HP Bar
+      const headerHpFill = document.getElementById('headerHpFill');
+      const headerHpText = document.getElementById('headerHpText');
+      headerHpFill.style.width = hpPercent + '%';
+      headerHpText.textContent = `${currentCharacter.hp.current}/${currentCharacter.hp.max}`;
+
+      // Update HP bar color based on percentage
+      headerHpFill.classList.remove('high', 'medium');
+      if (hpPercent > 60) {
+        headerHpFill.classList.add('high');
+      } else if (hpPercent > 25) {
+        headerHpFill.classList.add('medium');
+      }
+
+      // Update Battle HP Bar
+      const battleHpFill = document.getElementById('battleHpFill');
+      const battleHpText = document.getElementById('battleHpText');
+      if (battleHpFill && battleHpText) {
+        battleHpFill.style.width = hpPercent + '%';
+        battleHpFill.classList.remove('high', 'medium', 'low');
+        if (hpPercent > 66) battleHpFill.classList.add('high');
+        else if (hpPercent > 33) battleHpFill.classList.add('medium');
+        else battleHpFill.classList.add('low');
+        battleHpText.textContent = `${currentCharacter.hp.current} / ${currentCharacter.hp.max}`;
+      }
+
+
+      // Update AC
+      document.getElementById('acValue').textContent = currentCharacter.ac;
+      document.getElementById('headerAc').textContent = `AC ${currentCharacter.ac}`;
+
+      // Update Initiative
+      const dexMod = Math.floor((stats.dex - 10) / 2);
+      document.getElementById('initValue').textContent = (dexMod >= 0 ? '+' : '') + dexMod;
+
+      // Update location selector
+      document.getElementById('locationSelect').value = currentCharacter.location;
+
+      // Update abilities
+      updateAbilities();
+
+      // Update skills
+      updateSkills();
+
+      // Update turn tracker
+      document.getElementById('turnNumber').textContent = turnNumber;
+
+      // Auto-select first cantrip for battle mode (only for cantrip classes)
+      const cantripClasses = ['bard', 'cleric', 'druid', 'sorcerer', 'warlock', 'wizard'];
+      const charClass = currentCharacter.class.toLowerCase();
+
+      if (cantripClasses.includes(charClass)) {
+        if (currentCharacter.spells && currentCharacter.spells['0'] && currentCharacter.spells['0'].length > 0) {
+          selectedCantrip = currentCharacter.spells['0'][0];
+          updateCantripButton();
+        } else {
+          selectedCantrip = null;
+          updateCantripButton();
+        }
+      } else {
+        // Non-cantrip class - hide button
+        selectedCantrip = null;
+        updateCantripButton();
+      }
+
+      // Update tab visibility based on class
+      updateTabVisibility();
+    }'''
+
+new_update_display = '''    function updateCharacterDisplay(...fields) {
+      // A different character (or no fields named) redraws everything
+      if (fields.length === 0 || currentCharacter !== characterRender.character) {
+        markCharacterDirty(...CHARACTER_FIELDS);
+      } else {
+        markCharacterDirty(...fields);
+      }
+      const dirty = characterRender.dirty;
+      characterRender.dirty = new Set();
+      characterRender.character = currentCharacter;
+
+      if (dirty.has('identity')) renderCharacterIdentity();
+      if (dirty.has('stats')) renderCharacterStats();
+      if (dirty.has('hp')) renderCharacterHp();
+      if (dirty.has('ac')) {
+        setCharacterText('acValue', currentCharacter.ac);
+        setCharacterText('headerAc', `AC ${currentCharacter.ac}`);
+      }
+      if (dirty.has('location')) {
+        const locationSelect = characterElement('locationSelect');
+        if (locationSelect.value !== currentCharacter.location) locationSelect.value = currentCharacter.location;
+      }
+      if (dirty.has('turn')) setCharacterText('turnNumber', turnNumber);
+
+      // Skills use the stats and the proficiency bonus (level)
+      if (dirty.has('identity') || dirty.has('stats')) updateSkills();
+      // The abilities grid lists attacks, abilities and spells
+      if (dirty.has('abilities') || dirty.has('spells')) updateAbilities();
+      if (dirty.has('abilities')) updateAbilitiesTab();
+      if (dirty.has('identity') || dirty.has('spells')) selectDefaultCantrip();
+      if (dirty.has('spells')) updateSpellsTab();
+      // The inventory is rendered when its tab opens; redraw it only while shown
+      if (dirty.has('inventory') && characterElement('inventoryTab').style.display !== 'none') updateInventory();
+    }
+
+    function renderCharacterIdentity() {
+      setCharacterText('currentCharName', currentCharacter.name);
+      setCharacterText('charAlignment', currentCharacter.alignment || 'Neutral');
+      setCharacterText('charLevel', currentCharacter.level);
+      setCharacterText('charRace', currentCharacter.race || 'Human');
+      setCharacterText('charClass', currentCharacter.class);
+      setCharacterText('characterNameHeader', currentCharacter.name);
+
+      // Portraits
+      setCharacterText('headerPortrait', currentCharacter.emoji);
+      setCharacterText('footerPortrait', currentCharacter.emoji);
+      setCharacterText('fullsizePortrait', currentCharacter.emoji);
+
+      // Tab visibility depends on class and subclass
+      updateTabVisibility();
+    }
+
+    function renderCharacterStats() {
+      const stats = currentCharacter.stats;
+      CHARACTER_STATS.forEach(stat => {
+        const value = stats[stat];
+        setCharacterText(stat + 'Value', value);
+        setCharacterText(stat + 'Mod', formatModifier(Math.floor((value - 10) / 2)));
+      });
+      setCharacterText('initValue', formatModifier(Math.floor((stats.dex - 10) / 2)));
+    }
+
+    function renderCharacterHp() {
+      const { current, max } = currentCharacter.hp;
+      const hpPercent = (current / max) * 100;
+      const width = hpPercent + '%';
+
+      // Stats tab (these may not exist if removed)
+      const hpFillEl = characterElement('hpFill');
+      if (hpFillEl) hpFillEl.style.width = width;
+      setCharacterText('hpText', `${current} / ${max}`);
+      setCharacterText('hpCurrentEdit', current);
+      setCharacterText('hpMaxEdit', max);
+
+      // Header HP bar, colored by percentage
+      const headerHpFill = characterElement('headerHpFill');
+      headerHpFill.style.width = width;
+      headerHpFill.classList.toggle('high', hpPercent > 60);
+      headerHpFill.classList.toggle('medium', hpPercent <= 60 && hpPercent > 25);
+      setCharacterText('headerHpText', `${current}/${max}`);
+
+      // Battle HP bar
+      const battleHpFill = characterElement('battleHpFill');
+      if (battleHpFill && characterElement('battleHpText')) {
+        battleHpFill.style.width = width;
+        battleHpFill.classList.toggle('high', hpPercent > 66);
+        battleHpFill.classList.toggle('medium', hpPercent <= 66 && hpPercent > 33);
+        battleHpFill.classList.toggle('low', hpPercent <= 33);
+        setCharacterText('battleHpText', `${current} / ${max}`);
+      }
+    }
+
+    // Auto-select the first cantrip for battle mode (only for cantrip classes)
+    function selectDefaultCantrip() {
+      const cantrips = currentCharacter.spells && currentCharacter.spells['0'];
+      if (CANTRIP_CLASSES.has(currentCharacter.class.toLowerCase()) && cantrips && cantrips.length > 0) {
+        selectedCantrip = cantrips[0];
+      } else {
+        // No cantrips, or a non-cantrip class - hide button
+        selectedCantrip = null;
+      }
+      updateCantripButton();
+    }'''
+
+content, found = replace_anchor(content, old_update_display, new_update_display)
+if found:
+    print("✅ updateCharacterDisplay renders dirty widget groups only")
+else:
+    print("⚠️ Could not find updateCharacterDisplay")
+
+old_skill_lookup = '''        const skillId = 'skill-' + skillName.toLowerCase().replace(/\\s+/g, '');
+        const element = document.getElementById(skillId);
+        if (element) {
+          element.textContent = (total >= 0 ? '+' : '') + total;
+        }'''
+
+new_skill_lookup = '''        setCharacterText('skill-' + skillName.toLowerCase().replace(/\\s+/g, ''), formatModifier(total));'''
+
+content, found = replace_anchor(content, old_skill_lookup, new_skill_lookup)
+if found:
+    print("✅ updateSkills uses the cached skill elements")
+else:
+    print("⚠️ Could not find the skill lookup in updateSkills")
+
+# ============================================================================
+# PART 3: Callers name the fields they changed
+# ============================================================================
+
+# Full renders already include the spells and abilities tabs
+old_switch = '''      // Update all displays
+      updateCharacterDisplay();
+      updateMessages();
+
+      // IMPORTANT: Update spells and abilities tabs
+      updateSpellsTab();
+      updateAbilitiesTab();'''
+
+new_switch = '''      // Update all displays (a new character redraws every group,
+      // spells and abilities tabs included)
+      updateCharacterDisplay();
+      updateMessages();'''
+
+content, found = replace_anchor(content, old_switch, new_switch)
+if found:
+    print("✅ switchCharacter renders once")
+else:
+    print("⚠️ Could not find the display update in switchCharacter")
+
+old_create = '''      // Update displays
+      updateCharacterDisplay();
+      populateCharacterMenu();
+      updateSpellsTab();
+      updateAbilitiesTab();'''
+
+new_create = '''      // Update displays
+      updateCharacterDisplay();
+      populateCharacterMenu();'''
+
+content, found = replace_anchor(content, old_create, new_create)
+if found:
+    print("✅ createNewCharacter renders once")
+else:
+    print("⚠️ Could not find the display update in createNewCharacter")
+
+old_short_rest = '''      updateCharacterDisplay();
+      updateSpellsTab();
+
+      alert(`Short Rest Complete!'''
+
+new_short_rest = '''      updateCharacterDisplay('hp', 'spells');
+
+      alert(`Short Rest Complete!'''
+
+content, found = replace_anchor(content, old_short_rest, new_short_rest)
+if found:
+    print("✅ shortRest renders HP and spells")
+else:
+    print("⚠️ Could not find the display update in shortRest")
+
+# Temporary modifiers may have changed anything, so a long rest redraws it all
+old_long_rest = '''      updateCharacterDisplay();
+      updateSpellsTab();
+
+      alert(`Long Rest Complete!'''
+
+new_long_rest = '''      updateCharacterDisplay();
+
+      alert(`Long Rest Complete!'''
+
+content, found = replace_anchor(content, old_long_rest, new_long_rest)
+if found:
+    print("✅ longRest renders once")
+else:
+    print("⚠️ Could not find the display update in longRest")
+
+hp_updates = (
+    ('takeDamage', '''      currentCharacter.hp.current = Math.max(0, currentCharacter.hp.current - damage);
+      updateCharacterDisplay();'''),
+    ('heal', '''      currentCharacter.hp.current = Math.min(currentCharacter.hp.max, currentCharacter.hp.current + healing);
+      updateCharacterDisplay();
+      showDiceRoll('Healing','''),
+    ('the HP editor', '''      currentCharacter.hp.current = Math.min(newCurrentNum, max);
+      updateCharacterDisplay();'''),
+    ('the header HP edit', '''          currentCharacter.hp.current = Math.min(newValue, currentCharacter.hp.max);
+          updateCharacterDisplay();
+        } else {
+          element.textContent = currentText;'''),
+    ('the header HP edit (Escape)', '''          element.textContent = currentText;
+          updateCharacterDisplay();'''),
+)
+
+for where, old_hp in hp_updates:
+    content, found = replace_anchor(content, old_hp, old_hp.replace('updateCharacterDisplay();', "updateCharacterDisplay('hp');"))
+    if found:
+        print(f"✅ {where} renders HP only")
+    else:
+        print(f"⚠️ Could not find the display update in {where}")
+
+old_stat_edit = '''          } else if (['str', 'dex', 'con', 'int', 'wis', 'cha'].includes(statName)) {
+            currentCharacter.stats[statName] = newValue;
+          }
+          // Remove input first before updating display
+          if (input.parentNode === element) {
+            input.remove();
+          }
+          updateCharacterDisplay();'''
+
+new_stat_edit = '''          } else if (['str', 'dex', 'con', 'int', 'wis', 'cha'].includes(statName)) {
+            currentCharacter.stats[statName] = newValue;
+          }
+          // Remove input first before updating display
+          if (input.parentNode === element) {
+            input.remove();
+          }
+          updateCharacterDisplay(statName.startsWith('hp') ? 'hp' : statName === 'ac' ? 'ac' : 'stats');'''
+
+content, found = replace_anchor(content, old_stat_edit, new_stat_edit)
+if found:
+    print("✅ Stat edits render the edited field only")
+else:
+    print("⚠️ Could not find the display update in the stat editor")
+
+old_modifier_edit = '''          currentCharacter.stats[statName] = newScore;
+          // Remove input first before updating display
+          if (input.parentNode === element) {
+            input.remove();
+          }
+          updateCharacterDisplay();'''
+
+new_modifier_edit = '''          currentCharacter.stats[statName] = newScore;
+          // Remove input first before updating display
+          if (input.parentNode === element) {
+            input.remove();
+          }
+          updateCharacterDisplay('stats');'''
+
+content, found = replace_anchor(content, old_modifier_edit, new_modifier_edit)
+if found:
+    print("✅ Modifier edits render stats only")
+else:
+    print("⚠️ Could not find the display update in the modifier editor")
+
+# Consuming an item changes HP and the inventory; render once the item is gone
+old_consume = '''      updateCharacterDisplay();
+      addBattleLog(`${currentCharacter.name} consumed ${item.name} and ${effect}!`);
+
+      // Remove item if quantity reaches 0
+      if (item.quantity === 0) {
+        const index = currentCharacter.inventory.indexOf(item);
+        if (index > -1) currentCharacter.inventory.splice(index, 1);
+        addBattleLog(`⚠️ Out of ${item.name}!`);
+      }'''
+
+new_consume = '''      addBattleLog(`${currentCharacter.name} consumed ${item.name} and ${effect}!`);
+
+      // Remove item if quantity reaches 0
+      if (item.quantity === 0) {
+        const index = currentCharacter.inventory.indexOf(item);
+        if (index > -1) currentCharacter.inventory.splice(index, 1);
+        addBattleLog(`⚠️ Out of ${item.name}!`);
+      }
+
+      updateCharacterDisplay('hp', 'inventory');'''
+
+content, found = replace_anchor(content, old_consume, new_consume)
+if found:
+    print("✅ consumeItem renders HP and inventory")
+else:
+    print("⚠️ Could not find the display update in consumeItem")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+Persistent characters: every character mutation is recorded as a small delta
+in localStorage, compacted into a full snapshot when the page is idle, and
+replayed over the snapshot on load so a reload restores the session. The
+log can be exported for python3 -m pagebuild.characterlog
+"""
+
+from pagebuild.anchors import replace_anchor
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: Export/reset buttons in the character menu
+# ============================================================================
+
+old_character_list = '''      <div class="character-list" id="characterList">
+        <!-- Will be populated by JS -->
+      </div>
+    </div>'''
+
+new_character_list = '''      <div class="character-list" id="characterList">
+        <!-- Will be populated by JS -->
+      </div>
+      <div style="display: flex; gap: 8px; margin: 15px 10px 10px 10px;">
+        <button onclick="exportCharacterStore()" style="flex: 1; padding: 8px; background: var(--background-color); border: 1px solid var(--border-color); border-radius: 6px; color: var(--text-secondary); cursor: pointer;">💾 Export save</button>
+        <button onclick="resetCharacterStore()" style="flex: 1; padding: 8px; background: var(--background-color); border: 1px solid var(--border-color); border-radius: 6px; color: var(--text-secondary); cursor: pointer;">🗑️ Reset save</button>
+      </div>
+    </div>'''
+
+content, found = replace_anchor(content, old_character_list, new_character_list)
+if found:
+    print("✅ Added export/reset buttons to the character menu")
+else:
+    print("⚠️ Could not find the character list in the menu")
+
+# ============================================================================
+# PART 2: Delta log, snapshots and restore
+# ============================================================================
+
+old_initialize = '''    // Initialize
+    console.log('=== INITIALIZING PAGE ===');'''
+
+new_initialize = '''    // Character store. Two localStorage keys:
+    //   snapshot  {version, seq, current, characters}, rewritten only when compacting
+    //   log       [[seq, op, characterId, path, value], ...] since the snapshot
+    // ops: set (path = value), push (onto the array at path, created if
+    // missing), remove (index `value` from the array at path), create (append
+    // character `value`), select (make it current). Paths are dot-separated;
+    // numeric parts index arrays. A mutation appends one small entry instead
+    // of re-serializing the characters and their spell lists; the log is
+    // folded into a new snapshot once it reaches CHARACTER_LOG_COMPACT_AT
+    // entries. python3 -m pagebuild.characterlog replays and validates exports.
+    // Character spells are stored as {id, prepared, ..., record?} (see
+    // storedCharacterValue) and re-interned on restore.
+    const CHARACTER_STORE_VERSION = 2;
+    const CHARACTER_SNAPSHOT_KEY = 'dnd-characters:snapshot';
+    const CHARACTER_LOG_KEY = 'dnd-characters:log';
+    const CHARACTER_LOG_COMPACT_AT = 64;
+    const CHARACTER_FLUSH_DELAY = 250;
+    const characterStore = {
+      seq: 0,
+      hasSnapshot: false,
+      log: [],         // serialized entries since the snapshot
+      pending: false,  // a flush is scheduled
+      compacting: false,
+      enabled: true
+    };
+
+    function characterPathParts(path) {
+      return path.split('.').map(part => /^\\d+$/.test(part) ? Number(part) : part);
+    }
+
+    function valueAtPath(target, path) {
+      return characterPathParts(path).reduce((value, part) => value == null ? undefined : value[part], target);
+    }
+
+    // Apply one log entry to {characters, current}; throws if it does not fit
+    function applyCharacterDelta(state, [seq, op, id, path, value]) {
+      if (op === 'create') {
+        state.characters.push(value);
+        return;
+      }
+      const character = state.characters.find(c => c.id === id);
+      if (!character) throw new Error(`#${seq}: no character ${id}`);
+      if (op === 'select') {
+        state.current = id;
+        return;
+      }
+      const parts = characterPathParts(path);
+      const last = parts.pop();
+      const parent = parts.reduce((target, part) => {
+        if (target == null || typeof target !== 'object') throw new Error(`#${seq}: no ${path}`);
+        return target[part];
+      }, character);
+      if (parent == null || typeof parent !== 'object') throw new Error(`#${seq}: no ${path}`);
+      if (op === 'set') {
+        parent[last] = value;
+      } else if (op === 'push') {
+        if (parent[last] === undefined) parent[last] = [];
+        if (!Array.isArray(parent[last])) throw new Error(`#${seq}: ${path} is not a list`);
+        parent[last].push(value);
+      } else if (op === 'remove') {
+        const list = parent[last];
+        if (!Array.isArray(list) || !(value >= 0 && value < list.length)) throw new Error(`#${seq}: no ${path}.${value}`);
+        list.splice(value, 1);
+      } else {
+        throw new Error(`#${seq}: unknown op ${op}`);
+      }
+    }
+
+    // JSON.stringify replacer. A character spell keeps only its own state
+    // (id, prepared, isDefault); its shared record is inherited, so it would
+    // otherwise be lost. The record is left out when spellRecord(id) gives it
+    // back on restore and stored inline otherwise (built-in characters' own
+    // spell text, spells added from the SRD list)
+    function storedCharacterValue(key, value) {
+      if (value === null || typeof value !== 'object' || Array.isArray(value)) return value;
+      const record = Object.getPrototypeOf(value);
+      if (record === Object.prototype || !spellRecords.get(value.id)?.includes(record)) return value;
+      return record === spellRecord(value.id) ? { ...value } : { ...value, record: { ...record } };
+    }
+
+    // Stored spells back to interned ones. A spell saved whole (never
+    // interned) carries its own fields; one saved with neither those, an
+    // inline record nor a spellDefinitions entry is dropped
+    function restoreCharacterSpells(character) {
+      Object.keys(character.spells || {}).forEach(level => {
+        character.spells[level] = character.spells[level].flatMap(({ record, ...spell }) => {
+          const fields = record || (SPELL_RECORD_FIELDS.some(field => field in spell) ? {} : spellRecord(spell.id));
+          if (fields) return [{ ...fields, ...spell }];
+          console.warn(`Dropped saved spell ${spell.id}: no spell data for it`);
+          return [];
+        });
+      });
+      internCharacterSpells(character);
+    }
+
+    function recordCharacterChange(op, path, value, character = currentCharacter) {
+      if (!characterStore.enabled) return;
+      const entry = [++characterStore.seq, op, character.id];
+      if (value !== undefined) entry.push(path, value);
+      characterStore.log.push(JSON.stringify(entry, storedCharacterValue));
+      if (!characterStore.pending) {
+        characterStore.pending = true;
+        setTimeout(flushCharacterStore, CHARACTER_FLUSH_DELAY);
+      }
+    }
+
+    // Record the current values at `paths` (skipping ones that do not exist)
+    function saveCharacterFields(...paths) {
+      paths.forEach(path => {
+        const value = valueAtPath(currentCharacter, path);
+        if (value !== undefined) recordCharacterChange('set', path, value);
+      });
+    }
+
+    // Record one field of a character spell, found by identity (a spell shown
+    // from the picker is not the character's, so there is nothing to record)
+    function saveCharacterSpellField(spell, field) {
+      for (const [level, spells] of Object.entries(currentCharacter.spells || {})) {
+        const index = spells.indexOf(spell);
+        if (index !== -1) return saveCharacterFields(`spells.${level}.${index}.${field}`);
+      }
+    }
+
+    // Temporary modifiers live in one page-level list; each character keeps
+    // a copy so they survive character switches and reloads
+    function saveTempModifiers() {
+      currentCharacter.tempModifiers = tempModifiers.map(mod => ({ ...mod }));
+      saveCharacterFields('tempModifiers');
+    }
+
+    function loadTempModifiers() {
+      tempModifiers = (currentCharacter.tempModifiers || []).map(mod => ({ ...mod }));
+      updateTempModifiersList();
+    }
+
+    function writeCharacterStorage(key, text) {
+      try {
+        localStorage.setItem(key, text);
+        return true;
+      } catch (error) {
+        console.warn('Could not save characters:', error);
+        return false;
+      }
+    }
+
+    function flushCharacterStore() {
+      characterStore.pending = false;
+      if (!characterStore.enabled) return;
+      // Nothing to replay the log onto yet: start with a snapshot
+      if (!characterStore.hasSnapshot) {
+        compactCharacterStore();
+        return;
+      }
+      const saved = writeCharacterStorage(CHARACTER_LOG_KEY, '[' + characterStore.log.join(',') + ']');
+      if ((!saved || characterStore.log.length >= CHARACTER_LOG_COMPACT_AT) && !characterStore.compacting) {
+        characterStore.compacting = true;
+        (window.requestIdleCallback || setTimeout)(compactCharacterStore);
+      }
+    }
+
+    // Fold the log into a new snapshot of the in-memory characters
+    function compactCharacterStore() {
+      characterStore.compacting = false;
+      if (!characterStore.enabled) return;
+      const snapshot = JSON.stringify({
+        version: CHARACTER_STORE_VERSION,
+        seq: characterStore.seq,
+        current: currentCharacter.id,
+        characters
+      }, storedCharacterValue);
+      // The snapshot goes first: entries it already covers are skipped on restore
+      if (writeCharacterStorage(CHARACTER_SNAPSHOT_KEY, snapshot)) {
+        characterStore.hasSnapshot = true;
+        characterStore.log = [];
+        writeCharacterStorage(CHARACTER_LOG_KEY, '[]');
+      }
+    }
+
+    // Load the snapshot, replay the log over it and swap the result in
+    function restoreCharacterStore() {
+      let snapshot, log;
+      try {
+        snapshot = JSON.parse(localStorage.getItem(CHARACTER_SNAPSHOT_KEY));
+        log = JSON.parse(localStorage.getItem(CHARACTER_LOG_KEY) || '[]');
+      } catch (error) {
+        console.warn('Saved characters are unreadable; starting fresh:', error);
+        return;
+      }
+      if (!snapshot || snapshot.version !== CHARACTER_STORE_VERSION) return;
+
+      const state = { characters: snapshot.characters, current: snapshot.current };
+      let seq = snapshot.seq;
+      let replayed = 0;
+      for (const entry of log) {
+        if (entry[0] <= seq) continue;
+        try {
+          applyCharacterDelta(state, entry);
+        } catch (error) {
+          // Keep what replayed cleanly; the next compaction drops the rest
+          console.warn('Stopped replaying saved changes:', error);
+          break;
+        }
+        seq = entry[0];
+        replayed++;
+      }
+      state.characters.forEach(restoreCharacterSpells);
+
+      characters.splice(0, characters.length, ...state.characters);
+      currentCharacter = characters.find(c => c.id === state.current) || characters[0];
+      characterStore.seq = seq;
+      characterStore.hasSnapshot = true;
+      characterStore.log = log.filter(entry => entry[0] > snapshot.seq && entry[0] <= seq).map(entry => JSON.stringify(entry));
+      console.log(`Restored ${characters.length} characters (${replayed} changes since the snapshot)`);
+    }
+
+    function exportCharacterStore() {
+      flushCharacterStore();
+      const data = {
+        version: CHARACTER_STORE_VERSION,
+        snapshot: JSON.parse(localStorage.getItem(CHARACTER_SNAPSHOT_KEY)),
+        log: JSON.parse(localStorage.getItem(CHARACTER_LOG_KEY) || '[]')
+      };
+      const link = document.createElement('a');
+      link.href = URL.createObjectURL(new Blob([JSON.stringify(data)], { type: 'application/json' }));
+      link.download = `characters-${new Date().toISOString().slice(0, 10)}.json`;
+      link.click();
+      URL.revokeObjectURL(link.href);
+    }
+
+    function resetCharacterStore() {
+      if (!confirm('Delete the saved characters and reload the defaults?')) return;
+      characterStore.enabled = false;
+      localStorage.removeItem(CHARACTER_SNAPSHOT_KEY);
+      localStorage.removeItem(CHARACTER_LOG_KEY);
+      location.reload();
+    }
+
+    // Pending entries are written before the page goes away
+    window.addEventListener('pagehide', () => {
+      if (characterStore.pending) flushCharacterStore();
+    });
+
+    restoreCharacterStore();
+
+    // Initialize
+    console.log('=== INITIALIZING PAGE ===');'''
+
+content, found = replace_anchor(content, old_initialize, new_initialize)
+if found:
+    print("✅ Added the character store")
+else:
+    print("⚠️ Could not find the page initialization")
+
+# ============================================================================
+# PART 3: Record the mutations
+# ============================================================================
+
+old_select = '''      // Update current character
+      currentCharacter = characters[index];'''
+
+new_select = '''      // Update current character
+      currentCharacter = characters[index];
+      recordCharacterChange('select', null);
+      loadTempModifiers();'''
+
+content, found = replace_anchor(content, old_select, new_select)
+if found:
+    print("✅ Character switches are saved")
+else:
+    print("⚠️ Could not find the character switch")
+
+old_create = '''      characters.push(newChar);
+
+      // Switch to new character
+      currentCharacter = newChar;'''
+
+new_create = '''      characters.push(newChar);
+      recordCharacterChange('create', null, newChar, newChar);
+
+      // Switch to new character
+      currentCharacter = newChar;
+      recordCharacterChange('select', null);
+      loadTempModifiers();'''
+
+content, found = replace_anchor(content, old_create, new_create)
+if found:
+    print("✅ New characters are saved")
+else:
+    print("⚠️ Could not find characters.push in createNewCharacter")
+
+field_updates = (
+    ('takeDamage', '''      currentCharacter.hp.current = Math.max(0, currentCharacter.hp.current - damage);
+''', "      saveCharacterFields('hp.current');\n"),
+    ('heal', '''      currentCharacter.hp.current = Math.min(currentCharacter.hp.max, currentCharacter.hp.current + healing);
+      updateCharacterDisplay('hp');
+''', "      saveCharacterFields('hp.current');\n"),
+    ('the HP editor', '''      currentCharacter.hp.current = Math.min(newCurrentNum, max);
+''', "      saveCharacterFields('hp.current');\n"),
+    ('the header HP edit', '''          currentCharacter.hp.current = Math.min(newValue, currentCharacter.hp.max);
+          updateCharacterDisplay('hp');
+''', "          saveCharacterFields('hp.current');\n"),
+    ('editModifier', '''          currentCharacter.stats[statName] = newScore;
+''', "          saveCharacterFields(`stats.${statName}`);\n"),
+    ('castSpellFromModal', '''        currentCharacter.spellSlots[level].current--;
+''', "        saveCharacterFields(`spellSlots.${level}.current`);\n"),
+    ('shortRest', '''      updateCharacterDisplay('hp', 'spells');
+''', "      saveCharacterFields('hp.current', 'spellSlots');\n"),
+    ('addSpellToCharacter', '''      currentCharacter.spells[level].push(spell);
+''', "      recordCharacterChange('push', `spells.${level}`, spell);\n"),
+)
+
+for where, old_field, record in field_updates:
+    content, found = replace_anchor(content, old_field, old_field + record)
+    if found:
+        print(f"✅ {where} is saved")
+    else:
+        print(f"⚠️ Could not find the change in {where}")
+
+old_long_rest = '''      addBattleLog(`🧹 Temporary effects cleared!`);
+
+      updateCharacterDisplay();'''
+
+new_long_rest = '''      addBattleLog(`🧹 Temporary effects cleared!`);
+
+      saveCharacterFields('hp.current', 'spellSlots');
+      updateCharacterDisplay();'''
+
+content, found = replace_anchor(content, old_long_rest, new_long_rest)
+if found:
+    print("✅ longRest is saved")
+else:
+    print("⚠️ Could not find the display update in longRest")
+
+old_edit_stat = '''          updateCharacterDisplay(statName.startsWith('hp') ? 'hp' : statName === 'ac' ? 'ac' : 'stats');'''
+
+new_edit_stat = '''          saveCharacterFields(statName.startsWith('hp') ? 'hp' : statName === 'ac' ? 'ac' : `stats.${statName}`);
+          updateCharacterDisplay(statName.startsWith('hp') ? 'hp' : statName === 'ac' ? 'ac' : 'stats');'''
+
+content, found = replace_anchor(content, old_edit_stat, new_edit_stat)
+if found:
+    print("✅ editStat is saved")
+else:
+    print("⚠️ Could not find the display update in editStat")
+
+old_consume = '''      // Consume 1 of the item
+      item.quantity--;'''
+
+new_consume = '''      // Consume 1 of the item
+      item.quantity--;
+      saveCharacterFields(`inventory.${currentCharacter.inventory.indexOf(item)}.quantity`);'''
+
+content, found = replace_anchor(content, old_consume, new_consume)
+if found:
+    print("✅ consumeItem saves the quantity")
+else:
+    print("⚠️ Could not find the quantity change in consumeItem")
+
+old_consume_end = '''        if (index > -1) currentCharacter.inventory.splice(index, 1);
+        addBattleLog(`⚠️ Out of ${item.name}!`);
+      }
+
+      updateCharacterDisplay('hp', 'inventory');'''
+
+new_consume_end = '''        if (index > -1) {
+          currentCharacter.inventory.splice(index, 1);
+          recordCharacterChange('remove', 'inventory', index);
+        }
+        addBattleLog(`⚠️ Out of ${item.name}!`);
+      }
+
+      saveCharacterFields('hp.current', 'food');
+      updateCharacterDisplay('hp', 'inventory');'''
+
+content, found = replace_anchor(content, old_consume_end, new_consume_end)
+if found:
+    print("✅ consumeItem saves HP, food and removals")
+else:
+    print("⚠️ Could not find the item removal in consumeItem")
+
+old_delete_spell = '''      // Remove spell
+      currentCharacter.spells[level] = currentCharacter.spells[level].filter(s => s.id !== spellId);'''
+
+new_delete_spell = '''      // Remove spell
+      const spellPosition = currentCharacter.spells[level].indexOf(spell);
+      currentCharacter.spells[level].splice(spellPosition, 1);
+      recordCharacterChange('remove', `spells.${level}`, spellPosition);'''
+
+content, found = replace_anchor(content, old_delete_spell, new_delete_spell)
+if found:
+    print("✅ deleteSpell is saved")
+else:
+    print("⚠️ Could not find the spell removal in deleteSpell")
+
+state_updates = (
+    ('togglePrepareFromModal', '''      spell.prepared = !spell.prepared;
+
+''', "      saveCharacterSpellField(spell, 'prepared');\n"),
+    ('toggleSpellPrepared', '''        spell.prepared = !spell.prepared;
+        updateAbilities();
+''', "        saveCharacterSpellField(spell, 'prepared');\n"),
+    ('setDefaultSpell', '''      if (spell && spell.prepared) {
+        spell.isDefault = true;
+''', "        saveCharacterSpellField(spell, 'isDefault');\n"),
+    ('addAbilityToCharacter', '''        description: ability.description
+      });
+''', "      recordCharacterChange('push', 'abilities', currentCharacter.abilities.at(-1));\n"),
+    ('the custom ability creator', '''        description: description
+      });
+''', "      recordCharacterChange('push', 'abilities', currentCharacter.abilities.at(-1));\n"),
+    ('addMoreAbilities', '''          description: ability.description
+        });
+        abilitiesAdded++;
+''', "        recordCharacterChange('push', 'abilities', currentCharacter.abilities.at(-1));\n"),
+    ('updateSpells', '''              characterSpell(spellId, record, { prepared: preparedCasters.includes(charClass) })
+            );
+''', "            recordCharacterChange('push', `spells.${levelKey}`, currentCharacter.spells[levelKey].at(-1));\n"),
+    ('addTempModifier', '''      tempModifiers.push({ name, value });
+''', "      saveTempModifiers();\n"),
+    ('removeTempModifier', '''      tempModifiers.splice(index, 1);
+''', "      saveTempModifiers();\n"),
+    ('longRest', '''      // Clear temporary modifiers
+      tempModifiers = [];
+''', "      saveTempModifiers();\n"),
+    ('the temporary modifier list', '''    let tempModifiers = [];
+''', "    loadTempModifiers();\n"),
+)
+
+for where, old_state, record in state_updates:
+    content, found = replace_anchor(content, old_state, old_state + record)
+    if found:
+        print(f"✅ {where} is saved")
+    else:
+        print(f"⚠️ Could not find the change in {where}")
+
+old_clear_spell_defaults = '''        currentCharacter.spells[lvl].forEach(s => s.isDefault = false);'''
+
+new_clear_spell_defaults = '''        currentCharacter.spells[lvl].forEach(s => {
+          if (!s.isDefault) return;
+          s.isDefault = false;
+          saveCharacterSpellField(s, 'isDefault');
+        });'''
+
+content, found = replace_anchor(content, old_clear_spell_defaults, new_clear_spell_defaults)
+if found:
+    print("✅ setDefaultSpell saves the cleared defaults")
+else:
+    print("⚠️ Could not find the default reset in setDefaultSpell")
+
+old_default_ability = '''      const ability = currentCharacter.abilities.find(a => a.id === abilityId);
+      if (ability) {
+        ability.isDefault = true;
+        updateAbilitiesTab();
+      }'''
+
+new_default_ability = '''      const ability = currentCharacter.abilities.find(a => a.id === abilityId);
+      if (ability) ability.isDefault = true;
+      saveCharacterFields('abilities');
+      if (ability) updateAbilitiesTab();'''
+
+content, found = replace_anchor(content, old_default_ability, new_default_ability)
+if found:
+    print("✅ setDefaultAbility is saved")
+else:
+    print("⚠️ Could not find the new default in setDefaultAbility")
+
+# updateInventory_autoAdd adds items in three places with the same body
+for indent in ('          ', '            '):
+    old_auto_add = f'''
+{indent}currentCharacter.inventory.push(item);
+'''
+    new_auto_add = f'''
+{indent}currentCharacter.inventory.push(item);
+{indent}recordCharacterChange('push', 'inventory', item);
+'''
+    content, found = replace_anchor(content, old_auto_add, new_auto_add)
+    if found:
+        print(f"✅ updateInventory_autoAdd saves {found} added item(s)")
+    else:
+        print("⚠️ Could not find the item push in updateInventory_autoAdd")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
@@ -42,7 +42,7 @@ new_picker_header = r'''        <div class="spell-picker-search">
 
         <div class="spell-picker-filters">'''
 
-content = re.sub(old_picker_header, new_picker_header, content, flags=re.DOTALL)
+content = re.sub(old_picker_header, lambda _: new_picker_header, content, flags=re.DOTALL)
 
 # Add class filter variable near other spell picker variables
 old_vars = "    let currentLevelFilter = 'all';"
@@ -86,7 +86,7 @@ new_filter = r'''    function filterPickerSpells() {
         return matchesSearch && matchesLevel && matchesClass;
       });'''
 
-content = re.sub(old_filter, new_filter, content, flags=re.DOTALL)
+content = re.sub(old_filter, lambda _: new_filter, content, flags=re.DOTALL)
 
 # Update closeSpellPicker to reset class filter
 old_close_picker = r'''    function closeSpellPicker\(event\) \{
@@ -113,7 +113,7 @@ new_close_picker = r'''    function closeSpellPicker(event) {
       });
     }'''
 
-content = re.sub(old_close_picker, new_close_picker, content, flags=re.DOTALL)
+content = re.sub(old_close_picker, lambda _: new_close_picker, content, flags=re.DOTALL)
 
 # Update the spell mapping to include classes array
 old_spell_map = r'''        allSpellsFromAPI = fallbackSpells\.map\(spell => \(\{
@@ -145,7 +145,7 @@ new_spell_map = r'''        allSpellsFromAPI = fallbackSpells.map(spell => ({
           classes: spell.classes || []
         }));'''
 
-content = re.sub(old_spell_map, new_spell_map, content, flags=re.DOTALL)
+content = re.sub(old_spell_map, lambda _: new_spell_map, content, flags=re.DOTALL)
 
 # Write the file
 with open('test-enhanced-features.html', 'w') as f:
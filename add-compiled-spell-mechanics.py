@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Use the structured spell mechanics from pagebuild/mechanics.py: attack rolls,
+healing and damage scaling come from the compiled `mechanics` field instead of
+substring checks, cantrip damage steps up with character level, and healing
+spells roll their healing when cast
+"""
+
+from pagebuild.anchors import replace_anchor
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: Keep healing and scaling on the interned spell records
+# ============================================================================
+
+old_record_fields = '''    const SPELL_RECORD_FIELDS = ['name', 'icon', 'damage', 'description', 'school', 'castingTime',
+      'range', 'components', 'duration', 'concentration', 'attackRoll', 'save'];'''
+
+new_record_fields = '''    const SPELL_RECORD_FIELDS = ['name', 'icon', 'damage', 'description', 'school', 'castingTime',
+      'range', 'components', 'duration', 'concentration', 'attackRoll', 'save', 'healing', 'scaling'];'''
+
+content, found = replace_anchor(content, old_record_fields, new_record_fields)
+if found:
+    print("✅ Spell records keep healing and scaling")
+else:
+    print("⚠️ Could not find SPELL_RECORD_FIELDS")
+
+# ============================================================================
+# PART 2: Map the compiled mechanics onto character spells
+# ============================================================================
+
+old_attack_detection = '''      // Detect if spell requires attack roll
+      // Check description for attack keywords or if it's explicitly marked
+      const needsAttackRoll = apiSpell.attack_roll ||
+                             (apiSpell.desc && apiSpell.desc.some(d =>
+                               d.includes('ranged spell attack') ||
+                               d.includes('melee spell attack') ||
+                               d.includes('spell attack')
+                             ));'''
+
+new_attack_detection = '''      // Compiled spells carry the mechanics parsed from their description
+      // (python3 -m pagebuild.spells); other sources fall back to keywords
+      const mechanics = apiSpell.mechanics;
+      if (mechanics) {
+        if (mechanics.healing) spell.healing = mechanics.healing;
+        if (mechanics.scaling) spell.scaling = mechanics.scaling;
+      }
+
+      // Detect if spell requires attack roll
+      const needsAttackRoll = mechanics ? mechanics.attack !== null : (apiSpell.attack_roll ||
+                             (apiSpell.desc && apiSpell.desc.some(d => d.includes('spell attack'))));'''
+
+content, found = replace_anchor(content, old_attack_detection, new_attack_detection)
+if found:
+    print("✅ mapAPISpellToCharacterSpell uses the compiled mechanics")
+else:
+    print("⚠️ Could not find the attack roll detection in mapAPISpellToCharacterSpell")
+
+old_map_spell = '''    function mapAPISpellToCharacterSpell(apiSpell) {'''
+
+new_map_spell = '''    // Dice for a spell at the current character level (cantrips) or at
+    // slotLevel (leveled spells), from its mechanics scaling; `base` when the
+    // spell does not scale
+    function scaledSpellDice(spell, base, slotLevel) {
+      const scaling = spell.scaling;
+      if (!base || !scaling) return base;
+
+      const level = scaling.by === 'character' ? (currentCharacter?.level || 1) : Number(slotLevel);
+      let scaled = base;
+      // Integer-like keys enumerate in ascending order
+      Object.keys(scaling.levels).forEach(step => {
+        if (Number(step) <= level) scaled = scaling.levels[step];
+      });
+      return scaled;
+    }
+
+    function mapAPISpellToCharacterSpell(apiSpell) {'''
+
+content, found = replace_anchor(content, old_map_spell, new_map_spell)
+if found:
+    print("✅ Added scaledSpellDice")
+else:
+    print("⚠️ Could not find mapAPISpellToCharacterSpell")
+
+# ============================================================================
+# PART 3: Show the scaled damage in the spell modal
+# ============================================================================
+
+old_modal_damage = '''            <div class="spell-stat-value" style="color: var(--battle-color);">${spell.damage}</div>'''
+
+new_modal_damage = '''            <div class="spell-stat-value" style="color: var(--battle-color);">${scaledSpellDice(spell, spell.damage, level)}</div>'''
+
+content, found = replace_anchor(content, old_modal_damage, new_modal_damage)
+if found:
+    print("✅ Spell modal shows scaled damage")
+else:
+    print("⚠️ Could not find the spell modal damage stat")
+
+# ============================================================================
+# PART 4: Roll scaled damage and healing when casting
+# ============================================================================
+
+old_cast_damage = '''        if (spell.damage) {
+          const formula = diceFormulaIn(spell.damage);
+          if (formula) {
+            const damage = compileDice(formula)({ crit: isCrit });
+            resultText += ` | Damage: ${damage.total} (${spell.damage}${isCrit ? ', crit' : ''}) [${damage.rolls.join(', ')}]`;
+          }
+        }
+      } else if (spell.save) {'''
+
+new_cast_damage = '''        if (spell.damage) {
+          const damageDice = scaledSpellDice(spell, spell.damage, level);
+          const formula = diceFormulaIn(damageDice);
+          if (formula) {
+            const damage = compileDice(formula)({ crit: isCrit });
+            resultText += ` | Damage: ${damage.total} (${damageDice}${isCrit ? ', crit' : ''}) [${damage.rolls.join(', ')}]`;
+          }
+        }
+      } else if (spell.healing) {
+        // Healing spell; fixed amounts (Heal's 70) roll as a constant
+        const healingDice = scaledSpellDice(spell, spell.healing, level);
+        const healing = compileDice(healingDice)();
+        resultText += ` | Healing: ${healing.total} (${healingDice}) [${healing.rolls.join(', ')}]`;
+      } else if (spell.save) {'''
+
+content, found = replace_anchor(content, old_cast_damage, new_cast_damage)
+if found:
+    print("✅ castSpellFromModal rolls scaled damage and healing")
+else:
+    print("⚠️ Could not find the damage roll in castSpellFromModal")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
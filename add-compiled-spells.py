@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Load the precompiled spell list instead of mapping spells-srd.json on every load
+(build it with: python3 -m pagebuild.spells)
+"""
+
+from pagebuild.anchors import replace_anchor
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+old_fetch = '''        // Fetch spell list from local file
+        const response = await fetch('spells-srd.json');
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const spells = await response.json();
+
+        // Map to our format (SRD format is different from D&D 5e API)
+        allSpellsFromAPI = spells.map(spell => ({
+          index: spell.name.toLowerCase().replace(/\\s+/g, '-').replace(/[^\\w-]/g, ''),
+          name: spell.name,
+          level: spell.level === 'cantrip' ? 0 : parseInt(spell.level),
+          school: { name: spell.school.charAt(0).toUpperCase() + spell.school.slice(1) },
+          desc: [spell.description],
+          casting_time: spell.casting_time,
+          range: spell.range,
+          components: spell.components.raw || 'V, S',
+          duration: spell.duration,
+          concentration: spell.duration.toLowerCase().includes('concentration'),
+          // Try to extract damage from description
+          damage: extractDamageFromDescription(spell.description),
+          dc: extractSaveFromDescription(spell.description),
+          classes: spell.classes || []
+        }));
+'''
+
+new_fetch = '''        // Fetch the precompiled spell list (python3 -m pagebuild.spells).
+        // It is already in picker format: index, level, school, damage, save,
+        // concentration, attack_roll and lower-case classes are computed at build time.
+        const response = await fetch('spells-compiled.json');
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        allSpellsFromAPI = await response.json();
+'''
+
+content, found = replace_anchor(content, old_fetch, new_fetch)
+if found:
+    print("✅ fetchSpellsFromAPI now loads spells-compiled.json")
+else:
+    print("⚠️ Could not find spell mapping in fetchSpellsFromAPI")
+
+# Damage/save extraction now happens at build time
+old_extractors = '''    function extractDamageFromDescription(description) {
+      // Simple regex to extract damage dice (e.g., "1d6", "2d8")
+      const damageMatch = description.match(/(\\d+d\\d+(?:\\s*\\+\\s*\\d+)?)/);
+      return damageMatch ? damageMatch[1] : null;
+    }
+
+    function extractSaveFromDescription(description) {
+      // Extract save type (Dexterity, Constitution, etc.)
+      const saveMatch = description.match(/(Strength|Dexterity|Constitution|Intelligence|Wisdom|Charisma)\\s+saving\\s+throw/i);
+      if (saveMatch) {
+        return { dc_type: { name: saveMatch[1] } };
+      }
+      return null;
+    }
+
+'''
+
+content, found = replace_anchor(content, old_extractors, '')
+if found:
+    print("✅ Removed runtime damage/save extraction")
+else:
+    print("⚠️ Could not find extractDamageFromDescription/extractSaveFromDescription")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
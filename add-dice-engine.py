@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Add a dice expression engine (compiled, cached rollers with advantage,
+disadvantage, crit doubling, keep-highest and batch rolling) and use it for
+the quick attack buttons, rollDice and castSpellFromModal
+"""
+
+from pagebuild.anchors import replace_anchor
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: The engine (same behaviour as src/utils/dice.js and pagebuild/dice.py)
+# ============================================================================
+
+old_roll_attack = '''    function rollAttack() {
+      // Legacy function - redirect to melee attack
+      rollMeleeAttack();
+    }
+'''
+
+new_roll_attack = '''    // Dice expressions: '1d8+3', '2d6+1d4+3', 'd20', '4d6kh3', '2d20kl1'.
+    // compileDice() parses an expression once into a roller cached by its
+    // normalized text. roller({ advantage, disadvantage, crit }) returns
+    // { total, rolls, dropped, natural, formula }: advantage/disadvantage roll
+    // a lone d20 twice and keep the higher/lower, crit doubles every dice term.
+    const DICE_TERM = /([+-])(?:(\\d*)d(\\d+)(?:(kh|kl)(\\d+))?|(\\d+))/y;
+    const diceCache = new Map();
+
+    function parseDice(expression) {
+      let text = String(expression).replace(/\\s+/g, '').toLowerCase();
+      if (!/^[+-]/.test(text)) text = '+' + text;
+
+      const dice = [];
+      let modifier = 0;
+      DICE_TERM.lastIndex = 0;
+      while (DICE_TERM.lastIndex < text.length) {
+        const match = DICE_TERM.exec(text);
+        if (!match) throw new Error(`Invalid dice expression: ${expression}`);
+
+        const sign = match[1] === '-' ? -1 : 1;
+        if (match[6] !== undefined) {
+          modifier += sign * parseInt(match[6], 10);
+          continue;
+        }
+
+        const count = match[2] === '' ? 1 : parseInt(match[2], 10);
+        const sides = parseInt(match[3], 10);
+        const keep = match[4] ? Math.min(parseInt(match[5], 10), count) : count;
+        if (sides < 1) throw new Error(`Invalid dice expression: ${expression}`);
+        dice.push({ sign, count, sides, keep, keepHighest: match[4] !== 'kl' });
+      }
+
+      return { dice, modifier };
+    }
+
+    // Roll one dice term; kept dice go onto `rolls`, the others onto `dropped`
+    function rollDiceTerm(count, sides, keep, keepHighest, rolls, dropped) {
+      if (keep === count) {
+        let sum = 0;
+        for (let i = 0; i < count; i++) {
+          const roll = Math.floor(Math.random() * sides) + 1;
+          if (rolls) rolls.push(roll);
+          sum += roll;
+        }
+        return sum;
+      }
+
+      const values = [];
+      for (let i = 0; i < count; i++) values.push(Math.floor(Math.random() * sides) + 1);
+      values.sort(keepHighest ? (a, b) => b - a : (a, b) => a - b);
+      let sum = 0;
+      for (let i = 0; i < keep; i++) sum += values[i];
+      if (rolls) rolls.push(...values.slice(0, keep));
+      if (dropped) dropped.push(...values.slice(keep));
+      return sum;
+    }
+
+    function buildDiceRoller(parsed, formula) {
+      const { dice, modifier } = parsed;
+      const d20Term = dice.findIndex(term => term.sides === 20 && term.count === 1);
+
+      const roller = (options = {}) => {
+        const crit = options.crit ? 2 : 1;
+        const adv = options.advantage && !options.disadvantage;
+        const dis = options.disadvantage && !options.advantage;
+        const rolls = [];
+        const dropped = [];
+        let total = modifier;
+        let natural = null;
+
+        for (let i = 0; i < dice.length; i++) {
+          const term = dice[i];
+          if (i === d20Term && (adv || dis)) {
+            natural = rollDiceTerm(2, 20, 1, adv, rolls, dropped);
+            total += term.sign * natural;
+            continue;
+          }
+          const start = rolls.length;
+          total += term.sign * rollDiceTerm(term.count * crit, term.sides, term.keep * crit, term.keepHighest, rolls, dropped);
+          if (i === d20Term) natural = rolls[start];
+        }
+
+        return { total, rolls, dropped, natural, formula };
+      };
+
+      // Many rolls, totals only (no per-roll allocation)
+      roller.totals = (times, options = {}) => {
+        const crit = options.crit ? 2 : 1;
+        const adv = options.advantage && !options.disadvantage;
+        const dis = options.disadvantage && !options.advantage;
+        const out = new Int32Array(times);
+        for (let n = 0; n < times; n++) {
+          let total = modifier;
+          for (let i = 0; i < dice.length; i++) {
+            const term = dice[i];
+            const value = i === d20Term && (adv || dis)
+              ? rollDiceTerm(2, 20, 1, adv, null, null)
+              : rollDiceTerm(term.count * crit, term.sides, term.keep * crit, term.keepHighest, null, null);
+            total += term.sign * value;
+          }
+          out[n] = total;
+        }
+        return out;
+      };
+
+      roller.parsed = parsed;
+      roller.formula = formula;
+      return roller;
+    }
+
+    function compileDice(expression) {
+      const key = String(expression).replace(/\\s+/g, '').toLowerCase();
+      let roller = diceCache.get(key);
+      if (!roller) {
+        roller = buildDiceRoller(parseDice(key), key);
+        diceCache.set(key, roller);
+      }
+      return roller;
+    }
+
+    // Roll several expressions in one call: strings or { expression, advantage, disadvantage, crit }
+    function rollDiceBatch(requests) {
+      return requests.map(request => typeof request === 'string'
+        ? compileDice(request)()
+        : compileDice(request.expression)(request));
+    }
+
+    // First dice expression inside free text such as a spell's damage field, or null
+    function diceFormulaIn(text) {
+      const match = String(text || '').match(/\\d*d\\d+(?:\\s*[+-]\\s*\\d*d?\\d+)*/i);
+      return match ? match[0].replace(/\\s+/g, '') : null;
+    }
+
+    function signedModifier(value) {
+      return value === 0 ? '' : `${value > 0 ? '+' : ''}${value}`;
+    }
+
+    function rollAttack() {
+      // Legacy function - redirect to melee attack
+      rollMeleeAttack();
+    }
+'''
+
+content, found = replace_anchor(content, old_roll_attack, new_roll_attack)
+if found:
+    print("✅ Added dice expression engine")
+else:
+    print("⚠️ Could not find rollAttack")
+
+# ============================================================================
+# PART 2: Quick melee/ranged attacks
+# ============================================================================
+
+for ability, mod, label, emoji in (('str', 'strMod', 'Melee Attack', '⚔️'), ('dex', 'dexMod', 'Ranged Attack', '🏹')):
+    old_attack = f'''      const {mod} = Math.floor((currentCharacter.stats.{ability} - 10) / 2);
+      const roll = Math.floor(Math.random() * 20) + 1;
+      const total = roll + {mod};
+      const breakdown = `1d20${{{mod} >= 0 ? '+' : ''}}${{{mod}}}`;
+
+      showDiceRoll('{label}', 'd20', roll, total, breakdown, roll === 20 ? 'success' : (roll === 1 ? 'fail' : null));
+      addBattleLog(`{emoji} ${{currentCharacter.name}} rolled {label}: ${{total}} (${{breakdown}})`);
+
+      // Roll damage if hit (not on nat 1)
+      if (roll !== 1) {{
+        setTimeout(() => {{
+          const damageRoll = Math.floor(Math.random() * 8) + 1 + {mod};
+          addBattleLog(`💥 Damage: ${{damageRoll}} (1d8${{{mod} >= 0 ? '+' : ''}}${{{mod}}})`);
+        }}, 500);
+      }}'''
+
+    new_attack = f'''      const {mod} = Math.floor((currentCharacter.stats.{ability} - 10) / 2);
+      const attack = compileDice(`1d20${{signedModifier({mod})}}`)();
+      const roll = attack.natural;
+      const total = attack.total;
+      const breakdown = `1d20${{{mod} >= 0 ? '+' : ''}}${{{mod}}}`;
+
+      showDiceRoll('{label}', 'd20', roll, total, breakdown, roll === 20 ? 'success' : (roll === 1 ? 'fail' : null));
+      addBattleLog(`{emoji} ${{currentCharacter.name}} rolled {label}: ${{total}} (${{breakdown}})`);
+
+      // Roll damage if hit (not on nat 1); a natural 20 doubles the dice
+      if (roll !== 1) {{
+        setTimeout(() => {{
+          const damage = compileDice(`1d8${{signedModifier({mod})}}`)({{ crit: roll === 20 }});
+          addBattleLog(`💥 Damage: ${{damage.total}} (${{roll === 20 ? '2d8' : '1d8'}}${{{mod} >= 0 ? '+' : ''}}${{{mod}}})`);
+        }}, 500);
+      }}'''
+
+    content, found = replace_anchor(content, old_attack, new_attack)
+    if found:
+        print(f"✅ {label} uses the dice engine")
+    else:
+        print(f"⚠️ Could not find {label} roll")
+
+# ============================================================================
+# PART 3: rollDice
+# ============================================================================
+
+old_roll_dice = '''    function rollDice(type, dice, modifier = 0) {
+      const sides = parseInt(dice.substring(1));
+      const roll = Math.floor(Math.random() * sides) + 1;
+'''
+
+new_roll_dice = '''    function rollDice(type, dice, modifier = 0) {
+      const roller = compileDice(`1${dice}`);
+      const sides = roller.parsed.dice[0].sides;
+      const roll = roller().total;
+'''
+
+content, found = replace_anchor(content, old_roll_dice, new_roll_dice)
+if found:
+    print("✅ rollDice uses the dice engine")
+else:
+    print("⚠️ Could not find rollDice")
+
+# ============================================================================
+# PART 4: castSpellFromModal
+# ============================================================================
+
+old_modal_attack = '''        if (spell.attackRoll) {
+          const d20 = Math.floor(Math.random() * 20) + 1;
+          const spellAttackBonus = currentCharacter.computed?.spellAttackBonus || 7;
+          const total = d20 + spellAttackBonus;
+          const isCrit = d20 === 20;
+          const isFail = d20 === 1;
+'''
+
+new_modal_attack = '''        let isCrit = false;
+        if (spell.attackRoll) {
+          const spellAttackBonus = currentCharacter.computed?.spellAttackBonus || 7;
+          const attack = compileDice(`1d20+${spellAttackBonus}`)();
+          const d20 = attack.natural;
+          const total = attack.total;
+          isCrit = d20 === 20;
+          const isFail = d20 === 1;
+'''
+
+content, found = replace_anchor(content, old_modal_attack, new_modal_attack)
+if found:
+    print("✅ castSpellFromModal attack uses the dice engine")
+else:
+    print("⚠️ Could not find castSpellFromModal attack roll")
+
+old_modal_damage = '''        if (spell.damage) {
+          const damageMatch = spell.damage.match(/(\\d+)d(\\d+)([+-]\\d+)?/);
+          if (damageMatch) {
+            const numDice = parseInt(damageMatch[1]);
+            const diceType = parseInt(damageMatch[2]);
+            const modifier = damageMatch[3] ? parseInt(damageMatch[3]) : 0;
+
+            let damageTotal = 0;
+            let rolls = [];
+            for (let i = 0; i < numDice; i++) {
+              const roll = Math.floor(Math.random() * diceType) + 1;
+              rolls.push(roll);
+              damageTotal += roll;
+            }
+            damageTotal += modifier;
+
+            resultText += ` | Damage: ${damageTotal} (${spell.damage}) [${rolls.join(', ')}]`;
+          }
+        }'''
+
+new_modal_damage = '''        if (spell.damage) {
+          const formula = diceFormulaIn(spell.damage);
+          if (formula) {
+            const damage = compileDice(formula)({ crit: isCrit });
+            resultText += ` | Damage: ${damage.total} (${spell.damage}${isCrit ? ', crit' : ''}) [${damage.rolls.join(', ')}]`;
+          }
+        }'''
+
+content, found = replace_anchor(content, old_modal_damage, new_modal_damage)
+if found:
+    print("✅ castSpellFromModal damage uses the dice engine")
+else:
+    print("⚠️ Could not find castSpellFromModal damage roll")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Show exact hit chance and expected damage: generated d20/damage lookup data
+from pagebuild/odds.py, an exact convolution fallback for other expressions,
+and a target AC used by the spell modals and rollWeaponAttack
+"""
+
+from pagebuild.anchors import replace_anchor
+from pagebuild.odds import render_js
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: CSS for the target AC input in the spell modal
+# ============================================================================
+
+old_stat_value_css = '''    .spell-stat-value {
+      font-size: 0.9rem;
+      color: var(--text-primary);
+      font-weight: 600;
+    }
+'''
+
+new_stat_value_css = '''    .spell-stat-value {
+      font-size: 0.9rem;
+      color: var(--text-primary);
+      font-weight: 600;
+    }
+
+    .spell-stat-label input {
+      width: 3.2em;
+      margin-left: 4px;
+      padding: 1px 4px;
+      font-size: 0.75rem;
+      background: var(--surface-color);
+      color: var(--text-primary);
+      border: 1px solid var(--border-color);
+      border-radius: 4px;
+    }
+'''
+
+content, found = replace_anchor(content, old_stat_value_css, new_stat_value_css)
+if found:
+    print("✅ Added target AC input styles")
+else:
+    print("⚠️ Could not find .spell-stat-value styles")
+
+# ============================================================================
+# PART 2: Generated odds tables + exact distributions
+# ============================================================================
+
+old_signed_modifier = '''    function signedModifier(value) {
+      return value === 0 ? '' : `${value > 0 ? '+' : ''}${value}`;
+    }
+'''
+
+new_signed_modifier = old_signed_modifier + '''
+    // Dice odds: hit chance against a target AC and expected damage, exact
+    // rather than sampled. Known damage expressions come from the generated
+    // tables below; anything else is convolved once by diceDistribution().
+''' + render_js(content) + '''
+    const DICE_ENUMERATION_LIMIT = 2000000;
+    const diceDistributionCache = new Map();
+    const diceStatsCache = new Map();
+    let oddsTargetAC = 15;
+
+    function convolvePmf(a, b) {
+      const p = new Float64Array(a.p.length + b.p.length - 1);
+      for (let i = 0; i < a.p.length; i++) {
+        if (a.p[i] === 0) continue;
+        for (let j = 0; j < b.p.length; j++) p[i + j] += a.p[i] * b.p[j];
+      }
+      return { min: a.min + b.min, p };
+    }
+
+    // Distribution of one term's sum; keep-highest/lowest terms are
+    // enumerated outright (null past DICE_ENUMERATION_LIMIT outcomes)
+    function diceTermPmf(count, sides, keep, keepHighest) {
+      if (keep === count) {
+        const die = { min: 1, p: new Float64Array(sides).fill(1 / sides) };
+        let pmf = { min: 0, p: new Float64Array([1]) };
+        for (let i = 0; i < count; i++) pmf = convolvePmf(pmf, die);
+        return pmf;
+      }
+
+      const outcomes = sides ** count;
+      if (outcomes > DICE_ENUMERATION_LIMIT) return null;
+      const faces = new Array(count).fill(1);
+      const sorted = new Array(count);
+      const counts = new Float64Array(keep * sides + 1);
+      for (let n = 0; n < outcomes; n++) {
+        for (let i = 0; i < count; i++) sorted[i] = faces[i];
+        sorted.sort(keepHighest ? (a, b) => b - a : (a, b) => a - b);
+        let total = 0;
+        for (let i = 0; i < keep; i++) total += sorted[i];
+        counts[total]++;
+        for (let i = 0; i < count && ++faces[i] > sides; i++) faces[i] = 1;
+      }
+      return { min: keep, p: counts.subarray(keep).map(c => c / outcomes) };
+    }
+
+    // Exact distribution of an expression: { min, max, mean, p } with
+    // p[total - min] = P(total), or null if a keep term is too large.
+    // Same rules as compileDice's rollers (and pagebuild/dice.py).
+    function diceDistribution(expression, options = {}) {
+      const roller = compileDice(expression);
+      const crit = options.crit ? 2 : 1;
+      const adv = options.advantage && !options.disadvantage;
+      const dis = options.disadvantage && !options.advantage;
+      const key = `${roller.formula}|${adv ? 'adv' : dis ? 'dis' : ''}|${crit}`;
+      if (diceDistributionCache.has(key)) return diceDistributionCache.get(key);
+
+      const { dice, modifier } = roller.parsed;
+      const d20Term = dice.findIndex(term => term.sides === 20 && term.count === 1);
+      let pmf = { min: modifier, p: new Float64Array([1]) };
+      for (let i = 0; i < dice.length && pmf; i++) {
+        const term = dice[i];
+        const part = i === d20Term && (adv || dis)
+          ? diceTermPmf(2, 20, 1, adv)
+          : diceTermPmf(term.count * crit, term.sides, term.keep * crit, term.keepHighest);
+        if (!part) {
+          pmf = null;
+        } else if (term.sign < 0) {
+          pmf = convolvePmf(pmf, { min: -(part.min + part.p.length - 1), p: part.p.slice().reverse() });
+        } else {
+          pmf = convolvePmf(pmf, part);
+        }
+      }
+
+      let distribution = null;
+      if (pmf) {
+        let mean = 0;
+        for (let i = 0; i < pmf.p.length; i++) mean += (pmf.min + i) * pmf.p[i];
+        distribution = { min: pmf.min, max: pmf.min + pmf.p.length - 1, mean, p: pmf.p };
+      }
+      diceDistributionCache.set(key, distribution);
+      return distribution;
+    }
+
+    // { mean, critMean, min, max } of a damage expression, or null
+    function diceStats(expression) {
+      const key = String(expression).replace(/\\s+/g, '').toLowerCase();
+      let stats = diceStatsCache.get(key);
+      if (stats !== undefined) return stats;
+
+      const row = diceStatsTable[key];
+      if (row) {
+        stats = { mean: row[0], critMean: row[1], min: row[2], max: row[3] };
+      } else {
+        try {
+          const normal = diceDistribution(key);
+          const crit = diceDistribution(key, { crit: true });
+          stats = normal && crit ? { mean: normal.mean, critMean: crit.mean, min: normal.min, max: normal.max } : null;
+        } catch (error) {
+          stats = null;
+        }
+      }
+      diceStatsCache.set(key, stats);
+      return stats;
+    }
+
+    // P(hit) and P(crit) for d20 + bonus against an AC: a natural 1 always
+    // misses, a natural 20 always hits and crits
+    function attackOdds(bonus, ac, options = {}) {
+      const mode = options.advantage && !options.disadvantage ? 1
+        : options.disadvantage && !options.advantage ? 2 : 0;
+      const need = Math.min(Math.max(ac - bonus, 2), 20);
+      return { hit: d20AtLeast[mode * 22 + need] / 400, crit: d20AtLeast[mode * 22 + 20] / 400 };
+    }
+
+    // Average damage per attack, misses included; crits double the dice
+    function expectedAttackDamage(expression, bonus, ac, options = {}) {
+      const stats = diceStats(expression);
+      if (!stats) return null;
+      const { hit, crit } = attackOdds(bonus, ac, options);
+      return (hit - crit) * stats.mean + crit * stats.critMean;
+    }
+
+    function formatChance(p) {
+      return `${Math.round(p * 100)}%`;
+    }
+
+    function spellAttackOddsText(spell) {
+      const bonus = currentCharacter.computed?.spellAttackBonus || 7;
+      const { hit } = attackOdds(bonus, oddsTargetAC);
+      const expected = expectedAttackDamage(diceFormulaIn(spell.damage), bonus, oddsTargetAC);
+      return `${formatChance(hit)} to hit • ${expected.toFixed(1)} avg`;
+    }
+
+    // Extra spell modal stats: average damage, and for attack spells the hit
+    // chance and expected damage against the target AC
+    function spellOddsHtml(spell) {
+      const formula = diceFormulaIn(spell.damage);
+      const stats = formula && diceStats(formula);
+      if (!stats) return '';
+
+      let html = `
+        <div class="spell-stat">
+          <div class="spell-stat-label">Average Damage</div>
+          <div class="spell-stat-value">${+stats.mean.toFixed(1)} (${stats.min}–${stats.max})</div>
+        </div>
+      `;
+      if (spell.attackRoll) {
+        html += `
+          <div class="spell-stat">
+            <div class="spell-stat-label">vs AC<input type="number" min="1" max="30" value="${oddsTargetAC}" onchange="setOddsTargetAC(this.value)"></div>
+            <div class="spell-stat-value" id="modalSpellOdds">${spellAttackOddsText(spell)}</div>
+          </div>
+        `;
+      }
+      return html;
+    }
+
+    function setOddsTargetAC(value) {
+      const ac = parseInt(value, 10);
+      if (!Number.isFinite(ac)) return;
+      oddsTargetAC = Math.min(Math.max(ac, 1), 30);
+      const odds = document.getElementById('modalSpellOdds');
+      if (odds && currentModalSpell) odds.textContent = spellAttackOddsText(currentModalSpell);
+    }
+'''
+
+content, found = replace_anchor(content, old_signed_modifier, new_signed_modifier)
+if found:
+    print("✅ Added dice odds tables and exact distributions")
+else:
+    print("⚠️ Could not find signedModifier")
+
+# ============================================================================
+# PART 3: Odds in the spell detail modals
+# ============================================================================
+
+old_spell_detail_stats = '''        statsGrid.innerHTML += damageHtml + saveHtml;
+      }
+
+      // Description
+      document.getElementById('modalSpellDescription').textContent = spell.description || 'No description available.';'''
+
+new_spell_detail_stats = '''        statsGrid.innerHTML += damageHtml + saveHtml;
+      }
+      statsGrid.insertAdjacentHTML('beforeend', spellOddsHtml(spell));
+
+      // Description
+      document.getElementById('modalSpellDescription').textContent = spell.description || 'No description available.';'''
+
+content, found = replace_anchor(content, old_spell_detail_stats, new_spell_detail_stats)
+if found:
+    print("✅ openSpellDetail shows damage odds")
+else:
+    print("⚠️ Could not find openSpellDetail stats")
+
+old_picker_detail_stats = '''        statsGrid.innerHTML += damageHtml + saveHtml;
+      }
+
+      // Description
+      document.getElementById('modalSpellDescription').textContent = mappedSpell.description || 'No description available.';'''
+
+new_picker_detail_stats = '''        statsGrid.innerHTML += damageHtml + saveHtml;
+      }
+      statsGrid.insertAdjacentHTML('beforeend', spellOddsHtml(mappedSpell));
+
+      // Description
+      document.getElementById('modalSpellDescription').textContent = mappedSpell.description || 'No description available.';'''
+
+content, found = replace_anchor(content, old_picker_detail_stats, new_picker_detail_stats)
+if found:
+    print("✅ openSpellPickerDetail shows damage odds")
+else:
+    print("⚠️ Could not find openSpellPickerDetail stats")
+
+# ============================================================================
+# PART 4: rollWeaponAttack hits against the target AC and reports the odds
+# ============================================================================
+
+old_weapon_attack = '''      // Roll attack (d20 + toHit)
+      const attackRoll = Math.floor(Math.random() * 20) + 1;
+      const attackTotal = attackRoll + attack.toHit;
+      const attackBreakdown = `1d20+${attack.toHit}`;
+
+      showDiceRoll(`${attack.name} Attack`, 'd20', attackRoll, attackTotal, attackBreakdown,
+        attackRoll === 20 ? 'success' : (attackRoll === 1 ? 'fail' : null));
+
+      addBattleLog(`${currentCharacter.name} attacks with ${attack.name}: ${attackTotal} to hit`);
+
+      // If hit, prompt for damage roll or auto-roll
+      if (attackRoll >= 10) { // Simplified - assume hits on 10+
+        setTimeout(() => {
+          // Parse damage (e.g., "1d8+4")
+          const match = attack.damage.match(/(\\d+)d(\\d+)([\\+\\-]\\d+)?/);
+          if (match) {
+            const numDice = parseInt(match[1]);
+            const diceSize = parseInt(match[2]);
+            const modifier = match[3] ? parseInt(match[3]) : 0;
+
+            let damageTotal = 0;
+            for (let i = 0; i < numDice; i++) {
+              damageTotal += Math.floor(Math.random() * diceSize) + 1;
+            }
+            damageTotal += modifier;
+
+            showDiceRoll(`${attack.name} Damage`, `d${diceSize}`, damageTotal - modifier, damageTotal, attack.damage, null);
+            addBattleLog(`${attack.name} deals ${damageTotal} damage!`);
+          }
+        }, 1000);
+      }
+    }'''
+
+new_weapon_attack = '''      // Roll attack (d20 + toHit) against the target AC
+      const attackRoll = compileDice(`1d20${signedModifier(attack.toHit)}`)();
+      const natural = attackRoll.natural;
+      const attackTotal = attackRoll.total;
+      const attackBreakdown = `1d20+${attack.toHit}`;
+      const isCrit = natural === 20;
+      const isHit = isCrit || (natural !== 1 && attackTotal >= oddsTargetAC);
+
+      showDiceRoll(`${attack.name} Attack`, 'd20', natural, attackTotal, attackBreakdown,
+        natural === 20 ? 'success' : (natural === 1 ? 'fail' : null));
+
+      const formula = diceFormulaIn(attack.damage);
+      const { hit } = attackOdds(attack.toHit, oddsTargetAC);
+      const expected = formula ? expectedAttackDamage(formula, attack.toHit, oddsTargetAC) : null;
+      const odds = `${formatChance(hit)} to hit${expected !== null ? `, ${expected.toFixed(1)} avg damage` : ''}`;
+      addBattleLog(`${currentCharacter.name} attacks with ${attack.name}: ${attackTotal} vs AC ${oddsTargetAC}, ${isHit ? 'hit' : 'miss'} (${odds})`);
+
+      // On a hit, roll damage; a natural 20 doubles the dice
+      if (isHit && formula) {
+        setTimeout(() => {
+          const roller = compileDice(formula);
+          const damage = roller({ crit: isCrit });
+          const sides = roller.parsed.dice[0]?.sides;
+          const breakdown = isCrit ? `${attack.damage} (crit)` : attack.damage;
+
+          showDiceRoll(`${attack.name} Damage`, sides ? `d${sides}` : '🎲', damage.total - roller.parsed.modifier, damage.total, breakdown, null);
+          addBattleLog(`${attack.name} deals ${damage.total} damage!`);
+        }, 1000);
+      }
+    }'''
+
+content, found = replace_anchor(content, old_weapon_attack, new_weapon_attack)
+if found:
+    print("✅ rollWeaponAttack rolls against the target AC")
+else:
+    print("⚠️ Could not find rollWeaponAttack")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Replace the hand-picked embedded fallback spells with the generated, size-budgeted
+list from pagebuild/fallback.py: already in the allSpellsFromAPI shape, so the
+offline path only parses a JSON string and maps nothing
+"""
+
+from pagebuild.anchors import replace_anchor
+from pagebuild.fallback import render_js
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: Generated fallback data
+# ============================================================================
+
+old_server_queries = '''    // Server-side spell queries (python3 -m pagebuild.devserver). A corpus'''
+
+new_server_queries = render_js(content) + '''
+    // Server-side spell queries (python3 -m pagebuild.devserver). A corpus'''
+
+content, found = replace_anchor(content, old_server_queries, new_server_queries)
+if found:
+    print("✅ Added the generated fallback spell list")
+else:
+    print("⚠️ Could not find the server spell query helpers")
+
+# ============================================================================
+# PART 2: Use it in fetchSpellsFromAPI's catch block
+# ============================================================================
+
+# The old list is one very long line; take it from the page as it is
+fallback_start = content.find('        const fallbackSpells = [')
+fallback_end = content.find('\n', fallback_start)
+
+old_fallback = content[fallback_start:fallback_end] + '''
+
+        // Map to our format
+        allSpellsFromAPI = fallbackSpells.map(spell => ({
+          index: spell.name.toLowerCase().replace(/\\s+/g, '-').replace(/[^\\w-]/g, ''),
+          name: spell.name,
+          level: spell.level === 'cantrip' ? 0 : parseInt(spell.level),
+          school: { name: spell.school },
+          desc: [spell.description],
+          casting_time: spell.casting_time,
+          range: spell.range,
+          components: spell.components.raw,
+          duration: spell.duration,
+          concentration: spell.duration.includes('Concentration'),
+          ritual: spell.ritual,
+          classes: spell.classes || []
+        }));'''
+
+new_fallback = '''        spellSearchIndex = null;
+        allSpellsFromAPI = JSON.parse(embeddedFallbackSpellsJSON);'''
+
+if fallback_start == -1:
+    found = False
+else:
+    content, found = replace_anchor(content, old_fallback, new_fallback)
+if found:
+    print("✅ fetchSpellsFromAPI parses the generated fallback list")
+else:
+    print("⚠️ Could not find the embedded fallback spells in fetchSpellsFromAPI")
+
+old_info = '''          For full spell list, run: <code style="background: rgba(0,0,0,0.2); padding: 2px 6px; border-radius: 3px;">python3 -m http.server 8000</code>'''
+
+new_info = '''          For full spell list, run: <code style="background: rgba(0,0,0,0.2); padding: 2px 6px; border-radius: 3px;">./start-server.sh</code>'''
+
+content, found = replace_anchor(content, old_info, new_info)
+if found:
+    print("✅ Fallback notice points at start-server.sh")
+else:
+    print("⚠️ Could not find the fallback notice")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
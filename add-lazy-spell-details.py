@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Load only the slim spell index up front and fetch descriptions per level on demand
+(spells-index.json + spell-shards/level-N.json, built by: python3 -m pagebuild.spells)
+"""
+
+from pagebuild.anchors import replace_anchor
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: Fetch the summary index instead of the full compiled list
+# ============================================================================
+
+old_fetch = '''        // Fetch the precompiled spell list (python3 -m pagebuild.spells).
+        // It is already in picker format: index, level, school, damage, save,
+        // concentration, attack_roll and lower-case classes are computed at build time.
+        const response = await fetch('spells-compiled.json');'''
+
+new_fetch = '''        // Fetch the spell index (python3 -m pagebuild.spells): only index, name,
+        // level, school and classes. Descriptions and mechanics are fetched per
+        // level by ensureSpellDetails() when a spell is opened or added.
+        const response = await fetch('spells-index.json');'''
+
+content, found = replace_anchor(content, old_fetch, new_fetch)
+if found:
+    print("✅ fetchSpellsFromAPI now loads spells-index.json")
+else:
+    print("⚠️ Could not find compiled spell fetch")
+
+# ============================================================================
+# PART 2: Add per-level shard loader before renderPickerSpells
+# ============================================================================
+
+render_marker = '''    function renderPickerSpells(spells) {'''
+
+shard_loader = '''    // Spell details live in per-level shards; each shard is fetched at most once
+    const spellShardRequests = {};
+
+    function loadSpellShard(level) {
+      if (!spellShardRequests[level]) {
+        spellShardRequests[level] = fetch(`spell-shards/level-${level}.json`)
+          .then(response => {
+            if (!response.ok) {
+              throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return response.json();
+          })
+          .catch(error => {
+            delete spellShardRequests[level];
+            throw error;
+          });
+      }
+      return spellShardRequests[level];
+    }
+
+    async function ensureSpellDetails(spell) {
+      // Embedded fallback spells already carry their description
+      if (spell.desc) return spell;
+      const shard = await loadSpellShard(spell.level);
+      return Object.assign(spell, shard[spell.index]);
+    }
+
+'''
+
+content, found = replace_anchor(content, render_marker, shard_loader + render_marker)
+if found:
+    print("✅ Added loadSpellShard / ensureSpellDetails")
+else:
+    print("⚠️ Could not find renderPickerSpells")
+
+# ============================================================================
+# PART 3: Load details before showing or adding a picker spell
+# ============================================================================
+
+old_picker_detail = '''    function openSpellPickerDetail(spellIndex) {
+      const spell = allSpellsFromAPI.find(s => s.index === spellIndex);
+      if (!spell) return;
+'''
+
+new_picker_detail = '''    async function openSpellPickerDetail(spellIndex) {
+      const spell = allSpellsFromAPI.find(s => s.index === spellIndex);
+      if (!spell) return;
+
+      try {
+        await ensureSpellDetails(spell);
+      } catch (error) {
+        console.warn(`Could not load details for ${spell.name}:`, error);
+      }
+'''
+
+content, found = replace_anchor(content, old_picker_detail, new_picker_detail)
+if found:
+    print("✅ openSpellPickerDetail loads the spell's shard")
+else:
+    print("⚠️ Could not find openSpellPickerDetail")
+
+old_add_spell = '''    function addSpellToCharacter(spellIndex) {
+      const apiSpell = allSpellsFromAPI.find(s => s.index === spellIndex);
+      if (!apiSpell) return;
+'''
+
+new_add_spell = '''    async function addSpellToCharacter(spellIndex) {
+      const apiSpell = allSpellsFromAPI.find(s => s.index === spellIndex);
+      if (!apiSpell) return;
+
+      try {
+        await ensureSpellDetails(apiSpell);
+      } catch (error) {
+        console.warn(`Could not load details for ${apiSpell.name}:`, error);
+      }
+'''
+
+content, found = replace_anchor(content, old_add_spell, new_add_spell)
+if found:
+    print("✅ addSpellToCharacter loads the spell's shard")
+else:
+    print("⚠️ Could not find addSpellToCharacter")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
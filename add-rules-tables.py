@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Replace the ad-hoc spell slot / progression tables with the lookup tables
+generated by pagebuild/rules.py (full, half and third casters, slots up to
+9th level, spells/cantrips known, proficiency bonus)
+"""
+
+from pagebuild.anchors import replace_anchor
+from pagebuild.rules import render_js
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: Generated tables replace the progression arrays
+# ============================================================================
+
+old_progression_tables = '''    // 5e Spell Progression Tables (spells known/in spellbook by level)
+    const spellsKnownProgression = {
+      // Full casters - Known spells
+      bard: [0, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 15, 16, 18, 19, 20, 22, 22, 22],
+      sorcerer: [0, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 12, 13, 13, 14, 14, 15, 15, 15, 15],
+      warlock: [0, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 11, 11, 12, 12, 13, 13, 14, 14, 15, 15],
+      // Half casters - Known spells
+      ranger: [0, 0, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10, 11, 11],
+      // Prepared casters - these numbers represent spellbook size for wizards
+      wizard: [0, 6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30, 32, 34, 36, 38, 40, 42, 44],
+      // Prepared casters (Cleric, Druid, Paladin) have access to full class list
+      // They can prepare: spellcasting_mod + level spells
+    };
+
+    // Cantrips known progression
+    const cantripsKnownProgression = {
+      bard: [0, 2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4],
+      cleric: [0, 3, 3, 3, 4, 4, 4, 4, 4, 4, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5],
+      druid: [0, 2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4],
+      sorcerer: [0, 4, 4, 4, 5, 5, 5, 5, 5, 5, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6],
+      warlock: [0, 2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4],
+      wizard: [0, 3, 3, 3, 4, 4, 4, 4, 4, 4, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5]
+    };
+'''
+
+content, found = replace_anchor(content, old_progression_tables, render_js())
+if found:
+    print("✅ Added generated rules tables")
+else:
+    print("⚠️ Could not find spell progression tables")
+
+# ============================================================================
+# PART 2: getSpellSlots now comes from the generated block
+# ============================================================================
+
+old_get_spell_slots = '''    // Helper function to get spell slots by level and class type
+    function getSpellSlots(characterLevel, classType, spellLevel) {
+      // Simplified spell slot calculation (D&D 5e)
+      const halfcasterLevel = Math.floor(characterLevel / 2);
+      const effectiveLevel = classType === 'halfcaster' ? halfcasterLevel : characterLevel;
+
+      const slotTable = {
+        1: [2, 3, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4],
+        2: [0, 0, 2, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3],
+        3: [0, 0, 0, 0, 2, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3],
+        4: [0, 0, 0, 0, 0, 0, 1, 2, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3],
+        5: [0, 0, 0, 0, 0, 0, 0, 0, 1, 2, 2, 2, 2, 2, 2, 2, 2, 3, 3, 3]
+      };
+
+      if (spellLevel > 5 || effectiveLevel < 1) return 0;
+      return slotTable[spellLevel]?.[effectiveLevel - 1] || 0;
+    }
+
+'''
+
+content, found = replace_anchor(content, old_get_spell_slots, '')
+if found:
+    print("✅ Removed inline getSpellSlots table")
+else:
+    print("⚠️ Could not find getSpellSlots")
+
+# ============================================================================
+# PART 3: Spell slot display uses the table for third casters and prep counts
+# ============================================================================
+
+old_slot_init = '''        const maxSpellLevel = Math.max(...Object.keys(currentCharacter.spells).map(l => parseInt(l)).filter(l => l > 0));
+        for (let level = 1; level <= maxSpellLevel; level++) {
+          const maxSlots = getSpellSlots(currentCharacter.level, currentCharacter.classType, level);'''
+
+new_slot_init = '''        const maxSpellLevel = Math.max(...Object.keys(currentCharacter.spells).map(l => parseInt(l)).filter(l => l > 0));
+        const slotClassType = ['Eldritch Knight', 'Arcane Trickster'].includes(currentCharacter.subclass)
+          ? 'thirdcaster'
+          : currentCharacter.classType;
+        for (let level = 1; level <= maxSpellLevel; level++) {
+          const maxSlots = getSpellSlots(currentCharacter.level, slotClassType, level);'''
+
+content, found = replace_anchor(content, old_slot_init, new_slot_init)
+if found:
+    print("✅ Spell slot init handles third casters")
+else:
+    print("⚠️ Could not find spell slot initialization")
+
+old_max_prepared = '''      let maxPrepared = Math.floor(currentCharacter.level / 2) + Math.floor((currentCharacter.stats.wis - 10) / 2);
+      if (currentCharacter.classType === 'caster') {
+        maxPrepared = currentCharacter.level + Math.floor((currentCharacter.stats.int - 10) / 2);
+      }'''
+
+new_max_prepared = '''      let maxPrepared = preparedCasterLevel(CASTER_HALF, currentCharacter.level) + Math.floor((currentCharacter.stats.wis - 10) / 2);
+      if (currentCharacter.classType === 'caster') {
+        maxPrepared = preparedCasterLevel(CASTER_FULL, currentCharacter.level) + Math.floor((currentCharacter.stats.int - 10) / 2);
+      }'''
+
+content, found = replace_anchor(content, old_max_prepared, new_max_prepared)
+if found:
+    print("✅ Prepared count uses the rules table")
+else:
+    print("⚠️ Could not find prepared spell count")
+
+# ============================================================================
+# PART 4: autoPopulateSpells / updateSpells read the tables
+# ============================================================================
+
+old_third_cantrips = '''      } else if (isThirdCaster && level >= 3) {
+        // 1/3 casters get cantrips starting at level 3
+        cantripCount = level >= 10 ? 3 : 2;
+      }'''
+
+new_third_cantrips = '''      } else if (isThirdCaster) {
+        // 1/3 casters get cantrips starting at level 3
+        cantripCount = cantripsKnown('thirdcaster', level);
+      }'''
+
+content, found = replace_anchor(content, old_third_cantrips, new_third_cantrips)
+if found:
+    print("✅ Third caster cantrips use the rules table")
+else:
+    print("⚠️ Could not find third caster cantrip count")
+
+old_max_spell_level = '''      let maxSpellLevel;
+      if (isThirdCaster) {
+        // 1/3 casters: start at level 3, max 4th level spells
+        if (level < 3) return; // No spells yet
+        maxSpellLevel = Math.min(4, Math.floor(level / 3));
+      } else if (halfcasters.includes(charClass)) {
+        // Half casters: start at level 2, max 5th level spells
+        if (level < 2) return; // No spells yet
+        maxSpellLevel = Math.min(5, Math.ceil(level / 4));
+      } else {
+        // Full casters: start at level 1, max 9th level spells
+        maxSpellLevel = Math.min(9, Math.ceil(level / 2));
+      }'''
+
+new_max_spell_level = '''      // Full casters reach 9th level spells, half casters 5th (from level 2),
+      // 1/3 casters 4th (from level 3)
+      const caster = isThirdCaster ? CASTER_THIRD : halfcasters.includes(charClass) ? CASTER_HALF : CASTER_FULL;
+      const maxSpellLevel = maxSpellLevelFor(caster, level);
+      if (maxSpellLevel === 0) return; // No spells yet'''
+
+content, found = replace_anchor(content, old_max_spell_level, new_max_spell_level)
+if found:
+    print("✅ autoPopulateSpells max spell level uses the rules table")
+else:
+    print("⚠️ Could not find max spell level calculation")
+
+old_third_known = '''        // 1/3 casters use their own progression
+        // Level 3: 3 spells, Level 4-6: 4, Level 7: 5, etc.
+        totalSpellsToAdd = Math.min(13, Math.floor((level - 3) / 2) + 3);'''
+
+new_third_known = '''        // 1/3 casters use their own progression
+        totalSpellsToAdd = spellsKnown('thirdcaster', level);'''
+
+content, found = replace_anchor(content, old_third_known, new_third_known)
+if found:
+    print("✅ Third caster spells known use the rules table")
+else:
+    print("⚠️ Could not find third caster spells known")
+
+old_update_max_level = '''      const maxSpellLevel = halfcasters.includes(charClass) ? Math.min(5, Math.ceil(level / 4)) : Math.min(9, Math.ceil(level / 2));'''
+
+new_update_max_level = '''      const caster = isThirdCaster ? CASTER_THIRD : halfcasters.includes(charClass) ? CASTER_HALF : CASTER_FULL;
+      const maxSpellLevel = maxSpellLevelFor(caster, level);'''
+
+content, found = replace_anchor(content, old_update_max_level, new_update_max_level)
+if found:
+    print("✅ updateSpells max spell level uses the rules table")
+else:
+    print("⚠️ Could not find updateSpells max spell level")
+
+# ============================================================================
+# PART 5: Proficiency bonus from the table
+# ============================================================================
+
+old_prof_bonus = '''const profBonus = 2 + Math.floor((currentCharacter.level - 1) / 4);'''
+new_prof_bonus = '''const profBonus = proficiencyBonus(currentCharacter.level);'''
+
+count = content.count(old_prof_bonus)
+content = content.replace(old_prof_bonus, new_prof_bonus)
+
+old_spell_prof_bonus = '''const profBonus = Math.ceil(currentCharacter.level / 4) + 1; // Proficiency bonus'''
+count += content.count(old_spell_prof_bonus)
+content = content.replace(old_spell_prof_bonus, new_prof_bonus)
+
+if count:
+    print(f"✅ Replaced {count} proficiency bonus calculations")
+else:
+    print("⚠️ Could not find proficiency bonus calculations")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
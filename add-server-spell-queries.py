@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Server-side spell filtering: when the dev server (python3 -m pagebuild.devserver)
+reports a corpus too large to download whole, the picker asks /api/spells for
+each filter change, then for the next page as the list scrolls to its end,
+and /api/spells/<index> for details instead of loading spells-index.json and
+the level shards
+"""
+
+from pagebuild.anchors import replace_anchor
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: Query helpers
+# ============================================================================
+
+old_fetch_spells = '''    async function fetchSpellsFromAPI() {'''
+
+new_fetch_spells = '''    // Server-side spell queries (python3 -m pagebuild.devserver). A corpus
+    // larger than the threshold is filtered by the server a page at a time
+    // instead of being downloaded whole; a plain static server has no /api
+    const SERVER_SPELL_QUERY_THRESHOLD = 2000;
+    const SERVER_SPELL_PAGE_SIZE = 200;
+    let spellQueryServer = false;
+    let spellQuerySequence = 0;
+
+    async function probeSpellQueryServer() {
+      try {
+        const response = await fetch('api/spells?limit=0');
+        if (!response.ok) return false;
+        const { count } = await response.json();
+        return count > SERVER_SPELL_QUERY_THRESHOLD;
+      } catch (error) {
+        return false;
+      }
+    }
+
+    // The query the picker shows: its parameters and total match count. The
+    // first page is fetched when the query changes, the rest as the virtual
+    // list reaches the last loaded row (loadMoreServerSpells)
+    const serverSpellQuery = { params: null, count: 0, loading: false };
+
+    async function fetchServerSpellPage(params, offset) {
+      params.set('offset', offset);
+      const response = await fetch(`api/spells?${params}`);
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      return response.json();
+    }
+
+    async function queryServerSpells(searchTerm) {
+      const params = new URLSearchParams({ limit: SERVER_SPELL_PAGE_SIZE });
+      if (searchTerm) params.set('q', searchTerm);
+      if (currentLevelFilter !== 'all') params.set('level', currentLevelFilter);
+      if (currentClassFilter !== 'all') params.set('class', currentClassFilter);
+
+      // Only the latest query renders; responses to earlier ones are dropped
+      const sequence = ++spellQuerySequence;
+      try {
+        const page = await fetchServerSpellPage(params, 0);
+        if (sequence !== spellQuerySequence) return;
+
+        // The picker looks spells up by index in allSpellsFromAPI, so it
+        // holds the pages loaded so far
+        serverSpellQuery.params = params;
+        serverSpellQuery.count = page.count;
+        allSpellsFromAPI = page.results;
+        filteredSpells = page.results;
+        renderPickerSpells(page.results);
+      } catch (error) {
+        if (sequence === spellQuerySequence) console.warn('Spell query failed:', error);
+      }
+    }
+
+    async function loadMoreServerSpells() {
+      const loaded = allSpellsFromAPI.length;
+      if (serverSpellQuery.loading || loaded >= serverSpellQuery.count) return;
+
+      const sequence = spellQuerySequence;
+      serverSpellQuery.loading = true;
+      try {
+        const page = await fetchServerSpellPage(serverSpellQuery.params, loaded);
+        if (sequence !== spellQuerySequence) return;
+        // The corpus shrank since the first page: nothing more to load
+        if (page.results.length === 0) serverSpellQuery.count = loaded;
+
+        allSpellsFromAPI = allSpellsFromAPI.concat(page.results);
+        filteredSpells = allSpellsFromAPI;
+        pickerList.spells = allSpellsFromAPI;
+        renderPickerWindow();
+      } catch (error) {
+        if (sequence === spellQuerySequence) console.warn('Loading more spells failed:', error);
+      } finally {
+        serverSpellQuery.loading = false;
+      }
+    }
+
+    async function fetchSpellsFromAPI() {'''
+
+content, found = replace_anchor(content, old_fetch_spells, new_fetch_spells)
+if found:
+    print("✅ Added server spell query helpers")
+else:
+    print("⚠️ Could not find fetchSpellsFromAPI")
+
+# ============================================================================
+# PART 2: Switch to server queries when the corpus is large
+# ============================================================================
+
+old_fetch_index = '''        // Fetch the spell index (python3 -m pagebuild.spells): only index, name,
+        // level, school and classes. Descriptions and mechanics are fetched per
+        // level by ensureSpellDetails() when a spell is opened or added.
+        const response = await fetch('spells-index.json');'''
+
+new_fetch_index = '''        if (await probeSpellQueryServer()) {
+          spellQueryServer = true;
+          spellSearchIndex = null;
+          addBattleLog('📚 Searching spells on the local server');
+          await queryServerSpells(document.getElementById('spellPickerSearch').value.toLowerCase());
+          return;
+        }
+
+        // Fetch the spell index (python3 -m pagebuild.spells): only index, name,
+        // level, school and classes. Descriptions and mechanics are fetched per
+        // level by ensureSpellDetails() when a spell is opened or added.
+        const response = await fetch('spells-index.json');'''
+
+content, found = replace_anchor(content, old_fetch_index, new_fetch_index)
+if found:
+    print("✅ fetchSpellsFromAPI switches to server queries for large corpora")
+else:
+    print("⚠️ Could not find the spell index fetch in fetchSpellsFromAPI")
+
+old_filter = '''      const searchTerm = document.getElementById('spellPickerSearch').value.toLowerCase();
+
+      if (spellSearchIndex && spellSearchIndex.count === allSpellsFromAPI.length) {'''
+
+new_filter = '''      const searchTerm = document.getElementById('spellPickerSearch').value.toLowerCase();
+
+      if (spellQueryServer) {
+        queryServerSpells(searchTerm);
+        return;
+      }
+
+      if (spellSearchIndex && spellSearchIndex.count === allSpellsFromAPI.length) {'''
+
+content, found = replace_anchor(content, old_filter, new_filter)
+if found:
+    print("✅ filterPickerSpells queries the server")
+else:
+    print("⚠️ Could not find filterPickerSpells")
+
+old_open_picker = '''      // Fetch spells if not already loaded
+      if (allSpellsFromAPI.length === 0) {'''
+
+new_open_picker = '''      // Fetch spells if not already loaded
+      if (spellQueryServer) {
+        // Filters were reset on close; ask the server again
+        filterPickerSpells();
+      } else if (allSpellsFromAPI.length === 0) {'''
+
+content, found = replace_anchor(content, old_open_picker, new_open_picker)
+if found:
+    print("✅ openSpellPicker re-queries the server")
+else:
+    print("⚠️ Could not find the spell fetch in openSpellPicker")
+
+old_picker_window_end = '''          bindPickerRow(row, spells[index]);
+        } else {
+          row.style.display = 'none';
+        }
+      });
+    }'''
+
+new_picker_window_end = '''          bindPickerRow(row, spells[index]);
+        } else {
+          row.style.display = 'none';
+        }
+      });
+
+      // Server queries arrive a page at a time; fetch the next page once
+      // the window reaches the last loaded row
+      if (spellQueryServer && last === spells.length) loadMoreServerSpells();
+    }'''
+
+content, found = replace_anchor(content, old_picker_window_end, new_picker_window_end)
+if found:
+    print("✅ The picker list loads the next page of server results at its end")
+else:
+    print("⚠️ Could not find the end of renderPickerWindow")
+
+# ============================================================================
+# PART 3: Details from /api/spells/<index>
+# ============================================================================
+
+old_ensure_details = '''      // Embedded fallback spells already carry their description
+      if (spell.desc) return spell;
+      const shard = await loadSpellShard(spell.level);'''
+
+new_ensure_details = '''      // Embedded fallback spells already carry their description
+      if (spell.desc) return spell;
+      if (spellQueryServer) {
+        const response = await fetch(`api/spells/${encodeURIComponent(spell.index)}`);
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return Object.assign(spell, await response.json());
+      }
+      const shard = await loadSpellShard(spell.level);'''
+
+content, found = replace_anchor(content, old_ensure_details, new_ensure_details)
+if found:
+    print("✅ ensureSpellDetails fetches from the server")
+else:
+    print("⚠️ Could not find ensureSpellDetails")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
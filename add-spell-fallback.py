@@ -69,7 +69,7 @@ new_fetch = f'''    async function fetchSpellsFromAPI() {{
         }}
         const spells = await response.json();'''
 
-content = re.sub(old_fetch, new_fetch, content, flags=re.DOTALL)
+content = re.sub(old_fetch, lambda _: new_fetch, content, flags=re.DOTALL)
 
 # Find the error catch block and add fallback embedded spells
 old_catch = r'''      \} catch \(error\) \{
@@ -108,7 +108,7 @@ new_catch = f'''      }} catch (error) {{
       }}
     }}'''
 
-content = re.sub(old_catch, new_catch, content, flags=re.DOTALL)
+content = re.sub(old_catch, lambda _: new_catch, content, flags=re.DOTALL)
 
 # Write the file
 with open('test-enhanced-features.html', 'w') as f:
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Replace autoPopulateSpells' per-call spell selection with the loadout table
+generated by pagebuild/loadouts.py, and build spell entries from one cached
+frozen record per spell id
+"""
+
+from pagebuild.anchors import replace_anchor
+from pagebuild.jsindex import script_index
+from pagebuild.loadouts import render_js
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: Hoist classDefaultSpells next to subclassSpells
+# ============================================================================
+
+defaults_start_marker = '''      // Fallback: Use generic class-based spells if subclass not found
+      const classDefaultSpells = {'''
+defaults_end_marker = '''
+      };
+'''
+
+populate = script_index(content).get('autoPopulateSpells')
+defaults_start = content.find(defaults_start_marker, populate.start) if populate else -1
+defaults_end = content.find(defaults_end_marker, defaults_start) if defaults_start != -1 else -1
+
+if defaults_start != -1 and populate.start < defaults_end < populate.end:
+    defaults_end += len(defaults_end_marker)
+    block = content[defaults_start:defaults_end]
+    block = '\n'.join(line[2:] if line.startswith('  ') else line for line in block.split('\n'))
+    block = block.replace('// Fallback: Use generic class-based spells if subclass not found',
+                          '// Generic class-based spells, used when a subclass has no themed list')
+
+    subclass_span = script_index(content)['subclassSpells']
+    content = (content[:subclass_span.end] + '\n\n' + block.rstrip('\n')
+               + content[subclass_span.end:defaults_start] + content[defaults_end:])
+    print("✅ Hoisted classDefaultSpells to a top-level constant")
+else:
+    print("⚠️ Could not find classDefaultSpells in autoPopulateSpells")
+
+# ============================================================================
+# PART 2: Generated loadout table + lookup-based autoPopulateSpells
+# ============================================================================
+
+new_populate = render_js(content) + '''
+    // Canonical spellDefinitions records, built once per spell id
+    const spellRecordCache = new Map();
+
+    function spellRecord(spellId) {
+      let record = spellRecordCache.get(spellId);
+      if (!record) {
+        const spellDef = spellDefinitions[spellId];
+        if (!spellDef) return null;
+        record = Object.freeze({
+          id: spellId,
+          name: spellDef.name,
+          icon: spellDef.icon,
+          damage: spellDef.damage,
+          description: spellDef.description,
+          school: spellDef.school,
+          castingTime: spellDef.castingTime,
+          range: spellDef.range,
+          components: spellDef.components,
+          duration: spellDef.duration,
+          concentration: spellDef.concentration,
+          attackRoll: spellDef.attackRoll,
+          save: spellDef.save
+        });
+        spellRecordCache.set(spellId, record);
+      }
+      return record;
+    }
+
+    // Auto-populate spells based on class, subclass and level (precomputed
+    // by pagebuild/loadouts.py)
+    function autoPopulateSpells(character) {
+      const charClass = character.class.toLowerCase();
+      const subclass = character.subclass || '';
+      const loadout = Object.hasOwn(spellLoadouts, charClass) ? spellLoadouts[charClass] : null;
+      const subclasses = loadout ? loadout.subclasses : {};
+      const rows = Object.hasOwn(subclasses, subclass) ? subclasses[subclass] : subclasses[''];
+
+      if (!rows) {
+        return; // No spells for non-casters
+      }
+
+      character.castingType = loadout.castingType;
+      const prepared = loadout.castingType === 'prepared'; // Prepared casters auto-prepare
+
+      // Initialize spells object
+      character.spells = {};
+
+      const level = Math.min(Math.max(parseInt(character.level) || 1, 1), rows.length - 1);
+      rows[level].forEach((listIndex, spellLevel) => {
+        if (listIndex < 0) return;
+        character.spells[spellLevel.toString()] = spellLoadoutLists[listIndex].map(spellId =>
+          spellLevel === 0 ? { ...spellRecord(spellId) } : { ...spellRecord(spellId), prepared }
+        );
+      });
+    }'''
+
+populate = script_index(content).get('autoPopulateSpells')
+if populate:
+    comment = '    // Auto-populate spells based on class and level\n'
+    start = content.rfind('\n', 0, populate.start) + 1
+    if content[start - len(comment):start] == comment:
+        start -= len(comment)
+    content = content[:start] + new_populate + content[populate.end:]
+    print("✅ autoPopulateSpells reads the precomputed loadout table")
+else:
+    print("⚠️ Could not find autoPopulateSpells")
+
+# ============================================================================
+# PART 3: "Auto-Add More" builds entries from the cached records too
+# ============================================================================
+
+old_update_push = '''          const spellDef = spellDefinitions[spellId];
+
+          if (spellDef) {
+            currentCharacter.spells[levelKey].push({
+              id: spellId,
+              name: spellDef.name,
+              icon: spellDef.icon,
+              damage: spellDef.damage,
+              description: spellDef.description,
+              school: spellDef.school,
+              castingTime: spellDef.castingTime,
+              range: spellDef.range,
+              components: spellDef.components,
+              duration: spellDef.duration,
+              concentration: spellDef.concentration,
+              attackRoll: spellDef.attackRoll,
+              save: spellDef.save,
+              prepared: preparedCasters.includes(charClass) ? true : false
+            });'''
+
+new_update_push = '''          const record = spellRecord(spellId);
+
+          if (record) {
+            currentCharacter.spells[levelKey].push({
+              ...record,
+              prepared: preparedCasters.includes(charClass)
+            });'''
+
+content, found = replace_anchor(content, old_update_push, new_update_push)
+if found:
+    print("✅ updateSpells uses cached spell records")
+else:
+    print("⚠️ Could not find spell copy in updateSpells")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
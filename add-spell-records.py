@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Intern spell records: every character's spell entry holds only its own state
+(id, prepared, ...) and inherits the spell data from one shared, frozen
+record instead of carrying its own copy of it
+"""
+
+from pagebuild.anchors import replace_anchor
+from pagebuild.jsindex import script_index
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: Interning layer after spellDefinitions; intern the built-in party
+# ============================================================================
+
+old_definitions_end = '''    };
+
+    let currentCharacter = characters[0];'''
+
+new_definitions_end = '''    };
+
+    // Spell record interning. Spell data (name, damage, description, ...) lives
+    // in frozen records shared by every character that knows the spell; a
+    // character's entry only holds per-character state (id, prepared,
+    // isDefault) and inherits the rest from its record through the prototype
+    // chain, so spell.name etc. read exactly as before.
+    const SPELL_RECORD_FIELDS = ['name', 'icon', 'damage', 'description', 'school', 'castingTime',
+      'range', 'components', 'duration', 'concentration', 'attackRoll', 'save'];
+    const spellRecords = new Map(); // spell id -> records seen for that id
+
+    function internSpellRecord(spellId, fields) {
+      let variants = spellRecords.get(spellId);
+      if (!variants) {
+        variants = [];
+        spellRecords.set(spellId, variants);
+      }
+
+      // The same id can come from different sources (built-in characters,
+      // spellDefinitions, the SRD list) with different text; each distinct
+      // version gets its own record
+      const existing = variants.find(record =>
+        SPELL_RECORD_FIELDS.every(field => record[field] === fields[field]));
+      if (existing) return existing;
+
+      const record = {};
+      SPELL_RECORD_FIELDS.forEach(field => {
+        if (field in fields) record[field] = fields[field];
+      });
+      Object.freeze(record);
+      variants.push(record);
+      return record;
+    }
+
+    function characterSpell(spellId, record, state) {
+      return Object.assign(Object.create(record), { id: spellId }, state);
+    }
+
+    function internCharacterSpells(character) {
+      Object.keys(character.spells || {}).forEach(level => {
+        character.spells[level] = character.spells[level].map(spell => {
+          if (Object.getPrototypeOf(spell) !== Object.prototype) return spell; // already interned
+          const state = {};
+          Object.keys(spell).forEach(key => {
+            if (key !== 'id' && !SPELL_RECORD_FIELDS.includes(key)) state[key] = spell[key];
+          });
+          return characterSpell(spell.id, internSpellRecord(spell.id, spell), state);
+        });
+      });
+    }
+
+    characters.forEach(internCharacterSpells);
+
+    let currentCharacter = characters[0];'''
+
+content, found = replace_anchor(content, old_definitions_end, new_definitions_end)
+if found:
+    print("✅ Added spell record interning layer")
+else:
+    print("⚠️ Could not find end of spellDefinitions")
+
+# ============================================================================
+# PART 2: spellRecord() interns spellDefinitions entries
+# ============================================================================
+
+old_spell_record = '''    // Canonical spellDefinitions records, built once per spell id
+    const spellRecordCache = new Map();
+
+    function spellRecord(spellId) {
+      let record = spellRecordCache.get(spellId);
+      if (!record) {
+        const spellDef = spellDefinitions[spellId];
+        if (!spellDef) return null;
+        record = Object.freeze({
+          id: spellId,
+          name: spellDef.name,
+          icon: spellDef.icon,
+          damage: spellDef.damage,
+          description: spellDef.description,
+          school: spellDef.school,
+          castingTime: spellDef.castingTime,
+          range: spellDef.range,
+          components: spellDef.components,
+          duration: spellDef.duration,
+          concentration: spellDef.concentration,
+          attackRoll: spellDef.attackRoll,
+          save: spellDef.save
+        });
+        spellRecordCache.set(spellId, record);
+      }
+      return record;
+    }'''
+
+new_spell_record = '''    // Shared record for a spellDefinitions entry
+    function spellRecord(spellId) {
+      const spellDef = spellDefinitions[spellId];
+      return spellDef ? internSpellRecord(spellId, spellDef) : null;
+    }'''
+
+content, found = replace_anchor(content, old_spell_record, new_spell_record)
+if found:
+    print("✅ spellRecord returns interned records")
+else:
+    print("⚠️ Could not find spellRecord")
+
+old_loadout_entries = '''        character.spells[spellLevel.toString()] = spellLoadoutLists[listIndex].map(spellId =>
+          spellLevel === 0 ? { ...spellRecord(spellId) } : { ...spellRecord(spellId), prepared }
+        );'''
+
+new_loadout_entries = '''        character.spells[spellLevel.toString()] = spellLoadoutLists[listIndex].map(spellId =>
+          characterSpell(spellId, spellRecord(spellId), spellLevel === 0 ? {} : { prepared })
+        );'''
+
+content, found = replace_anchor(content, old_loadout_entries, new_loadout_entries)
+if found:
+    print("✅ autoPopulateSpells shares spell records")
+else:
+    print("⚠️ Could not find spell entries in autoPopulateSpells")
+
+old_update_push = '''            currentCharacter.spells[levelKey].push({
+              ...record,
+              prepared: preparedCasters.includes(charClass)
+            });'''
+
+new_update_push = '''            currentCharacter.spells[levelKey].push(
+              characterSpell(spellId, record, { prepared: preparedCasters.includes(charClass) })
+            );'''
+
+content, found = replace_anchor(content, old_update_push, new_update_push)
+if found:
+    print("✅ updateSpells shares spell records")
+else:
+    print("⚠️ Could not find spell entry in updateSpells")
+
+# ============================================================================
+# PART 3: mapAPISpellToCharacterSpell interns the mapped fields
+# ============================================================================
+
+old_map_start = '''      const spell = {
+        id: apiSpell.index,
+        name: apiSpell.name,'''
+
+new_map_start = '''      const spell = {
+        name: apiSpell.name,'''
+
+old_map_prepared = '''        concentration: apiSpell.concentration || false,
+        prepared: false
+      };'''
+
+new_map_prepared = '''        concentration: apiSpell.concentration || false
+      };'''
+
+old_map_return = '''        spell.save = apiSpell.dc.dc_type.name;
+      }
+
+      return spell;
+    }'''
+
+new_map_return = '''        spell.save = apiSpell.dc.dc_type.name;
+      }
+
+      return characterSpell(apiSpell.index, internSpellRecord(apiSpell.index, spell), { prepared: false });
+    }'''
+
+mapper = script_index(content).get('mapAPISpellToCharacterSpell')
+if mapper:
+    body = mapper.text(content)
+    replaced = 0
+    for old, new in ((old_map_start, new_map_start), (old_map_prepared, new_map_prepared),
+                     (old_map_return, new_map_return)):
+        replaced += body.count(old)
+        body = body.replace(old, new)
+    content = content[:mapper.start] + body + content[mapper.end:]
+    if replaced == 3:
+        print("✅ mapAPISpellToCharacterSpell shares spell records")
+    else:
+        print(f"⚠️ Only updated {replaced}/3 parts of mapAPISpellToCharacterSpell")
+else:
+    print("⚠️ Could not find mapAPISpellToCharacterSpell")
+
+# ============================================================================
+# PART 4: Don't spread entries (own properties are only per-character state)
+# ============================================================================
+
+old_prepared_push = '''                preparedSpells.push({ ...spell, level: parseInt(level) });'''
+new_prepared_push = '''                preparedSpells.push({ id: spell.id, icon: spell.icon, name: spell.name, level: parseInt(level) });'''
+
+content, found = replace_anchor(content, old_prepared_push, new_prepared_push)
+if found:
+    print("✅ Dice popup reads spell fields explicitly")
+else:
+    print("⚠️ Could not find prepared spell buttons")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
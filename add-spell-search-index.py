@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Filter the spell picker with the precomputed search index (spells-search.json)
+instead of rescanning every spell on each keystroke
+"""
+
+from pagebuild.anchors import replace_anchor
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: Load the search index together with the spell list
+# ============================================================================
+
+old_load = '''        allSpellsFromAPI = await response.json();
+'''
+
+new_load = '''        allSpellsFromAPI = await response.json();
+        spellSearchIndex = await loadSpellSearchIndex(allSpellsFromAPI);
+'''
+
+content, found = replace_anchor(content, old_load, new_load)
+if found:
+    print("✅ fetchSpellsFromAPI loads spells-search.json")
+else:
+    print("⚠️ Could not find spell list load in fetchSpellsFromAPI")
+
+# ============================================================================
+# PART 2: Search index loader and bitset helpers
+# ============================================================================
+
+filter_marker = '''    function filterByLevel(level) {'''
+
+search_index_code = '''    // Precomputed picker search index (python3 -m pagebuild.spells).
+    // Spell ids are positions in allSpellsFromAPI; sets are Uint32Array bitsets.
+    let spellSearchIndex = null;
+
+    async function loadSpellSearchIndex(spells) {
+      try {
+        const response = await fetch('spells-search.json');
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const data = await response.json();
+        if (data.count !== spells.length) {
+          console.warn('Spell search index is out of date, using linear filter');
+          return null;
+        }
+
+        const words = Math.ceil(data.count / 32);
+        const toBitsets = lists => Object.fromEntries(
+          Object.entries(lists).map(([key, list]) => [key, Uint32Array.from(list)])
+        );
+        const all = new Uint32Array(words).fill(0xFFFFFFFF);
+        if (data.count % 32) all[words - 1] = 2 ** (data.count % 32) - 1;
+
+        return {
+          count: data.count,
+          gram: data.gram,
+          trigrams: data.trigrams,
+          trigramBits: new Map(),
+          classes: toBitsets(data.classes),
+          levels: toBitsets(data.levels),
+          schools: toBitsets(data.schools),
+          all,
+          none: new Uint32Array(words),
+          names: spells.map(spell => spell.name.toLowerCase())
+        };
+      } catch (error) {
+        console.warn('Spell search index unavailable, using linear filter:', error);
+        return null;
+      }
+    }
+
+    function andBits(a, b) {
+      const out = new Uint32Array(a.length);
+      for (let i = 0; i < a.length; i++) out[i] = a[i] & b[i];
+      return out;
+    }
+
+    function orBits(a, b) {
+      const out = new Uint32Array(a.length);
+      for (let i = 0; i < a.length; i++) out[i] = a[i] | b[i];
+      return out;
+    }
+
+    function forEachBit(bits, callback) {
+      for (let w = 0; w < bits.length; w++) {
+        let word = bits[w];
+        while (word) {
+          const low = word & -word;
+          callback(w * 32 + 31 - Math.clz32(low));
+          word ^= low;
+        }
+      }
+    }
+
+    function trigramBits(index, gram) {
+      let bits = index.trigramBits.get(gram);
+      if (!bits) {
+        // Postings are delta-encoded: [first id, gap, gap, ...]
+        bits = new Uint32Array(index.none.length);
+        let id = 0;
+        (index.trigrams[gram] || []).forEach((gap, i) => {
+          id = i === 0 ? gap : id + gap;
+          bits[id >>> 5] |= 1 << (id & 31);
+        });
+        index.trigramBits.set(gram, bits);
+      }
+      return bits;
+    }
+
+    function querySpellSearchIndex(index, term) {
+      let bits = index.all;
+      if (currentLevelFilter !== 'all') bits = andBits(bits, index.levels[currentLevelFilter] || index.none);
+      if (currentClassFilter !== 'all') bits = andBits(bits, index.classes[currentClassFilter] || index.none);
+      if (!term) return bits;
+
+      // Name match: AND the trigram postings, then confirm the remaining
+      // candidates (short terms have no trigrams and confirm every candidate)
+      let candidates = bits;
+      for (let i = 0; i + index.gram <= term.length; i++) {
+        candidates = andBits(candidates, trigramBits(index, term.slice(i, i + index.gram)));
+      }
+      const nameBits = new Uint32Array(bits.length);
+      forEachBit(candidates, id => {
+        if (index.names[id].includes(term)) nameBits[id >>> 5] |= 1 << (id & 31);
+      });
+
+      // School match, as the linear filter did
+      let schoolBits = index.none;
+      for (const school in index.schools) {
+        if (school.toLowerCase().includes(term)) schoolBits = orBits(schoolBits, index.schools[school]);
+      }
+      return orBits(nameBits, andBits(bits, schoolBits));
+    }
+
+'''
+
+content, found = replace_anchor(content, filter_marker, search_index_code + filter_marker)
+if found:
+    print("✅ Added spell search index helpers")
+else:
+    print("⚠️ Could not find filterByLevel")
+
+# ============================================================================
+# PART 3: filterPickerSpells uses the index when it is available
+# ============================================================================
+
+old_filter = '''        function filterPickerSpells() {
+      const searchTerm = document.getElementById('spellPickerSearch').value.toLowerCase();
+
+      filteredSpells = allSpellsFromAPI.filter(spell => {
+        const matchesSearch = spell.name.toLowerCase().includes(searchTerm) ||
+                            (spell.school?.name || '').toLowerCase().includes(searchTerm);
+        const matchesLevel = currentLevelFilter === 'all' || spell.level === parseInt(currentLevelFilter);
+        const matchesClass = currentClassFilter === 'all' ||
+                            (spell.classes && Array.isArray(spell.classes) &&
+                             spell.classes.some(c => typeof c === 'string' && c.toLowerCase() === currentClassFilter));
+
+        return matchesSearch && matchesLevel && matchesClass;
+      });
+
+            renderPickerSpells(filteredSpells);
+    }'''
+
+new_filter = '''    function filterPickerSpells() {
+      const searchTerm = document.getElementById('spellPickerSearch').value.toLowerCase();
+
+      if (spellSearchIndex && spellSearchIndex.count === allSpellsFromAPI.length) {
+        filteredSpells = [];
+        forEachBit(querySpellSearchIndex(spellSearchIndex, searchTerm), id => {
+          filteredSpells.push(allSpellsFromAPI[id]);
+        });
+      } else {
+        // No index (embedded fallback spells): linear filter
+        filteredSpells = allSpellsFromAPI.filter(spell => {
+          const matchesSearch = spell.name.toLowerCase().includes(searchTerm) ||
+                              (spell.school?.name || '').toLowerCase().includes(searchTerm);
+          const matchesLevel = currentLevelFilter === 'all' || spell.level === parseInt(currentLevelFilter);
+          const matchesClass = currentClassFilter === 'all' ||
+                              (spell.classes && Array.isArray(spell.classes) &&
+                               spell.classes.some(c => typeof c === 'string' && c.toLowerCase() === currentClassFilter));
+
+          return matchesSearch && matchesLevel && matchesClass;
+        });
+      }
+
+      renderPickerSpells(filteredSpells);
+    }'''
+
+content, found = replace_anchor(content, old_filter, new_filter)
+if found:
+    print("✅ filterPickerSpells uses the search index")
+else:
+    print("⚠️ Could not find filterPickerSpells")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Virtualize the spell picker list: render only the visible rows, recycle row
+nodes while scrolling, and answer hasSpell() from a Set of known spell ids
+"""
+
+from pagebuild.anchors import replace_anchor
+
+# Read the file
+with open('test-enhanced-features.html', 'r') as f:
+    content = f.read()
+
+# ============================================================================
+# PART 1: CSS for absolutely positioned, fixed-height rows
+# ============================================================================
+
+old_empty_css = '''    .spell-picker-empty {
+      text-align: center;
+      padding: 40px;
+      color: var(--text-secondary);
+    }
+'''
+
+new_empty_css = old_empty_css + '''
+    .spell-picker-list.virtual {
+      display: block;
+      position: relative;
+    }
+
+    .spell-picker-list.virtual .spell-picker-item {
+      position: absolute;
+      left: 0;
+      right: 0;
+    }
+
+    .spell-picker-list.virtual .spell-picker-item-name,
+    .spell-picker-list.virtual .spell-picker-item-meta {
+      white-space: nowrap;
+      overflow: hidden;
+      text-overflow: ellipsis;
+    }
+'''
+
+content, found = replace_anchor(content, old_empty_css, new_empty_css)
+if found:
+    print("✅ Added virtual list CSS")
+else:
+    print("⚠️ Could not find .spell-picker-empty CSS")
+
+# ============================================================================
+# PART 2: Windowed renderPickerSpells with recycled row nodes
+# ============================================================================
+
+old_render = '''    function renderPickerSpells(spells) {
+      const body = document.getElementById('spellPickerBody');
+
+      if (spells.length === 0) {
+        body.innerHTML = '<div class="spell-picker-empty">No spells found matching your search.</div>';
+        return;
+      }
+
+      let html = '<div class="spell-picker-list">';
+
+      spells.forEach(spell => {
+        const levelText = spell.level === 0 ? 'Cantrip' : `Level ${spell.level}`;
+        const school = spell.school?.name || 'Unknown';
+        const alreadyHas = hasSpell(spell.index);
+
+        html += `
+          <div class="spell-picker-item" style="cursor: pointer;" onclick="openSpellPickerDetail('${spell.index}')">
+            <div class="spell-picker-item-info">
+              <div class="spell-picker-item-name">${spell.name}</div>
+              <div class="spell-picker-item-meta">${levelText} • ${school}</div>
+            </div>
+            <button class="spell-picker-item-add"
+                    onclick="event.stopPropagation(); addSpellToCharacter('${spell.index}')"
+                    ${alreadyHas ? 'disabled' : ''}>
+              ${alreadyHas ? '✓ Added' : '+ Add'}
+            </button>
+          </div>
+        `;
+      });
+
+      html += '</div>';
+      body.innerHTML = html;
+    }'''
+
+new_render = '''    // Virtualized picker list: only rows in (or near) the viewport exist in
+    // the DOM, and those row nodes are reused as the list scrolls
+    const PICKER_ROW_GAP = 6;       // matches .spell-picker-list gap
+    const PICKER_ROW_OVERSCAN = 6;  // extra rows above/below the viewport
+    const pickerList = { spells: [], container: null, rows: [], rowHeight: 0, listening: false };
+
+    function renderPickerSpells(spells) {
+      const body = document.getElementById('spellPickerBody');
+      pickerList.spells = spells;
+
+      if (spells.length === 0) {
+        pickerList.container = null;
+        body.innerHTML = '<div class="spell-picker-empty">No spells found matching your search.</div>';
+        return;
+      }
+
+      if (!pickerList.container || !body.contains(pickerList.container)) {
+        body.innerHTML = '<div class="spell-picker-list virtual"></div>';
+        pickerList.container = body.firstElementChild;
+        pickerList.rows = [];
+      }
+
+      if (!pickerList.listening) {
+        let frame = 0;
+        const schedule = () => {
+          if (!frame) frame = requestAnimationFrame(() => { frame = 0; renderPickerWindow(); });
+        };
+        body.addEventListener('scroll', schedule, { passive: true });
+        window.addEventListener('resize', () => { pickerList.rowHeight = 0; schedule(); });
+        pickerList.listening = true;
+      }
+
+      body.scrollTop = 0;
+      renderPickerWindow();
+    }
+
+    function createPickerRow() {
+      const row = document.createElement('div');
+      row.className = 'spell-picker-item';
+      row.innerHTML = `
+        <div class="spell-picker-item-info">
+          <div class="spell-picker-item-name"></div>
+          <div class="spell-picker-item-meta"></div>
+        </div>
+        <button class="spell-picker-item-add"></button>`;
+      row.addEventListener('click', () => openSpellPickerDetail(row.dataset.index));
+      row.lastElementChild.addEventListener('click', event => {
+        event.stopPropagation();
+        addSpellToCharacter(row.dataset.index);
+      });
+      return row;
+    }
+
+    function bindPickerRow(row, spell) {
+      if (row.dataset.index !== spell.index) {
+        const levelText = spell.level === 0 ? 'Cantrip' : `Level ${spell.level}`;
+        const school = spell.school?.name || 'Unknown';
+        row.dataset.index = spell.index;
+        row.querySelector('.spell-picker-item-name').textContent = spell.name;
+        row.querySelector('.spell-picker-item-meta').textContent = `${levelText} • ${school}`;
+      }
+      const alreadyHas = hasSpell(spell.index);
+      const button = row.lastElementChild;
+      button.disabled = alreadyHas;
+      button.textContent = alreadyHas ? '✓ Added' : '+ Add';
+    }
+
+    function renderPickerWindow() {
+      const { container, spells, rows } = pickerList;
+      if (!container || !container.isConnected || spells.length === 0) return;
+      const body = container.parentElement;
+
+      if (!pickerList.rowHeight) {
+        const probe = createPickerRow();
+        container.appendChild(probe);
+        bindPickerRow(probe, spells[0]);
+        pickerList.rowHeight = probe.offsetHeight ? probe.offsetHeight + PICKER_ROW_GAP : 0;
+        probe.remove();
+        if (!pickerList.rowHeight) return;  // modal not laid out yet
+      }
+
+      const rowHeight = pickerList.rowHeight;
+      container.style.height = `${spells.length * rowHeight - PICKER_ROW_GAP}px`;
+
+      // The list may sit below other content (e.g. the fallback notice)
+      const listTop = container.getBoundingClientRect().top - body.getBoundingClientRect().top + body.scrollTop;
+      const viewTop = Math.max(0, body.scrollTop - listTop);
+      const first = Math.max(0, Math.floor(viewTop / rowHeight) - PICKER_ROW_OVERSCAN);
+      const last = Math.min(spells.length, Math.ceil((viewTop + body.clientHeight) / rowHeight) + PICKER_ROW_OVERSCAN);
+
+      while (rows.length < last - first) {
+        const row = createPickerRow();
+        container.appendChild(row);
+        rows.push(row);
+      }
+
+      rows.forEach((row, i) => {
+        const index = first + i;
+        if (index < last) {
+          row.style.display = '';
+          row.style.top = `${index * rowHeight}px`;
+          bindPickerRow(row, spells[index]);
+        } else {
+          row.style.display = 'none';
+        }
+      });
+    }'''
+
+content, found = replace_anchor(content, old_render, new_render)
+if found:
+    print("✅ renderPickerSpells renders only the visible window")
+else:
+    print("⚠️ Could not find renderPickerSpells")
+
+# ============================================================================
+# PART 3: O(1) hasSpell backed by a Set of known spell ids
+# ============================================================================
+
+old_has_spell = '''    function hasSpell(spellIndex) {
+      // Check if character already has this spell
+      if (!currentCharacter.spells) return false;
+
+      for (const level in currentCharacter.spells) {
+        if (currentCharacter.spells[level].some(s => s.id === spellIndex)) {
+          return true;
+        }
+      }
+      return false;
+    }'''
+
+new_has_spell = '''    // Ids of the spells the current character knows. Rebuilt when the picker
+    // opens or the character changes; addSpellToCharacter and deleteSpell
+    // keep it in step.
+    let knownSpellIds = new Set();
+    let knownSpellIdsOwner = null;
+
+    function rebuildKnownSpellIds() {
+      knownSpellIds = new Set();
+      knownSpellIdsOwner = currentCharacter;
+      for (const level in currentCharacter.spells || {}) {
+        currentCharacter.spells[level].forEach(s => knownSpellIds.add(s.id));
+      }
+    }
+
+    function hasSpell(spellIndex) {
+      if (knownSpellIdsOwner !== currentCharacter) rebuildKnownSpellIds();
+      return knownSpellIds.has(spellIndex);
+    }'''
+
+content, found = replace_anchor(content, old_has_spell, new_has_spell)
+if found:
+    print("✅ hasSpell uses a Set of known spell ids")
+else:
+    print("⚠️ Could not find hasSpell")
+
+old_picker_open = '''      // Show modal
+      document.getElementById('spellPickerOverlay').classList.add('show');
+'''
+
+new_picker_open = '''      // Show modal
+      document.getElementById('spellPickerOverlay').classList.add('show');
+      rebuildKnownSpellIds();
+'''
+
+content, found = replace_anchor(content, old_picker_open, new_picker_open)
+if found:
+    print("✅ openSpellPicker refreshes known spell ids")
+else:
+    print("⚠️ Could not find openSpellPicker")
+
+old_add_push = '''      // Add spell to character
+      currentCharacter.spells[level].push(spell);
+'''
+
+new_add_push = '''      // Add spell to character
+      currentCharacter.spells[level].push(spell);
+      knownSpellIds.add(spell.id);
+'''
+
+content, found = replace_anchor(content, old_add_push, new_add_push)
+if found:
+    print("✅ addSpellToCharacter updates known spell ids")
+else:
+    print("⚠️ Could not find spell push in addSpellToCharacter")
+
+old_add_rerender = '''      // Re-render picker to update button states
+      filterPickerSpells();'''
+
+new_add_rerender = '''      // Refresh button states of the visible picker rows
+      renderPickerWindow();'''
+
+content, found = replace_anchor(content, old_add_rerender, new_add_rerender)
+if found:
+    print("✅ addSpellToCharacter refreshes only visible rows")
+else:
+    print("⚠️ Could not find picker re-render in addSpellToCharacter")
+
+old_delete = '''      // Remove spell
+      currentCharacter.spells[level] = currentCharacter.spells[level].filter(s => s.id !== spellId);
+'''
+
+new_delete = '''      // Remove spell
+      currentCharacter.spells[level] = currentCharacter.spells[level].filter(s => s.id !== spellId);
+      if (knownSpellIdsOwner === currentCharacter) knownSpellIds.delete(spellId);
+'''
+
+content, found = replace_anchor(content, old_delete, new_delete)
+if found:
+    print("✅ deleteSpell updates known spell ids")
+else:
+    print("⚠️ Could not find spell removal in deleteSpell")
+
+# Write the file
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
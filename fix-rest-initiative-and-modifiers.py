@@ -8,6 +8,8 @@
 
 import re
 
+from pagebuild.anchors import replace_anchor
+
 # Read the file
 with open('test-enhanced-features.html', 'r') as f:
     content = f.read()
@@ -68,8 +70,8 @@ new_tab_visibility = '''    // Hide/show Spells tab based on character class and
       }
     }'''
 
-if old_tab_visibility in content:
-    content = content.replace(old_tab_visibility, new_tab_visibility)
+content, found = replace_anchor(content, old_tab_visibility, new_tab_visibility)
+if found:
     print("✅ Updated updateTabVisibility for 1/3 casters")
 else:
     print("⚠️ Could not find updateTabVisibility function")
@@ -100,8 +102,8 @@ new_battle_actions = '''            <div class="battle-actions">
 
             </div>'''
 
-if old_battle_actions in content:
-    content = content.replace(old_battle_actions, new_battle_actions)
+content, found = replace_anchor(content, old_battle_actions, new_battle_actions)
+if found:
     print("✅ Removed Initiative button from battle actions")
 else:
     print("⚠️ Could not find battle actions section")
@@ -138,8 +140,8 @@ new_turn_tracker = '''            <div class="turn-tracker">
               </div>
             </div>'''
 
-if old_turn_tracker in content:
-    content = content.replace(old_turn_tracker, new_turn_tracker)
+content, found = replace_anchor(content, old_turn_tracker, new_turn_tracker)
+if found:
     print("✅ Added Initiative button to Turn tracker")
 else:
     print("⚠️ Could not find turn tracker")
@@ -171,8 +173,8 @@ new_location = '''      <!-- Rest Buttons -->
         <div style="font-size: 0.9rem; color: var(--text-secondary); margin-bottom: 8px;">📍 Location</div>
         <select id="locationSelect" onchange="changeLocation()" style="width: 100%; padding: 10px; background: var(--surface-color); color: var(--text-primary); border: 2px solid var(--border-color); border-radius: 6px; font-size: 1rem; cursor: pointer;">'''
 
-if old_location in content:
-    content = content.replace(old_location, new_location)
+content, found = replace_anchor(content, old_location, new_location)
+if found:
     print("✅ Added Short/Long Rest buttons above Location")
 else:
     print("⚠️ Could not find Location section")
@@ -316,8 +318,8 @@ new_roll_dice = '''    function rollDice(name, diceType, baseModifier = 0) {
       showDiceRoll(name, diceType, diceValue, total, baseModifier + tempMod);
     }'''
 
-if old_roll_dice in content:
-    content = content.replace(old_roll_dice, new_roll_dice)
+content, found = replace_anchor(content, old_roll_dice, new_roll_dice)
+if found:
     print("✅ Updated rollDice to apply temporary modifiers")
 else:
     print("⚠️ Could not find rollDice function to update")
@@ -3,23 +3,23 @@
 Fix spell attack roll detection and ensure damage spells roll dice
 """
 
-import re
+from pagebuild.anchors import replace_anchor
 
 # Read the file
 with open('test-enhanced-features.html', 'r') as f:
     content = f.read()
 
 # Find mapAPISpellToCharacterSpell and add attackRoll detection
-old_mapping = r'''      // Add damage if present \(from our mapping or from API\)
-      if \(apiSpell\.damage\) \{
-        if \(typeof apiSpell\.damage === 'string'\) \{
-          spell\.damage = apiSpell\.damage;
-        \} else if \(apiSpell\.damage\?\.damage_at_character_level \|\| apiSpell\.damage\?\.damage_at_slot_level\) \{
-          const damageData = apiSpell\.damage\.damage_at_character_level \|\| apiSpell\.damage\.damage_at_slot_level;
-          const firstLevel = Object\.keys\(damageData\)\[0\];
-          spell\.damage = damageData\[firstLevel\];
-        \}
-      \}'''
+old_mapping = '''      // Add damage if present (from our mapping or from API)
+      if (apiSpell.damage) {
+        if (typeof apiSpell.damage === 'string') {
+          spell.damage = apiSpell.damage;
+        } else if (apiSpell.damage?.damage_at_character_level || apiSpell.damage?.damage_at_slot_level) {
+          const damageData = apiSpell.damage.damage_at_character_level || apiSpell.damage.damage_at_slot_level;
+          const firstLevel = Object.keys(damageData)[0];
+          spell.damage = damageData[firstLevel];
+        }
+      }'''
 
 new_mapping = r'''      // Add damage if present (from our mapping or from API)
       if (apiSpell.damage) {
@@ -51,28 +51,28 @@ new_mapping = r'''      // Add damage if present (from our mapping or from API)
         spell.save = apiSpell.dc.dc_type?.name || 'DEX';
       }'''
 
-content = re.sub(old_mapping, new_mapping, content, flags=re.DOTALL)
+content, _ = replace_anchor(content, old_mapping, new_mapping)
 
 # Also update the castSpellFromModal to always show damage rolls even without attack roll
-old_cast_logic = r'''      // Roll spell \(if applicable\)
-      let resultText = `✨ \$\{spell\.name\}`;
+old_cast_logic = '''      // Roll spell (if applicable)
+      let resultText = `✨ ${spell.name}`;
 
-      if \(spell\.attackRoll \|\| spell\.damage\) \{
+      if (spell.attackRoll || spell.damage) {
         // Attack spell
-        if \(spell\.attackRoll\) \{
-          const d20 = Math\.floor\(Math\.random\(\) \* 20\) \+ 1;
-          const spellAttackBonus = currentCharacter\.computed\?\.spellAttackBonus \|\| 7;
-          const total = d20 \+ spellAttackBonus;
+        if (spell.attackRoll) {
+          const d20 = Math.floor(Math.random() * 20) + 1;
+          const spellAttackBonus = currentCharacter.computed?.spellAttackBonus || 7;
+          const total = d20 + spellAttackBonus;
           const isCrit = d20 === 20;
           const isFail = d20 === 1;
 
-          resultText \+= ` \| Attack: \$\{total\} \(d20: \$\{d20\}\+\$\{spellAttackBonus\}\)`;
-          if \(isCrit\) resultText \+= ' \*\*CRITICAL HIT!\*\*';
-          if \(isFail\) resultText \+= ' \(Critical Miss\)';
-        \}
+          resultText += ` | Attack: ${total} (d20: ${d20}+${spellAttackBonus})`;
+          if (isCrit) resultText += ' **CRITICAL HIT!**';
+          if (isFail) resultText += ' (Critical Miss)';
+        }
 
         // Damage
-        if \(spell\.damage\) \{'''
+        if (spell.damage) {'''
 
 new_cast_logic = r'''      // Roll spell (if applicable)
       let resultText = `✨ ${spell.name}`;
@@ -94,7 +94,7 @@ new_cast_logic = r'''      // Roll spell (if applicable)
         // Damage (always show if spell has damage, even without attack roll)
         if (spell.damage) {'''
 
-content = re.sub(old_cast_logic, new_cast_logic, content, flags=re.DOTALL)
+content, _ = replace_anchor(content, old_cast_logic, new_cast_logic)
 
 # Write the file
 with open('test-enhanced-features.html', 'w') as f:
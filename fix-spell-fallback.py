@@ -5,6 +5,8 @@ Fix: Add fallback spells when subclass not found or not selected
 
 import re
 
+from pagebuild.jsindex import script_index
+
 # Read the file
 with open('test-enhanced-features.html', 'r') as f:
     content = f.read()
@@ -15,21 +17,9 @@ if func_start == -1:
     print("❌ Could not find autoPopulateSpells function")
     exit(1)
 
-# Find the end of the function (matching braces)
-search_pos = func_start
-brace_count = 0
-found_opening = False
-func_end = -1
-
-for i in range(search_pos, len(content)):
-    if content[i] == '{':
-        found_opening = True
-        brace_count += 1
-    elif content[i] == '}':
-        brace_count -= 1
-        if found_opening and brace_count == 0:
-            func_end = i
-            break
+# Find the end of the function (tokenizer-aware, ignores braces in strings)
+span = script_index(content).get('autoPopulateSpells')
+func_end = span.end - 1 if span else -1
 
 if func_end == -1:
     print("❌ Could not find end of autoPopulateSpells function")
@@ -0,0 +1,50 @@
+"""
+Build tooling for test-enhanced-features.html
+
+The page is assembled by the add-*/fix-* scripts in the repo root. This
+package runs them as registered patches against one in-memory copy of the
+page instead of letting every script read, scan and rewrite the file.
+
+    python3 -m pagebuild            # apply every patch not already applied
+    python3 -m pagebuild --force    # ignore the manifest, run everything
+    python3 -m pagebuild --list     # show the declared patch order
+    python3 -m pagebuild --check-anchors
+    python3 -m pagebuild --only PATCH --mark-applied  # record a patch already in the page
+    python3 -m pagebuild.spells     # rebuild the compiled spell data
+    python3 -m pagebuild.mechanics fireball  # mechanics parsed from a spell's description
+    python3 -m pagebuild.store      # rebuild the SQLite spell/item store
+    python3 -m pagebuild.devserver  # dev server with the /api/spells query API
+    python3 -m pagebuild.staticserver  # caching, compressing static file server
+    python3 -m pagebuild.assets     # minified, content-hashed deploy copy in page-dist/
+    python3 -m pagebuild.perflint --check  # fail on new hot-path anti-patterns
+    python3 -m pagebuild --perf-lint       # the same check after patching
+    python3 -m pagebuild.characterlog save.json  # replay/validate an exported character log
+    python3 -m pagebuild.rules --update     # regenerate the rules tables
+    python3 -m pagebuild.loadouts --update  # regenerate the spell loadouts
+    python3 -m pagebuild.fallback --update  # regenerate the embedded offline spells
+    python3 -m pagebuild.dice 2d6+3         # exact distribution of a dice expression
+    python3 -m pagebuild.odds --update      # regenerate the hit/damage odds tables
+    python3 -m pagebuild.combat -j 8        # Monte Carlo combat curves (needs NumPy)
+    python3 -m pytest pagebuild             # tests (the store round trip needs node)
+"""
+
+from .anchors import find_anchor, replace_anchor
+from .document import Document
+from .jsindex import ScriptIndex, Span, script_index
+from .manifest import Manifest, ManifestError
+from .runner import PATCHES, Patch, PatchResult, run_patches
+
+__all__ = [
+    'Document',
+    'PATCHES',
+    'Patch',
+    'PatchResult',
+    'run_patches',
+    'ScriptIndex',
+    'Span',
+    'script_index',
+    'find_anchor',
+    'replace_anchor',
+    'Manifest',
+    'ManifestError',
+]
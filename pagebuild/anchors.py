@@ -0,0 +1,331 @@
+"""
+Multi-pattern anchor matcher
+
+Patches locate the code they rewrite with large verbatim `old_*` blocks (and
+a few `*_marker` strings), each found with its own full-page `in` / find /
+re.sub pass. This module collects every anchor from every registered patch
+and finds all of them in one linear Aho-Corasick scan of the page, giving an
+offset table the patches share:
+
+    content, count = replace_anchor(content, old_mapping, new_mapping)
+
+The automaton is built once per pattern set. The runner scans the page for
+the anchors of every patch in the build once, before the first patch runs.
+The table then follows the page through replace_anchor(): the edit is known
+exactly, so offsets after it are shifted and only a window around each
+replaced span is rescanned. A patch that rewrites the page some other way is
+followed the same way from the runner's diff of its edit (follow()). A
+lookup on text the table does not describe is a plain str.find, which is
+cheaper than rescanning in Python.
+
+The same table backs the runner's preflight check, which flags anchors that
+match zero times or more than once before anything is rewritten.
+"""
+
+import ast
+import functools
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+ANCHOR_PREFIXES = ('old_',)
+ANCHOR_SUFFIXES = ('_marker',)
+PRODUCT_PREFIXES = ('new_',)
+
+# Preflight statuses
+UNIQUE = 'unique'
+MISSING = 'missing'
+AMBIGUOUS = 'ambiguous'
+DEFERRED = 'deferred'  # missing now, but inserted by an earlier patch
+
+
+@dataclass(frozen=True)
+class Anchor:
+    patch: str
+    variable: str
+    text: str
+    line: int
+
+
+class AhoCorasick:
+    """Aho-Corasick automaton over a fixed set of literal patterns."""
+
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(p for p in patterns if p))
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for pid, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] = self._out[state] + (pid,)
+        self._link()
+
+    def _link(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+
+    def search(self, text, start=0, end=None):
+        """Return {pattern: [start offsets]} for every (possibly overlapping)
+        match lying entirely within text[start:end]."""
+        goto, fail, out = self._goto, self._fail, self._out
+        lengths = [len(p) for p in self.patterns]
+        hits = [[] for _ in self.patterns]
+        state = 0
+        for i in range(start, len(text) if end is None else end):
+            ch = text[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for pid in out[state]:
+                    hits[pid].append(i + 1 - lengths[pid])
+        return dict(zip(self.patterns, hits))
+
+
+@functools.lru_cache(maxsize=8)
+def automaton(patterns):
+    """The AhoCorasick automaton for a tuple of patterns, built once."""
+    return AhoCorasick(patterns)
+
+
+def _string_assignments(source, prefixes, suffixes=()):
+    """Yield (name, text, line) for `name = '...'` assignments anywhere in a script."""
+    tree = ast.parse(source)
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if not isinstance(target, ast.Name):
+            continue
+        if not (target.id.startswith(prefixes) or (suffixes and target.id.endswith(suffixes))):
+            continue
+        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            yield target.id, node.value.value, node.lineno
+
+
+def collect_anchors(patch, root=None):
+    """Literal anchors a patch script searches for."""
+    with open(patch.path(root) if root else patch.path(), encoding='utf-8') as f:
+        source = f.read()
+    return [Anchor(patch.name, name, text, line)
+            for name, text, line in _string_assignments(source, ANCHOR_PREFIXES, ANCHOR_SUFFIXES)]
+
+
+def collect_products(patch, root=None):
+    """Literal `new_*` blocks a patch inserts into the page."""
+    with open(patch.path(root) if root else patch.path(), encoding='utf-8') as f:
+        source = f.read()
+    return [text for _, text, _ in _string_assignments(source, PRODUCT_PREFIXES)]
+
+
+class AnchorTable:
+    """Offsets of a set of anchors in one version of the page."""
+
+    def __init__(self, content, patterns, offsets=None):
+        self.content = content
+        self.patterns = tuple(patterns)
+        self.offsets = automaton(self.patterns).search(content) if offsets is None else offsets
+
+    def __contains__(self, pattern):
+        return pattern in self.offsets
+
+    def describes(self, content):
+        return self.content is content or self.content == content
+
+    def find_all(self, pattern):
+        return self.offsets[pattern]
+
+    def count(self, pattern):
+        return len(self.offsets[pattern])
+
+    def edited(self, content, edits):
+        """The table for `content`, made from this one by `edits`.
+
+        `edits` are (start, end, replacement length) in the old text,
+        ascending and non-overlapping. Matches clear of every edit are
+        shifted; matches touching an edit are dropped and found again by
+        rescanning a window around it in the new text.
+        """
+        reach = max(map(len, self.patterns), default=1) - 1
+        new_spans = []
+        delta = 0
+        for start, end, length in edits:
+            new_spans.append((start + delta, start + delta + length))
+            delta += length - (end - start)
+
+        offsets = {}
+        for pattern, found in self.offsets.items():
+            kept = []
+            size = len(pattern)
+            for offset in found:
+                shift = 0
+                for start, end, length in edits:
+                    if start >= offset + size:
+                        break  # this and later edits come after the match
+                    if end > offset or start > offset:
+                        shift = None  # the edit overlaps the match
+                        break
+                    shift += length - (end - start)
+                if shift is not None:
+                    kept.append(offset + shift)
+            offsets[pattern] = kept
+
+        # Rescan windows around each replaced span (merged where they overlap)
+        windows = []
+        for start, end in new_spans:
+            low, high = max(start - reach, 0), min(end + reach, len(content))
+            if windows and low <= windows[-1][1]:
+                windows[-1][1] = max(windows[-1][1], high)
+            else:
+                windows.append([low, high])
+        machine = automaton(self.patterns)
+        for low, high in windows:
+            for pattern, found in machine.search(content, low, high).items():
+                size = len(pattern)
+                fresh = [offset for offset in found
+                         if any(offset < end and offset + size > start if end > start
+                                else offset < start < offset + size  # a deletion seam
+                                for start, end in new_spans)]
+                if fresh:
+                    offsets[pattern] = sorted(set(offsets[pattern]).union(fresh))
+        return AnchorTable(content, self.patterns, offsets)
+
+
+_CURRENT = None  # the table for the latest page version seen
+
+
+@functools.lru_cache(maxsize=None)
+def anchor_texts(patches, root=None):
+    """Anchor texts of a tuple of patches, without duplicates (collected once per process)."""
+    texts = [anchor.text for patch in patches for anchor in collect_anchors(patch, root)]
+    return tuple(dict.fromkeys(text for text in texts if text))
+
+
+def registered_anchor_texts():
+    """Anchor texts of every registered patch."""
+    from .runner import PATCHES
+    return anchor_texts(PATCHES)
+
+
+def anchor_table(content, patterns=None):
+    """Shared AnchorTable for this page text (scanned once per pattern set)."""
+    global _CURRENT
+    patterns = registered_anchor_texts() if patterns is None else tuple(dict.fromkeys(p for p in patterns if p))
+    if _CURRENT is not None and _CURRENT.patterns == patterns and _CURRENT.describes(content):
+        return _CURRENT
+    _CURRENT = AnchorTable(content, patterns)
+    return _CURRENT
+
+
+def follow(before, after, edits):
+    """Carry the shared table from `before` to `after` over an edit made without replace_anchor.
+
+    `edits` are as for AnchorTable.edited. A table describing neither text
+    (the page was also changed some other way) is dropped.
+    """
+    global _CURRENT
+    table = _CURRENT
+    if table is None or table.describes(after):
+        return
+    _CURRENT = table.edited(after, edits) if table.describes(before) else None
+
+
+@contextmanager
+def kept_table():
+    """Leave the shared table as it is across a dry run on a copy of the page."""
+    global _CURRENT
+    table = _CURRENT
+    try:
+        yield
+    finally:
+        _CURRENT = table
+
+
+def find_anchor(content, anchor):
+    """Start offsets of `anchor` in `content`.
+
+    Served from the shared table when it describes this text, otherwise a
+    str.find scan (a single pattern is not worth a Python-level rescan).
+    """
+    table = _CURRENT
+    if table is not None and anchor in table and table.describes(content):
+        return list(table.find_all(anchor))
+    offsets, pos = [], content.find(anchor)
+    while pos != -1:
+        offsets.append(pos)
+        pos = content.find(anchor, pos + 1)
+    return offsets
+
+
+def replace_anchor(content, anchor, replacement):
+    """Replace every non-overlapping occurrence of `anchor` (like str.replace).
+
+    Returns (new content, number of replacements). A shared table describing
+    `content` is carried over to the result.
+    """
+    global _CURRENT
+    pieces = []
+    edits = []
+    last = 0
+    for start in find_anchor(content, anchor):
+        if start < last:
+            continue
+        pieces.append(content[last:start])
+        pieces.append(replacement)
+        last = start + len(anchor)
+        edits.append((start, last, len(replacement)))
+    if not pieces:
+        return content, 0
+    pieces.append(content[last:])
+    result = ''.join(pieces)
+    table = _CURRENT
+    if table is not None and table.describes(content):
+        _CURRENT = table.edited(result, edits)
+    return result, len(edits)
+
+
+def preflight(content, patches, root=None):
+    """Check every anchor of `patches` against the page before rewriting.
+
+    Returns a list of (Anchor, status, offsets) for anchors that are not
+    UNIQUE. An anchor missing from the page but contained in a `new_*` block
+    of an earlier patch is DEFERRED rather than MISSING.
+    """
+    per_patch = [(patch, collect_anchors(patch, root)) for patch in patches]
+    patterns = [anchor.text for _, anchors in per_patch for anchor in anchors]
+    table = anchor_table(content, patterns)
+
+    problems = []
+    produced = []
+    for patch, anchors in per_patch:
+        for anchor in anchors:
+            offsets = table.find_all(anchor.text)
+            if len(offsets) == 1:
+                continue
+            if len(offsets) > 1:
+                status = AMBIGUOUS
+            elif any(anchor.text in block for block in produced):
+                status = DEFERRED
+            else:
+                status = MISSING
+            problems.append((anchor, status, offsets))
+        produced.extend(collect_products(patch, root))
+    return problems
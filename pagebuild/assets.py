@@ -0,0 +1,306 @@
+"""
+Asset build for test-enhanced-features.html
+
+The page is one file: every visit downloads the CSS, the script and the data
+tables embedded in it, however little changed. This stage writes a deployable
+copy to page-dist/ with each part in its own minified, content-hashed file:
+
+    assets/page.<hash>.css        the <style> block
+    assets/<name>.<hash>.js       each large top-level data declaration
+                                  (characters, spellDefinitions, the generated
+                                  JSON.parse tables, ...), still a classic
+                                  script declaring the same global const
+    assets/page.<hash>.js         the rest of the <script> block
+
+The <link> takes the place of the <style> block. The data scripts, in page
+order, and then page.js take the place of the <script> block, so the data
+declarations move ahead of the code that surrounded them. That is safe
+because they are plain literals (jsindex.is_plain_data) and read nothing
+else from the page; each is a global const by the time page.js runs.
+
+Hashed names never change content, so staticserver.py sends them with a
+one-year immutable Cache-Control; only the HTML is revalidated, and a repeat
+visit fetches just the files whose hash changed. Every output also gets a .gz sibling (and .br
+when the brotli module is installed) for the server to send as is.
+
+Minification is token-based and conservative: the JS is re-emitted from
+jsindex's tokens with comments dropped and whitespace reduced to what
+separates tokens (a newline is kept wherever automatic semicolon insertion
+could depend on it), and the build checks that the result tokenizes to the
+same token sequence. Strings and template literals are copied verbatim. The
+CSS loses comments and insignificant whitespace.
+
+The runtime files the page fetches (spell index, search index, shards) are
+copied alongside. The source page is not touched; patches keep working on it.
+
+    python3 -m pagebuild.assets                build page-dist/
+    python3 -m pagebuild.assets --out /tmp/site
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from . import rules
+from .jsindex import IDENT, NUMBER, PUNCT, REGEX, find_script, is_plain_data, script_index, tokenize
+
+try:
+    import brotli
+except ImportError:  # optional: .gz only
+    brotli = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUT_DIR = os.path.join(REPO_ROOT, 'page-dist')
+ASSET_DIR = 'assets'
+MANIFEST_NAME = 'asset-manifest.json'
+HASH_LENGTH = 12
+DATA_BLOB_MIN = 4096  # declarations at least this long get their own file
+
+# Files the page fetches at runtime, copied next to the built page
+RUNTIME_PATHS = ('spells-index.json', 'spells-search.json', 'spell-shards')
+
+STYLE_OPEN, STYLE_CLOSE = '<style>', '</style>'
+
+# After these a line break cannot end the statement, so it can go
+_CONTINUES = frozenset(('{', '(', '[', ',', ';', ':', '?', '.', '?.', '=>', '=', '==', '===', '!=', '!==',
+                        '<', '>', '<=', '>=', '+', '-', '*', '/', '%', '**', '&', '|', '^', '!', '~',
+                        '&&', '||', '??', '<<', '>>', '>>>', '+=', '-=', '*=', '/=', '%=', '**=',
+                        '&=', '|=', '^=', '<<=', '>>=', '>>>=', '&&=', '||=', '??=', '...'))
+_WORDISH = frozenset((IDENT, NUMBER))
+_CSS_TIGHT = frozenset('{};,>')
+_CSS_TIGHT_AFTER = _CSS_TIGHT | {':'}  # a space before ':' can start a pseudo-class
+
+
+class MinifyError(ValueError):
+    pass
+
+
+def minify_js(text, start=0, end=None):
+    """Minified text[start:end] (see the module docstring)."""
+    tokens = tokenize(text, start, end)
+    out = []
+    prev = None
+    for tok in tokens:
+        if prev is not None:
+            gap = text[prev.end:tok.start]
+            if '\n' in gap and prev.value not in _CONTINUES or tok.value in ('++', '--') and gap:
+                out.append('\n')
+            elif _needs_space(prev, tok):
+                out.append(' ')
+        out.append(tok.value)
+        prev = tok
+    minified = ''.join(out)
+
+    before = [t.value for t in tokens]
+    after = [t.value for t in tokenize(minified)]
+    if before != after:
+        raise MinifyError('minified JavaScript does not tokenize like the source')
+    return minified
+
+
+def _needs_space(prev, tok):
+    if prev.kind in _WORDISH and tok.kind in _WORDISH:
+        return True
+    if prev.kind == REGEX and tok.kind in _WORDISH:
+        return True  # would read as flags
+    if prev.kind == NUMBER and tok.value.startswith('.'):
+        return True
+    if prev.kind == PUNCT and tok.kind in (PUNCT, REGEX):
+        a, b = prev.value[-1], tok.value[0]
+        return (a == b and a in '+-') or (a == '/' and b in '/*') or (a == '<' and b == '!') \
+            or (prev.value.endswith('--') and b == '>')
+    return False
+
+
+def minify_css(css):
+    """CSS without comments and insignificant whitespace; strings kept as is."""
+    out = []
+    i, n = 0, len(css)
+    pending_space = False
+    while i < n:
+        ch = css[i]
+        if css.startswith('/*', i):
+            close = css.find('*/', i + 2)
+            if close == -1:
+                raise MinifyError(f'Unterminated CSS comment at offset {i}')
+            i = close + 2
+            pending_space = True
+            continue
+        if ch.isspace():
+            pending_space = True
+            i += 1
+            continue
+        if ch in '"\'':
+            close = i + 1
+            while close < n and css[close] != ch:
+                close += 2 if css[close] == '\\' else 1
+            token = css[i:close + 1]
+            i = close + 1
+        else:
+            token = ch
+            i += 1
+        if pending_space and out and out[-1][-1] not in _CSS_TIGHT_AFTER and token not in _CSS_TIGHT:
+            out.append(' ')
+        if token == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(token)
+        pending_space = False
+    return ''.join(out)
+
+
+def data_declarations(content, minimum=DATA_BLOB_MIN):
+    """Top-level const declarations of plain data at least `minimum` long."""
+    index = script_index(content)
+    found = []
+    for span in index.spans:
+        if span.kind != 'const' or span.end - span.start < minimum:
+            continue
+        tokens = tokenize(content, span.start, span.end)
+        if len(tokens) > 3 and tokens[2].value == '=' and is_plain_data(tokens[3:]):
+            found.append(span)
+    return found
+
+
+def content_name(stem, suffix, data):
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{suffix}'
+
+
+def _slug(name):
+    return re.sub(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])', '-', name).lower()
+
+
+def split_page(content, minimum=DATA_BLOB_MIN):
+    """(html with placeholders, css, [(blob name, js)], main js) from the page.
+
+    The blobs are the data declarations in page order; main js is everything
+    else in the script with those declarations cut out. build() emits the
+    blobs first, so each declaration runs before the code around it did.
+    """
+    style_start = content.find(STYLE_OPEN)
+    style_end = content.find(STYLE_CLOSE, style_start)
+    if style_start == -1 or style_end == -1:
+        raise ValueError('No <style> block found')
+    css = content[style_start + len(STYLE_OPEN):style_end]
+
+    script_start, script_end = find_script(content)
+    blobs = []
+    main_parts = []
+    cursor = script_start
+    for span in data_declarations(content, minimum):
+        blobs.append((_slug(span.name), minify_js(content, span.start, span.end)))
+        main_parts.append(minify_js(content, cursor, span.start))
+        cursor = span.end
+    main_parts.append(minify_js(content, cursor, script_end))
+    main_js = '\n'.join(part for part in main_parts if part)
+
+    html = (content[:style_start] + '\x00STYLE\x00' + content[style_end + len(STYLE_CLOSE):script_start
+            - len('<script>')] + '\x00SCRIPT\x00' + content[script_end + len('</script>'):])
+    return html, css, blobs, main_js
+
+
+def _write(path, data):
+    """Write `data` (bytes) plus compressed siblings, unless already identical."""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, 9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data))
+    return True
+
+
+def _copy_runtime(out_dir, paths=RUNTIME_PATHS):
+    copied = 0
+    for relative in paths:
+        source = os.path.join(REPO_ROOT, relative)
+        if os.path.isdir(source):
+            files = [os.path.join(relative, name) for name in sorted(os.listdir(source))]
+        elif os.path.exists(source):
+            files = [relative]
+        else:
+            continue
+        for file in files:
+            target = os.path.join(out_dir, file)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(os.path.join(REPO_ROOT, file), 'rb') as f:
+                copied += _write(target, f.read())
+    return copied
+
+
+def build(page=rules.PAGE_PATH, out_dir=OUT_DIR, minimum=DATA_BLOB_MIN):
+    """Build the page into out_dir; returns {output name: (bytes, gzip bytes)}."""
+    with open(page, 'r', encoding='utf-8') as f:
+        content = f.read()
+    html, css, blobs, main_js = split_page(content, minimum)
+
+    asset_dir = os.path.join(out_dir, ASSET_DIR)
+    os.makedirs(asset_dir, exist_ok=True)
+    outputs = {}
+    manifest = {}
+
+    def emit(stem, suffix, text):
+        data = text.encode('utf-8')
+        name = content_name(stem, suffix, data)
+        _write(os.path.join(asset_dir, name), data)
+        manifest[stem + suffix] = f'{ASSET_DIR}/{name}'
+        outputs[f'{ASSET_DIR}/{name}'] = (len(data), len(gzip.compress(data, 9, mtime=0)))
+        return f'{ASSET_DIR}/{name}'
+
+    stylesheet = emit('page', '.css', minify_css(css))
+    scripts = [emit(name, '.js', js) for name, js in blobs]
+    scripts.append(emit('page', '.js', main_js))
+
+    html = html.replace('\x00STYLE\x00', f'<link rel="stylesheet" href="{stylesheet}">')
+    html = html.replace('\x00SCRIPT\x00', '\n  '.join(f'<script src="{src}"></script>' for src in scripts))
+    page_name = os.path.basename(page)
+    data = html.encode('utf-8')
+    _write(os.path.join(out_dir, page_name), data)
+    outputs[page_name] = (len(data), len(gzip.compress(data, 9, mtime=0)))
+
+    # Drop hashed files from earlier builds
+    keep = {os.path.basename(path) for path in manifest.values()}
+    for name in os.listdir(asset_dir):
+        base = name[:-3] if name.endswith(('.gz', '.br')) else name
+        if base not in keep:
+            os.remove(os.path.join(asset_dir, name))
+
+    _write(os.path.join(out_dir, MANIFEST_NAME),
+           json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8') + b'\n')
+    _copy_runtime(out_dir)
+    return outputs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.assets',
+                                     description='Extract, minify and content-hash the page assets.')
+    parser.add_argument('--page', default=rules.PAGE_PATH, help='page to build (default: %(default)s)')
+    parser.add_argument('--out', default=OUT_DIR, help='output directory (default: %(default)s)')
+    parser.add_argument('--min-blob', type=int, default=DATA_BLOB_MIN,
+                        help='smallest data declaration given its own file (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    source_size = os.path.getsize(args.page)
+    try:
+        outputs = build(args.page, args.out, args.min_blob)
+    except MinifyError as error:
+        print(f'⚠️ {error}')
+        return 1
+    for name, (size, gzipped) in outputs.items():
+        print(f'✅ {name:52} {size:9,} bytes  {gzipped:8,} gzip')
+    total = sum(size for size, _ in outputs.values())
+    print(f'{source_size:,} bytes in, {total:,} bytes out ({total / source_size:.0%})')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,256 @@
+"""
+Replay and validate exported character save logs
+
+The page keeps its characters in localStorage as a snapshot plus a log of
+small deltas (see the character store in add-character-store.py); "Export
+save" in the character menu downloads both as
+
+    {"version": 2,
+     "snapshot": {"version": 2, "seq": 41, "current": "theron", "characters": [...]},
+     "log": [[42, "set", "theron", "hp.current", 31],
+             [43, "push", "zara", "spells.3", {"id": "fire-bolt", "prepared": false, "record": {...}}],
+             [44, "remove", "kael", "inventory", 2],
+             [45, "create", "c1729150000000", null, {...}],
+             [46, "select", "c1729150000000"]]}
+
+A character spell is stored as its id and own state; its shared data
+(name, damage, description, ...) is under "record", or left out when the
+page's spellDefinitions entry for the id supplies it.
+
+This replays the log over the snapshot exactly as the page does on load and
+reports what would go wrong there: entries out of sequence, unknown or
+duplicate characters, paths that do not resolve, removals out of range. The
+replayed characters are then sanity-checked (HP within 0..max, ability
+scores 1-30, spell slots and item quantities in range). --out writes the
+replayed state back as a compacted export with an empty log.
+
+    python3 -m pagebuild.characterlog characters-2026-10-17.json
+    python3 -m pagebuild.characterlog characters.json --out compacted.json
+"""
+
+import argparse
+import copy
+import json
+from dataclasses import dataclass
+
+STORE_VERSION = 2
+ABILITIES = ('str', 'dex', 'con', 'int', 'wis', 'cha')
+SCORE_RANGE = (1, 30)
+
+
+class LogError(ValueError):
+    """A log entry the page could not replay; replay stops there."""
+
+    def __init__(self, seq, message):
+        super().__init__(f'#{seq}: {message}')
+        self.seq = seq
+
+
+@dataclass(frozen=True)
+class Problem:
+    seq: int  # the entry after which it showed up (the snapshot's seq if before any)
+    message: str
+    fatal: bool = False
+
+    def __str__(self):
+        return f'{"❌" if self.fatal else "⚠️"} #{self.seq}: {self.message}'
+
+
+def path_parts(path):
+    """'spellSlots.1.current' -> ['spellSlots', '1', 'current']."""
+    return path.split('.')
+
+
+def _step(target, part):
+    # The page converts numeric parts to numbers; JS objects key them by
+    # string anyway, so only lists index by integer
+    if isinstance(target, list):
+        return target[int(part)] if part.isdigit() and int(part) < len(target) else None
+    if isinstance(target, dict):
+        return target.get(part)
+    return None
+
+
+def _container(target, last):
+    if isinstance(target, list):
+        return int(last) if last.isdigit() else None
+    return last if isinstance(target, dict) else None
+
+
+def apply_delta(state, entry):
+    """Apply one log entry to {'characters': [...], 'current': id} in place."""
+    if not isinstance(entry, list) or len(entry) < 3:
+        raise LogError('?', f'malformed entry {entry!r}')
+    seq, op, character_id = entry[:3]
+    path, value = (entry[3:5] + [None, None])[:2]
+
+    if op == 'create':
+        if not isinstance(value, dict):
+            raise LogError(seq, 'create without a character')
+        if value.get('id') != character_id:
+            raise LogError(seq, f'created character has id {value.get("id")!r}, entry says {character_id!r}')
+        if any(c.get('id') == character_id for c in state['characters']):
+            raise LogError(seq, f'character {character_id!r} created twice')
+        state['characters'].append(value)
+        return
+    character = next((c for c in state['characters'] if c.get('id') == character_id), None)
+    if character is None:
+        raise LogError(seq, f'no character {character_id!r}')
+    if op == 'select':
+        state['current'] = character_id
+        return
+    if not isinstance(path, str) or not path:
+        raise LogError(seq, f'{op} without a path')
+
+    *parents, last = path_parts(path)
+    parent = character
+    for part in parents:
+        parent = _step(parent, part)
+    key = _container(parent, last)
+    if key is None or isinstance(parent, list) and op == 'set' and key >= len(parent):
+        raise LogError(seq, f'{character_id}: no {path}')
+
+    if op == 'set':
+        parent[key] = value
+    elif op == 'push':
+        if isinstance(parent, dict) and key not in parent:
+            parent[key] = []
+        target = parent[key] if isinstance(parent, dict) or key < len(parent) else None
+        if not isinstance(target, list):
+            raise LogError(seq, f'{character_id}: {path} is not a list')
+        target.append(value)
+    elif op == 'remove':
+        target = _step(parent, last)
+        if not isinstance(target, list) or not isinstance(value, int) or not 0 <= value < len(target):
+            raise LogError(seq, f'{character_id}: no {path}.{value}')
+        del target[value]
+    else:
+        raise LogError(seq, f'unknown op {op!r}')
+
+
+def check_character(character):
+    """Values the page would never produce itself, as messages."""
+    name = character.get('id', '?')
+    found = []
+
+    def within(label, current, high=None, low=0):
+        if not isinstance(current, int) or isinstance(current, bool):
+            found.append(f'{name}: {label} is {current!r}, not a whole number')
+        elif current < low or high is not None and current > high:
+            found.append(f'{name}: {label} {current} is outside {low}..{high if high is not None else "∞"}')
+
+    hp = character.get('hp')
+    if not isinstance(hp, dict):
+        found.append(f'{name}: no hp')
+    else:
+        within('hp.max', hp.get('max'))
+        within('hp.current', hp.get('current'), hp.get('max') if isinstance(hp.get('max'), int) else None)
+    for ability in ABILITIES:
+        within(f'stats.{ability}', (character.get('stats') or {}).get(ability), SCORE_RANGE[1], SCORE_RANGE[0])
+    for level, slots in (character.get('spellSlots') or {}).items():
+        if isinstance(slots, dict):
+            within(f'spellSlots.{level}.current', slots.get('current'),
+                   slots.get('max') if isinstance(slots.get('max'), int) else None)
+    for index, item in enumerate(character.get('inventory') or []):
+        if isinstance(item, dict) and 'quantity' in item:
+            within(f'inventory.{index}.quantity ({item.get("name", "?")})', item['quantity'])
+    food = character.get('food')
+    if isinstance(food, dict):
+        within('food.current', food.get('current'), food.get('max') if isinstance(food.get('max'), int) else None)
+    return found
+
+
+def replay(export):
+    """Replay an export the way the page restores it.
+
+    Returns (state, seq, problems): the characters and current id after every
+    entry that replayed cleanly, the last applied seq, and a list of Problem.
+    """
+    snapshot = export.get('snapshot')
+    if export.get('version') != STORE_VERSION or not isinstance(snapshot, dict) \
+            or snapshot.get('version') != STORE_VERSION:
+        return None, 0, [Problem(0, f'not a version {STORE_VERSION} character export', fatal=True)]
+
+    state = {'characters': copy.deepcopy(snapshot.get('characters') or []), 'current': snapshot.get('current')}
+    seq = snapshot.get('seq', 0)
+    problems = []
+
+    ids = [c.get('id') for c in state['characters']]
+    for duplicate in sorted({i for i in ids if ids.count(i) > 1}, key=str):
+        problems.append(Problem(seq, f'snapshot has character {duplicate!r} more than once'))
+    if state['current'] not in ids:
+        problems.append(Problem(seq, f'snapshot selects unknown character {state["current"]!r}'))
+
+    reported = set()
+    for entry in export.get('log') or []:
+        entry_seq = entry[0] if isinstance(entry, list) and entry else None
+        if isinstance(entry_seq, int) and entry_seq <= seq:
+            continue  # already in the snapshot (or replayed): the page skips it too
+        if isinstance(entry_seq, int) and entry_seq != seq + 1:
+            problems.append(Problem(seq, f'next entry is #{entry_seq}; entries {seq + 1}..{entry_seq - 1} are missing'))
+        try:
+            apply_delta(state, entry)
+        except LogError as error:
+            problems.append(Problem(seq, f'replay stops here, the page drops the rest: {error}', fatal=True))
+            break
+        except (TypeError, ValueError, IndexError, AttributeError) as error:
+            problems.append(Problem(seq, f'replay stops at {entry!r}: {error}', fatal=True))
+            break
+        seq = entry_seq
+        touched = next((c for c in state['characters'] if c.get('id') == entry[2]), None)
+        for message in check_character(touched) if touched else ():
+            if message not in reported:
+                reported.add(message)
+                problems.append(Problem(seq, message))
+
+    # Characters the log never touched are checked against the snapshot
+    for character in state['characters']:
+        for message in check_character(character):
+            if message not in reported:
+                reported.add(message)
+                problems.append(Problem(snapshot.get('seq', 0), message))
+    return state, seq, problems
+
+
+def compacted(state, seq):
+    """An export whose snapshot is `state` and whose log is empty."""
+    snapshot = {'version': STORE_VERSION, 'seq': seq, 'current': state['current'], 'characters': state['characters']}
+    return {'version': STORE_VERSION, 'snapshot': snapshot, 'log': []}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.characterlog',
+                                     description='Replay and validate an exported character save log.')
+    parser.add_argument('export', help='file saved with "Export save" in the character menu')
+    parser.add_argument('--out', help='write the replayed characters here as a compacted export')
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.export, 'r', encoding='utf-8') as f:
+            export = json.load(f)
+    except (OSError, ValueError) as error:
+        print(f'❌ Could not read {args.export}: {error}')
+        return 1
+    if not isinstance(export, dict):
+        print(f'❌ {args.export} is not a character export')
+        return 1
+
+    state, seq, problems = replay(export)
+    for problem in problems:
+        print(problem)
+    if state is None:
+        return 1
+
+    start = export['snapshot'].get('seq', 0)
+    log_size = len(export.get('log') or [])
+    print(f'{"⚠️" if problems else "✅"} Replayed {seq - start} of {log_size} log entries over snapshot #{start}: '
+          f'{len(state["characters"])} characters, current {state["current"]!r}')
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(compacted(state, seq), f, ensure_ascii=False)
+        print(f'✅ Wrote compacted export to {args.out}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
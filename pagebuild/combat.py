@@ -0,0 +1,432 @@
+"""
+Monte Carlo combat simulator
+
+Plays the demo characters from the page's `characters` array through
+adventuring days against a training target, with the page's own attack,
+spell and rest rules, so their numbers can be tuned from curves rather than
+by hand:
+
+    weapon attacks    rollWeaponAttack: d20 + toHit, attacks.melee /
+                      attacks.ranged damage
+    quick attacks     rollMeleeAttack / rollRangedAttack: d20 + STR / DEX
+                      modifier, 1d8 + the same modifier
+    cantrip rolls     rollSpellAttack: d20 + casting modifier + proficiency,
+                      only the first NdM of the damage, no crit doubling
+    spells            castSpellFromModal: prepared spells only, spends a slot
+                      of the spell's level; attack spells roll d20 +
+                      computed.spellAttackBonus (7 when unset)
+    rests             longRest before each day restores every slot;
+                      shortRest restores a warlock's slots
+
+A natural 20 doubles the damage dice wherever the page does. The page
+leaves hits to the player, so the target decides them: an attack hits on a
+natural 20 or when the total reaches the target's AC (a natural 1 always
+misses). Against a spell that names a save the target rolls d20 + its save
+bonus against computed.spellSaveDC (15 when unset) and takes half damage
+from leveled spells, none from cantrips, on a success. Other damage spells
+always land. The target does not fight back, and healing and bonus-action
+spells are not cast.
+
+Each round every trial takes the affordable action with the highest exact
+expected damage (odds.py). Trials run as NumPy array operations in chunks of
+CHUNK_TRIALS; every chunk draws from its own seed spawned from --seed, so
+the result for a seed is the same however many processes (-j) share the
+chunks.
+
+    python3 -m pagebuild.combat --trials 1000000 -j 8
+    python3 -m pagebuild.combat zara --ac 13 --hp 90 --encounters 6 --short-rests 2,4
+    python3 -m pagebuild.combat --json > curves.json
+
+Needs NumPy (pip install numpy); the rest of pagebuild does not.
+"""
+
+import argparse
+import json
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Optional
+
+import numpy as np
+
+from . import dice, odds, rules
+from .jsindex import literal_value
+
+CHUNK_TRIALS = 100_000
+
+# castSpellFromModal's fallbacks when a character has no `computed` block
+DEFAULT_SPELL_ATTACK_BONUS = 7
+DEFAULT_SPELL_SAVE_DC = 15
+
+THIRD_CASTER_SUBCLASSES = ('Eldritch Knight', 'Arcane Trickster')
+CASTER_TYPES = {'caster': rules.FULL, 'halfcaster': rules.HALF, 'thirdcaster': rules.THIRD}
+
+_HEALING = re.compile(r'\b(heal|restore|regain)', re.IGNORECASE)
+_FIRST_DICE = re.compile(r'\d+d\d+')
+
+
+@dataclass(frozen=True)
+class Action:
+    """One way for a character to deal damage in a round."""
+
+    name: str
+    source: str                  # page function whose rules it follows
+    damage: dice.DiceExpression
+    formula: str
+    bonus: Optional[int] = None  # attack bonus; None: no attack roll
+    crit_doubles: bool = True
+    save: bool = False           # target rolls a save instead
+    half_on_save: bool = False
+    slot_level: int = 0          # slot spent per use (0: none)
+
+
+@dataclass(frozen=True)
+class Character:
+    id: str
+    name: str
+    summary: str
+    slots: tuple                 # max slots by spell level, index 0 unused
+    warlock: bool
+    save_dc: int
+    actions: tuple
+
+
+@dataclass(frozen=True)
+class Target:
+    hp: int = 60
+    ac: int = 15
+    save_bonus: int = 2
+
+
+@dataclass(frozen=True)
+class Plan:
+    encounters: int = 4
+    rounds: int = 20
+    short_rests: frozenset = frozenset({2})  # after these encounters (1-based)
+
+
+def _modifier(score):
+    return (score - 10) // 2
+
+
+def _action(name, source, formula, **kwargs):
+    formula = dice.normalize(formula)
+    return Action(name, source, dice.parse(formula), formula, **kwargs)
+
+
+def character_from_page(char):
+    """A Character from one entry of the page's `characters` array."""
+    stats = char['stats']
+    level = char['level']
+    spells = char.get('spells') or {}
+
+    actions = []
+    for kind in ('melee', 'ranged'):
+        attack = (char.get('attacks') or {}).get(kind)
+        formula = attack and odds.formula_in(attack['damage'])
+        if formula:
+            actions.append(_action(attack['name'], 'rollWeaponAttack', formula, bonus=attack['toHit']))
+    for name, source, ability in (('Melee Attack', 'rollMeleeAttack', 'str'),
+                                  ('Ranged Attack', 'rollRangedAttack', 'dex')):
+        mod = _modifier(stats[ability])
+        actions.append(_action(name, source, f'1d8{mod:+d}', bonus=mod))
+
+    computed = char.get('computed') or {}
+    spell_attack_bonus = computed.get('spellAttackBonus') or DEFAULT_SPELL_ATTACK_BONUS
+    save_dc = computed.get('spellSaveDC') or DEFAULT_SPELL_SAVE_DC
+    casting_mod = _modifier(stats['int'] if char.get('classType') == 'caster' else stats['wis'])
+    popup_bonus = casting_mod + rules.proficiency_bonus(level)
+
+    for spell_level, entries in spells.items():
+        spell_level = int(spell_level)
+        for spell in entries:
+            formula = odds.formula_in(spell.get('damage'))
+            if (not formula or _HEALING.search(spell.get('description') or '')
+                    or 'bonus' in (spell.get('castingTime') or '').lower()):
+                continue
+            if spell_level == 0:
+                first = _FIRST_DICE.search(formula)
+                actions.append(_action(f"{spell['name']} (dice popup)", 'rollSpellAttack', first.group(0),
+                                       bonus=popup_bonus, crit_doubles=False))
+            elif not spell.get('prepared'):
+                continue
+            if spell.get('attackRoll'):
+                rolls = dict(bonus=spell_attack_bonus)
+            elif spell.get('save'):
+                rolls = dict(save=True, half_on_save=spell_level > 0)
+            else:
+                rolls = {}
+            actions.append(_action(spell['name'], 'castSpellFromModal', formula,
+                                   slot_level=spell_level, **rolls))
+
+    caster = (rules.THIRD if char.get('subclass') in THIRD_CASTER_SUBCLASSES
+              else CASTER_TYPES.get(char.get('classType'), rules.FULL))
+    max_level = max((int(key) for key in spells if int(key) > 0), default=0)
+    slots = [0] * rules.SPELL_LEVELS
+    for spell_level in range(1, max_level + 1):
+        slots[spell_level] = rules.spell_slots(caster, level, spell_level)
+
+    return Character(
+        id=char['id'],
+        name=char['name'],
+        summary=f"{char['class']} {level}",
+        slots=tuple(slots),
+        warlock=char['class'].lower() == 'warlock',
+        save_dc=save_dc,
+        actions=tuple(actions),
+    )
+
+
+def load_characters(content):
+    return [character_from_page(char) for char in literal_value(content, 'characters')]
+
+
+def expected_damage(action, target, save_dc):
+    """Exact expected damage of one use of `action` against `target`."""
+    mean, crit_mean, _, _ = odds.damage_stats(action.formula)
+    if action.bonus is not None:
+        hit, crit = odds.attack_odds(action.bonus, target.ac)
+        return (hit - crit) * mean + crit * (crit_mean if action.crit_doubles else mean)
+    if action.save:
+        fail = min(max(save_dc - target.save_bonus - 1, 0), 20) / 20
+        return mean * (fail + (1 - fail) / 2) if action.half_on_save else mean * fail
+    return mean
+
+
+def action_order(character, target):
+    """Action indices, best expected damage first."""
+    return sorted(range(len(character.actions)),
+                  key=lambda i: -expected_damage(character.actions[i], target, character.save_dc))
+
+
+class Tally:
+    """Counts and sums from a batch of trials; tallies from chunks add up.
+
+    Rounds are indexed from 1 (index 0 unused) and encounters from 0.
+    """
+
+    def __init__(self, character, plan):
+        self.trials = 0
+        self.kills = np.zeros((plan.encounters, plan.rounds + 1), dtype=np.int64)
+        self.damage = np.zeros(plan.rounds + 1, dtype=np.int64)
+        self.active = np.zeros(plan.rounds + 1, dtype=np.int64)
+        self.out_of_slots = np.zeros(plan.encounters, dtype=np.int64)
+        self.slots_left = np.zeros((plan.encounters, len(character.slots)), dtype=np.int64)
+        self.uses = np.zeros(len(character.actions), dtype=np.int64)
+
+    def add(self, other):
+        self.trials += other.trials
+        for name in ('kills', 'damage', 'active', 'out_of_slots', 'slots_left', 'uses'):
+            getattr(self, name).__iadd__(getattr(other, name))
+        return self
+
+
+def _roll_term(rng, count, sides, keep, keep_highest, n):
+    faces = rng.integers(1, sides + 1, size=(n, count), dtype=np.int32)
+    if keep == count:
+        return faces.sum(axis=1, dtype=np.int64)
+    faces.sort(axis=1)
+    kept = faces[:, count - keep:] if keep_highest else faces[:, :keep]
+    return kept.sum(axis=1, dtype=np.int64)
+
+
+def roll_totals(rng, expr, n, crit=None):
+    """n totals of a parsed expression; rows where `crit` is set double the dice."""
+    total = np.full(n, expr.modifier, dtype=np.int64)
+    for term in expr.dice:
+        part = _roll_term(rng, term.count, term.sides, term.keep, term.keep_highest, n)
+        if crit is not None:
+            crits = np.count_nonzero(crit)
+            if crits:
+                part[crit] = _roll_term(rng, term.count * 2, term.sides, term.keep * 2, term.keep_highest, crits)
+        total += term.sign * part
+    return total
+
+
+def resolve(rng, action, n, target, save_dc):
+    """Damage dealt by n uses of `action`."""
+    if action.bonus is not None:
+        natural = rng.integers(1, 21, size=n)
+        crit = natural == 20
+        hit = crit | ((natural != 1) & (natural + action.bonus >= target.ac))
+        damage = roll_totals(rng, action.damage, n, crit if action.crit_doubles else None)
+        return np.where(hit, damage, 0)
+    damage = roll_totals(rng, action.damage, n)
+    if action.save:
+        saved = rng.integers(1, 21, size=n) + target.save_bonus >= save_dc
+        return np.where(saved, damage // 2 if action.half_on_save else 0, damage)
+    return damage
+
+
+def simulate_chunk(character, target, plan, trials, seed):
+    """Play `trials` independent adventuring days; returns a Tally."""
+    rng = np.random.default_rng(seed)
+    tally = Tally(character, plan)
+    tally.trials = trials
+    order = action_order(character, target)
+    max_slots = np.array(character.slots, dtype=np.int16)
+    slots = np.tile(max_slots, (trials, 1))  # long rest before the day
+
+    for encounter in range(plan.encounters):
+        if encounter in plan.short_rests and character.warlock:
+            slots[:] = max_slots
+        tally.out_of_slots[encounter] = np.count_nonzero(slots.sum(axis=1) == 0)
+        tally.slots_left[encounter] = slots.sum(axis=0)
+
+        hp = np.full(trials, target.hp, dtype=np.int64)
+        fighting = np.ones(trials, dtype=bool)
+        for round_number in range(1, plan.rounds + 1):
+            rows = np.flatnonzero(fighting)
+            if rows.size == 0:
+                break
+            tally.active[round_number] += rows.size
+
+            dealt = np.zeros(rows.size, dtype=np.int64)
+            undecided = np.ones(rows.size, dtype=bool)
+            for index in order:
+                action = character.actions[index]
+                chosen = undecided.copy()
+                if action.slot_level:
+                    chosen &= slots[rows, action.slot_level] > 0
+                n = np.count_nonzero(chosen)
+                if not n:
+                    continue
+                dealt[chosen] = resolve(rng, action, n, target, character.save_dc)
+                if action.slot_level:
+                    slots[rows[chosen], action.slot_level] -= 1
+                tally.uses[index] += n
+                undecided &= ~chosen
+                if not undecided.any():
+                    break
+
+            hp[rows] -= dealt
+            tally.damage[round_number] += dealt.sum()
+            killed = hp[rows] <= 0
+            tally.kills[encounter, round_number] += np.count_nonzero(killed)
+            fighting[rows[killed]] = False
+    return tally
+
+
+def simulate(character, target=Target(), plan=Plan(), trials=100_000, seed=None, jobs=1):
+    """Run `trials` adventuring days in chunks, across `jobs` processes."""
+    chunks = [min(CHUNK_TRIALS, trials - start) for start in range(0, trials, CHUNK_TRIALS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    tally = Tally(character, plan)
+    if jobs > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for part in pool.map(simulate_chunk, repeat(character), repeat(target), repeat(plan), chunks, seeds):
+                tally.add(part)
+    else:
+        for size, chunk_seed in zip(chunks, seeds):
+            tally.add(simulate_chunk(character, target, plan, size, chunk_seed))
+    return tally
+
+
+def curves(character, tally):
+    """Damage-per-round, time-to-kill and slot-exhaustion curves from a Tally."""
+    active = np.maximum(tally.active[1:], 1)
+    kills = tally.kills[:, 1:]
+    killed = kills.sum(axis=1)
+    rounds = np.arange(1, kills.shape[1] + 1)
+    ttk_pmf = kills.sum(axis=0) / (tally.trials * len(kills))
+    return {
+        'character': character.name,
+        'trials': tally.trials,
+        'damage_per_round': (tally.damage[1:] / active).tolist(),
+        'mean_damage_per_round': float(tally.damage.sum() / max(tally.active.sum(), 1)),
+        'time_to_kill': {
+            'pmf': ttk_pmf.tolist(),
+            'cdf': np.cumsum(ttk_pmf).tolist(),
+            'mean_by_encounter': ((kills * rounds).sum(axis=1) / np.maximum(killed, 1)).tolist(),
+            'not_killed_by_encounter': (1 - killed / tally.trials).tolist(),
+        },
+        'slots': {
+            'out_of_slots_by_encounter': (tally.out_of_slots / tally.trials).tolist(),
+            'left_by_encounter': (tally.slots_left[:, 1:] / tally.trials).tolist(),
+        },
+        'action_share': {
+            f'{action.name} ({action.source})': float(uses / max(tally.uses.sum(), 1))
+            for action, uses in zip(character.actions, tally.uses) if uses
+        },
+    }
+
+
+def _report(character, result, target, plan):
+    print(f'{character.name} ({character.summary}) vs AC {target.ac}, {target.hp} HP, '
+          f'save {target.save_bonus:+d}: {result["trials"]:,} days x {plan.encounters} encounters')
+    for name, share in sorted(result['action_share'].items(), key=lambda item: -item[1]):
+        print(f'  {share:6.1%}  {name}')
+    dpr = result['damage_per_round']
+    shown = ' '.join(f'{value:.1f}' for value in dpr[:8])
+    print(f'  damage/round: mean {result["mean_damage_per_round"]:.2f}; rounds 1-8: {shown}')
+    cdf = result['time_to_kill']['cdf']
+    median = next((r + 1 for r, p in enumerate(cdf) if p >= 0.5), None)
+    print(f'  time to kill: median {median or f">{plan.rounds}"} rounds; '
+          + ' '.join(f'<={r}: {cdf[r - 1]:.0%}' for r in (1, 2, 3, 5, 10) if r <= len(cdf)))
+    ttk = result['time_to_kill']
+    has_slots = any(character.slots)
+    for encounter in range(plan.encounters):
+        line = (f'  encounter {encounter + 1}: mean {ttk["mean_by_encounter"][encounter]:.2f} rounds, '
+                f'{ttk["not_killed_by_encounter"][encounter]:.1%} not killed')
+        if has_slots:
+            left = result['slots']['left_by_encounter'][encounter]
+            top = max(i for i, n in enumerate(character.slots) if n)
+            line += (f', {result["slots"]["out_of_slots_by_encounter"][encounter]:.1%} out of slots, '
+                     f'slots left {" ".join(f"{n:.2f}" for n in left[:top])}')
+        print(line)
+
+
+def _select(characters, names):
+    if not names:
+        return characters
+    chosen = []
+    for name in names:
+        key = name.lower()
+        matches = [c for c in characters if c.id == key or c.name.lower().startswith(key)]
+        if not matches:
+            raise SystemExit(f'⚠️ No character matches {name!r} ({", ".join(c.id for c in characters)})')
+        chosen.extend(matches)
+    return chosen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.combat',
+                                     description='Monte Carlo combat curves for the demo characters.')
+    parser.add_argument('names', nargs='*', help='character ids or name prefixes (default: all)')
+    parser.add_argument('--trials', type=int, default=100_000, help='adventuring days (default: %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='worker processes (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--hp', type=int, default=Target.hp, help='target HP (default: %(default)s)')
+    parser.add_argument('--ac', type=int, default=Target.ac, help='target AC (default: %(default)s)')
+    parser.add_argument('--save', type=int, default=Target.save_bonus, help='target save bonus (default: %(default)s)')
+    parser.add_argument('--encounters', type=int, default=Plan.encounters, help='encounters per day (default: %(default)s)')
+    parser.add_argument('--rounds', type=int, default=Plan.rounds, help='round limit per encounter (default: %(default)s)')
+    parser.add_argument('--short-rests', default=','.join(str(n) for n in sorted(Plan.short_rests)),
+                        help='short rest after these encounters, comma separated (default: %(default)s)')
+    parser.add_argument('--json', action='store_true', help='print the curves as JSON')
+    parser.add_argument('--page', default=rules.PAGE_PATH, help='page to read (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    with open(args.page, 'r') as f:
+        characters = _select(load_characters(f.read()), args.names)
+    target = Target(hp=args.hp, ac=args.ac, save_bonus=args.save)
+    plan = Plan(encounters=args.encounters, rounds=args.rounds,
+                short_rests=frozenset(int(n) for n in args.short_rests.split(',') if n.strip()))
+
+    results = []
+    for character in characters:
+        result = curves(character, simulate(character, target, plan, args.trials, args.seed, args.jobs))
+        results.append(result)
+        if not args.json:
+            _report(character, result, target, plan)
+            print()
+    if args.json:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,245 @@
+"""
+Local dev server with a spell query API
+
+Serves the repo root through staticserver.py and answers spell queries
+from an in-memory index of spells-compiled.json, so the picker can filter on
+the server instead of downloading every spell:
+
+    GET /api/spells?class=&level=&school=&q=&offset=&limit=&fields=
+        {"count": total matches, "offset": .., "limit": .., "results": [..]}
+        Matches in page order; q matches a name or school substring, as
+        the picker's own search does. An offset past the end gives no
+        results (count is still the number of matches). results carry the
+        summary fields (index, name, level, school, classes) unless fields=
+        names others.
+    GET /api/spells/<index>
+        the full compiled record, as the level shards hold it
+
+The index is built once per spells-compiled.json (rebuilt when the file
+changes): one id set per class, level and school, plus the lower-cased names.
+Detail bodies are serialized up front and query bodies are memoized, so a
+repeated request costs a dictionary lookup. Every response carries a strong
+ETag derived from the data file's hash and the canonical query; a matching
+If-None-Match gets a 304 without touching the index.
+
+    python3 -m pagebuild.devserver              serve on port 8000
+    python3 -m pagebuild.devserver --port 8080
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .spells import COMPILED_NAME, REPO_ROOT, SUMMARY_FIELDS
+from .staticserver import StaticRequestHandler, make_handler
+from .staticserver import serve as serve_static
+
+COMPILED_PATH = os.path.join(REPO_ROOT, COMPILED_NAME)
+API_PREFIX = '/api/spells'
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+QUERY_CACHE_SIZE = 1024
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class QueryError(ValueError):
+    """A malformed query parameter (answered with 400)."""
+
+
+class SpellIndex:
+    """Facet sets and serialized records over one compiled spell list."""
+
+    def __init__(self, spells, version):
+        self.spells = spells
+        self.version = version
+        self.fields = frozenset(field for spell in spells for field in spell)
+        self.names = [spell['name'].lower() for spell in spells]
+        self.classes, self.levels, self.schools = {}, {}, {}
+        self.details = {}
+        for i, spell in enumerate(spells):
+            for class_name in spell.get('classes') or ():
+                self.classes.setdefault(class_name, set()).add(i)
+            self.levels.setdefault(spell['level'], set()).add(i)
+            self.schools.setdefault(spell['school']['name'].lower(), set()).add(i)
+            body = _dumps(spell)
+            self.details[spell['index']] = (body, self.etag(spell['index']))
+        self.query = functools.lru_cache(maxsize=QUERY_CACHE_SIZE)(self._query)
+
+    @classmethod
+    def load(cls, path=COMPILED_PATH):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        return cls(json.loads(raw), hashlib.sha256(raw).hexdigest()[:16])
+
+    def etag(self, key):
+        digest = hashlib.sha256(f'{self.version}\0{key}'.encode('utf-8')).hexdigest()[:24]
+        return f'"{digest}"'
+
+    def match(self, class_name=None, level=None, school=None, q=None):
+        """Sorted ids of the spells passing every filter."""
+        ids = None
+        for facet, key in ((self.classes, class_name), (self.levels, level), (self.schools, school)):
+            if key is None:
+                continue
+            found = facet.get(key, set())
+            ids = found if ids is None else ids & found
+        candidates = range(len(self.spells)) if ids is None else sorted(ids)
+        if not q:
+            return list(candidates)
+        schools = {i for name, members in self.schools.items() if q in name for i in members}
+        return [i for i in candidates if q in self.names[i] or i in schools]
+
+    def _query(self, key):
+        class_name, level, school, q, offset, limit, fields = key
+        ids = self.match(class_name, level, school, q)
+        results = [{field: self.spells[i][field] for field in fields if field in self.spells[i]}
+                   for i in ids[offset:offset + limit]]
+        body = _dumps({'count': len(ids), 'offset': offset, 'limit': limit, 'results': results})
+        return body, self.etag(repr(key))
+
+    def parse_query(self, query_string):
+        """Canonical query key from a query string; raises QueryError."""
+        params = {name: values[-1] for name, values in parse_qs(query_string).items()}
+
+        def number(name, default, low, high):
+            value = params.get(name)
+            if value in (None, ''):
+                return default
+            try:
+                number = int(value)
+            except ValueError:
+                raise QueryError(f'{name} must be an integer') from None
+            if high is None and number < low:
+                raise QueryError(f'{name} must be at least {low}')
+            if high is not None and not low <= number <= high:
+                raise QueryError(f'{name} must be between {low} and {high}')
+            return number
+
+        fields = tuple(SUMMARY_FIELDS)
+        if params.get('fields'):
+            fields = tuple(dict.fromkeys(field.strip() for field in params['fields'].split(',') if field.strip()))
+            unknown = [field for field in fields if field not in self.fields]
+            if unknown:
+                raise QueryError(f'unknown fields: {", ".join(unknown)}')
+
+        def text(name):
+            value = (params.get(name) or '').strip().lower()
+            return value or None
+
+        class_name, school, q = text('class'), text('school'), text('q')
+        if class_name == 'all':
+            class_name = None
+        level = None if params.get('level') == 'all' else number('level', None, 0, 9)
+        # Paging past the end is an empty page, and every such offset shares
+        # one cache key
+        offset = min(number('offset', 0, 0, None), len(self.spells))
+        return (class_name, level, school, q, offset, number('limit', DEFAULT_LIMIT, 0, MAX_LIMIT), fields)
+
+
+class IndexHolder:
+    """The current SpellIndex, reloaded when the compiled file changes."""
+
+    def __init__(self, path=COMPILED_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._index = None
+
+    def get(self):
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    self._index = SpellIndex.load(self.path)
+                    self._stamp = stamp
+        return self._index
+
+
+class DevRequestHandler(StaticRequestHandler):
+    """Static files from the repo root plus the /api/spells routes."""
+
+    holder = None  # IndexHolder, set by serve()
+
+    def do_GET(self):
+        if not self._is_api():
+            return super().do_GET()
+        self._api(send_body=True)
+
+    def do_HEAD(self):
+        if not self._is_api():
+            return super().do_HEAD()
+        self._api(send_body=False)
+
+    def _is_api(self):
+        path = urlsplit(self.path).path
+        return path == API_PREFIX or path.startswith(API_PREFIX + '/')
+
+    def _api(self, send_body):
+        url = urlsplit(self.path)
+        try:
+            index = self.holder.get()
+        except (OSError, ValueError) as error:
+            return self._send_json(503, _dumps({'error': f'spell data unavailable: {error}'}), None, send_body)
+
+        if url.path.rstrip('/') == API_PREFIX:
+            try:
+                key = index.parse_query(url.query)
+            except QueryError as error:
+                return self._send_json(400, _dumps({'error': str(error)}), None, send_body)
+            body, etag = index.query(key)
+        else:
+            found = index.details.get(unquote(url.path[len(API_PREFIX) + 1:]))
+            if found is None:
+                return self._send_json(404, _dumps({'error': 'no such spell'}), None, send_body)
+            body, etag = found
+
+        if etag in (tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self._send_json(200, body, etag, send_body)
+
+    def _send_json(self, status, body, etag, send_body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')  # revalidate; the ETag makes that a 304
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def serve(port=8000, bind='', directory=REPO_ROOT, compiled_path=COMPILED_PATH):
+    holder = IndexHolder(compiled_path)
+    holder.get()  # build the index before the first request
+    handler = make_handler(DevRequestHandler, directory, holder=holder)
+    return serve_static(handler, port, bind, note=f' (spell API at {API_PREFIX})')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.devserver',
+                                     description='Serve the repo root with the /api/spells query API.')
+    parser.add_argument('--port', type=int, default=8000, help='port (default: %(default)s)')
+    parser.add_argument('--bind', default='', help='address to bind (default: all interfaces)')
+    parser.add_argument('--directory', default=REPO_ROOT, help='directory to serve (default: repo root)')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(COMPILED_PATH):
+        print(f'⚠️ {COMPILED_NAME} is missing (build it with: python3 -m pagebuild.spells)')
+        return 1
+    return serve(args.port, args.bind, args.directory)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+"""
+Dice expressions: Python reference implementation
+
+Mirrors the dice engine in src/utils/dice.js and the page (compileDice):
+sums of dice terms and flat modifiers such as `1d8+3`, `2d6+1d4+3`, `d20`,
+`4d6kh3` (keep highest 3) and `2d20kl1` (keep lowest 1), rolled with
+optional advantage/disadvantage (a lone d20 is rolled twice, keeping the
+higher/lower) and crit doubling (every dice term's count is doubled, the
+modifier is not).
+
+Besides a sampler it computes exact distributions, which is what the JS
+engine is checked against:
+
+    python3 -m pagebuild.dice '2d6+1d4+3'
+    python3 -m pagebuild.dice 1d20 --advantage
+    node scripts/roll-dice.mjs 1d20 100000 --advantage | python3 -m pagebuild.dice 1d20 --advantage --compare -
+
+The last form reads a JSON list of totals rolled by the JS engine and
+reports how far their histogram is from the exact distribution
+(test_dice.py runs it for src/utils/dice.js and the page's copy).
+"""
+
+import argparse
+import itertools
+import json
+import random
+import re
+import sys
+from fractions import Fraction
+from typing import NamedTuple
+
+_TERM = re.compile(r'([+-])(?:(\d*)d(\d+)(?:(kh|kl)(\d+))?|(\d+))')
+
+# Keep-highest/lowest terms are enumerated outright; refuse anything bigger.
+MAX_ENUMERATION = 2_000_000
+
+
+class DiceTerm(NamedTuple):
+    sign: int
+    count: int
+    sides: int
+    keep: int
+    keep_highest: bool = True
+
+
+class DiceExpression(NamedTuple):
+    dice: tuple
+    modifier: int
+
+
+def normalize(expression):
+    return re.sub(r'\s+', '', str(expression)).lower()
+
+
+def parse(expression):
+    """Parse a dice expression; raises ValueError like the JS parser throws."""
+    text = normalize(expression)
+    if not text.startswith(('+', '-')):
+        text = '+' + text
+
+    dice = []
+    modifier = 0
+    pos = 0
+    while pos < len(text):
+        match = _TERM.match(text, pos)
+        if not match:
+            raise ValueError(f'Invalid dice expression: {expression}')
+        pos = match.end()
+        sign = -1 if match.group(1) == '-' else 1
+        if match.group(6) is not None:
+            modifier += sign * int(match.group(6))
+            continue
+        count = int(match.group(2)) if match.group(2) else 1
+        sides = int(match.group(3))
+        if sides < 1:
+            raise ValueError(f'Invalid dice expression: {expression}')
+        keep = min(int(match.group(5)), count) if match.group(4) else count
+        dice.append(DiceTerm(sign, count, sides, keep, match.group(4) != 'kl'))
+    return DiceExpression(tuple(dice), modifier)
+
+
+def _d20_term(expr):
+    """Index of the first lone d20 (the one advantage applies to), or -1."""
+    return next((i for i, t in enumerate(expr.dice) if t.sides == 20 and t.count == 1), -1)
+
+
+def _effective_terms(expr, advantage=False, disadvantage=False, crit=False):
+    """The terms actually rolled once the options are applied."""
+    adv = advantage and not disadvantage
+    dis = disadvantage and not advantage
+    d20 = _d20_term(expr)
+    factor = 2 if crit else 1
+    terms = []
+    for i, term in enumerate(expr.dice):
+        if i == d20 and (adv or dis):
+            terms.append(DiceTerm(term.sign, 2, 20, 1, adv))
+        else:
+            terms.append(term._replace(count=term.count * factor, keep=term.keep * factor))
+    return terms
+
+
+def roll(expression, rng=random, advantage=False, disadvantage=False, crit=False):
+    """Roll once; returns the total."""
+    expr = parse(expression) if isinstance(expression, str) else expression
+    total = expr.modifier
+    for term in _effective_terms(expr, advantage, disadvantage, crit):
+        values = [rng.randint(1, term.sides) for _ in range(term.count)]
+        values.sort(reverse=term.keep_highest)
+        total += term.sign * sum(values[:term.keep])
+    return total
+
+
+def _convolve(a, b):
+    out = {}
+    for x, px in a.items():
+        for y, py in b.items():
+            out[x + y] = out.get(x + y, 0) + px * py
+    return out
+
+
+def _sum_pmf(count, sides):
+    pmf = {0: Fraction(1)}
+    die = {face: Fraction(1, sides) for face in range(1, sides + 1)}
+    for _ in range(count):
+        pmf = _convolve(pmf, die)
+    return pmf
+
+
+def _keep_pmf(term):
+    outcomes = term.sides ** term.count
+    if outcomes > MAX_ENUMERATION:
+        raise ValueError(f'{term.count}d{term.sides} keep {term.keep} is too large to enumerate')
+    counts = {}
+    for faces in itertools.product(range(1, term.sides + 1), repeat=term.count):
+        kept = sorted(faces, reverse=term.keep_highest)[:term.keep]
+        total = sum(kept)
+        counts[total] = counts.get(total, 0) + 1
+    return {total: Fraction(n, outcomes) for total, n in counts.items()}
+
+
+def distribution(expression, advantage=False, disadvantage=False, crit=False):
+    """Exact {total: probability} (as Fractions) for an expression."""
+    expr = parse(expression) if isinstance(expression, str) else expression
+    pmf = {expr.modifier: Fraction(1)}
+    for term in _effective_terms(expr, advantage, disadvantage, crit):
+        part = _sum_pmf(term.count, term.sides) if term.keep == term.count else _keep_pmf(term)
+        if term.sign < 0:
+            part = {-total: p for total, p in part.items()}
+        pmf = _convolve(pmf, part)
+    return dict(sorted(pmf.items()))
+
+
+def mean(pmf):
+    return sum(total * p for total, p in pmf.items())
+
+
+def total_variation(pmf, totals):
+    """Total variation distance between a sample of totals and the exact pmf."""
+    counts = {}
+    for total in totals:
+        counts[total] = counts.get(total, 0) + 1
+    n = len(totals)
+    support = set(pmf) | set(counts)
+    return sum(abs(counts.get(t, 0) / n - float(pmf.get(t, 0))) for t in support) / 2
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.dice',
+                                     description='Exact distribution of a dice expression.')
+    parser.add_argument('expression')
+    parser.add_argument('--advantage', action='store_true')
+    parser.add_argument('--disadvantage', action='store_true')
+    parser.add_argument('--crit', action='store_true')
+    parser.add_argument('--samples', type=int, default=0,
+                        help='also roll this many times with the Python sampler and compare')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='JSON list of totals rolled elsewhere (- for stdin) to compare')
+    args = parser.parse_args(argv)
+
+    options = dict(advantage=args.advantage, disadvantage=args.disadvantage, crit=args.crit)
+    pmf = distribution(args.expression, **options)
+    print(f'{normalize(args.expression)}: min {min(pmf)}, max {max(pmf)}, mean {float(mean(pmf)):.4f}')
+    for total, p in pmf.items():
+        print(f'{total:>5}  {float(p):8.5f}')
+
+    samples = []
+    if args.samples:
+        expr = parse(args.expression)
+        samples.append(('python', [roll(expr, **options) for _ in range(args.samples)]))
+    if args.compare:
+        if args.compare == '-':
+            samples.append(('input', json.load(sys.stdin)))
+        else:
+            with open(args.compare) as f:
+                samples.append((args.compare, json.load(f)))
+    for label, totals in samples:
+        print(f'{label}: {len(totals):,} rolls, sample mean {sum(totals) / len(totals):.4f}, '
+              f'total variation {total_variation(pmf, totals):.5f}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+"""
+Shared in-memory copy of the page
+
+Every patch script opens test-enhanced-features.html by name (some with the
+old absolute /home/user/dabidoe/ path). While a patch runs, Document.redirect()
+swaps the builtin open() so that any open of the page reads from and writes
+to this buffer instead of the disk. Other files (spells-srd.json, ...) still
+go to the real filesystem.
+"""
+
+import builtins
+import io
+import os
+from contextlib import contextmanager
+
+PAGE_NAME = 'test-enhanced-features.html'
+
+
+class _BufferFile(io.StringIO):
+    """File object handed to a patch; commits its contents back on close."""
+
+    def __init__(self, document, mode):
+        writing = 'w' in mode or 'a' in mode
+        initial = document.text if ('a' in mode or not writing) else ''
+        super().__init__(initial)
+        if 'a' in mode:
+            self.seek(0, io.SEEK_END)
+        self._document = document
+        self._writing = writing
+        if not writing:
+            document.bytes_read += len(initial.encode('utf-8'))
+
+    def close(self):
+        if self._writing and not self.closed:
+            self._document.commit(self.getvalue())
+        super().close()
+
+
+class Document:
+    """The page being built, plus per-patch I/O accounting."""
+
+    def __init__(self, path, text):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.text = text
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(path, f.read())
+
+    def save(self, path=None):
+        with open(path or self.path, 'w', encoding='utf-8') as f:
+            f.write(self.text)
+
+    def commit(self, text):
+        self.bytes_written += len(text.encode('utf-8'))
+        self.text = text
+
+    def reset_counters(self):
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def matches(self, file):
+        """True if a path passed to open() refers to this page."""
+        if isinstance(file, int):
+            return False
+        return os.path.basename(os.fspath(file)) in (self.name, PAGE_NAME)
+
+    @contextmanager
+    def redirect(self):
+        """Route open() calls for the page to this buffer."""
+        real_open = builtins.open
+
+        def patched_open(file, mode='r', *args, **kwargs):
+            if self.matches(file) and 'b' not in mode:
+                return _BufferFile(self, mode)
+            return real_open(file, mode, *args, **kwargs)
+
+        builtins.open = patched_open
+        try:
+            yield self
+        finally:
+            builtins.open = real_open
@@ -0,0 +1,219 @@
+"""
+Embedded fallback spells
+
+When the page is opened from disk (no server, so no spells-index.json),
+fetchSpellsFromAPI falls back to a spell list embedded in the page. That list
+is chosen here by rule instead of by hand:
+
+    coverage    every (class, spell level) cell up to MAX_LEVEL gets PER_CELL
+                spells where the corpus has them; one spell fills a cell for
+                each of its classes, so the greedy pick prefers spells that
+                fill the most cells still short, then spells with damage or
+                healing, then the smaller record
+    projection  only what the picker and spell modal read: the summary
+                fields, the first paragraph of the description (cut at a
+                sentence within DESCRIPTION_CHARS), the casting details and
+                the attack/healing/scaling part of the mechanics; empty
+                fields are left out, except a null mechanics.attack (no
+                attack roll) next to healing or scaling
+    budget      spells are added while the emitted block stays within
+                BUDGET_BYTES; a pick that does not fit is skipped
+
+Records come from spells-compiled.json, already in the allSpellsFromAPI
+shape, and are emitted as one JSON string that is only parsed when the
+fallback is actually used:
+
+    embeddedFallbackSpellsJSON   JSON.parse() it to get allSpellsFromAPI
+
+    python3 -m pagebuild.fallback                  print the generated block
+    python3 -m pagebuild.fallback --update         rewrite the block in the page
+    python3 -m pagebuild.fallback --budget 16000   print a smaller selection
+"""
+
+import argparse
+import json
+import re
+
+from . import rules
+from .manifest import ManifestError, follow_edit
+from .odds import COMPILED_SPELLS_PATH, load_compiled_spells
+
+BUDGET_BYTES = 24_000
+PER_CELL = 3
+MAX_LEVEL = 5
+DESCRIPTION_CHARS = 320
+
+SUMMARY_FIELDS = ('index', 'name', 'level', 'school', 'classes')
+DETAIL_FIELDS = ('casting_time', 'range', 'components', 'duration', 'concentration', 'damage', 'dc', 'attack_roll')
+MECHANICS_FIELDS = ('attack', 'healing', 'scaling')
+
+GENERATED_BEGIN = '    // BEGIN fallback spells generated by pagebuild/fallback.py - regenerate, don\'t edit\n'
+GENERATED_END = '    // END fallback spells\n'
+
+_SENTENCE_END = re.compile(r'[.!?](?=\s|$)')
+
+
+def shorten(description, limit=DESCRIPTION_CHARS):
+    """First paragraph, cut after the last sentence that ends within `limit`."""
+    paragraph = description.strip().split('\n\n', 1)[0].strip()
+    if len(paragraph) <= limit:
+        return paragraph
+    ends = [m.end() for m in _SENTENCE_END.finditer(paragraph, 0, limit)]
+    if ends:
+        return paragraph[:ends[-1]]
+    return paragraph[:limit - 1].rstrip() + '…'
+
+
+def project(spell, description_chars=DESCRIPTION_CHARS):
+    """The fields of a compiled spell the offline picker reads."""
+    record = {field: spell[field] for field in SUMMARY_FIELDS}
+    record['desc'] = [shorten(' '.join(spell.get('desc') or ()), description_chars)]
+    for field in DETAIL_FIELDS:
+        if spell.get(field):
+            record[field] = spell[field]
+    mechanics = {field: spell['mechanics'][field] for field in MECHANICS_FIELDS
+                 if (spell.get('mechanics') or {}).get(field)}
+    if mechanics:
+        # The page takes any mechanics.attack but null as an attack roll
+        mechanics.setdefault('attack', None)
+        record['mechanics'] = mechanics
+    return record
+
+
+def _json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def _js_string(text):
+    return "'" + text.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def _usefulness(spell):
+    mechanics = spell.get('mechanics') or {}
+    return 2 if spell.get('damage') or mechanics.get('healing') else 1 if spell.get('dc') or spell.get('attack_roll') else 0
+
+
+def select(spells, budget=BUDGET_BYTES, per_cell=PER_CELL, max_level=MAX_LEVEL,
+           description_chars=DESCRIPTION_CHARS, overhead=0):
+    """(records in corpus order, unfilled cells): the fallback selection.
+
+    `overhead` is the size of everything in the block but the records.
+    """
+    candidates = [(i, spell, project(spell, description_chars)) for i, spell in enumerate(spells)
+                  if spell['level'] <= max_level]
+    available = {}
+    for _, spell, _ in candidates:
+        for class_name in spell['classes']:
+            cell = (class_name, spell['level'])
+            available[cell] = available.get(cell, 0) + 1
+    need = {cell: min(count, per_cell) for cell, count in available.items()}
+
+    # JS string escaping adds a little over the raw JSON; measure the real text
+    # (each record plus its comma)
+    cost = {i: len(_js_string(_json(record)).encode('utf-8')) - 1 for i, _, record in candidates}
+    used = overhead + 2  # the array brackets (the quotes are in the overhead)
+    chosen = {}
+    remaining = list(candidates)
+    while remaining and any(need.values()):
+        def score(candidate):
+            i, spell, _ = candidate
+            helps = sum(1 for c in spell['classes'] if need.get((c, spell['level'])))
+            return helps, _usefulness(spell), -cost[i], -i
+
+        best = max(remaining, key=score)
+        remaining.remove(best)
+        i, spell, record = best
+        if score(best)[0] == 0:
+            break
+        if used + cost[i] > budget:
+            continue
+        chosen[i] = record
+        used += cost[i]
+        for class_name in spell['classes']:
+            cell = (class_name, spell['level'])
+            if need.get(cell):
+                need[cell] -= 1
+
+    unfilled = sorted(cell for cell, count in need.items() if count)
+    return [chosen[i] for i in sorted(chosen)], unfilled
+
+
+def build(compiled_spells, **options):
+    """(generated block, records, unfilled cells); options go to select()."""
+    comment = ('    // Offline spell list in the allSpellsFromAPI shape, chosen for class/level coverage\n'
+               '    // within a byte budget; parsed only when spells-index.json cannot be fetched\n')
+    declaration = '    const embeddedFallbackSpellsJSON = {};\n'
+    overhead = len((GENERATED_BEGIN + comment + declaration.format('') + GENERATED_END).encode('utf-8'))
+    records, unfilled = select(compiled_spells, overhead=overhead, **options)
+    block = GENERATED_BEGIN + comment + declaration.format(_js_string(_json(records))) + GENERATED_END
+    return block, records, unfilled
+
+
+def render_js(content=None, compiled_spells=None, **options):
+    """The generated block, markers included; options go to select()."""
+    if compiled_spells is None:
+        compiled_spells = load_compiled_spells()
+    return build(compiled_spells, **options)[0]
+
+
+def replace_generated(content, compiled_spells=None, **options):
+    """Regenerate the block in `content`; returns (content, found)."""
+    start = content.find(GENERATED_BEGIN)
+    end = content.find(GENERATED_END, start)
+    if start == -1 or end == -1:
+        return content, False
+    block = render_js(content, compiled_spells, **options)
+    return content[:start] + block + content[end + len(GENERATED_END):], True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.fallback',
+                                     description='Generate the embedded offline spell list.')
+    parser.add_argument('--budget', type=int, default=BUDGET_BYTES, help='block size limit in bytes (default: %(default)s)')
+    parser.add_argument('--per-cell', type=int, default=PER_CELL, help='spells per class and level (default: %(default)s)')
+    parser.add_argument('--max-level', type=int, default=MAX_LEVEL, help='highest spell level (default: %(default)s)')
+    parser.add_argument('--description-chars', type=int, default=DESCRIPTION_CHARS,
+                        help='description length limit (default: %(default)s)')
+    parser.add_argument('--source', default=COMPILED_SPELLS_PATH, help='compiled spells (default: %(default)s)')
+    parser.add_argument('--update', action='store_true', help='rewrite the generated block in the page')
+    parser.add_argument('--page', default=rules.PAGE_PATH, help='page to read/update (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    spells = load_compiled_spells(args.source)
+    if not spells:
+        print(f'⚠️ {args.source} is missing (build it with: python3 -m pagebuild.spells)')
+        return 1
+    options = {'budget': args.budget, 'per_cell': args.per_cell, 'max_level': args.max_level,
+               'description_chars': args.description_chars}
+    block, records, unfilled = build(spells, **options)
+    if unfilled:
+        shown = ', '.join(f'{c} {lvl}' for c, lvl in unfilled[:8])
+        print(f'⚠️ Budget leaves {len(unfilled)} class/level cells short: {shown}'
+              + (', ...' if len(unfilled) > 8 else ''))
+
+    if not args.update:
+        print(block, end='')
+        return 0
+
+    with open(args.page, 'r') as f:
+        content = f.read()
+    updated, found = replace_generated(content, spells, **options)
+    if not found:
+        print('⚠️ Could not find the generated fallback block (apply add-embedded-fallback.py first)')
+        return 1
+    if updated != content:
+        try:
+            follow_edit(args.page, content, updated)
+        except ManifestError as exc:
+            print(f'❌ {exc}')
+            return 1
+        with open(args.page, 'w') as f:
+            f.write(updated)
+        print(f'✅ Updated fallback spells ({len(records)} spells, {len(block.encode("utf-8")):,} bytes)')
+    else:
+        print('✅ Fallback spells already up to date')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
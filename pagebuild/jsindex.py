@@ -0,0 +1,558 @@
+"""
+Tokenizer-aware declaration index for the page's inline <script> block
+
+Patches used to find the end of `abilityDatabase` or `autoPopulateSpells` by
+walking characters and counting braces, which is O(n) per lookup and gets
+confused by braces inside strings, template literals (`${...}`), comments and
+regexes. script_index() tokenizes the script once and maps every top-level
+function/const/let/var declaration to its exact span in the page text:
+
+    index = script_index(content)
+    span = index['autoPopulateSpells']
+    content[span.start:span.end]     # 'function autoPopulateSpells(...) {...}'
+
+Offsets are str offsets into the whole page (what patches slice with), not
+offsets into the script. Indexes are cached by content hash, so every patch
+in a runner pass that sees the same text shares one tokenization. When the
+text is an edit of the last indexed version, only the declarations the edit
+touches are re-tokenized and the spans after them are shifted; the full
+token list (ScriptIndex.tokens) is built lazily, on first use.
+
+Brackets that do not balance (typically a `/.../` regex read as division,
+leaving a stray `}`) raise TokenizeError rather than truncating a span and
+dropping the declarations after it.
+"""
+
+import ast
+import bisect
+import hashlib
+import re
+from collections import OrderedDict
+from typing import NamedTuple
+
+from .manifest import changed_region
+
+SCRIPT_OPEN = '<script>'
+SCRIPT_CLOSE = '</script>'
+
+IDENT = 'ident'
+NUMBER = 'number'
+STRING = 'string'
+TEMPLATE = 'template'
+REGEX = 'regex'
+PUNCT = 'punct'
+
+DECLARATION_KEYWORDS = ('function', 'const', 'let', 'var', 'class')
+
+# After these a `/` starts a regex literal rather than a division.
+_REGEX_AFTER_KEYWORDS = frozenset((
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+))
+_STATEMENT_KEYWORDS = frozenset(DECLARATION_KEYWORDS + (
+    'async', 'if', 'for', 'while', 'do', 'switch', 'try', 'return', 'throw',
+))
+_PUNCT3 = frozenset(('===', '!==', '**=', '...', '<<=', '>>=', '>>>', '&&=', '||=', '??='))
+_PUNCT2 = frozenset((
+    '=>', '==', '!=', '<=', '>=', '&&', '||', '??', '?.', '++', '--', '+=',
+    '-=', '*=', '/=', '%=', '&=', '|=', '^=', '<<', '>>', '**',
+))
+_OPENERS = {'(': ')', '[': ']', '{': '}'}
+_CLOSERS = frozenset(_OPENERS.values())
+# `(` after these opens a condition: a `/` after its `)` starts a regex
+_CONDITION_KEYWORDS = frozenset(('if', 'while', 'for', 'with'))
+# `{` after these opens a block (not an object literal): same for its `}`
+_BLOCK_AFTER = frozenset((')', '=>', ';', '{', '}', 'else', 'try', 'finally', 'do'))
+
+
+class Token(NamedTuple):
+    kind: str
+    start: int
+    end: int
+    value: str
+
+
+class Span(NamedTuple):
+    """A top-level declaration; `end` is exclusive."""
+
+    name: str
+    kind: str
+    start: int
+    end: int
+    line: int
+
+    def text(self, content):
+        return content[self.start:self.end]
+
+
+class TokenizeError(ValueError):
+    pass
+
+
+def _is_ident_start(ch):
+    return ch.isalpha() or ch in '_$'
+
+
+def _is_ident_part(ch):
+    return ch.isalnum() or ch in '_$'
+
+
+def _skip_string(text, pos, quote):
+    """Return the offset just past the string starting at `pos`."""
+    i = pos + 1
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '\\':
+            i += 2
+        elif ch == quote:
+            return i + 1
+        elif ch == '\n':
+            raise TokenizeError(f'Unterminated string at offset {pos}')
+        else:
+            i += 1
+    raise TokenizeError(f'Unterminated string at offset {pos}')
+
+
+def _skip_template(text, pos, end):
+    """Return the offset just past the template literal starting at `pos`.
+
+    `${...}` substitutions are tokenized recursively so braces, strings and
+    nested templates inside them are handled.
+    """
+    i = pos + 1
+    while i < end:
+        ch = text[i]
+        if ch == '\\':
+            i += 2
+        elif ch == '`':
+            return i + 1
+        elif ch == '$' and text.startswith('${', i):
+            depth = 1
+            for tok in _tokens(text, i + 2, end):
+                if tok.value == '{':
+                    depth += 1
+                elif tok.value == '}':
+                    depth -= 1
+                    if depth == 0:
+                        i = tok.end
+                        break
+            else:
+                raise TokenizeError(f'Unterminated template substitution at offset {i}')
+        else:
+            i += 1
+    raise TokenizeError(f'Unterminated template literal at offset {pos}')
+
+
+def _skip_regex(text, pos, end):
+    i = pos + 1
+    in_class = False
+    while i < end:
+        ch = text[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '\n':
+            raise TokenizeError(f'Unterminated regex at offset {pos}')
+        if in_class:
+            in_class = ch != ']'
+        elif ch == '[':
+            in_class = True
+        elif ch == '/':
+            i += 1
+            while i < end and _is_ident_part(text[i]):
+                i += 1
+            return i
+        i += 1
+    raise TokenizeError(f'Unterminated regex at offset {pos}')
+
+
+def _regex_allowed(prev, closed_statement):
+    if prev is None:
+        return True
+    if prev.kind == IDENT:
+        return prev.value in _REGEX_AFTER_KEYWORDS
+    if prev.kind == PUNCT:
+        if prev.value in (')', '}'):
+            return closed_statement  # after `if (...)` or a block, not after an expression
+        return prev.value != ']'
+    return False
+
+
+def _tokens(text, pos, end):
+    """Yield tokens of text[pos:end]; comments and whitespace are dropped."""
+    prev = None
+    # For each open bracket: does its closer end a condition/block?
+    statement_brackets = []
+    closed_statement = False
+    i = pos
+    while i < end:
+        ch = text[i]
+        if ch.isspace():
+            i += 1
+            continue
+        if ch == '/' and text.startswith('//', i):
+            nl = text.find('\n', i)
+            i = end if nl == -1 or nl > end else nl
+            continue
+        if ch == '/' and text.startswith('/*', i):
+            close = text.find('*/', i + 2)
+            if close == -1:
+                raise TokenizeError(f'Unterminated comment at offset {i}')
+            i = close + 2
+            continue
+
+        start = i
+        if _is_ident_start(ch):
+            i += 1
+            while i < end and _is_ident_part(text[i]):
+                i += 1
+            kind = IDENT
+        elif ch.isdigit() or (ch == '.' and i + 1 < end and text[i + 1].isdigit()):
+            i += 1
+            while i < end and (_is_ident_part(text[i]) or text[i] == '.'):
+                i += 1
+            kind = NUMBER
+        elif ch in '"\'':
+            i = _skip_string(text, i, ch)
+            kind = STRING
+        elif ch == '`':
+            i = _skip_template(text, i, end)
+            kind = TEMPLATE
+        elif ch == '/' and _regex_allowed(prev, closed_statement):
+            i = _skip_regex(text, i, end)
+            kind = REGEX
+        else:
+            kind = PUNCT
+            if text[i:i + 4] == '>>>=':
+                i += 4
+            elif text[i:i + 3] in _PUNCT3:
+                i += 3
+            elif text[i:i + 2] in _PUNCT2:
+                i += 2
+            else:
+                i += 1
+        token = Token(kind, start, i, text[start:i])
+        closed_statement = False
+        if kind == PUNCT:
+            if token.value == '(':
+                statement_brackets.append(prev is not None and prev.value in _CONDITION_KEYWORDS)
+            elif token.value == '{':
+                statement_brackets.append(prev is None or prev.value in _BLOCK_AFTER)
+            elif token.value == '[':
+                statement_brackets.append(False)
+            elif token.value in _CLOSERS:
+                closed_statement = statement_brackets.pop() if statement_brackets else True
+        prev = token
+        yield prev
+
+
+def tokenize(text, start=0, end=None):
+    """Tokenize JavaScript in text[start:end]; offsets are into `text`."""
+    return list(_tokens(text, start, len(text) if end is None else end))
+
+
+def find_script(content):
+    """Return (start, end) of the inline script body, excluding the tags."""
+    open_at = content.find(SCRIPT_OPEN)
+    if open_at == -1:
+        raise ValueError(f'No {SCRIPT_OPEN} block found')
+    start = open_at + len(SCRIPT_OPEN)
+    end = content.find(SCRIPT_CLOSE, start)
+    if end == -1:
+        raise ValueError(f'No {SCRIPT_CLOSE} after offset {start}')
+    return start, end
+
+
+def _line_starts(content):
+    return [0] + [m.end() for m in re.finditer('\n', content)]
+
+
+class ScriptIndex:
+    """Top-level declarations of the inline script, by name."""
+
+    def __init__(self, content, digest=None):
+        self.digest = digest or content_hash(content)
+        self.script_start, self.script_end = find_script(content)
+        self._content = content
+        self._line_starts = _line_starts(content)
+        self._tokens = tokenize(content, self.script_start, self.script_end)
+        self.spans = self._collect(self._tokens)
+        self._index_names()
+
+    @property
+    def tokens(self):
+        """Every token of the script (tokenized on first use after an edit)."""
+        if self._tokens is None:
+            self._tokens = tokenize(self._content, self.script_start, self.script_end)
+        return self._tokens
+
+    def _index_names(self):
+        self._by_name = {}
+        for span in self.spans:
+            self._by_name.setdefault(span.name, []).append(span)
+
+    def _line(self, offset):
+        return bisect.bisect_right(self._line_starts, offset)
+
+    def edited(self, content, start, old_end, new_end, digest=None):
+        """The index for `content`, this text with [start, old_end) replaced
+        by content[start:new_end]; None if the edit is not inside the script.
+
+        Declarations touching the edit are re-tokenized, from the end of the
+        last declaration before it to the start of the first one after it;
+        later spans are shifted.
+        """
+        if start < self.script_start or old_end > self.script_end:
+            return None
+        delta = new_end - old_end
+        before = [span for span in self.spans if span.end < start]
+        after = [span for span in self.spans if span.start > old_end]
+        low = before[-1].end if before else self.script_start
+        high = after[0].start if after else self.script_end
+
+        index = ScriptIndex.__new__(ScriptIndex)
+        index.digest = digest or content_hash(content)
+        index.script_start, index.script_end = self.script_start, self.script_end + delta
+        index._content = content
+        index._line_starts = _line_starts(content)
+        index._tokens = None
+        middle = index._collect(tokenize(content, low, high + delta))
+        shifted = [Span(span.name, span.kind, span.start + delta, span.end + delta,
+                        index._line(span.start + delta)) for span in after]
+        index.spans = before + middle + shifted
+        index._index_names()
+        return index
+
+    def _collect(self, tokens):
+        self._scan = tokens
+        spans = []
+        depth = 0
+        i = 0
+        n = len(tokens)
+        while i < n:
+            tok = tokens[i]
+            if tok.value in _OPENERS:
+                depth += 1
+            elif tok.value in _CLOSERS:
+                depth -= 1
+                if depth < 0:
+                    raise TokenizeError(f'Unbalanced {tok.value!r} at offset {tok.start}')
+            elif depth == 0 and tok.kind == IDENT:
+                decl = self._declaration_at(i)
+                if decl is not None:
+                    span, i = decl
+                    spans.append(span)
+                    continue
+            i += 1
+        if depth:
+            raise TokenizeError(f'{depth} unclosed bracket(s) in the script')
+        self._scan = None
+        return spans
+
+    def _declaration_at(self, i):
+        """Parse a declaration starting at token i; return (Span, next index)."""
+        tokens = self._scan
+        start_tok = tokens[i]
+        j = i
+        if tokens[j].value == 'async' and j + 1 < len(tokens) and tokens[j + 1].value == 'function':
+            j += 1
+        kind = tokens[j].value
+        if kind not in DECLARATION_KEYWORDS or j + 1 >= len(tokens):
+            return None
+        j += 1
+        if tokens[j].value == '*':
+            j += 1
+        if tokens[j].kind != IDENT:
+            return None
+        name = tokens[j].value
+
+        if kind in ('function', 'class'):
+            end_index = self._match_block(j + 1)
+        else:
+            end_index = self._statement_end(j + 1)
+        end = tokens[end_index].end
+        span = Span(name, kind, start_tok.start, end, self._line(start_tok.start))
+        return span, end_index + 1
+
+    def _match_block(self, j):
+        """Index of the `}` closing the first block at or after token j.
+
+        Parenthesised parameter lists are skipped whole, so a default such as
+        `options = {}` is not taken for the function body.
+        """
+        tokens = self._scan
+        while tokens[j].value != '{':
+            if tokens[j].value == '(':
+                j = self._match_closer(j)
+            j += 1
+        return self._match_closer(j)
+
+    def _match_closer(self, j):
+        """Index of the bracket closing the opener at token j."""
+        tokens = self._scan
+        depth = 0
+        for k in range(j, len(tokens)):
+            value = tokens[k].value
+            if value in _OPENERS:
+                depth += 1
+            elif value in _CLOSERS:
+                depth -= 1
+                if depth == 0:
+                    return k
+        raise TokenizeError(f'Unbalanced block at offset {tokens[j].start}')
+
+    def _statement_end(self, j):
+        """Index of the last token of a const/let/var statement.
+
+        Ends at a depth-0 `;`, or (automatic semicolon insertion) before a
+        statement keyword that starts a new line.
+        """
+        tokens = self._scan
+        content = self._content
+        depth = 0
+        for k in range(j, len(tokens)):
+            tok = tokens[k]
+            if tok.value in _OPENERS:
+                depth += 1
+            elif tok.value in _CLOSERS:
+                depth -= 1
+                if depth < 0:
+                    raise TokenizeError(f'Unbalanced {tok.value!r} at offset {tok.start}')
+            elif depth == 0:
+                if tok.value == ';':
+                    return k
+                if (tok.kind == IDENT and tok.value in _STATEMENT_KEYWORDS
+                        and '\n' in content[tokens[k - 1].end:tok.start]):
+                    return k - 1
+        return len(tokens) - 1
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __getitem__(self, name):
+        """The effective (last) definition of `name`."""
+        return self._by_name[name][-1]
+
+    def get(self, name, default=None):
+        spans = self._by_name.get(name)
+        return spans[-1] if spans else default
+
+    def definitions(self, name):
+        """Every top-level definition of `name`, in source order."""
+        return list(self._by_name.get(name, ()))
+
+    def duplicates(self):
+        """Names declared more than once at the top level."""
+        return {name: spans for name, spans in self._by_name.items() if len(spans) > 1}
+
+    def names(self):
+        return list(self._by_name)
+
+    def enclosing(self, offset):
+        """The top-level declaration containing `offset`, or None."""
+        for span in self.spans:
+            if span.start <= offset < span.end:
+                return span
+        return None
+
+
+_LITERAL_CONSTANTS = {'true': True, 'false': False, 'null': None, 'undefined': None}
+
+
+def _literal(tokens, i):
+    """Evaluate the literal starting at tokens[i]; return (value, next index)."""
+    tok = tokens[i]
+    if tok.value == '{':
+        obj = {}
+        i += 1
+        while tokens[i].value != '}':
+            key_tok = tokens[i]
+            if key_tok.kind == STRING:
+                key = ast.literal_eval(key_tok.value)
+            elif key_tok.kind in (IDENT, NUMBER):
+                key = key_tok.value
+            else:
+                raise TokenizeError(f'Unsupported object key at offset {key_tok.start}')
+            if tokens[i + 1].value != ':':
+                raise TokenizeError(f'Expected ":" at offset {tokens[i + 1].start}')
+            obj[key], i = _literal(tokens, i + 2)
+            if tokens[i].value == ',':
+                i += 1
+        return obj, i + 1
+    if tok.value == '[':
+        items = []
+        i += 1
+        while tokens[i].value != ']':
+            value, i = _literal(tokens, i)
+            items.append(value)
+            if tokens[i].value == ',':
+                i += 1
+        return items, i + 1
+    if tok.value == '-' and tokens[i + 1].kind == NUMBER:
+        value, i = _literal(tokens, i + 1)
+        return -value, i
+    if tok.kind == STRING:
+        return ast.literal_eval(tok.value), i + 1
+    if tok.kind == NUMBER:
+        return (float(tok.value) if '.' in tok.value else int(tok.value, 0)), i + 1
+    if tok.kind == IDENT and tok.value in _LITERAL_CONSTANTS:
+        return _LITERAL_CONSTANTS[tok.value], i + 1
+    raise TokenizeError(f'Not a plain literal at offset {tok.start}: {tok.value!r}')
+
+
+# Identifiers allowed in plain data besides object keys: literals and the
+# generated tables' JSON.parse(.., (key, value) => Object.freeze(value))
+_DATA_IDENTIFIERS = frozenset(('JSON', 'parse', 'Object', 'freeze', 'key', 'value')) | frozenset(_LITERAL_CONSTANTS)
+
+
+def is_plain_data(tokens):
+    """Whether an initializer's tokens build only data (no calls into page code)."""
+    for k, tok in enumerate(tokens):
+        if tok.kind == REGEX or tok.kind == TEMPLATE and '${' in tok.value:
+            return False
+        if tok.kind == IDENT and tok.value not in _DATA_IDENTIFIERS:
+            if not (k + 1 < len(tokens) and tokens[k + 1].value == ':'):
+                return False
+    return True
+
+
+def literal_value(content, name):
+    """Python value of `const name = <object/array literal>` in the page.
+
+    Only plain data is supported (objects, arrays, strings, numbers, true,
+    false, null); object keys come back as strings.
+    """
+    span = script_index(content)[name]
+    tokens = tokenize(content, span.start, span.end)
+    eq = next(k for k, tok in enumerate(tokens) if tok.value == '=')
+    value, _ = _literal(tokens, eq + 1)
+    return value
+
+
+def content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+_CACHE = OrderedDict()
+_CACHE_SIZE = 8
+_LAST = None  # the most recently built index, for incremental updates
+
+
+def script_index(content):
+    """Return the (cached) ScriptIndex for this page text."""
+    global _LAST
+    digest = content_hash(content)
+    index = _CACHE.get(digest)
+    if index is not None:
+        _CACHE.move_to_end(digest)
+        return index
+    if _LAST is not None:
+        index = _LAST.edited(content, *changed_region(_LAST._content, content), digest=digest)
+    if index is None:
+        index = ScriptIndex(content, digest)
+    _CACHE[digest] = index
+    if len(_CACHE) > _CACHE_SIZE:
+        _CACHE.popitem(last=False)
+    _LAST = index
+    return index
@@ -0,0 +1,205 @@
+"""
+Precomputed starting spell loadouts
+
+autoPopulateSpells used to work out a new character's spells on every call:
+pick the subclass (or class default) list, count cantrips, find the highest
+spell level and spread the spells-known total across levels. That selection
+only depends on (class, subclass, level), so it is evaluated here for every
+class in `subclassOptions`, each subclass and levels 1-20, using the page's
+own `subclassSpells`, `classDefaultSpells` and `spellDefinitions` plus the
+tables in rules.py.
+
+The result is emitted into the page as two frozen tables:
+
+    spellLoadoutLists      distinct spell-id lists
+    spellLoadouts[class]   {castingType, subclasses: {subclass: rows}}
+
+rows[level] holds one index into spellLoadoutLists per spell level (0 =
+cantrips, -1 = no cantrip entry). The '' subclass is the class default; a
+subclass is only listed when its loadout differs from it. Classes with no
+spellcasting at all are absent.
+
+    python3 -m pagebuild.loadouts            print the generated block
+    python3 -m pagebuild.loadouts --update   rewrite the block in the page
+"""
+
+import argparse
+import json
+
+from . import rules
+from .jsindex import literal_value
+from .manifest import ManifestError, follow_edit
+
+SPELLCASTERS = ('bard', 'cleric', 'druid', 'sorcerer', 'warlock', 'wizard')
+HALFCASTERS = ('paladin', 'ranger')
+THIRD_CASTER_SUBCLASSES = ('Eldritch Knight', 'Arcane Trickster')
+PREPARED_CASTERS = ('cleric', 'druid', 'paladin')
+KNOWN_CASTERS = ('bard', 'sorcerer', 'warlock', 'ranger')
+
+GENERATED_BEGIN = '    // BEGIN spell loadouts generated by pagebuild/loadouts.py - regenerate, don\'t edit\n'
+GENERATED_END = '    // END spell loadouts\n'
+
+
+def page_data(content):
+    """The page tables the selection reads."""
+    return {
+        'subclass_options': literal_value(content, 'subclassOptions'),
+        'subclass_spells': literal_value(content, 'subclassSpells'),
+        'class_defaults': literal_value(content, 'classDefaultSpells'),
+        'spell_ids': set(literal_value(content, 'spellDefinitions')),
+    }
+
+
+def select_spells(data, char_class, subclass, level):
+    """Mirror of the old autoPopulateSpells selection.
+
+    Returns None for non-casters, otherwise (castingType, {spell level: ids}).
+    """
+    is_third = subclass in THIRD_CASTER_SUBCLASSES
+    if char_class not in SPELLCASTERS and char_class not in HALFCASTERS and not is_third:
+        return None
+
+    casting_type = 'prepared' if char_class in PREPARED_CASTERS else 'known'
+    spells = {}
+    spell_list = data['subclass_spells'].get(subclass) or data['class_defaults'].get(char_class)
+
+    def pick(key, count):
+        ids = (spell_list or {}).get(key, [])[:count]
+        return [spell_id for spell_id in ids if spell_id in data['spell_ids']]
+
+    if char_class in rules.CANTRIPS_KNOWN:
+        cantrips = rules.by_level(rules.CANTRIPS_KNOWN[char_class])[level]
+    elif char_class in SPELLCASTERS:
+        cantrips = min(4, 2 + level // 4)
+    elif is_third:
+        cantrips = rules.by_level(rules.THIRD_CASTER_CANTRIPS_KNOWN)[level]
+    else:
+        cantrips = 0
+    if cantrips > 0:
+        spells[0] = pick('cantrips', cantrips)
+
+    caster = rules.THIRD if is_third else rules.HALF if char_class in HALFCASTERS else rules.FULL
+    max_level = rules.max_spell_levels(caster)[level]
+    if max_level == 0:
+        return casting_type, spells
+
+    known = rules.by_level(rules.SPELLS_KNOWN[char_class])[level] if char_class in rules.SPELLS_KNOWN else 0
+    if char_class == 'wizard' or char_class in KNOWN_CASTERS:
+        total = known
+    elif char_class in PREPARED_CASTERS:
+        total = max_level * 4
+    elif is_third:
+        total = rules.by_level(rules.THIRD_CASTER_SPELLS_KNOWN)[level]
+    else:
+        total = 0
+
+    for spell_level in range(1, max_level + 1):
+        if spell_level == 1:
+            count = -(-total // max_level) + 1
+        else:
+            count = total // max_level
+        spells[spell_level] = pick(str(spell_level), count)
+    return casting_type, spells
+
+
+class _Lists:
+    """Interns spell-id lists so identical ones share an index."""
+
+    def __init__(self):
+        self.lists = []
+        self._index = {}
+
+    def add(self, ids):
+        key = tuple(ids)
+        if key not in self._index:
+            self._index[key] = len(self.lists)
+            self.lists.append(list(ids))
+        return self._index[key]
+
+
+def build_loadouts(data):
+    """Return (lists, loadouts) as described in the module docstring."""
+    lists = _Lists()
+    loadouts = {}
+    for char_class, subclasses in data['subclass_options'].items():
+        casting_type = None
+        tables = {}
+        for subclass in [''] + list(subclasses):
+            rows = [None]
+            for level in range(1, rules.MAX_LEVEL + 1):
+                selected = select_spells(data, char_class, subclass, level)
+                if selected is None:
+                    rows = None
+                    break
+                casting_type, spells = selected
+                max_level = max(spells, default=0)
+                rows.append([lists.add(spells[sl]) if sl in spells else -1
+                             for sl in range(max_level + 1)])
+            if rows is not None and (subclass == '' or rows != tables.get('')):
+                tables[subclass] = rows
+        if tables:
+            loadouts[char_class] = {'castingType': casting_type, 'subclasses': tables}
+    return lists.lists, loadouts
+
+
+def _js_string(data):
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return "'" + text.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def render_js(content):
+    """The generated block for this page, markers included."""
+    lists, loadouts = build_loadouts(page_data(content))
+    lines = [
+        '    // Distinct spell-id lists referenced by spellLoadouts',
+        f'    const spellLoadoutLists = JSON.parse({_js_string(lists)}, (key, value) => Object.freeze(value));',
+        '',
+        '    // spellLoadouts[class].subclasses[subclass][characterLevel] = one spellLoadoutLists',
+        "    // index per spell level (-1: no cantrips); subclass '' is the class default",
+        f'    const spellLoadouts = JSON.parse({_js_string(loadouts)}, (key, value) => Object.freeze(value));',
+    ]
+    return GENERATED_BEGIN + '\n'.join(lines) + '\n' + GENERATED_END
+
+
+def replace_generated(content):
+    """Regenerate the block in `content`; returns (content, found)."""
+    start = content.find(GENERATED_BEGIN)
+    end = content.find(GENERATED_END, start)
+    if start == -1 or end == -1:
+        return content, False
+    return content[:start] + render_js(content) + content[end + len(GENERATED_END):], True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.loadouts',
+                                     description='Generate the starting spell loadout tables.')
+    parser.add_argument('--update', action='store_true', help='rewrite the generated block in the page')
+    parser.add_argument('--page', default=rules.PAGE_PATH, help='page to read/update (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    with open(args.page, 'r') as f:
+        content = f.read()
+    if not args.update:
+        print(render_js(content), end='')
+        return 0
+
+    updated, found = replace_generated(content)
+    if not found:
+        print('⚠️ Could not find the generated loadout block (apply add-spell-loadouts.py first)')
+        return 1
+    if updated != content:
+        try:
+            follow_edit(args.page, content, updated)
+        except ManifestError as exc:
+            print(f'❌ {exc}')
+            return 1
+        with open(args.page, 'w') as f:
+            f.write(updated)
+        print('✅ Updated spell loadouts')
+    else:
+        print('✅ Spell loadouts already up to date')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
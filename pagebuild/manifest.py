@@ -0,0 +1,328 @@
+"""
+Applied-patch manifest
+
+Stored next to the page as <page>.manifest.json. For every patch it records
+the hash of the script that ran and the regions of the page that patch
+produced: one (start, end) span per hunk it changed, so a patch that edits
+the CSS and a function further down owns two small regions rather than
+everything in between. Regions are kept in step with the final page: an edit
+before a region shifts it, an edit inside one moves its end, and an edit
+straddling its boundary extends it over just that edit.
+
+On the next run a patch is skipped when its script is unchanged and its
+regions are still present with the same hash, so re-running the patch set
+never double-inserts and a no-op rebuild costs hashing only. Regions are
+offsets, so an edit made outside the runner (by hand, or by a generator's
+--update) moves them: before checking, locate() finds every region that is
+no longer where it was by its first line and hash. A region whose text is
+gone is an error, not a reason to run the patch again; most patches are not
+idempotent, and a re-run would apply them twice.
+
+The manifest is committed alongside the page: the page in the repo already
+has every registered patch applied, and without it a fresh clone would run
+them all again. Patches that were baked into the page before the manifest
+existed carry no regions; they are recorded with
+`python3 -m pagebuild --only PATCH ... --mark-applied`. For those the
+manifest keeps a probe instead: the hash of the change a dry run of the
+patch would make to the page. When the page has changed since the last
+build, such a patch is skipped only if a dry run still makes that same
+change (for most of them, none at all).
+
+Generators that rewrite a block of the page call follow_edit() so the
+manifest moves with their edit.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, field
+
+MANIFEST_VERSION = 3
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def manifest_path(page_path):
+    return page_path + MANIFEST_SUFFIX
+
+
+class ManifestError(ValueError):
+    """The manifest says a patch is applied but the page no longer shows it."""
+
+
+def _common_prefix(a, b):
+    """Length of the common prefix of a and b (binary search on slices)."""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, limit):
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def changed_region(before, after):
+    """Return (start, old_end, new_end) of the single span that differs."""
+    start = _common_prefix(before, after)
+    limit = min(len(before), len(after)) - start
+    suffix = _common_suffix(before, after, limit)
+    return start, len(before) - suffix, len(after) - suffix
+
+
+def changed_hunks(before, after):
+    """Return [(start, old_end, new_start, new_end)] for each changed run of lines.
+
+    `start`/`old_end` are offsets in `before`, `new_start`/`new_end` in
+    `after`. Only the span between the common prefix and suffix is diffed.
+    """
+    start, old_end, new_end = changed_region(before, after)
+    if start == old_end == new_end:
+        return []
+    # Widen to whole lines (the prefix and suffix are shared, so the same
+    # amount applies to both texts) and diff the lines in between
+    start = before.rfind('\n', 0, start) + 1
+    line_end = before.find('\n', old_end)
+    extra = len(before) - old_end if line_end == -1 else line_end + 1 - old_end
+    old_end, new_end = old_end + extra, new_end + extra
+    old_lines = before[start:old_end].splitlines(keepends=True)
+    new_lines = after[start:new_end].splitlines(keepends=True)
+
+    def offsets(lines):
+        table = [start]
+        for line in lines:
+            table.append(table[-1] + len(line))
+        return table
+
+    old_at, new_at = offsets(old_lines), offsets(new_lines)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [(old_at[i1], old_at[i2], new_at[j1], new_at[j2])
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def change_sha256(before, after):
+    """Hash of what changed between two texts, independent of where it is."""
+    return sha256('\x00'.join(before[start:old_end] + '\x01' + after[new_start:new_end]
+                              for start, old_end, new_start, new_end in changed_hunks(before, after)))
+
+
+def _first_line(text):
+    end = text.find('\n')
+    return text if end == -1 else text[:end + 1]
+
+
+@dataclass
+class Entry:
+    patch: str
+    script_sha256: str
+    status: str
+    regions: list = field(default_factory=list)  # [[start, end], ...] in the current page
+    region_sha256: list = field(default_factory=list)  # one hash per region
+    region_heads: list = field(default_factory=list)  # first line of each region, to find it again
+    probe_sha256: str = ''  # regionless 'applied' entries: change_sha256 of a dry run
+
+    @property
+    def has_region(self):
+        return bool(self.regions)
+
+    def region_matches(self, text):
+        if not self.has_region or len(self.region_sha256) != len(self.regions):
+            return False
+        return all(end <= len(text) and sha256(text[start:end]) == digest
+                   for (start, end), digest in zip(self.regions, self.region_sha256))
+
+    def locate(self, text):
+        """Point the regions at their text in `text`; False if some region is gone.
+
+        A region that is not in place is searched for by its first line and
+        checked against its hash. Of several matches the one nearest to where
+        the previous region's move puts it wins.
+        """
+        if len(self.region_sha256) != len(self.regions):
+            return False
+        found, delta = [], 0
+        for (start, end), digest, head in zip(self.regions, self.region_sha256, self.region_heads):
+            length, expected = end - start, start + delta
+            best = expected if sha256(text[expected:expected + length]) == digest else None
+            pos = text.find(head) if best is None and head else -1
+            while pos != -1:
+                if (best is None or abs(pos - expected) < abs(best - expected)) \
+                        and sha256(text[pos:pos + length]) == digest:
+                    best = pos
+                pos = text.find(head, pos + 1)
+            if best is None:
+                return False
+            found.append([best, best + length])
+            delta = best - start
+        self.regions = found
+        return True
+
+
+class Manifest:
+    def __init__(self, path, output_sha256='', entries=None):
+        self.path = path
+        self.output_sha256 = output_sha256
+        self.entries = {entry.patch: entry for entry in entries or ()}
+
+    @classmethod
+    def load(cls, path):
+        """Load a manifest; a missing or unreadable one is treated as empty."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get('version') != MANIFEST_VERSION:
+            # Treating it as empty would run every patch again over the page
+            raise ManifestError(f'{path} has version {data.get("version")}, expected {MANIFEST_VERSION}; '
+                                'rebuild the page and its manifest')
+        entries = [Entry(**entry) for entry in data.get('patches', [])]
+        return cls(path, data.get('output_sha256', ''), entries)
+
+    def save(self):
+        data = {
+            'version': MANIFEST_VERSION,
+            'page': os.path.basename(self.path[:-len(MANIFEST_SUFFIX)]),
+            'output_sha256': self.output_sha256,
+            'patches': [asdict(entry) for entry in self.entries.values()],
+        }
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.write('\n')
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def can_skip(self, name, script_sha256, text, page_unchanged, probe=None):
+        """True if the patch's recorded output is still in place.
+
+        Entries without regions are patches that changed nothing (or only
+        deleted text, or were marked applied by hand): they are skipped
+        when the page is exactly the manifest's last output. Otherwise an
+        'applied' one is skipped if `probe()` (change_sha256 of a dry run
+        on `text`) still matches its recorded probe.
+
+        Raises ManifestError if the patch is recorded as applied with an
+        unchanged script but its output cannot be confirmed, since running
+        it again would apply it twice. Call locate() first if the page may
+        have been edited since the manifest was written.
+        """
+        entry = self.entries.get(name)
+        if entry is None or entry.script_sha256 != script_sha256 or entry.status == 'failed':
+            return False
+        if entry.has_region:
+            if entry.region_matches(text):
+                return True
+            raise ManifestError(f'{name}: its recorded output is no longer in the page')
+        if page_unchanged:
+            return True
+        if entry.status != 'applied':
+            return False  # it changed nothing last time, so running it again is safe
+        if probe is not None and entry.probe_sha256 and probe() == entry.probe_sha256:
+            return True
+        raise ManifestError(f'{name}: the page changed and a dry run no longer matches the one '
+                            'recorded when it was applied')
+
+    def locate(self, text):
+        """Find moved regions in `text` (see Entry.locate); returns the patches whose regions are gone."""
+        missing = []
+        for entry in self.entries.values():
+            if entry.has_region and not entry.region_matches(text) and not entry.locate(text):
+                missing.append(entry.patch)
+        return missing
+
+    def needs_probe(self, entry):
+        return entry.status == 'applied' and not entry.has_region
+
+    def record(self, name, script_sha256, status, regions=()):
+        entry = Entry(name, script_sha256, status, [list(region) for region in regions if region[0] < region[1]])
+        self.entries[name] = entry
+        return entry
+
+    def mark_applied(self, name, script_sha256, probe_sha256=''):
+        """Record a patch as applied without running it, keeping any regions."""
+        entry = self.entries.get(name)
+        regions = entry.regions if entry is not None else ()
+        entry = self.record(name, script_sha256, 'applied', regions)
+        entry.probe_sha256 = probe_sha256
+        return entry
+
+    def order(self, names):
+        """Put entries for `names` first, in that order."""
+        ordered = {name: self.entries[name] for name in names if name in self.entries}
+        ordered.update(self.entries)
+        self.entries = ordered
+
+    def shift(self, start, old_end, new_end):
+        """Move recorded regions to account for replacing [start, old_end)
+        with text ending at new_end (all in the coordinates before the edit).
+        """
+        delta = new_end - old_end
+        for entry in self.entries.values():
+            for region in entry.regions:
+                if region[1] <= start:
+                    continue
+                if region[0] >= old_end:
+                    region[0] += delta
+                    region[1] += delta
+                elif region[0] <= start and region[1] >= old_end:
+                    region[1] += delta  # edit inside the region
+                else:
+                    # straddles a boundary: extend over the edit only
+                    region[0] = min(region[0], start)
+                    region[1] = region[1] + delta if region[1] >= old_end else new_end
+
+    def apply_hunks(self, hunks):
+        """shift() for every hunk of one edit (hunks as from changed_hunks)."""
+        for start, old_end, new_start, new_end in reversed(hunks):
+            self.shift(start, old_end, start + (new_end - new_start))
+
+    def finalize(self, text):
+        """Hash every region against the final page."""
+        for entry in self.entries.values():
+            entry.region_sha256 = [sha256(text[start:end]) for start, end in entry.regions]
+            entry.region_heads = [_first_line(text[start:end]) for start, end in entry.regions]
+        self.output_sha256 = sha256(text)
+
+
+def follow_edit(page_path, before, after):
+    """Move the manifest next to `page_path` along with an edit made outside the runner.
+
+    Does nothing if the page has no manifest; raises ManifestError (before
+    anything is saved) if a recorded region cannot be found in `before`.
+    """
+    manifest = Manifest.load(manifest_path(page_path))
+    if not manifest.entries:
+        return
+    in_step = manifest.output_sha256 == sha256(before)
+    missing = manifest.locate(before)
+    if missing:
+        raise ManifestError(f'recorded output of {", ".join(missing)} is no longer in the page; '
+                            'rebuild it before regenerating')
+    output_sha256 = manifest.output_sha256
+    manifest.apply_hunks(changed_hunks(before, after))
+    manifest.finalize(after)
+    if not in_step:
+        # Hand edits made before this one still get checked by the next build
+        manifest.output_sha256 = output_sha256
+    manifest.save()
@@ -0,0 +1,405 @@
+"""
+Spell mechanics extraction
+
+Parses an SRD spell's description (with its higher_levels text, level and
+range) into structured mechanics, once per distinct text:
+
+    damage          [{'dice': '3d6', 'type': 'fire'}, ...] each damage roll
+                    as written (per target, per projectile); the type is
+                    None when the caster picks it or the text omits it,
+                    'radiant/necrotic' when it offers a list
+    projectiles     darts/rays/beams per cast (1 unless the text says so)
+    dice            total damage of one cast with every projectile on one
+                    target, e.g. magic missile '3d4+3': the first roll plus
+                    any dealt with it ('and', not 'or'); None without damage
+    healing         hit points regained ('1d8', '70') or None
+    ability_modifier  the dice add your spellcasting ability modifier
+    scaling         {'by': 'character' | 'slot', 'levels': {level: dice}}:
+                    total damage (or healing) at each character level a
+                    cantrip steps up at, or at each slot level from the
+                    spell's own; None when it does not scale
+    save            'Dexterity', ... or None; half_on_save when a successful
+                    save still takes half damage
+    attack          'ranged' | 'melee' | 'spell' (unspecified) or None
+    area            {'shape': 'cone', 'size': 15} in feet, or None
+
+Only what the spell does to its targets counts: damage you take yourself
+(dimension door, contact other plane), damage dealt only for disobeying
+(geas), stat-block tables (animate objects), saves against a fixed DC and
+the save that only protects an object's holder (light) are left out.
+
+Results are cached in spell-mechanics-cache.json under a hash of the fields
+they were parsed from, so recompiling after an SRD re-import only re-parses
+the spells whose text changed. MECHANICS_VERSION is part of the cache and
+must be bumped whenever the parser's output changes.
+
+    python3 -m pagebuild.mechanics             summary of the whole corpus
+    python3 -m pagebuild.mechanics fireball    mechanics of matching spells
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+
+MECHANICS_VERSION = 2
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(REPO_ROOT, 'spell-mechanics-cache.json')
+
+DAMAGE_TYPES = ('acid', 'bludgeoning', 'cold', 'fire', 'force', 'lightning', 'necrotic',
+                'piercing', 'poison', 'psychic', 'radiant', 'slashing', 'thunder')
+ABILITIES = ('Strength', 'Dexterity', 'Constitution', 'Intelligence', 'Wisdom', 'Charisma')
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+                'eight': 8, 'nine': 9, 'ten': 10}
+
+_DICE = r'\d+d\d+(?:\s*\+\s*\d+)?'
+_TYPES = '|'.join(DAMAGE_TYPES)
+_ORDINAL = r'(\d+)(?:st|nd|rd|th)'
+_COUNT = '|'.join(NUMBER_WORDS)
+
+_TYPED_DAMAGE = re.compile(rf'({_DICE})\s+({_TYPES})\s+damage', re.IGNORECASE)
+_DAMAGE_EQUAL_TO = re.compile(rf'({_TYPES})\s+damage\s+equal\s+to\s+({_DICE})', re.IGNORECASE)
+_CHOICE_DAMAGE = re.compile(rf'({_DICE})\s+((?:{_TYPES})(?:,?\s+(?:or\s+)?(?:{_TYPES}))+)\s+damage', re.IGNORECASE)
+_UNTYPED_DAMAGE = (
+    re.compile(rf'({_DICE})\s+(?:extra\s+)?damage', re.IGNORECASE),
+    re.compile(rf'({_DICE})\s+of\s+the\s+type', re.IGNORECASE),
+    re.compile(rf'damage\s+is\s+({_DICE})', re.IGNORECASE),
+)
+_HEALING = (
+    re.compile(rf'regains?\s+(?:a\s+number\s+of\s+)?hit\s+points\s+equal\s+to\s+({_DICE})', re.IGNORECASE),
+    re.compile(rf'regains?\s+({_DICE}|\d+)\s+hit\s+points', re.IGNORECASE),
+)
+_ABILITY_MODIFIER = re.compile(rf'{_DICE}\s*\+\s*your\s+spellcasting\s+ability\s+modifier', re.IGNORECASE)
+# A creature making the save; 'amke' is the SRD's own typo in feeblemind
+_SAVE = re.compile(rf'\b(?:makes?|amke|succeeds?\s+on|fails?)\s+(?:an?\s+)?(DC\s+\d+\s+)?'
+                   rf'({"|".join(ABILITIES)})\s+saving\s+throw', re.IGNORECASE)
+_HELD_OBJECT = re.compile(r'object\s+held\s+or\s+worn', re.IGNORECASE)
+_HALF_ON_SAVE = re.compile(r'half\s+as\s+much\s+damage', re.IGNORECASE)
+_ATTACK = re.compile(r'\b(ranged|melee)\s+spell\s+attack', re.IGNORECASE)
+_ANY_ATTACK = re.compile(r'spell\s+attack', re.IGNORECASE)
+_ALTERNATIVE = re.compile(r'\bor\b', re.IGNORECASE)
+_TABLE_ROW = re.compile(r'^[ \t]*\|.*$', re.MULTILINE)
+_SELF_DAMAGE = re.compile(r'^\s*you\b.*\btakes?\s+$', re.IGNORECASE | re.DOTALL)
+_PENALTY = re.compile(r'counter\s+to\s+your\s+instructions', re.IGNORECASE)
+_PROJECTILES = re.compile(rf'(?<!by\s)\b({_COUNT})\s+(?:glowing\s+)?(darts|rays|beams)\b(?!\s+at\s+\d)', re.IGNORECASE)
+
+_CANTRIP_STEPS = re.compile(rf'{_ORDINAL}\s+level\s+\((\d+d\d+)\)', re.IGNORECASE)
+_CANTRIP_BEAMS = re.compile(rf'\b({_COUNT})\s+beams\s+at\s+{_ORDINAL}\s+level', re.IGNORECASE)
+_SLOT_DICE = re.compile(
+    rf'(?:the\s+)?(?:(\w+)\s+)?(damage|healing)\s+increases\s+by\s+(\d+d\d+)\s+for\s+(each|every\s+two)\s+'
+    rf'slot\s+levels?\s+above\s+{_ORDINAL}', re.IGNORECASE)
+_SLOT_PROJECTILES = re.compile(
+    rf'creates?\s+one\s+(?:more|additional)\s+(?:dart|ray|beam)\s+for\s+each\s+slot\s+level\s+above\s+{_ORDINAL}',
+    re.IGNORECASE)
+
+_AREA_RADIUS = re.compile(r'(\d+)-foot[- ]radius(?:\s+(sphere|cylinder|circle))?', re.IGNORECASE)
+_AREA_SHAPE = re.compile(r'(\d+)-foot[- ](cone|cube|line|square|sphere|cylinder)', re.IGNORECASE)
+_AREA_LINE = re.compile(r'line\s+(\d+)\s+feet\s+long', re.IGNORECASE)
+
+
+class Dice:
+    """A sum of dice and a flat modifier, kept as {sides: count} in order."""
+
+    def __init__(self, counts=None, modifier=0):
+        self.counts = dict(counts or {})
+        self.modifier = modifier
+
+    @classmethod
+    def parse(cls, text):
+        dice = cls()
+        for count, sides in re.findall(r'(\d+)d(\d+)', text):
+            dice.counts[int(sides)] = dice.counts.get(int(sides), 0) + int(count)
+        dice.modifier = sum(int(n) for n in re.findall(r'\+\s*(\d+)(?!\s*d)', text))
+        if not dice.counts and re.fullmatch(r'\d+', text.strip()):
+            dice.modifier = int(text)
+        return dice
+
+    def __add__(self, other):
+        counts = dict(self.counts)
+        for sides, count in other.counts.items():
+            counts[sides] = counts.get(sides, 0) + count
+        return Dice(counts, self.modifier + other.modifier)
+
+    def __mul__(self, times):
+        return Dice({sides: count * times for sides, count in self.counts.items()}, self.modifier * times)
+
+    def __str__(self):
+        text = '+'.join(f'{count}d{sides}' for sides, count in self.counts.items() if count)
+        if self.modifier or not text:
+            text += f'+{self.modifier}' if text else str(self.modifier)
+        return text
+
+
+def _normalize(dice):
+    return str(Dice.parse(dice))
+
+
+def _sentence(text, position):
+    start = text.rfind('.', 0, position) + 1
+    end = text.find('.', position)
+    return start, len(text) if end < 0 else end
+
+
+def _incidental(text, position):
+    """Damage at `position` that does not come from casting at a target:
+    the caster's own ('you take 6d6 psychic damage') or a penalty."""
+    start, end = _sentence(text, position)
+    clause = text[max(start, text.rfind(',', 0, position) + 1):position]
+    return bool(_SELF_DAMAGE.search(clause) or _PENALTY.search(text[start:end]))
+
+
+def _damage_parts(text):
+    """Damage rolls in order of appearance, as (start, end, part)."""
+    found = []
+    seen = set()
+
+    def add(match, dice, kind):
+        if kind not in seen and not _incidental(text, match.start()):
+            seen.add(kind)
+            found.append((match.start(), match.end(), {'dice': _normalize(dice), 'type': kind}))
+
+    for match in _TYPED_DAMAGE.finditer(text):
+        add(match, match.group(1), match.group(2).lower())
+    for match in _DAMAGE_EQUAL_TO.finditer(text):
+        add(match, match.group(2), match.group(1).lower())
+    for match in _CHOICE_DAMAGE.finditer(text):
+        add(match, match.group(1), '/'.join(re.findall(_TYPES, match.group(2).lower())))
+    for pattern in _UNTYPED_DAMAGE:
+        match = None if found else pattern.search(text)
+        if match:
+            add(match, match.group(1), None)
+    return sorted(found, key=lambda item: item[0])
+
+
+def _dealt_together(text, found):
+    """How many leading parts land together: the same sentence, joined by
+    'and' rather than offered as alternatives with 'or'."""
+    count = min(len(found), 1)
+    for (_, end, _), (start, _, _) in zip(found, found[1:]):
+        between = text[end:start]
+        if '.' in between or _ALTERNATIVE.search(between):
+            break
+        count += 1
+    return count
+
+
+def _total(parts, projectiles):
+    if not parts:
+        return None
+    total = Dice()
+    for part in parts:
+        total = total + Dice.parse(part['dice'])
+    return total * projectiles
+
+
+def _healing(text):
+    for pattern in _HEALING:
+        match = pattern.search(text)
+        if match:
+            return _normalize(match.group(1))
+    return None
+
+
+def _cantrip_scaling(text, parts, projectiles):
+    """Total damage at each character level a cantrip steps up at."""
+    steps = [(int(level), dice) for level, dice in _CANTRIP_STEPS.findall(text)]
+    if steps and parts:
+        levels = {1: str(_total(parts, projectiles))}
+        for level, dice in steps:
+            scaled = [dict(parts[0], dice=_normalize(dice))] + parts[1:]
+            levels[level] = str(_total(scaled, projectiles))
+        return {'by': 'character', 'levels': levels}
+
+    beams = [(NUMBER_WORDS[count.lower()], int(level)) for count, level in _CANTRIP_BEAMS.findall(text)]
+    if beams and parts:
+        levels = {1: str(_total(parts, projectiles))}
+        for count, level in beams:
+            levels[level] = str(_total(parts, count))
+        return {'by': 'character', 'levels': levels}
+    return None
+
+
+def _slot_scaling(higher_levels, spell_level, parts, projectiles, healing):
+    """Total damage (or healing) at each slot level from the spell's own."""
+    match = _SLOT_DICE.search(higher_levels)
+    if match:
+        qualifier, what, step, every, above = match.groups()
+        base_level = int(above)
+        per = 2 if every.lower().startswith('every') else 1
+        if what.lower() == 'healing':
+            if not healing:
+                return None
+            base = Dice.parse(healing)
+            return {'by': 'slot', 'levels': {
+                level: str(base + Dice.parse(step) * ((level - base_level) // per))
+                for level in range(spell_level, 10)}}
+        if not parts:
+            return None
+        target = next((i for i, part in enumerate(parts)
+                       if qualifier and part['type'] == qualifier.lower()), 0)
+        levels = {}
+        for level in range(spell_level, 10):
+            scaled = list(parts)
+            extra = Dice.parse(step) * ((level - base_level) // per)
+            scaled[target] = dict(parts[target], dice=str(Dice.parse(parts[target]['dice']) + extra))
+            levels[level] = str(_total(scaled, projectiles))
+        return {'by': 'slot', 'levels': levels}
+
+    match = _SLOT_PROJECTILES.search(higher_levels)
+    if match and parts:
+        base_level = int(match.group(1))
+        return {'by': 'slot', 'levels': {
+            level: str(_total(parts, projectiles + level - base_level)) for level in range(spell_level, 10)}}
+    return None
+
+
+def _save(text):
+    for match in _SAVE.finditer(text):
+        start, end = _sentence(text, match.start())
+        if not match.group(1) and not _HELD_OBJECT.search(text[start:end]):
+            return match.group(2).capitalize()
+    return None
+
+
+def _area(range_text, description):
+    for text in (range_text, description):
+        match = _AREA_RADIUS.search(text)
+        if match:
+            return {'shape': (match.group(2) or 'radius').lower(), 'size': int(match.group(1))}
+        match = _AREA_SHAPE.search(text)
+        if match:
+            return {'shape': match.group(2).lower(), 'size': int(match.group(1))}
+        match = _AREA_LINE.search(text)
+        if match:
+            return {'shape': 'line', 'size': int(match.group(1))}
+    return None
+
+
+def spell_level(spell):
+    level = spell.get('level', 0)
+    return 0 if level == 'cantrip' else int(level)
+
+
+def extract(spell):
+    """Mechanics of one SRD spell (see the module docstring)."""
+    description = _TABLE_ROW.sub('', spell.get('description', ''))
+    higher_levels = spell.get('higher_levels', '')
+    level = spell_level(spell)
+
+    found = _damage_parts(description)
+    parts = [part for _, _, part in found]
+    together = parts[:_dealt_together(description, found)]
+    projectile = _PROJECTILES.search(description)
+    projectiles = NUMBER_WORDS[projectile.group(1).lower()] if projectile and parts else 1
+    total = _total(together, projectiles)
+    healing = _healing(description)
+    save = _save(description)
+    attack = _ATTACK.search(description)
+
+    if level == 0:
+        scaling = _cantrip_scaling(description, together, projectiles)
+    else:
+        scaling = _slot_scaling(higher_levels, level, together, projectiles, healing)
+    if scaling:
+        # String keys, so fresh and cached (JSON round-tripped) results match
+        scaling['levels'] = {str(key): value for key, value in scaling['levels'].items()}
+
+    return {
+        'damage': parts,
+        'projectiles': projectiles,
+        'dice': str(total) if total else None,
+        'healing': healing,
+        'ability_modifier': bool(_ABILITY_MODIFIER.search(description)),
+        'scaling': scaling,
+        'save': save,
+        'half_on_save': bool(save and _HALF_ON_SAVE.search(description)),
+        'attack': attack.group(1).lower() if attack else 'spell' if _ANY_ATTACK.search(description) else None,
+        'area': _area(spell.get('range') or '', description),
+    }
+
+
+def source_key(spell):
+    """Hash of everything extract() reads from a spell."""
+    source = [spell.get('level'), spell.get('range'), spell.get('description', ''), spell.get('higher_levels', '')]
+    return hashlib.sha256(json.dumps(source, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class MechanicsCache:
+    """extract() results keyed by source_key(), persisted as JSON."""
+
+    def __init__(self, path=CACHE_PATH, entries=None):
+        self.path = path
+        self.entries = dict(entries or {})
+        self.hits = 0
+        self.misses = 0
+        self._used = set()
+
+    @classmethod
+    def load(cls, path=CACHE_PATH):
+        """Load a cache; a missing, unreadable or outdated one is empty."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get('version') != MECHANICS_VERSION:
+            return cls(path)
+        return cls(path, data.get('entries'))
+
+    def get(self, spell):
+        key = source_key(spell)
+        self._used.add(key)
+        mechanics = self.entries.get(key)
+        if mechanics is None:
+            self.misses += 1
+            mechanics = self.entries[key] = extract(spell)
+        else:
+            self.hits += 1
+        return mechanics
+
+    def save(self):
+        """Write the entries used since loading (stale ones are dropped)."""
+        entries = {key: self.entries[key] for key in sorted(self._used)}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MECHANICS_VERSION, 'entries': entries}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+
+
+def main(argv=None):
+    from .spells import SRD_PATH, load_srd
+
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.mechanics',
+                                     description='Extract structured mechanics from SRD spell descriptions.')
+    parser.add_argument('names', nargs='*', help='show spells whose name contains one of these')
+    parser.add_argument('--source', default=SRD_PATH, help='SRD spell list (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    spells = load_srd(args.source)
+    if args.names:
+        wanted = [name.lower() for name in args.names]
+        for spell in spells:
+            if any(name in spell['name'].lower() for name in wanted):
+                print(spell['name'])
+                print(json.dumps(extract(spell), indent=2, ensure_ascii=False))
+        return 0
+
+    extracted = [extract(spell) for spell in spells]
+    print(f'{len(spells)} spells')
+    for label, count in (
+        ('deal damage', sum(bool(m['damage']) for m in extracted)),
+        ('deal more than one damage type', sum(len(m['damage']) > 1 for m in extracted)),
+        ('heal', sum(bool(m['healing']) for m in extracted)),
+        ('scale with character level', sum(bool(m['scaling']) and m['scaling']['by'] == 'character' for m in extracted)),
+        ('scale with slot level', sum(bool(m['scaling']) and m['scaling']['by'] == 'slot' for m in extracted)),
+        ('call for a save', sum(bool(m['save']) for m in extracted)),
+        ('make a spell attack', sum(bool(m['attack']) for m in extracted)),
+        ('have an area', sum(bool(m['area']) for m in extracted)),
+    ):
+        print(f'  {count:4} {label}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
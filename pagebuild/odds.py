@@ -0,0 +1,212 @@
+"""
+Attack odds and expected damage
+
+Exact hit chances and damage expectations for the spell modals and weapon
+rolls, worked out from the distributions in dice.py rather than sampled.
+Distributions are memoized per normalized expression and options, so each
+expression is convolved once however many times it is asked for.
+
+An attack hits when the kept d20 plus the bonus reaches the target AC; a
+natural 1 always misses and a natural 20 always hits and crits (crit damage
+doubles the dice, not the modifier). With hit = P(hit) and crit = P(natural
+20):
+
+    expected damage = (hit - crit) * mean(damage) + crit * mean(damage, crit)
+
+render_js() emits the lookup data the page reads instead of convolving on
+every modal open:
+
+    d20AtLeast[mode * 22 + n]     400 * P(kept d20 >= n), n = 0-21, mode 0
+                                  normal / 1 advantage / 2 disadvantage
+    diceStatsTable[expression]    [mean, crit mean, min, max] for every damage
+                                  expression in the page and compiled spells
+
+Expressions not in the table (edited weapons, new spells) are convolved
+exactly on the page by diceDistribution(), the JS mirror of distribution().
+
+    python3 -m pagebuild.odds                          print the generated block
+    python3 -m pagebuild.odds --update                 rewrite the block in the page
+    python3 -m pagebuild.odds 1d8+3 --bonus 5 --ac 15  odds for one attack
+"""
+
+import argparse
+import functools
+import json
+import os
+import re
+from fractions import Fraction
+
+from . import dice, rules
+from .manifest import ManifestError, follow_edit
+
+NORMAL, ADVANTAGE, DISADVANTAGE = 0, 1, 2
+D20_DENOMINATOR = 400  # every d20AtLeast entry is exact over 20 * 20
+
+COMPILED_SPELLS_PATH = os.path.join(os.path.dirname(rules.PAGE_PATH), 'spells-compiled.json')
+
+GENERATED_BEGIN = '    // BEGIN dice odds generated by pagebuild/odds.py - regenerate, don\'t edit\n'
+GENERATED_END = '    // END dice odds\n'
+
+# Same pattern as the page's diceFormulaIn()
+_FORMULA = re.compile(r'\d*d\d+(?:\s*[+-]\s*\d*d?\d+)*', re.IGNORECASE)
+_PAGE_DAMAGE = re.compile(r'''damage: (['"])(.*?)\1''')
+
+
+@functools.lru_cache(maxsize=None)
+def _pmf(key, advantage, disadvantage, crit):
+    return dice.distribution(key, advantage=advantage, disadvantage=disadvantage, crit=crit)
+
+
+def pmf(expression, advantage=False, disadvantage=False, crit=False):
+    """Memoized dice.distribution(); treat the result as read-only."""
+    return _pmf(dice.normalize(expression), advantage, disadvantage, crit)
+
+
+def d20_at_least(mode=NORMAL):
+    """[P(kept d20 >= n) for n in 0..21] as Fractions."""
+    natural = pmf('1d20', advantage=mode == ADVANTAGE, disadvantage=mode == DISADVANTAGE)
+    return [sum((p for face, p in natural.items() if face >= n), Fraction(0)) for n in range(22)]
+
+
+def attack_odds(bonus, ac, mode=NORMAL):
+    """(P(hit), P(crit)) for d20 + bonus against `ac`."""
+    at_least = d20_at_least(mode)
+    need = min(max(ac - bonus, 2), 20)
+    return at_least[need], at_least[20]
+
+
+def damage_stats(expression):
+    """(mean, crit mean, min, max) of a damage expression."""
+    normal = pmf(expression)
+    return dice.mean(normal), dice.mean(pmf(expression, crit=True)), min(normal), max(normal)
+
+
+def expected_damage(expression, bonus, ac, mode=NORMAL):
+    hit, crit = attack_odds(bonus, ac, mode)
+    mean, crit_mean, _, _ = damage_stats(expression)
+    return (hit - crit) * mean + crit * crit_mean
+
+
+def formula_in(text):
+    """First dice expression in free text, normalized, or None (diceFormulaIn)."""
+    match = _FORMULA.search(str(text or ''))
+    return dice.normalize(match.group(0)) if match else None
+
+
+def damage_expressions(content, compiled_spells=()):
+    """Every distinct parseable damage formula in the page and spell data."""
+    texts = [match.group(2) for match in _PAGE_DAMAGE.finditer(content)]
+    texts += [spell.get('damage') for spell in compiled_spells]
+    found = set()
+    for text in texts:
+        formula = formula_in(text)
+        if formula is None:
+            continue
+        try:
+            dice.parse(formula)
+        except ValueError:
+            continue
+        found.add(formula)
+    return sorted(found, key=lambda f: (len(f), f))
+
+
+def load_compiled_spells(path=COMPILED_SPELLS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _number(value):
+    value = round(float(value), 4)
+    return int(value) if value == int(value) else value
+
+
+def _js_string(data):
+    text = json.dumps(data, separators=(',', ':'))
+    return "'" + text.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+
+def render_js(content, compiled_spells=None):
+    """The generated block for this page, markers included."""
+    if compiled_spells is None:
+        compiled_spells = load_compiled_spells()
+
+    at_least = []
+    for mode in (NORMAL, ADVANTAGE, DISADVANTAGE):
+        for p in d20_at_least(mode):
+            scaled = p * D20_DENOMINATOR
+            assert scaled.denominator == 1
+            at_least.append(int(scaled))
+
+    stats = {formula: [_number(v) for v in damage_stats(formula)]
+             for formula in damage_expressions(content, compiled_spells)}
+
+    lines = [
+        f'    // d20AtLeast[mode * 22 + n] = {D20_DENOMINATOR} * P(kept d20 >= n); mode 0 normal, 1 advantage, 2 disadvantage',
+        f'    const d20AtLeast = new Uint16Array([{", ".join(str(v) for v in at_least)}]);',
+        '',
+        '    // diceStatsTable[expression] = [mean, crit mean, min, max] for the known damage expressions',
+        f'    const diceStatsTable = JSON.parse({_js_string(stats)}, (key, value) => Object.freeze(value));',
+    ]
+    return GENERATED_BEGIN + '\n'.join(lines) + '\n' + GENERATED_END
+
+
+def replace_generated(content, compiled_spells=None):
+    """Regenerate the block in `content`; returns (content, found)."""
+    start = content.find(GENERATED_BEGIN)
+    end = content.find(GENERATED_END, start)
+    if start == -1 or end == -1:
+        return content, False
+    block = render_js(content[:start] + content[end + len(GENERATED_END):], compiled_spells)
+    return content[:start] + block + content[end + len(GENERATED_END):], True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.odds',
+                                     description='Generate the dice odds tables, or show the odds for one attack.')
+    parser.add_argument('expression', nargs='?', help='damage expression to report on instead')
+    parser.add_argument('--bonus', type=int, default=0, help='attack bonus (default: %(default)s)')
+    parser.add_argument('--ac', type=int, default=15, help='target AC (default: %(default)s)')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--advantage', action='store_const', dest='mode', const=ADVANTAGE, default=NORMAL)
+    mode.add_argument('--disadvantage', action='store_const', dest='mode', const=DISADVANTAGE)
+    parser.add_argument('--update', action='store_true', help='rewrite the generated block in the page')
+    parser.add_argument('--page', default=rules.PAGE_PATH, help='page to read/update (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    if args.expression:
+        hit, crit = attack_odds(args.bonus, args.ac, args.mode)
+        mean, crit_mean, low, high = damage_stats(args.expression)
+        expected = expected_damage(args.expression, args.bonus, args.ac, args.mode)
+        print(f'd20{args.bonus:+d} vs AC {args.ac}: hit {float(hit):.2%}, crit {float(crit):.2%}')
+        print(f'{dice.normalize(args.expression)}: {low}-{high}, mean {float(mean):.4f}, crit mean {float(crit_mean):.4f}')
+        print(f'expected damage per attack: {float(expected):.4f}')
+        return 0
+
+    with open(args.page, 'r') as f:
+        content = f.read()
+    if not args.update:
+        print(render_js(content), end='')
+        return 0
+
+    updated, found = replace_generated(content)
+    if not found:
+        print('⚠️ Could not find the generated dice odds block (apply add-dice-odds.py first)')
+        return 1
+    if updated != content:
+        try:
+            follow_edit(args.page, content, updated)
+        except ManifestError as exc:
+            print(f'❌ {exc}')
+            return 1
+        with open(args.page, 'w') as f:
+            f.write(updated)
+        print('✅ Updated dice odds')
+    else:
+        print('✅ Dice odds already up to date')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,364 @@
+"""
+Hot-path performance linter for the page's inline <script>
+
+Works on jsindex's tokens, so strings, comments, regexes and template
+literals never produce false matches. Each finding carries a line, the
+top-level declaration it sits in and a severity; code inside a loop body
+(for/while/do, or a forEach/map/reduce/... callback) counts double.
+
+    innerhtml-append       el.innerHTML += ...: re-parses everything already
+                           in the element on every call                     3
+    innerhtml-rebuild      el.innerHTML = list.map(..).join(..) or a string
+                           accumulated in a loop: rebuilds the whole list   2
+    repeated-lookup        the same getElementById/querySelector(literal)
+                           more than once in one function, per extra call   1
+    lookup-in-loop         a DOM lookup inside a loop body                  2
+    many-lookups           a function making LOOKUP_BUDGET or more DOM
+                           lookups per call, per LOOKUP_BUDGET              1
+    literal-in-function    a constant object/array table (LITERAL_MIN_ENTRIES
+                           entries or more) rebuilt on every call           1, 2 if large
+    duplicate-definition   a top-level name declared more than once; only
+                           the last definition is live                      3
+
+Findings are identified by (rule, declaration, subject), not by line, and a
+baseline file records the accepted ones, so a build can fail only on new
+findings:
+
+    python3 -m pagebuild.perflint                    report every finding
+    python3 -m pagebuild.perflint --check            exit 1 on findings not in the baseline
+    python3 -m pagebuild.perflint --update-baseline  accept the current findings
+    python3 -m pagebuild --perf-lint                 patch, then --check the result
+"""
+
+import argparse
+import bisect
+import json
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from . import rules
+from .jsindex import IDENT, PUNCT, STRING, TEMPLATE, is_plain_data, script_index
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_ROOT, 'perflint-baseline.json')
+
+LITERAL_MIN_ENTRIES = 4
+LITERAL_LARGE_CHARS = 200
+LOOKUP_BUDGET = 8
+LOOP_FACTOR = 2
+
+SEVERITY = {
+    'innerhtml-append': 3,
+    'innerhtml-rebuild': 2,
+    'repeated-lookup': 1,
+    'lookup-in-loop': 2,
+    'many-lookups': 1,
+    'literal-in-function': 1,
+    'duplicate-definition': 3,
+}
+
+TOP_LEVEL = '<top level>'
+_LOOP_KEYWORDS = frozenset(('for', 'while'))
+_ITERATORS = frozenset(('forEach', 'map', 'flatMap', 'filter', 'reduce', 'some', 'every', 'find', 'findIndex'))
+_LOOKUPS = frozenset(('getElementById', 'querySelector', 'querySelectorAll', 'getElementsByClassName'))
+_OPENERS = {'(': ')', '[': ']', '{': '}'}
+_REBUILD_IN_TEMPLATE = re.compile(r'\.(map|join)\(')
+
+
+@dataclass(frozen=True)
+class Finding:
+    rule: str
+    severity: int
+    line: int
+    scope: str
+    subject: str
+    message: str
+
+    @property
+    def key(self):
+        return f'{self.rule}:{self.scope}:{self.subject}'
+
+
+@dataclass
+class _Frame:
+    closer: str
+    loop: bool
+    header: bool = False  # the (...) after for/while
+
+
+class _Walker:
+    """One pass over the script tokens, tracking loop nesting and scope."""
+
+    def __init__(self, content):
+        self.content = content
+        self.index = script_index(content)
+        self.tokens = self.index.tokens
+        self._line_starts = [0]
+        self._line_starts.extend(m.end() for m in re.finditer('\n', content))
+        self.findings = []
+        self.loop_at = [False] * len(self.tokens)
+        self._mark_loops()
+
+    def line(self, offset):
+        return bisect.bisect_right(self._line_starts, offset)
+
+    def scope(self, offset):
+        span = self.index.enclosing(offset)
+        return span.name if span else TOP_LEVEL
+
+    def add(self, rule, k, subject, message, severity=None):
+        """Record a finding at token k, doubled inside a loop."""
+        tok = self.tokens[k]
+        severity = SEVERITY[rule] if severity is None else severity
+        if self.loop_at[k]:
+            severity *= LOOP_FACTOR
+        self.findings.append(Finding(rule, severity, self.line(tok.start), self.scope(tok.start), subject, message))
+
+    def _mark_loops(self):
+        tokens = self.tokens
+        stack = []
+        brace_is_loop = False  # the next { is a loop body
+        statement_loop = None  # depth of a brace-less loop body, until its ;
+        for k, tok in enumerate(tokens):
+            in_loop = any(frame.loop for frame in stack) or statement_loop is not None
+            self.loop_at[k] = in_loop
+            prev = tokens[k - 1] if k else None
+            if tok.value in _OPENERS:
+                loop = in_loop
+                header = False
+                if tok.value == '(' and prev is not None:
+                    header = prev.value in _LOOP_KEYWORDS
+                    if prev.value in _ITERATORS and k > 1 and tokens[k - 2].value in ('.', '?.'):
+                        loop = True
+                elif tok.value == '{' and (brace_is_loop or (prev is not None and prev.value == 'do')):
+                    loop = True
+                brace_is_loop = False
+                stack.append(_Frame(_OPENERS[tok.value], loop, header))
+            elif tok.value in (')', ']', '}'):
+                frame = stack.pop() if stack else None
+                if frame is not None and frame.header:
+                    following = tokens[k + 1] if k + 1 < len(tokens) else None
+                    if following is not None and following.value == '{':
+                        brace_is_loop = True
+                    elif following is not None and following.value != ';':
+                        statement_loop = len(stack)
+            elif tok.value == ';' and statement_loop == len(stack):
+                statement_loop = None
+
+    # Rules
+
+    def run(self):
+        tokens = self.tokens
+        calls = {}
+        lookups = {}  # scope -> token index of every lookup
+        appended = set()  # (scope, name) of strings built with += inside a loop
+        for k, tok in enumerate(tokens):
+            if tok.kind != IDENT:
+                continue
+            prev = tokens[k - 1] if k else None
+            nxt = tokens[k + 1] if k + 1 < len(tokens) else None
+            if nxt is None:
+                break
+            if tok.value == 'innerHTML' and prev is not None and prev.value in ('.', '?.'):
+                target = self._target(k - 2)
+                if nxt.value == '+=':
+                    self.add('innerhtml-append', k, target,
+                             f'{target}.innerHTML += re-parses the existing content; append a node instead')
+                elif nxt.value == '=':
+                    rhs = self._expression(k + 2)
+                    if self._is_rebuild(rhs, appended, self.scope(tok.start)):
+                        self.add('innerhtml-rebuild', k, target,
+                                 f'{target}.innerHTML is rebuilt from a whole list; update the changed rows')
+            elif tok.value in _LOOKUPS and nxt.value == '(' and prev is not None and prev.value == '.':
+                argument = tokens[k + 2] if k + 2 < len(tokens) else None
+                subject = argument.value if argument is not None and argument.kind == STRING else '(dynamic)'
+                if self.loop_at[k]:
+                    self.add('lookup-in-loop', k, f'{tok.value}({subject})',
+                             f'{tok.value}({subject}) runs on every iteration; look it up once')
+                lookups.setdefault(self.scope(tok.start), []).append(k)
+                if argument is not None and argument.kind == STRING:
+                    calls.setdefault((self.scope(tok.start), tok.value, subject), []).append(k)
+            elif nxt.value == '+=' and self.loop_at[k] and (prev is None or prev.value not in ('.', '?.')):
+                appended.add((self.scope(tok.start), tok.value))
+            elif tok.value in ('const', 'let') and nxt.kind == IDENT:
+                self._literal(k)
+
+        for (scope, method, subject), hits in calls.items():
+            for k in hits[1:]:
+                self.add('repeated-lookup', k, f'{method}({subject})',
+                         f'{method}({subject}) was already looked up in {scope}; reuse the element')
+
+        for scope, hits in lookups.items():
+            if scope != TOP_LEVEL and len(hits) >= LOOKUP_BUDGET:
+                self.add('many-lookups', hits[0], scope,
+                         f'{scope} makes {len(hits)} DOM lookups per call; cache the elements',
+                         SEVERITY['many-lookups'] * (len(hits) // LOOKUP_BUDGET))
+
+        for name, spans in self.index.duplicates().items():
+            for span in spans[:-1]:
+                self.findings.append(Finding(
+                    'duplicate-definition', SEVERITY['duplicate-definition'], span.line, name, name,
+                    f'{name} is redefined at line {spans[-1].line}; this definition is dead code'))
+
+        self.findings.sort(key=lambda f: (f.line, f.rule))
+        return self.findings
+
+    def _target(self, k):
+        """Source text of the member/call expression ending at token k (e.g. `el`, `this.list`)."""
+        tokens = self.tokens
+        start = k
+        while start > 0:
+            if tokens[start].value in (')', ']'):
+                depth = 0
+                while start > 0:
+                    value = tokens[start].value
+                    depth += value in (')', ']')
+                    depth -= value in ('(', '[')
+                    if depth == 0:
+                        break
+                    start -= 1
+                start -= 1  # the callee
+                continue
+            if start >= 2 and tokens[start - 1].value in ('.', '?.') and tokens[start - 2].kind == IDENT:
+                start -= 2
+            elif start >= 2 and tokens[start - 1].value in ('.', '?.') and tokens[start - 2].value in (')', ']'):
+                start -= 2
+            else:
+                break
+        return ''.join(tok.value for tok in tokens[start:k + 1])
+
+    def _expression(self, k):
+        """Tokens from k to the end of the statement."""
+        tokens = self.tokens
+        depth = 0
+        end = k
+        while end < len(tokens):
+            value = tokens[end].value
+            if value in _OPENERS:
+                depth += 1
+            elif value in (')', ']', '}'):
+                depth -= 1
+                if depth < 0:
+                    break
+            elif value in (';', ',') and depth == 0:
+                break
+            end += 1
+        return tokens[k:end]
+
+    @staticmethod
+    def _is_rebuild(rhs, appended, scope):
+        for j, tok in enumerate(rhs):
+            if tok.kind == IDENT and tok.value in ('map', 'join') and j and rhs[j - 1].value == '.':
+                return True
+            if tok.kind == TEMPLATE and _REBUILD_IN_TEMPLATE.search(tok.value):
+                return True
+        return len(rhs) == 1 and rhs[0].kind == IDENT and (scope, rhs[0].value) in appended
+
+    def _literal(self, k):
+        """Flag `const name = {...}` / `[...]` of plain data inside a function."""
+        tokens = self.tokens
+        if k + 3 >= len(tokens) or tokens[k + 2].value != '=' or tokens[k + 3].value not in ('{', '['):
+            return
+        name_tok = tokens[k + 1]
+        span = self.index.enclosing(name_tok.start)
+        if span is None or span.start == tokens[k].start:
+            return  # top level: built once
+        initializer = self._expression(k + 3)
+        if not is_plain_data(initializer):
+            return
+        depth = entries = 0
+        for tok in initializer:
+            if tok.value in _OPENERS:
+                depth += 1
+            elif tok.value in (')', ']', '}'):
+                depth -= 1
+            elif tok.kind == PUNCT and tok.value == ',' and depth == 1:
+                entries += 1
+        entries += 1
+        if entries < LITERAL_MIN_ENTRIES:
+            return
+        size = initializer[-1].end - initializer[0].start
+        severity = SEVERITY['literal-in-function'] * (2 if size >= LITERAL_LARGE_CHARS else 1)
+        self.add('literal-in-function', k + 1, name_tok.value,
+                 f'{name_tok.value} ({entries} entries) is rebuilt on every call of {span.name}; hoist it',
+                 severity)
+
+
+def lint(content):
+    """Every finding in the page's inline script, in line order."""
+    return _Walker(content).run()
+
+
+def load_baseline(path=BASELINE_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return Counter(json.load(f))
+    except FileNotFoundError:
+        return Counter()
+
+
+def save_baseline(findings, path=BASELINE_PATH):
+    counts = Counter(finding.key for finding in findings)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dict(sorted(counts.items())), f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def new_findings(findings, baseline):
+    """The findings beyond what the baseline accepts (by key and count)."""
+    allowed = Counter(baseline)
+    fresh = []
+    for finding in findings:
+        if allowed[finding.key] > 0:
+            allowed[finding.key] -= 1
+        else:
+            fresh.append(finding)
+    return fresh
+
+
+def format_findings(findings):
+    lines = [f'{f.line:>6}  {f.severity:>2}  {f.rule:<21} {f.scope}: {f.message}' for f in findings]
+    lines.append(f'{len(findings)} finding(s), severity {sum(f.severity for f in findings)}')
+    return '\n'.join(lines)
+
+
+def check(content, baseline_path=BASELINE_PATH):
+    """(all findings, new findings) for `content` against the baseline."""
+    findings = lint(content)
+    return findings, new_findings(findings, load_baseline(baseline_path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.perflint',
+                                     description='Flag hot-path anti-patterns in the page script.')
+    parser.add_argument('--page', default=rules.PAGE_PATH, help='page to lint (default: %(default)s)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='accepted findings (default: %(default)s)')
+    parser.add_argument('--check', action='store_true', help='exit 1 if there are findings not in the baseline')
+    parser.add_argument('--update-baseline', action='store_true', help='accept the current findings')
+    parser.add_argument('--min-severity', type=int, default=1, help='hide findings below this severity')
+    args = parser.parse_args(argv)
+
+    with open(args.page, 'r', encoding='utf-8') as f:
+        content = f.read()
+    findings, fresh = check(content, args.baseline)
+
+    if args.update_baseline:
+        save_baseline(findings, args.baseline)
+        print(f'✅ Baseline updated ({len(findings)} findings)')
+        return 0
+    shown = fresh if args.check else findings
+    shown = [f for f in shown if f.severity >= args.min_severity]
+    if shown:
+        print(format_findings(shown))
+    if args.check:
+        if fresh:
+            print(f'❌ {len(fresh)} new performance finding(s) not in {os.path.basename(args.baseline)}')
+            return 1
+        print(f'✅ No new performance findings ({len(findings)} accepted)')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
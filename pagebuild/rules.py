@@ -0,0 +1,329 @@
+"""
+D&D 5e rules tables
+
+The single source for the level-based rules the page looks up: spell slots
+for full, half and third casters (1st-9th level slots), the highest spell
+level each progression reaches, spells/cantrips known, the caster level used
+for prepared-spell counts, and proficiency bonus.
+
+render_js() compiles them into a block of typed arrays indexed by character
+level (index 0 unused) plus the accessor functions the page calls, so a rules
+query is one array read with no per-call allocation:
+
+    spellSlotTable[(caster * 21 + level) * 10 + spellLevel]
+    maxSpellLevelTable[caster * 21 + level]
+    spellsKnownTable[spellsKnownRows[class] * 21 + level]
+    proficiencyBonusTable[level]
+
+Typed arrays cannot be frozen, so the page reads the tables only through the
+accessors (getSpellSlots, spellsKnown, cantripsKnown, ...), which return
+numbers rather than rows a caller could write into.
+
+The block sits between GENERATED_BEGIN and GENERATED_END in the page.
+
+    python3 -m pagebuild.rules            print the generated block
+    python3 -m pagebuild.rules --update   rewrite the block in the page
+"""
+
+import argparse
+import os
+
+from .manifest import ManifestError, follow_edit
+
+MAX_LEVEL = 20
+SPELL_LEVELS = 10  # slot rows are indexed by spell level 0-9; 0 is always 0
+
+FULL, HALF, THIRD = 0, 1, 2
+CASTER_NAMES = ('CASTER_FULL', 'CASTER_HALF', 'CASTER_THIRD')
+
+# Slots per spell level (1st, 2nd, ...) at each character level, SRD class tables.
+FULL_CASTER_SLOTS = {
+    1: [2],
+    2: [3],
+    3: [4, 2],
+    4: [4, 3],
+    5: [4, 3, 2],
+    6: [4, 3, 3],
+    7: [4, 3, 3, 1],
+    8: [4, 3, 3, 2],
+    9: [4, 3, 3, 3, 1],
+    10: [4, 3, 3, 3, 2],
+    11: [4, 3, 3, 3, 2, 1],
+    12: [4, 3, 3, 3, 2, 1],
+    13: [4, 3, 3, 3, 2, 1, 1],
+    14: [4, 3, 3, 3, 2, 1, 1],
+    15: [4, 3, 3, 3, 2, 1, 1, 1],
+    16: [4, 3, 3, 3, 2, 1, 1, 1],
+    17: [4, 3, 3, 3, 2, 1, 1, 1, 1],
+    18: [4, 3, 3, 3, 3, 1, 1, 1, 1],
+    19: [4, 3, 3, 3, 3, 2, 1, 1, 1],
+    20: [4, 3, 3, 3, 3, 2, 2, 1, 1],
+}
+
+# Paladin, Ranger
+HALF_CASTER_SLOTS = {
+    1: [],
+    2: [2],
+    3: [3],
+    4: [3],
+    5: [4, 2],
+    6: [4, 2],
+    7: [4, 3],
+    8: [4, 3],
+    9: [4, 3, 2],
+    10: [4, 3, 2],
+    11: [4, 3, 3],
+    12: [4, 3, 3],
+    13: [4, 3, 3, 1],
+    14: [4, 3, 3, 1],
+    15: [4, 3, 3, 2],
+    16: [4, 3, 3, 2],
+    17: [4, 3, 3, 3, 1],
+    18: [4, 3, 3, 3, 1],
+    19: [4, 3, 3, 3, 2],
+    20: [4, 3, 3, 3, 2],
+}
+
+# Eldritch Knight, Arcane Trickster
+THIRD_CASTER_SLOTS = {
+    1: [],
+    2: [],
+    3: [2],
+    4: [3],
+    5: [3],
+    6: [3],
+    7: [4, 2],
+    8: [4, 2],
+    9: [4, 2],
+    10: [4, 3],
+    11: [4, 3],
+    12: [4, 3],
+    13: [4, 3, 2],
+    14: [4, 3, 2],
+    15: [4, 3, 2],
+    16: [4, 3, 3],
+    17: [4, 3, 3],
+    18: [4, 3, 3],
+    19: [4, 3, 3, 1],
+    20: [4, 3, 3, 1],
+}
+
+SLOT_TABLES = {FULL: FULL_CASTER_SLOTS, HALF: HALF_CASTER_SLOTS, THIRD: THIRD_CASTER_SLOTS}
+
+# Spells known (spellbook size for wizards), by character level 1-20.
+SPELLS_KNOWN = {
+    'bard': [4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 15, 16, 18, 19, 20, 22, 22, 22],
+    'sorcerer': [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 12, 13, 13, 14, 14, 15, 15, 15, 15],
+    'warlock': [2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 11, 11, 12, 12, 13, 13, 14, 14, 15, 15],
+    'ranger': [0, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10, 11, 11],
+    'wizard': [6, 8, 10, 12, 14, 16, 18, 20, 22, 24, 26, 28, 30, 32, 34, 36, 38, 40, 42, 44],
+}
+
+CANTRIPS_KNOWN = {
+    'bard': [2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4],
+    'cleric': [3, 3, 3, 4, 4, 4, 4, 4, 4, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5],
+    'druid': [2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4],
+    'sorcerer': [4, 4, 4, 5, 5, 5, 5, 5, 5, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6, 6],
+    'warlock': [2, 2, 2, 3, 3, 3, 3, 3, 3, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4],
+    'wizard': [3, 3, 3, 4, 4, 4, 4, 4, 4, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5],
+}
+
+THIRD_CASTER_SPELLS_KNOWN = [0, 0, 3, 4, 4, 4, 5, 6, 6, 7, 8, 8, 9, 10, 10, 11, 11, 11, 12, 13]
+THIRD_CASTER_CANTRIPS_KNOWN = [0, 0, 2, 2, 2, 2, 2, 2, 2, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3, 3]
+
+# Eldritch Knight / Arcane Trickster rows of the known tables
+THIRD_CASTER_ROW = 'thirdcaster'
+
+GENERATED_BEGIN = '    // BEGIN rules tables generated by pagebuild/rules.py - edit them there\n'
+GENERATED_END = '    // END rules tables\n'
+
+PAGE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'test-enhanced-features.html')
+
+
+def proficiency_bonus(level):
+    return 2 + (level - 1) // 4
+
+
+def prepared_caster_level(caster, level):
+    """Level added to the ability modifier for prepared spells."""
+    return level if caster == FULL else level // 2
+
+
+def known_rows(tables, third_caster):
+    """{class: levels 1-20} with the 1/3 caster row last, in the page's row order."""
+    return {**dict(sorted(tables.items())), THIRD_CASTER_ROW: third_caster}
+
+
+def spells_known(char_class, level):
+    """Python mirror of the page's spellsKnown(); 0 for classes that prepare."""
+    rows = known_rows(SPELLS_KNOWN, THIRD_CASTER_SPELLS_KNOWN)
+    return by_level(rows[char_class])[level] if char_class in rows and 1 <= level <= MAX_LEVEL else 0
+
+
+def cantrips_known(char_class, level):
+    """Python mirror of the page's cantripsKnown()."""
+    rows = known_rows(CANTRIPS_KNOWN, THIRD_CASTER_CANTRIPS_KNOWN)
+    return by_level(rows[char_class])[level] if char_class in rows and 1 <= level <= MAX_LEVEL else 0
+
+
+def by_level(values):
+    """Prefix a 1-20 list with the unused level-0 slot."""
+    if len(values) != MAX_LEVEL:
+        raise ValueError(f'expected {MAX_LEVEL} levels, got {len(values)}')
+    return [0] + list(values)
+
+
+def slot_rows(caster):
+    """Flattened slots for one progression: row = level, column = spell level."""
+    table = SLOT_TABLES[caster]
+    rows = [0] * SPELL_LEVELS
+    for level in range(1, MAX_LEVEL + 1):
+        slots = table[level]
+        if len(slots) >= SPELL_LEVELS:
+            raise ValueError(f'level {level} lists more than 9 spell levels')
+        rows += [0] + slots + [0] * (SPELL_LEVELS - 1 - len(slots))
+    return rows
+
+
+def max_spell_levels(caster):
+    return by_level([len(SLOT_TABLES[caster][level]) for level in range(1, MAX_LEVEL + 1)])
+
+
+def spell_slots(caster, level, spell_level):
+    """Python mirror of the page's table lookup."""
+    if not 1 <= level <= MAX_LEVEL or not 1 <= spell_level < SPELL_LEVELS:
+        return 0
+    return slot_rows(caster)[level * SPELL_LEVELS + spell_level]
+
+
+def _array(values):
+    return f"new Uint8Array([{', '.join(str(v) for v in values)}])"
+
+
+def _known_table(name, rows, comment):
+    """One flat table per known count, class rows of 21 levels, plus the row index."""
+    index = ', '.join(f'{cls}: {i}' for i, cls in enumerate(rows))
+    return [
+        f'    // {comment}: {name}Table[{name}Rows[class] * {MAX_LEVEL + 1} + level]',
+        f'    const {name}Table = {_array([v for values in rows.values() for v in by_level(values)])};',
+        f'    const {name}Rows = Object.freeze({{ {index} }});',
+    ]
+
+
+def render_js():
+    """The generated block, GENERATED_BEGIN/END markers included."""
+    stride = MAX_LEVEL + 1
+    casters = (FULL, HALF, THIRD)
+    slots = [v for caster in casters for v in slot_rows(caster)]
+    max_levels = [v for caster in casters for v in max_spell_levels(caster)]
+    prepared = [v for caster in casters for v in by_level(
+        [prepared_caster_level(caster, level) for level in range(1, MAX_LEVEL + 1)])]
+    proficiency = by_level([proficiency_bonus(level) for level in range(1, MAX_LEVEL + 1)])
+
+    lines = [
+        f'    const RULES_MAX_LEVEL = {MAX_LEVEL};',
+        f"    const {', '.join(f'{name} = {i}' for i, name in enumerate(CASTER_NAMES))};",
+        '',
+        '    // Slots per spell level: spellSlotTable[(caster * 21 + level) * 10 + spellLevel]',
+        f'    const spellSlotTable = {_array(slots)};',
+        '',
+        '    // Highest spell level with slots: maxSpellLevelTable[caster * 21 + level]',
+        f'    const maxSpellLevelTable = {_array(max_levels)};',
+        '',
+        '    // Level added to the ability modifier for prepared spells: preparedLevelTable[caster * 21 + level]',
+        f'    const preparedLevelTable = {_array(prepared)};',
+        '',
+        f'    const proficiencyBonusTable = {_array(proficiency)};',
+        '',
+    ]
+    lines += _known_table('spellsKnown', known_rows(SPELLS_KNOWN, THIRD_CASTER_SPELLS_KNOWN),
+                          'Spells known (a wizard\'s spellbook size)')
+    lines.append('')
+    lines += _known_table('cantripsKnown', known_rows(CANTRIPS_KNOWN, THIRD_CASTER_CANTRIPS_KNOWN),
+                          'Cantrips known')
+    lines += [
+        '',
+        "    const casterTypeIndex = Object.freeze({ caster: CASTER_FULL, halfcaster: CASTER_HALF, thirdcaster: CASTER_THIRD });",
+        '',
+        '    function rulesLevel(level) {',
+        '      return level >= 1 && level <= RULES_MAX_LEVEL ? level | 0 : 0;',
+        '    }',
+        '',
+        '    // Spell slots for a character level, class type (caster/halfcaster/thirdcaster) and spell level',
+        '    function getSpellSlots(characterLevel, classType, spellLevel) {',
+        '      if (!(spellLevel >= 1 && spellLevel <= 9)) return 0;',
+        '      const caster = casterTypeIndex[classType] ?? CASTER_FULL;',
+        f'      return spellSlotTable[(caster * {stride} + rulesLevel(characterLevel)) * {SPELL_LEVELS} + spellLevel];',
+        '    }',
+        '',
+        '    function maxSpellLevelFor(caster, level) {',
+        f'      return maxSpellLevelTable[caster * {stride} + rulesLevel(level)];',
+        '    }',
+        '',
+        '    function preparedCasterLevel(caster, level) {',
+        f'      return preparedLevelTable[caster * {stride} + rulesLevel(level)];',
+        '    }',
+        '',
+        '    function proficiencyBonus(level) {',
+        '      return proficiencyBonusTable[rulesLevel(level)] || 2;',
+        '    }',
+        '',
+        '    // Spells known for a class (or \'thirdcaster\') at a level; 0 for classes that prepare',
+        '    function spellsKnown(charClass, level) {',
+        '      if (!Object.hasOwn(spellsKnownRows, charClass)) return 0;',
+        f'      return spellsKnownTable[spellsKnownRows[charClass] * {stride} + rulesLevel(level)];',
+        '    }',
+        '',
+        '    function cantripsKnown(charClass, level) {',
+        '      if (!Object.hasOwn(cantripsKnownRows, charClass)) return 0;',
+        f'      return cantripsKnownTable[cantripsKnownRows[charClass] * {stride} + rulesLevel(level)];',
+        '    }',
+    ]
+    return GENERATED_BEGIN + '\n'.join(lines) + '\n' + GENERATED_END
+
+
+def replace_generated(content, block=None):
+    """Swap the generated block in `content`; returns (content, found)."""
+    start = content.find(GENERATED_BEGIN)
+    end = content.find(GENERATED_END, start)
+    if start == -1 or end == -1:
+        return content, False
+    block = render_js() if block is None else block
+    return content[:start] + block + content[end + len(GENERATED_END):], True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.rules',
+                                     description='Generate the page\'s 5e rules lookup tables.')
+    parser.add_argument('--update', action='store_true', help='rewrite the generated block in the page')
+    parser.add_argument('--page', default=PAGE_PATH, help='page to update (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    block = render_js()
+    if not args.update:
+        print(block, end='')
+        return 0
+
+    with open(args.page, 'r') as f:
+        content = f.read()
+    updated, found = replace_generated(content, block)
+    if not found:
+        print('⚠️ Could not find the generated rules block (apply add-rules-tables.py first)')
+        return 1
+    if updated != content:
+        try:
+            follow_edit(args.page, content, updated)
+        except ManifestError as exc:
+            print(f'❌ {exc}')
+            return 1
+        with open(args.page, 'w') as f:
+            f.write(updated)
+        print('✅ Updated rules tables')
+    else:
+        print('✅ Rules tables already up to date')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
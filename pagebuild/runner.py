@@ -0,0 +1,365 @@
+"""
+Single-pass patch runner
+
+Loads test-enhanced-features.html once, runs every registered add-*/fix-*
+script against the shared buffer in the declared order, and writes the page
+back once at the end. Each patch is timed and charged for the bytes it read
+from (scanned) and wrote to the buffer.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import runpy
+import time
+from dataclasses import dataclass
+
+from . import anchors
+from .document import PAGE_NAME, Document
+from .manifest import Manifest, ManifestError, change_sha256, changed_hunks, file_sha256, manifest_path, sha256
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass(frozen=True)
+class Patch:
+    """A patch script in the repo root, identified by its file name."""
+
+    name: str
+    script: str
+
+    def path(self, root=REPO_ROOT):
+        return os.path.join(root, self.script)
+
+
+@dataclass
+class PatchResult:
+    patch: Patch
+    status: str = 'unchanged'  # applied | unchanged | skipped | failed
+    seconds: float = 0.0
+    bytes_scanned: int = 0
+    bytes_written: int = 0
+    output: str = ''
+    error: str = ''
+
+
+def _patch(script):
+    return Patch(name=script[:-3], script=script)
+
+
+# Declared application order. Later patches anchor on code inserted by
+# earlier ones, so new scripts are appended at the end.
+PATCHES = tuple(_patch(script) for script in (
+    'fix-test-page.py',
+    'fix-html-issues.py',
+    'fix-critical-errors.py',
+    'fix-remaining-issues.py',
+    'debug-and-fix.py',
+    'debug-character-menu.py',
+    'fix-character-menu.py',
+    'hoist-spell-vars.py',
+    'fix-spell-casting.py',
+    'add-hp-editor.py',
+    'insert-battle-hp.py',
+    'add-battle-hp-sync.py',
+    'fix-all-issues.py',
+    'add-spell-fallback.py',
+    'add-spell-fallback-v2.py',
+    'add-class-filter.py',
+    'add-class-filter-v2.py',
+    'add-classes-to-main-fetch.py',
+    'fix-modal-layering.py',
+    'fix-spell-issues.py',
+    'fix-cantrip-system.py',
+    'add-character-creator.py',
+    'add-auto-build-part2.py',
+    'add-spell-mechanics-part1.py',
+    'add-spell-mechanics-part2.py',
+    'fix-autopop-abilities.py',
+    'fix-spell-fallback.py',
+    'add-auto-add-more-button.py',
+    'add-ability-picker-part1.py',
+    'add-ability-picker-part2.py',
+    'add-5e-progression.py',
+    'add-stat-saves-part1.py',
+    'fix-cantrip-button-visibility.py',
+    'hide-spells-tab-and-update-buttons.py',
+    'fix-rest-initiative-and-modifiers.py',
+    'fix-spell-attack-rolls.py',
+    'add-compiled-spells.py',
+    'add-lazy-spell-details.py',
+    'add-spell-search-index.py',
+    'add-virtual-spell-picker.py',
+    'add-battle-log-buffer.py',
+    'add-rules-tables.py',
+    'add-spell-loadouts.py',
+    'add-spell-records.py',
+    'add-dice-engine.py',
+    'add-dice-odds.py',
+    'add-compiled-spell-mechanics.py',
+    'add-server-spell-queries.py',
+    'add-embedded-fallback.py',
+    'add-character-render.py',
+    'add-character-store.py',
+))
+
+
+def select_patches(names=None, patches=PATCHES):
+    """Return the registered patches named in `names`, keeping declared order."""
+    if not names:
+        return list(patches)
+    wanted = {name[:-3] if name.endswith('.py') else name for name in names}
+    unknown = wanted - {patch.name for patch in patches}
+    if unknown:
+        raise KeyError(f"Unknown patch(es): {', '.join(sorted(unknown))}")
+    return [patch for patch in patches if patch.name in wanted]
+
+
+def apply_patch(document, patch, root=REPO_ROOT):
+    """Run one patch script against the shared document."""
+    result = PatchResult(patch=patch)
+    before = document.text
+    document.reset_counters()
+    captured = io.StringIO()
+    cwd = os.getcwd()
+    start = time.perf_counter()
+    try:
+        os.chdir(root)
+        with document.redirect(), contextlib.redirect_stdout(captured):
+            runpy.run_path(patch.path(root), run_name='__main__')
+    except SystemExit as exc:
+        if exc.code not in (None, 0):
+            result.status = 'failed'
+            result.error = f'exited with status {exc.code}'
+    except Exception as exc:  # a broken patch must not take the build down
+        result.status = 'failed'
+        result.error = f'{type(exc).__name__}: {exc}'
+    finally:
+        os.chdir(cwd)
+    result.seconds = time.perf_counter() - start
+    result.bytes_scanned = document.bytes_read
+    result.bytes_written = document.bytes_written
+    result.output = captured.getvalue()
+
+    if result.status == 'failed':
+        document.text = before
+    elif document.text != before:
+        result.status = 'applied'
+    return result
+
+
+def probe_patch(document, patch, root=REPO_ROOT):
+    """change_sha256 of what running `patch` would do to the page, without keeping it."""
+    scratch = Document(document.path, document.text)
+    with anchors.kept_table():
+        apply_patch(scratch, patch, root)
+    return change_sha256(document.text, scratch.text)
+
+
+def _record_probes(manifest, document, root, refresh):
+    """Probe the regionless 'applied' entries (all of them with `refresh`, else the unprobed ones)."""
+    by_name = {patch.name: patch for patch in PATCHES}
+    for entry in manifest.entries.values():
+        if manifest.needs_probe(entry) and entry.patch in by_name and (refresh or not entry.probe_sha256):
+            entry.probe_sha256 = probe_patch(document, by_name[entry.patch], root)
+
+
+def _skip_result(manifest, patch, script_sha, document, root, page_unchanged):
+    """A 'skipped' result if the manifest says the patch is already applied.
+
+    A skipped patch never reads the page buffer, so it is charged 0 bytes
+    scanned; the hashing (and any dry run) time shows up in `seconds`.
+    """
+    start = time.perf_counter()
+    if not manifest.can_skip(patch.name, script_sha, document.text, page_unchanged,
+                             probe=lambda: probe_patch(document, patch, root)):
+        return None
+    return PatchResult(patch=patch, status='skipped', seconds=time.perf_counter() - start)
+
+
+def _apply_tracked(document, patch, manifest, root, page_unchanged, patches=()):
+    """Skip or apply one patch, keeping the manifest and the anchor table in step with the page.
+
+    The anchor table covers the anchors of every patch in `patches`; it is
+    built when the first of them actually runs and then follows each edit.
+    """
+    script_sha = file_sha256(patch.path(root))
+    skipped = _skip_result(manifest, patch, script_sha, document, root, page_unchanged)
+    if skipped:
+        return skipped
+    anchors.anchor_table(document.text, anchors.anchor_texts(tuple(patches) or (patch,), root))
+    before = document.text
+    result = apply_patch(document, patch, root)
+    hunks = changed_hunks(before, document.text) if result.status == 'applied' else []
+    anchors.follow(before, document.text, [(start, old_end, new_end - new_start)
+                                           for start, old_end, new_start, new_end in hunks])
+    if result.status == 'applied':
+        manifest.apply_hunks(hunks)
+        manifest.record(patch.name, script_sha, result.status,
+                        [(new_start, new_end) for _, _, new_start, new_end in hunks])
+    else:
+        manifest.record(patch.name, script_sha, result.status)
+    return result
+
+
+def run_patches(source, output=None, patches=None, root=REPO_ROOT, write=True,
+                use_manifest=True):
+    """Apply `patches` (default: all registered) to `source` in one pass.
+
+    Returns (document, results). The page is written to `output` (default:
+    `source`) only if some patch changed it. With `use_manifest`, patches
+    whose recorded output is still present in the page are skipped and the
+    manifest next to the output is updated.
+
+    Raises ManifestError, with nothing written, if a patch recorded as
+    applied can no longer be found in the page.
+    """
+    document = Document.load(source)
+    original = document.text
+    target = output or source
+    manifest = Manifest.load(manifest_path(target)) if use_manifest else Manifest(manifest_path(target))
+    page_unchanged = bool(manifest.output_sha256) and sha256(original) == manifest.output_sha256
+
+    patches = tuple(PATCHES if patches is None else patches)
+    if not page_unchanged:
+        # The page was edited outside the runner: find the regions it moved.
+        # Only a patch whose script changed may run over output that is gone.
+        rerun = {patch.name for patch in patches if manifest.get(patch.name)
+                 and manifest.get(patch.name).script_sha256 != file_sha256(patch.path(root))}
+        missing = [name for name in manifest.locate(original) if name not in rerun]
+        if missing:
+            raise ManifestError(f'recorded output of {", ".join(missing)} is no longer in the page')
+    results = [_apply_tracked(document, patch, manifest, root, page_unchanged, patches)
+               for patch in patches]
+
+    changed = document.text != original
+    if write:
+        if changed:
+            document.save(target)
+        if use_manifest and (changed or not page_unchanged or any(r.status != 'skipped' for r in results)):
+            _record_probes(manifest, document, root, refresh=changed)
+            manifest.finalize(document.text)
+            manifest.save()
+    return document, results
+
+
+def format_anchor_report(problems):
+    lines = []
+    for anchor, status, offsets in problems:
+        where = f' at offsets {offsets[:5]}' if offsets else ''
+        first_line = anchor.text.strip().splitlines()[0] if anchor.text.strip() else ''
+        lines.append(f'{status:<10} {anchor.patch}:{anchor.line} {anchor.variable}{where}')
+        lines.append(f'    {first_line[:90]}')
+    blocking = sum(status in (anchors.MISSING, anchors.AMBIGUOUS) for _, status, _ in problems)
+    lines.append(f'{len(problems)} anchor problem(s), {blocking} blocking')
+    return '\n'.join(lines)
+
+
+def format_report(results):
+    lines = [f"{'patch':<40} {'status':<10} {'ms':>8} {'scanned':>10} {'written':>10}"]
+    for r in results:
+        lines.append(
+            f'{r.patch.name:<40} {r.status:<10} {r.seconds * 1000:>8.1f} '
+            f'{r.bytes_scanned:>10,} {r.bytes_written:>10,}'
+        )
+        if r.error:
+            lines.append(f'    ❌ {r.error}')
+    total_ms = sum(r.seconds for r in results) * 1000
+    total_scanned = sum(r.bytes_scanned for r in results)
+    applied = sum(r.status == 'applied' for r in results)
+    skipped = sum(r.status == 'skipped' for r in results)
+    failed = sum(r.status == 'failed' for r in results)
+    lines.append(
+        f'{len(results)} patches, {applied} applied, {skipped} skipped, {failed} failed, '
+        f'{total_ms:.1f} ms, {total_scanned:,} bytes scanned'
+    )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python3 -m pagebuild',
+        description=f'Apply the registered patches to {PAGE_NAME} in one pass.',
+    )
+    parser.add_argument('--source', default=os.path.join(REPO_ROOT, PAGE_NAME),
+                        help='page to read (default: %(default)s)')
+    parser.add_argument('--output', help='where to write the result (default: --source)')
+    parser.add_argument('--only', nargs='+', metavar='PATCH',
+                        help='run only these patches, in declared order')
+    parser.add_argument('--list', action='store_true', help='print the declared order and exit')
+    parser.add_argument('--check-anchors', action='store_true',
+                        help='report anchors that match zero or several times, then exit')
+    parser.add_argument('--strict-anchors', action='store_true',
+                        help='refuse to rewrite anything if an anchor is missing or ambiguous')
+    parser.add_argument('--force', action='store_true',
+                        help='ignore the applied-patch manifest and run every patch')
+    parser.add_argument('--mark-applied', action='store_true',
+                        help='record the selected patches as applied to the page without running them')
+    parser.add_argument('--perf-lint', action='store_true',
+                        help='fail if the patched page has performance findings not in the baseline')
+    parser.add_argument('--dry-run', action='store_true', help='do not write the result')
+    parser.add_argument('-v', '--verbose', action='store_true', help="echo each patch's own output")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for i, patch in enumerate(PATCHES, 1):
+            print(f'{i:>3}. {patch.script}')
+        return 0
+
+    try:
+        patches = select_patches(args.only)
+    except KeyError as exc:
+        parser.error(exc.args[0])
+
+    if args.mark_applied:
+        target = args.output or args.source
+        manifest = Manifest.load(manifest_path(target))
+        for patch in patches:
+            manifest.mark_applied(patch.name, file_sha256(patch.path()))
+        manifest.order([patch.name for patch in PATCHES])
+        document = Document.load(target)
+        _record_probes(manifest, document, REPO_ROOT, refresh=False)
+        manifest.finalize(document.text)
+        manifest.save()
+        print(f'✅ Marked {len(patches)} patch(es) as applied in {os.path.basename(manifest.path)}')
+        return 0
+
+    if args.check_anchors or args.strict_anchors:
+        problems = anchors.preflight(Document.load(args.source).text, patches)
+        if problems:
+            print(format_anchor_report(problems))
+        blocking = any(status in (anchors.MISSING, anchors.AMBIGUOUS) for _, status, _ in problems)
+        if args.check_anchors:
+            return 1 if blocking else 0
+        if blocking:
+            print('❌ Anchor preflight failed; nothing was rewritten')
+            return 1
+
+    try:
+        document, results = run_patches(args.source, args.output, patches,
+                                        write=not args.dry_run, use_manifest=not args.force)
+    except ManifestError as exc:
+        print(f'❌ {exc}')
+        print('   Nothing was rewritten. Undo the edit, or rebuild the page with --force from a copy '
+              'without these patches applied.')
+        return 1
+    if args.verbose:
+        for r in results:
+            if r.output.strip():
+                print(f'--- {r.patch.script}')
+                print(r.output.rstrip())
+    print(format_report(results))
+    failed = any(r.status == 'failed' for r in results)
+
+    if args.perf_lint:
+        from . import perflint  # only needed here; keeps `python3 -m pagebuild.perflint` clean
+        findings, fresh = perflint.check(document.text)
+        if fresh:
+            print(perflint.format_findings(fresh))
+            print(f'❌ {len(fresh)} new performance finding(s); fix them or accept them with '
+                  'python3 -m pagebuild.perflint --update-baseline')
+            failed = True
+        else:
+            print(f'✅ No new performance findings ({len(findings)} accepted)')
+    return 1 if failed else 0
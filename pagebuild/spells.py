@@ -0,0 +1,151 @@
+"""
+Spell build step
+
+Compiles spells-srd.json into spells-compiled.json: the spell list already in
+the shape the spell picker keeps in `allSpellsFromAPI`, so the page only has
+to deserialize it. Everything fetchSpellsFromAPI used to do per load happens
+here once: slugified index, numeric level, capitalised school, concentration
+flag and normalized (lower-case, sorted) class lists. Damage, saves, attack
+rolls, healing and level scaling come from the description via mechanics.py,
+whose cache means an SRD re-import only re-parses the spells that changed.
+
+The page itself loads the same data split in two:
+
+    spells-index.json             summary fields the picker list needs
+    spell-shards/level-N.json     {index: remaining fields} per spell level,
+                                  fetched the first time a spell is opened
+    spells-search.json            trigram and facet index (see spellsearch.py)
+
+    python3 -m pagebuild.spells
+"""
+
+import argparse
+import json
+import os
+import re
+
+from .mechanics import MechanicsCache
+from .spellsearch import SEARCH_NAME, build_search_index
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRD_PATH = os.path.join(REPO_ROOT, 'spells-srd.json')
+COMPILED_NAME = 'spells-compiled.json'
+INDEX_NAME = 'spells-index.json'
+SHARD_DIR = 'spell-shards'
+
+# Fields in spells-index.json; everything else goes to the level shards.
+SUMMARY_FIELDS = ('index', 'name', 'level', 'school', 'classes')
+
+# Same patterns the page used (JS \w is ASCII-only, hence re.ASCII).
+_WHITESPACE = re.compile(r'\s+')
+_NON_WORD = re.compile(r'[^\w-]', re.ASCII)
+
+
+def load_srd(path=SRD_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def slugify(name):
+    """Spell index as the page builds it: 'Melf's Acid Arrow' -> 'melfs-acid-arrow'."""
+    return _NON_WORD.sub('', _WHITESPACE.sub('-', name.lower()))
+
+
+def parse_level(level):
+    return 0 if level == 'cantrip' else int(level)
+
+
+def normalize_classes(classes):
+    return sorted({c.lower() for c in classes or () if isinstance(c, str)})
+
+
+def compile_spell(spell, mechanics):
+    """One SRD spell in the picker's internal (allSpellsFromAPI) shape."""
+    description = spell.get('description', '')
+    school = spell.get('school', '')
+    duration = spell.get('duration', '')
+    return {
+        'index': slugify(spell['name']),
+        'name': spell['name'],
+        'level': parse_level(spell['level']),
+        'school': {'name': school[:1].upper() + school[1:]},
+        'desc': [description],
+        'casting_time': spell.get('casting_time'),
+        'range': spell.get('range'),
+        'components': (spell.get('components') or {}).get('raw') or 'V, S',
+        'duration': duration,
+        'concentration': 'concentration' in duration.lower(),
+        'ritual': bool(spell.get('ritual')),
+        'damage': mechanics['dice'],
+        'dc': {'dc_type': {'name': mechanics['save']}} if mechanics['save'] else None,
+        'attack_roll': mechanics['attack'] is not None,
+        'classes': normalize_classes(spell.get('classes')),
+        'mechanics': mechanics,
+    }
+
+
+def compile_spells(spells, cache=None):
+    """Compile every spell, reusing `cache`d mechanics where the text is unchanged."""
+    if cache is None:
+        cache = MechanicsCache(path=None)
+    return [compile_spell(spell, cache.get(spell)) for spell in spells]
+
+
+def summarize(compiled):
+    return [{field: spell[field] for field in SUMMARY_FIELDS} for spell in compiled]
+
+
+def shard_by_level(compiled):
+    """Map level -> {spell index: detail fields}."""
+    shards = {}
+    for spell in compiled:
+        details = {k: v for k, v in spell.items() if k not in SUMMARY_FIELDS}
+        shards.setdefault(spell['level'], {})[spell['index']] = details
+    return dict(sorted(shards.items()))
+
+
+def shard_name(level):
+    return f'{SHARD_DIR}/level-{level}.json'
+
+
+def write_json(path, data):
+    """Write compact JSON; returns the number of bytes written."""
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return len(text.encode('utf-8'))
+
+
+def build(source=SRD_PATH, out_dir=REPO_ROOT, cache=None):
+    """Compile `source` into out_dir; returns {file name: bytes written}."""
+    compiled = compile_spells(load_srd(source), cache)
+    written = {
+        COMPILED_NAME: write_json(os.path.join(out_dir, COMPILED_NAME), compiled),
+        INDEX_NAME: write_json(os.path.join(out_dir, INDEX_NAME), summarize(compiled)),
+        SEARCH_NAME: write_json(os.path.join(out_dir, SEARCH_NAME), build_search_index(compiled)),
+    }
+    os.makedirs(os.path.join(out_dir, SHARD_DIR), exist_ok=True)
+    for level, shard in shard_by_level(compiled).items():
+        name = shard_name(level)
+        written[name] = write_json(os.path.join(out_dir, name), shard)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.spells',
+                                     description='Compile spells-srd.json for the spell picker.')
+    parser.add_argument('--source', default=SRD_PATH, help='SRD spell list (default: %(default)s)')
+    parser.add_argument('--out-dir', default=REPO_ROOT, help='output directory (default: repo root)')
+    parser.add_argument('--reparse', action='store_true', help='ignore the mechanics cache and parse every spell')
+    args = parser.parse_args(argv)
+
+    cache = MechanicsCache() if args.reparse else MechanicsCache.load()
+    for name, size in build(args.source, args.out_dir, cache).items():
+        print(f'✅ Wrote {name} ({size:,} bytes)')
+    cache.save()
+    print(f'✅ Spell mechanics: {cache.misses} parsed, {cache.hits} cached')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
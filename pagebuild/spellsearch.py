@@ -0,0 +1,101 @@
+"""
+Spell picker search index
+
+Built alongside spells-index.json and addressed by position in it (spell id =
+array index). The picker answers a query with set operations instead of
+rescanning every spell on each keystroke:
+
+    trigrams   lower-case name trigram -> sorted spell ids, delta-encoded
+               ([first, gap, gap, ...]); a query of 3+ characters ANDs the
+               postings of its trigrams, then confirms the few candidates
+    classes    class  -> membership bitset
+    levels     level  -> membership bitset
+    schools    school -> membership bitset (the search term also matches
+               school names, as the linear filter did)
+
+Bitsets are lists of 32-bit words, bit i of word w marking spell w * 32 + i,
+so the page can load them straight into Uint32Arrays.
+"""
+
+SEARCH_NAME = 'spells-search.json'
+SEARCH_VERSION = 1
+GRAM = 3
+
+
+def name_grams(name, n=GRAM):
+    name = name.lower()
+    return {name[i:i + n] for i in range(len(name) - n + 1)}
+
+
+def delta_encode(ids):
+    ids = sorted(ids)
+    return ids[:1] + [b - a for a, b in zip(ids, ids[1:])]
+
+
+def delta_decode(gaps):
+    ids, total = [], 0
+    for i, gap in enumerate(gaps):
+        total = gap if i == 0 else total + gap
+        ids.append(total)
+    return ids
+
+
+def bitset(ids, count):
+    words = [0] * ((count + 31) // 32)
+    for i in ids:
+        words[i >> 5] |= 1 << (i & 31)
+    return words
+
+
+def bitset_ids(words):
+    return [w * 32 + bit for w, word in enumerate(words) for bit in range(32) if word >> bit & 1]
+
+
+def build_search_index(spells):
+    """Search index over `spells` (compiled or summary records, in page order)."""
+    count = len(spells)
+    trigrams, classes, levels, schools = {}, {}, {}, {}
+    for i, spell in enumerate(spells):
+        for gram in name_grams(spell['name']):
+            trigrams.setdefault(gram, []).append(i)
+        for cls in spell.get('classes', ()):
+            classes.setdefault(cls, []).append(i)
+        levels.setdefault(str(spell['level']), []).append(i)
+        schools.setdefault(spell['school']['name'], []).append(i)
+
+    def facet(groups):
+        return {key: bitset(ids, count) for key, ids in sorted(groups.items())}
+
+    return {
+        'version': SEARCH_VERSION,
+        'count': count,
+        'gram': GRAM,
+        'trigrams': {gram: delta_encode(ids) for gram, ids in sorted(trigrams.items())},
+        'classes': facet(classes),
+        'levels': facet(levels),
+        'schools': facet(schools),
+    }
+
+
+def search(index, spells, term='', level='all', cls='all'):
+    """Reference implementation of the page's query; returns matching ids."""
+    count = index['count']
+    result = set(range(count))
+    if level != 'all':
+        result &= set(bitset_ids(index['levels'].get(str(level), [])))
+    if cls != 'all':
+        result &= set(bitset_ids(index['classes'].get(cls, [])))
+    term = term.lower()
+    if term:
+        if len(term) >= index['gram']:
+            names = set(range(count))
+            for gram in name_grams(term, index['gram']):
+                names &= set(delta_decode(index['trigrams'].get(gram, [])))
+        else:
+            names = set(range(count))
+        names = {i for i in names if term in spells[i]['name'].lower()}
+        for school, words in index['schools'].items():
+            if term in school.lower():
+                names |= set(bitset_ids(words))
+        result &= names
+    return sorted(result)
@@ -0,0 +1,371 @@
+"""
+Static file server
+
+A threaded HTTP/1.1 replacement for `python3 -m http.server`, which answers
+one request at a time, closes the connection after each, re-reads every file
+from disk and sends no validators or caching headers. Here:
+
+    keep-alive      HTTP/1.1, every response carries a Content-Length
+    hot files       text files up to HOT_FILE_LIMIT (the page, spells-srd.json,
+                    the compiled spell data) are held in memory with their
+                    gzip (and brotli, when the module is installed) variants,
+                    invalidated by mtime/size, LRU within CACHE_BUDGET bytes
+    precompressed   foo.js.br / foo.js.gz next to foo.js are served to clients
+                    that accept them (and preferred over compressing in memory)
+    validators      strong ETags and Last-Modified; If-None-Match (compared
+                    weakly, so W/"..." matches) and If-Modified-Since answer 304
+    Cache-Control   no-cache (always revalidate) by default; images and fonts
+                    may be cached for a day, and content-hashed build output
+                    (assets/page.<hash>.js from pagebuild/assets.py) for a year
+    ranges          single `Range: bytes=` requests get 206 (416 when
+                    unsatisfiable), honouring If-Range
+    sendfile        everything not held in memory (the JPEGs in
+                    public/images/adventures, shards, ...) goes from the file
+                    to the socket with os.sendfile, without a userspace copy
+
+Directories without an index.html are listed as http.server does.
+
+    python3 -m pagebuild.staticserver              serve the repo root on 8000
+    python3 -m pagebuild.staticserver --port 8080 --directory public
+"""
+
+import argparse
+import collections
+import email.utils
+import functools
+import gzip
+import hashlib
+import http.server
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HOT_FILE_LIMIT = 4 * 1024 * 1024
+CACHE_BUDGET = 64 * 1024 * 1024
+GZIP_LEVEL = 6
+SENDFILE_CHUNK = 1 << 20
+
+# Content-Encoding -> precompressed file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                      'image/svg+xml')
+LONG_LIVED_SUFFIXES = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.ico', '.woff', '.woff2')
+LONG_LIVED_MAX_AGE = 86400
+# A name that changes whenever the content does (see pagebuild/assets.py)
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.(css|js)$')
+BYTE_RANGE = re.compile(r'bytes=[ \t]*([0-9]*)-([0-9]*)[ \t]*$')
+IMMUTABLE_MAX_AGE = 31536000
+
+
+def compressible(content_type):
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _compress(encoding, data):
+    if encoding == 'gzip':
+        return gzip.compress(data, GZIP_LEVEL, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data)
+    return None
+
+
+@dataclass(frozen=True)
+class CachedFile:
+    stamp: tuple
+    body: bytes
+    etag: str
+    variants: dict = field(default_factory=dict)  # encoding -> compressed body
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(v) for v in self.variants.values())
+
+
+class FileCache:
+    """Hot text files in memory, keyed by path and invalidated by (mtime, size)."""
+
+    def __init__(self, budget=CACHE_BUDGET, file_limit=HOT_FILE_LIMIT):
+        self.budget = budget
+        self.file_limit = file_limit
+        self._entries = collections.OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def get(self, path, stat, content_type):
+        """The cached file, loading it if needed; None when it isn't cacheable."""
+        if stat.st_size > self.file_limit or not compressible(content_type):
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(path)
+                return entry
+
+        entry = self._load(path, stamp)
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._used -= old.size
+            self._entries[path] = entry
+            self._used += entry.size
+            while self._used > self.budget and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._used -= evicted.size
+        return entry
+
+    @staticmethod
+    def _load(path, stamp):
+        with open(path, 'rb') as f:
+            body = f.read()
+        variants = {}
+        for encoding, suffix in ENCODINGS:
+            compressed = _read_if_fresh(path + suffix, stamp[0])
+            if compressed is None:
+                compressed = _compress(encoding, body)
+            if compressed is not None and len(compressed) < len(body):
+                variants[encoding] = compressed
+        etag = '"' + hashlib.sha256(body).hexdigest()[:24] + '"'
+        return CachedFile(stamp, body, etag, variants)
+
+
+def _read_if_fresh(path, mtime_ns):
+    """Contents of a precompressed sibling not older than its source, or None."""
+    try:
+        if os.stat(path).st_mtime_ns < mtime_ns:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def variant_etag(etag, encoding):
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def parse_range(header, size):
+    """(start, end) exclusive for a single `bytes=` range, None when there is
+    no usable range (serve the whole file), or 'unsatisfiable'."""
+    match = BYTE_RANGE.match(header or '')
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:  # the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size
+    start = int(first)
+    if last and int(last) < start:
+        return None  # malformed, so ignored
+    if start >= size:
+        return 'unsatisfiable'
+    return start, min(int(last) + 1 if last else size, size)
+
+
+class StaticRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler with keep-alive, caching, compression, ranges and sendfile."""
+
+    protocol_version = 'HTTP/1.1'
+    cache = FileCache()
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def cache_control(self, path):
+        if HASHED_NAME.search(path):
+            return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        if path.lower().endswith(LONG_LIVED_SUFFIXES):
+            return f'public, max-age={LONG_LIVED_MAX_AGE}'
+        return 'no-cache'
+
+    def _serve(self, send_body):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            index = next((os.path.join(path, name) for name in ('index.html', 'index.htm')
+                          if os.path.isfile(os.path.join(path, name))), None)
+            if index is None or not urlsplit(self.path).path.endswith('/'):
+                # Redirect to the trailing slash, or list the directory
+                return super().do_GET() if send_body else super().do_HEAD()
+            path = index
+        elif path.endswith('/'):
+            return self.send_error(404, 'File not found')
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return self.send_error(404, 'File not found')
+        content_type = self.guess_type(path)
+        is_compressible = compressible(content_type)
+        accepted = self._accepted_encodings() if is_compressible else set()
+
+        encoding = None
+        entry = self.cache.get(path, stat, content_type)
+        if entry is not None:
+            encoding = next((e for e, _ in ENCODINGS if e in accepted and e in entry.variants), None)
+            body = entry.variants[encoding] if encoding else entry.body
+            etag = variant_etag(entry.etag, encoding)
+            source, size = body, len(body)
+        else:
+            source, size = path, stat.st_size
+            for candidate, suffix in ENCODINGS:
+                if candidate not in accepted:
+                    continue
+                try:
+                    compressed = os.stat(path + suffix)
+                except OSError:
+                    continue
+                if compressed.st_mtime_ns >= stat.st_mtime_ns:
+                    encoding, source, size = candidate, path + suffix, compressed.st_size
+                    break
+            etag = variant_etag(f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', encoding)
+
+        headers = [
+            ('ETag', etag),
+            ('Last-Modified', email.utils.formatdate(stat.st_mtime, usegmt=True)),
+            ('Cache-Control', self.cache_control(path)),
+        ]
+        if is_compressible:
+            headers.append(('Vary', 'Accept-Encoding'))
+
+        if self._not_modified(etag, stat.st_mtime):
+            self.send_response(304)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        status, start, end = 200, 0, size
+        if encoding is None:
+            headers.append(('Accept-Ranges', 'bytes'))
+            if_range = self.headers.get('If-Range')
+            byte_range = parse_range(self.headers.get('Range'), size) if if_range in (None, etag) else None
+            if byte_range == 'unsatisfiable':
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if byte_range is not None:
+                status, (start, end) = 206, byte_range
+                headers.append(('Content-Range', f'bytes {start}-{end - 1}/{size}'))
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(end - start))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if not send_body:
+            return
+        if isinstance(source, bytes):
+            self.wfile.write(source[start:end])
+        else:
+            self._send_file(source, start, end)
+
+    def _accepted_encodings(self):
+        """Codings with a nonzero q; `*` stands for every coding not listed."""
+        accepted, refused = set(), set()
+        for part in self.headers.get('Accept-Encoding', '').split(','):
+            name, *params = (piece.strip() for piece in part.split(';'))
+            if not name:
+                continue
+            quality = 1.0
+            for param in params:
+                key, _, value = param.partition('=')
+                if key.strip().lower() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            (accepted if quality > 0 else refused).add(name.lower())
+        if '*' in accepted:
+            accepted |= {name for name, _ in ENCODINGS} - refused
+        return accepted
+
+    def _not_modified(self, etag, mtime):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # Weak comparison: W/"x" matches "x"
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in tags or etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def _send_file(self, path, start, end):
+        with open(path, 'rb') as f:
+            if hasattr(os, 'sendfile'):
+                try:
+                    offset = start
+                    while offset < end:
+                        sent = os.sendfile(self.connection.fileno(), f.fileno(), offset,
+                                           min(SENDFILE_CHUNK, end - offset))
+                        if sent == 0:
+                            break
+                        offset += sent
+                    return
+                except (OSError, AttributeError) as error:
+                    # Sockets without a real descriptor (or platforms that
+                    # refuse): copy, unless part of the body already went out
+                    if isinstance(error, BrokenPipeError) or offset != start:
+                        raise
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(SENDFILE_CHUNK, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+
+def make_handler(handler_class=StaticRequestHandler, directory=REPO_ROOT, **attributes):
+    """A request handler factory serving `directory`, with class attributes set."""
+    attributes.setdefault('cache', FileCache())
+    handler = type(handler_class.__name__, (handler_class,), attributes)
+    return functools.partial(handler, directory=directory)
+
+
+def serve(handler, port=8000, bind='', note=''):
+    with http.server.ThreadingHTTPServer((bind, port), handler) as server:
+        print(f'🌐 Serving {handler.keywords["directory"]} on http://localhost:{port}/{note}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.staticserver',
+                                     description='Serve a directory with caching, compression and ranges.')
+    parser.add_argument('--port', type=int, default=8000, help='port (default: %(default)s)')
+    parser.add_argument('--bind', default='', help='address to bind (default: all interfaces)')
+    parser.add_argument('--directory', default=REPO_ROOT, help='directory to serve (default: repo root)')
+    args = parser.parse_args(argv)
+    return serve(make_handler(directory=args.directory), args.port, args.bind)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,489 @@
+"""
+SQLite spell and item store
+
+Normalizes every spell and item source in the repo into one SQLite database
+(dnd-data.sqlite) that the dev server and offline tools query instead of
+loading and filtering the JSON arrays:
+
+    spells-srd.json           snake_case, level 'cantrip' / '3', class lists
+    data/spells-seed.json     camelCase, level 'Cantrip' / '3rd', written by
+    data/spells-sample.json   scripts/import-dnd-data.js (the 5etools
+                              conversion) and the hand-written samples;
+                              damageFormula, savingThrow {ability: 'DEX'}
+    data/items-seed.json      items, same camelCase shape
+    data/items-sample.json
+
+A spell or item name found in more than one source is kept from the first
+(SRD, then seeds, then samples). Spell damage, saves, attacks and healing come
+from mechanics.py, sharing its cache with pagebuild.spells; a source's own
+damageFormula/savingThrow is the fallback.
+
+Tables:
+
+    spells, items         one row per spell/item, `mechanics`/`properties`
+                          as JSON text
+    spell_classes         (class, level, school, name, spell_id) WITHOUT
+                          ROWID: covers class/level/school filters and the
+                          picker's name order without touching spells
+    spells_by_level,      covering indexes on spells for level/school
+    spells_by_school      filters without a class
+    spells_fts, items_fts FTS5 over names and descriptions (external content,
+                          porter stemming)
+    meta                  schema version and a hash of each source file
+
+The database is written to a temporary file and renamed into place, so a
+server holding the old one open keeps a consistent view.
+
+    python3 -m pagebuild.store                                    rebuild
+    python3 -m pagebuild.store --search fire --class wizard --level 3
+    python3 -m pagebuild.store --items --search sword
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+from .mechanics import MechanicsCache
+from .spells import REPO_ROOT, SRD_PATH, load_srd, normalize_classes, slugify
+
+DB_PATH = os.path.join(REPO_ROOT, 'dnd-data.sqlite')
+DATA_DIR = os.path.join(REPO_ROOT, 'data')
+SCHEMA_VERSION = 1
+NAME_WEIGHT = 10.0  # bm25 weight of a name hit relative to a description hit
+
+# In precedence order: an earlier source wins a name clash
+SPELL_SOURCES = (
+    ('srd', SRD_PATH),
+    ('seed', os.path.join(DATA_DIR, 'spells-seed.json')),
+    ('sample', os.path.join(DATA_DIR, 'spells-sample.json')),
+)
+ITEM_SOURCES = (
+    ('seed', os.path.join(DATA_DIR, 'items-seed.json')),
+    ('sample', os.path.join(DATA_DIR, 'items-sample.json')),
+)
+
+ABILITY_NAMES = {
+    'STR': 'Strength', 'DEX': 'Dexterity', 'CON': 'Constitution',
+    'INT': 'Intelligence', 'WIS': 'Wisdom', 'CHA': 'Charisma',
+}
+
+SCHEMA = '''
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE spells (
+    id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    school TEXT NOT NULL,
+    casting_time TEXT,
+    range TEXT,
+    components TEXT,
+    duration TEXT,
+    concentration INTEGER NOT NULL,
+    ritual INTEGER NOT NULL,
+    damage TEXT,
+    save TEXT,
+    attack TEXT,
+    healing TEXT,
+    description TEXT NOT NULL,
+    higher_levels TEXT,
+    origin TEXT NOT NULL,
+    source TEXT,
+    page INTEGER,
+    mechanics TEXT NOT NULL
+);
+CREATE INDEX spells_by_level ON spells (level, school, name, id);
+CREATE INDEX spells_by_school ON spells (school, level, name, id);
+
+CREATE TABLE spell_classes (
+    class TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    school TEXT NOT NULL,
+    name TEXT NOT NULL,
+    spell_id INTEGER NOT NULL REFERENCES spells (id),
+    PRIMARY KEY (class, level, school, name, spell_id)
+) WITHOUT ROWID;
+
+CREATE VIRTUAL TABLE spells_fts USING fts5 (
+    name, description, content='spells', content_rowid='id', tokenize='porter unicode61'
+);
+
+CREATE TABLE items (
+    id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    rarity TEXT NOT NULL,
+    item_slot TEXT,
+    damage TEXT,
+    armor INTEGER,
+    value INTEGER,
+    weight REAL,
+    properties TEXT NOT NULL,
+    summary TEXT,
+    description TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    source TEXT,
+    page INTEGER
+);
+CREATE INDEX items_by_type ON items (type, rarity, name, id);
+CREATE INDEX items_by_rarity ON items (rarity, type, name, id);
+
+CREATE VIRTUAL TABLE items_fts USING fts5 (
+    name, description, content='items', content_rowid='id', tokenize='porter unicode61'
+);
+'''
+
+SPELL_COLUMNS = ('slug', 'name', 'level', 'school', 'casting_time', 'range', 'components', 'duration',
+                 'concentration', 'ritual', 'damage', 'save', 'attack', 'healing', 'description',
+                 'higher_levels', 'origin', 'source', 'page', 'mechanics')
+ITEM_COLUMNS = ('slug', 'name', 'type', 'rarity', 'item_slot', 'damage', 'armor', 'value', 'weight',
+                'properties', 'summary', 'description', 'origin', 'source', 'page')
+
+_LEADING_NUMBER = re.compile(r'\d+')
+_HEADER_LINE = re.compile(r'^[A-Z][A-Za-z ]*: ')
+_HIGHER_LEVELS = re.compile(r'\n\n(?:At Higher Levels)[.:]\s*', re.IGNORECASE)
+_QUERY_WORD = re.compile(r'\w+')
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def parse_level(level):
+    """0-9 from 'cantrip', 'Cantrip', '3', '3rd' or 3."""
+    if isinstance(level, int):
+        return level
+    match = _LEADING_NUMBER.search(str(level))
+    return int(match.group(0)) if match else 0
+
+
+def split_long_description(text):
+    """(description, higher levels) from a camelCase longDescription.
+
+    The importer prefixes the description with 'Casting Time: ...' style
+    header lines and a blank line; those are dropped.
+    """
+    text = (text or '').strip()
+    head, sep, rest = text.partition('\n\n')
+    if sep and all(_HEADER_LINE.match(line) for line in head.splitlines()):
+        text = rest
+    parts = _HIGHER_LEVELS.split(text, maxsplit=1)
+    return parts[0].strip(), (parts[1].strip() if len(parts) > 1 else '')
+
+
+def capitalize(word):
+    return word[:1].upper() + word[1:]
+
+
+def srd_spell(spell):
+    """Mechanics input and row fields of an SRD (snake_case) spell."""
+    return {
+        'name': spell['name'],
+        'level': spell['level'],
+        'school': spell.get('school', ''),
+        'casting_time': spell.get('casting_time'),
+        'range': spell.get('range'),
+        'components': (spell.get('components') or {}).get('raw'),
+        'duration': spell.get('duration', ''),
+        'ritual': bool(spell.get('ritual')),
+        'description': spell.get('description', ''),
+        'higher_levels': spell.get('higher_levels', ''),
+        'classes': spell.get('classes'),
+    }
+
+
+def camel_spell(spell):
+    """Same for an importer/sample (camelCase) spell."""
+    description, higher_levels = split_long_description(spell.get('longDescription') or spell.get('shortDescription'))
+    saving_throw = spell.get('savingThrow')
+    if isinstance(saving_throw, dict):
+        saving_throw = saving_throw.get('ability')
+    return {
+        'name': spell['name'],
+        'level': parse_level(spell.get('level')),
+        'school': spell.get('school', ''),
+        'casting_time': spell.get('castingTime'),
+        'range': spell.get('range'),
+        'components': spell.get('components'),
+        'duration': spell.get('duration', ''),
+        'ritual': bool(spell.get('ritual')),
+        'description': description,
+        'higher_levels': higher_levels,
+        'classes': spell.get('classes'),
+        'damage': spell.get('damageFormula'),
+        'save': ABILITY_NAMES.get(str(saving_throw).upper(), saving_throw) if saving_throw else None,
+        'attack': 'spell' if spell.get('attackBonus') is not None else None,
+        'source': spell.get('source'),
+        'page': spell.get('page'),
+    }
+
+
+def spell_row(spell, origin, mechanics):
+    """A normalized spell (srd_spell/camel_spell) as a spells row plus its classes."""
+    duration = spell['duration'] or ''
+    row = {
+        'slug': slugify(spell['name']),
+        'name': spell['name'],
+        'level': parse_level(spell['level']),
+        'school': capitalize(spell['school'] or ''),
+        'casting_time': spell['casting_time'],
+        'range': spell['range'],
+        'components': spell['components'] or 'V, S',
+        'duration': duration,
+        'concentration': int('concentration' in duration.lower()),
+        'ritual': int(spell['ritual']),
+        # Samples put healing dice in damageFormula too
+        'damage': mechanics['dice'] or (None if mechanics['healing'] else spell.get('damage')),
+        'save': mechanics['save'] or spell.get('save'),
+        'attack': mechanics['attack'] or spell.get('attack'),
+        'healing': mechanics['healing'],
+        'description': spell['description'],
+        'higher_levels': spell['higher_levels'] or None,
+        'origin': origin,
+        'source': spell.get('source') or ('SRD' if origin == 'srd' else None),
+        'page': spell.get('page'),
+        'mechanics': json.dumps(mechanics, ensure_ascii=False, separators=(',', ':')),
+    }
+    return row, normalize_classes(spell['classes'])
+
+
+def item_row(item, origin):
+    armor = str(item.get('armor') or '')
+    description = item.get('longDescription') or item.get('shortDescription') or item['name']
+    return {
+        'slug': slugify(item['name']),
+        'name': item['name'],
+        'type': item.get('type') or 'Miscellaneous',
+        'rarity': item.get('rarity') or 'Common',
+        'item_slot': item.get('itemSlot'),
+        'damage': item.get('damage') or None,
+        'armor': int(armor) if armor.isdigit() else None,
+        'value': item.get('value'),
+        'weight': item.get('weight'),
+        'properties': json.dumps(item.get('properties') or [], separators=(',', ':')),
+        'summary': item.get('shortDescription'),
+        'description': description,
+        'origin': origin,
+        'source': item.get('source'),
+        'page': item.get('page'),
+    }
+
+
+def _insert(conn, table, columns, row):
+    placeholders = ', '.join('?' * len(columns))
+    cursor = conn.execute(f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})',
+                          [row[c] for c in columns])
+    return cursor.lastrowid
+
+
+def _existing_sources(sources):
+    return [(origin, path) for origin, path in sources if os.path.exists(path)]
+
+
+def build(path=DB_PATH, spell_sources=SPELL_SOURCES, item_sources=ITEM_SOURCES, cache=None):
+    """Build the database at `path`; returns {'spells', 'items', 'duplicates'} counts."""
+    if cache is None:
+        cache = MechanicsCache(path=None)
+    spell_sources = _existing_sources(spell_sources)
+    item_sources = _existing_sources(item_sources)
+
+    temp_path = path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    counts = {'spells': 0, 'items': 0, 'duplicates': 0}
+    try:
+        conn.executescript(SCHEMA)
+        seen = set()
+        for origin, source_path in spell_sources:
+            normalize = srd_spell if origin == 'srd' else camel_spell
+            spells = load_srd(source_path) if origin == 'srd' else load_json(source_path)
+            for spell in spells:
+                spell = normalize(spell)
+                row, classes = spell_row(spell, origin, cache.get(spell))
+                if row['slug'] in seen:
+                    counts['duplicates'] += 1
+                    continue
+                seen.add(row['slug'])
+                spell_id = _insert(conn, 'spells', SPELL_COLUMNS, row)
+                conn.executemany('INSERT INTO spell_classes VALUES (?, ?, ?, ?, ?)',
+                                 [(c, row['level'], row['school'], row['name'], spell_id) for c in classes])
+                counts['spells'] += 1
+
+        seen = set()
+        for origin, source_path in item_sources:
+            for item in load_json(source_path):
+                row = item_row(item, origin)
+                if row['slug'] in seen:
+                    counts['duplicates'] += 1
+                    continue
+                seen.add(row['slug'])
+                _insert(conn, 'items', ITEM_COLUMNS, row)
+                counts['items'] += 1
+
+        conn.execute("INSERT INTO spells_fts (rowid, name, description) SELECT id, name, description FROM spells")
+        conn.execute("INSERT INTO items_fts (rowid, name, description) SELECT id, name, description FROM items")
+        meta = {
+            'schema_version': str(SCHEMA_VERSION),
+            'sources': json.dumps({os.path.relpath(p, REPO_ROOT): file_hash(p)
+                                   for _, p in spell_sources + item_sources}, sort_keys=True),
+        }
+        conn.executemany('INSERT INTO meta VALUES (?, ?)', sorted(meta.items()))
+        conn.commit()
+        conn.execute('ANALYZE')
+        conn.execute('VACUUM')
+    finally:
+        conn.close()
+    os.replace(temp_path, path)
+    return counts
+
+
+def connect(path=DB_PATH):
+    """Read-only connection with dict-like rows."""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def match_query(text):
+    """FTS5 MATCH string for free text: every word, as a prefix ('fire bol' -> fire* AND bol*)."""
+    words = _QUERY_WORD.findall(text or '')
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+
+def search_spells(conn, text=None, class_name=None, level=None, school=None, limit=50, offset=0):
+    """Spell summaries matching every given filter.
+
+    Results are ordered by relevance (name hits first) when there is search text, otherwise by
+    level and name (the picker's order).
+    """
+    match = match_query(text)
+    params = []
+    if class_name:
+        sql = 'SELECT s.slug, s.name, s.level, s.school FROM spell_classes c JOIN spells s ON s.id = c.spell_id'
+        where = ['c.class = ?']
+        params.append(class_name.lower())
+        prefix = 'c.'
+    else:
+        sql = 'SELECT s.slug, s.name, s.level, s.school FROM spells s'
+        where = []
+        prefix = 's.'
+    if level is not None:
+        where.append(f'{prefix}level = ?')
+        params.append(int(level))
+    if school:
+        where.append(f'{prefix}school = ?')
+        params.append(capitalize(school.lower()))
+    if match:
+        sql += ' JOIN spells_fts f ON f.rowid = s.id'
+        where.append('spells_fts MATCH ?')
+        params.append(match)
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += f' ORDER BY bm25(spells_fts, {NAME_WEIGHT})' if match else f' ORDER BY {prefix}level, {prefix}name'
+    sql += ' LIMIT ? OFFSET ?'
+    params += [limit, offset]
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def get_spell(conn, slug):
+    """Full spell record with its classes and parsed mechanics, or None."""
+    row = conn.execute('SELECT * FROM spells WHERE slug = ?', (slug,)).fetchone()
+    if row is None:
+        return None
+    spell = dict(row)
+    del spell['id']
+    spell['concentration'] = bool(spell['concentration'])
+    spell['ritual'] = bool(spell['ritual'])
+    spell['mechanics'] = json.loads(spell['mechanics'])
+    spell['classes'] = [c for (c,) in conn.execute(
+        'SELECT class FROM spell_classes WHERE spell_id = ? ORDER BY class', (row['id'],))]
+    return spell
+
+
+def search_items(conn, text=None, item_type=None, rarity=None, limit=50, offset=0):
+    """Item summaries matching every given filter, by relevance or name."""
+    match = match_query(text)
+    sql = 'SELECT i.slug, i.name, i.type, i.rarity FROM items i'
+    where, params = [], []
+    if item_type:
+        where.append('i.type = ?')
+        params.append(item_type)
+    if rarity:
+        where.append('i.rarity = ?')
+        params.append(rarity)
+    if match:
+        sql += ' JOIN items_fts f ON f.rowid = i.id'
+        where.append('items_fts MATCH ?')
+        params.append(match)
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += f' ORDER BY bm25(items_fts, {NAME_WEIGHT})' if match else ' ORDER BY i.name'
+    sql += ' LIMIT ? OFFSET ?'
+    params += [limit, offset]
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def get_item(conn, slug):
+    row = conn.execute('SELECT * FROM items WHERE slug = ?', (slug,)).fetchone()
+    if row is None:
+        return None
+    item = dict(row)
+    del item['id']
+    item['properties'] = json.loads(item['properties'])
+    return item
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m pagebuild.store',
+                                     description='Build or query the SQLite spell and item store.')
+    parser.add_argument('--db', default=DB_PATH, help='database path (default: %(default)s)')
+    parser.add_argument('--search', help='query the existing database instead of rebuilding it')
+    parser.add_argument('--class', dest='class_name', help='spell class filter')
+    parser.add_argument('--level', type=int, help='spell level filter')
+    parser.add_argument('--school', help='spell school filter')
+    parser.add_argument('--items', action='store_true', help='query items instead of spells')
+    parser.add_argument('--limit', type=int, default=20, help='results to show (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    if args.search is not None or args.class_name or args.level is not None or args.school or args.items:
+        if not os.path.exists(args.db):
+            print(f'⚠️ {args.db} does not exist (build it with: python3 -m pagebuild.store)')
+            return 1
+        conn = connect(args.db)
+        start = time.perf_counter()
+        if args.items:
+            results = search_items(conn, args.search, limit=args.limit)
+        else:
+            results = search_spells(conn, args.search, args.class_name, args.level, args.school, limit=args.limit)
+        elapsed = time.perf_counter() - start
+        for row in results:
+            print('  '.join(str(value) for value in row.values()))
+        print(f'{len(results)} results in {elapsed * 1e6:.0f} µs')
+        return 0
+
+    cache = MechanicsCache.load()
+    counts = build(args.db, cache=cache)
+    cache.save()
+    print(f'✅ Wrote {os.path.relpath(args.db, REPO_ROOT)}: {counts["spells"]} spells, {counts["items"]} items'
+          f' ({counts["duplicates"]} duplicates skipped, {os.path.getsize(args.db):,} bytes)')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
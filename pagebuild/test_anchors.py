@@ -0,0 +1,126 @@
+"""Anchor tables and replace_anchor (python3 -m pytest pagebuild)."""
+
+import random
+
+import pytest
+
+from . import anchors
+from .anchors import AhoCorasick, AnchorTable, anchor_table, find_anchor, replace_anchor
+
+PATTERNS = ('ab', 'abab', 'ba', 'cab', 'b\n')
+
+
+def fresh(content, patterns=PATTERNS):
+    return AnchorTable(content, patterns).offsets
+
+
+def str_offsets(content, pattern):
+    offsets, pos = [], content.find(pattern)
+    while pos != -1:
+        offsets.append(pos)
+        pos = content.find(pattern, pos + 1)
+    return offsets
+
+
+@pytest.fixture(autouse=True)
+def no_shared_table(monkeypatch):
+    monkeypatch.setattr(anchors, '_CURRENT', None)
+
+
+def test_automaton_finds_overlapping_matches_like_str_find():
+    text = 'cababab\nbab\n' * 3
+    found = AhoCorasick(PATTERNS).search(text)
+    for pattern in PATTERNS:
+        assert found[pattern] == str_offsets(text, pattern)
+
+
+def test_automaton_search_window():
+    text = 'ab ab ab'
+    assert AhoCorasick(['ab']).search(text, 2, 6)['ab'] == [3]
+
+
+def test_edited_matches_a_fresh_scan():
+    rng = random.Random(7)
+    for _ in range(300):
+        content = ''.join(rng.choice('abc\n') for _ in range(rng.randint(0, 40)))
+        table = AnchorTable(content, PATTERNS)
+        edits, result, last = [], [], 0
+        for start in sorted(rng.sample(range(len(content) + 1), min(3, len(content) + 1))):
+            if start < last:
+                continue
+            end = min(len(content), start + rng.randint(0, 3))
+            replacement = ''.join(rng.choice('ab\n') for _ in range(rng.randint(0, 4)))
+            result += [content[last:start], replacement]
+            edits.append((start, end, len(replacement)))
+            last = end
+        new = ''.join(result) + content[last:]
+        assert table.edited(new, edits).offsets == fresh(new), (content, edits)
+
+
+def test_anchor_table_is_built_once_per_text():
+    content = 'xx ab yy'
+    table = anchor_table(content, ['ab'])
+    assert anchor_table(content, ['ab']) is table
+    assert anchor_table(content + ' ', ['ab']) is not table
+
+
+def test_replace_anchor_carries_the_table_over():
+    content = 'one ab two ab three cab'
+    anchor_table(content, PATTERNS)
+    result, count = replace_anchor(content, 'ab', 'ba')
+    assert (result, count) == (content.replace('ab', 'ba'), 3)
+    assert anchors._CURRENT.describes(result)
+    assert anchors._CURRENT.offsets == fresh(result)
+    assert find_anchor(result, 'ba') == str_offsets(result, 'ba')
+
+
+def test_replace_anchor_without_a_table():
+    assert replace_anchor('a-a-a', 'a-a', 'b') == ('b-a', 1)
+    assert replace_anchor('abc', 'x', 'y') == ('abc', 0)
+    assert anchors._CURRENT is None
+
+
+REGEX_PATCH = '''import re
+with open('test-enhanced-features.html') as f:
+    content = f.read()
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(re.sub('alpha', 'ALPHA', content))
+'''
+
+ANCHOR_PATCH = '''from pagebuild.anchors import replace_anchor
+with open('test-enhanced-features.html') as f:
+    content = f.read()
+old_call = 'beta();'
+content, found = replace_anchor(content, old_call, 'beta();\\ngamma();')
+with open('test-enhanced-features.html', 'w') as f:
+    f.write(content)
+'''
+
+
+def test_build_serves_replace_anchor_from_one_table(tmp_path, monkeypatch):
+    from .runner import Patch, run_patches
+    (tmp_path / 'fix-regex.py').write_text(REGEX_PATCH)
+    (tmp_path / 'add-anchor.py').write_text(ANCHOR_PATCH)
+    page = tmp_path / 'test-enhanced-features.html'
+    page.write_text('<script>\nalpha();\nbeta();\n</script>\n')
+    scans, lookups = [], []
+    init, find_all = AnchorTable.__init__, AnchorTable.find_all
+
+    def counting_init(self, content, patterns, offsets=None):
+        scans.append(offsets is None)
+        init(self, content, patterns, offsets)
+
+    def counting_find_all(self, pattern):
+        lookups.append(pattern)
+        return find_all(self, pattern)
+
+    monkeypatch.setattr(AnchorTable, '__init__', counting_init)
+    monkeypatch.setattr(AnchorTable, 'find_all', counting_find_all)
+    patches = [Patch('fix-regex', 'fix-regex.py'), Patch('add-anchor', 'add-anchor.py')]
+    document, results = run_patches(str(page), patches=patches, root=str(tmp_path), use_manifest=False)
+
+    assert [r.status for r in results] == ['applied', 'applied']
+    assert document.text == '<script>\nALPHA();\nbeta();\ngamma();\n</script>\n'
+    assert scans.count(True) == 1  # one full scan, followed across the regex edit
+    assert lookups == ['beta();']
+    assert anchors._CURRENT.describes(document.text)
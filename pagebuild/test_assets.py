@@ -0,0 +1,32 @@
+"""Page asset split (python3 -m pytest pagebuild)."""
+
+from .assets import split_page
+
+DATA = 'const bigTable = [' + ', '.join(f'"{i:04}"' for i in range(40)) + '];'
+PAGE = f'''<html><head><style>
+body {{ color: red; }}
+</style></head><body>
+<script>
+const before = 1;
+{DATA}
+function after() {{ return bigTable.length + before; }}
+</script>
+</body></html>
+'''
+
+
+def test_split_page_moves_data_declarations_out():
+    html, css, blobs, main_js = split_page(PAGE, minimum=100)
+    assert 'color' in css
+    assert [name for name, _ in blobs] == ['big-table']
+    assert blobs[0][1].startswith('const bigTable=["0000","0001",')
+    # The rest keeps its order with the declaration cut out
+    assert main_js == 'const before=1;\nfunction after(){return bigTable.length+before;}'
+    assert html.count('\x00STYLE\x00') == 1 and html.count('\x00SCRIPT\x00') == 1
+    assert '<script>' not in html and '<style>' not in html
+
+
+def test_split_page_leaves_small_declarations_inline():
+    _, _, blobs, main_js = split_page(PAGE, minimum=10_000)
+    assert blobs == []
+    assert 'bigTable' in main_js
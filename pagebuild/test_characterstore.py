@@ -0,0 +1,143 @@
+"""Character store round trip: the page's own store code, run in node."""
+
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from . import rules
+from .jsindex import script_index
+
+NODE = shutil.which('node')
+pytestmark = pytest.mark.skipif(NODE is None, reason='needs node')
+
+# What the store needs from the rest of the page
+SPELL_DECLARATIONS = ('spellDefinitions', 'SPELL_RECORD_FIELDS', 'spellRecords', 'internSpellRecord',
+                      'characterSpell', 'internCharacterSpells', 'spellRecord', 'characters')
+
+# Each load is a fresh context sharing one localStorage, like a page reload.
+# A character is compared with its spells flattened (record fields + own
+# state), since JSON.stringify alone does not see inherited fields.
+HARNESS = r'''
+const vm = require('vm');
+const fs = require('fs');
+const declarations = fs.readFileSync(process.argv[1], 'utf8');
+const storage = {};
+const warnings = [];
+
+function load() {
+  const timers = [];
+  const context = {
+    console: { log() {}, warn: (...args) => warnings.push(args.join(' ')) },
+    localStorage: {
+      getItem: key => key in storage ? storage[key] : null,
+      setItem: (key, value) => { storage[key] = String(value); },
+      removeItem: key => { delete storage[key]; }
+    },
+    setTimeout: callback => timers.push(callback),
+    window: { requestIdleCallback: callback => timers.push(callback) }
+  };
+  vm.createContext(context);
+  vm.runInContext(declarations + `
+    characters.forEach(internCharacterSpells);
+    let currentCharacter = characters[0];
+    let tempModifiers = [];
+    function updateTempModifiersList() {}
+    const flattened = () => JSON.stringify(characters.map(character => ({
+      ...character,
+      spells: Object.fromEntries(Object.entries(character.spells || {}).map(([level, spells]) =>
+        [level, spells.map(spell => ({ ...Object.getPrototypeOf(spell), ...spell }))]))
+    })));
+    const interned = () => characters.every(character => Object.values(character.spells || {}).every(spells =>
+      spells.every(spell => Object.getPrototypeOf(spell) !== Object.prototype)));
+  `, context);
+  context.flush = () => { while (timers.length) timers.shift()(); };
+  return context;
+}
+const run = (context, code) => vm.runInContext(code, context);
+const results = {};
+
+const first = load();
+run(first, `
+  currentCharacter.hp.current -= 3;
+  saveCharacterFields('hp.current');
+`);
+first.flush();  // the first flush writes a snapshot
+run(first, `
+  const srd = characterSpell('fire-bolt', internSpellRecord('fire-bolt', {
+    name: 'Fire Bolt', icon: '🔥', damage: '1d10', school: 'Evocation', attackRoll: true,
+    description: 'A mote of fire.', scaling: { by: 'character', levels: { 1: '1d10', 5: '2d10' } }
+  }), { prepared: false });
+  (currentCharacter.spells[0] = currentCharacter.spells[0] || []).push(srd);
+  recordCharacterChange('push', 'spells.0', srd);
+  const defined = characterSpell('fireball', spellRecord('fireball'), { prepared: true, isDefault: true });
+  (currentCharacter.spells[3] = currentCharacter.spells[3] || []).push(defined);
+  recordCharacterChange('push', 'spells.3', defined);
+  const plain = { id: 'homebrew', name: 'Homebrew Bolt', damage: '1d6', prepared: true };
+  (currentCharacter.spells[1] = currentCharacter.spells[1] || []).push(plain);
+  recordCharacterChange('push', 'spells.1', plain);
+  srd.prepared = true;
+  saveCharacterSpellField(srd, 'prepared');
+  tempModifiers.push({ name: 'Bless', value: 2 });
+  saveTempModifiers();
+`);
+first.flush();  // these go to the log
+results.saved = run(first, 'flattened()');
+results.log = JSON.parse(storage['dnd-characters:log']).length;
+
+const second = load();
+run(second, 'restoreCharacterStore()');
+results.replayed = run(second, 'flattened()');
+results.interned = run(second, 'interned()');
+results.shared = run(second, `Object.getPrototypeOf(currentCharacter.spells[3].at(-1)) === spellRecord('fireball')`);
+results.modifiers = run(second, 'loadTempModifiers(); JSON.stringify(tempModifiers)');
+run(second, 'compactCharacterStore()');
+
+const third = load();
+run(third, 'restoreCharacterStore()');
+results.compacted = run(third, 'flattened()');
+results.warnings = warnings;
+console.log(JSON.stringify(results));
+'''
+
+
+def store_declarations():
+    with open(rules.PAGE_PATH, 'r', encoding='utf-8') as f:
+        content = f.read()
+    spans = script_index(content).spans
+    by_name = {span.name: span for span in spans}
+    store_start = by_name['CHARACTER_STORE_VERSION'].start
+    store_end = by_name['restoreCharacterStore'].end
+    chosen = [by_name[name] for name in SPELL_DECLARATIONS]
+    chosen += [span for span in spans if store_start <= span.start < store_end]
+    return '\n'.join(content[span.start:span.end] for span in sorted(chosen, key=lambda span: span.start))
+
+
+@pytest.fixture(scope='module')
+def round_trip(tmp_path_factory):
+    path = tmp_path_factory.mktemp('store') / 'declarations.js'
+    path.write_text(store_declarations(), encoding='utf-8')
+    completed = subprocess.run([NODE, '-e', HARNESS, str(path)], capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+def test_reload_restores_every_character_field(round_trip):
+    assert round_trip['log'] == 5
+    assert json.loads(round_trip['replayed']) == json.loads(round_trip['saved'])
+    assert round_trip['warnings'] == []
+
+
+def test_prepared_toggle_and_temp_modifiers_are_restored(round_trip):
+    spells = json.loads(round_trip['replayed'])[0]['spells']
+    assert next(spell for spell in spells['0'] if spell['id'] == 'fire-bolt')['prepared'] is True
+    assert json.loads(round_trip['modifiers']) == [{'name': 'Bless', 'value': 2}]
+
+
+def test_compacted_snapshot_restores_the_same(round_trip):
+    assert json.loads(round_trip['compacted']) == json.loads(round_trip['saved'])
+
+
+def test_restored_spells_share_their_records(round_trip):
+    assert round_trip['interned']
+    assert round_trip['shared']
@@ -0,0 +1,119 @@
+"""Combat simulator rules and determinism (python3 -m pytest pagebuild)."""
+
+from fractions import Fraction
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from . import combat, dice, rules  # noqa: E402
+from .combat import Plan, Target, character_from_page, expected_damage, roll_totals, simulate  # noqa: E402
+
+CHAR = {
+    'id': 'test', 'name': 'Test', 'class': 'Wizard', 'classType': 'caster', 'level': 5,
+    'stats': {'str': 8, 'dex': 14, 'con': 12, 'int': 16, 'wis': 10, 'cha': 10},
+    'attacks': {'melee': {'name': 'Staff', 'toHit': 2, 'damage': '1d6-1 bludgeoning'}},
+    'computed': {'spellAttackBonus': 6, 'spellSaveDC': 14},
+    'spells': {
+        '0': [{'name': 'Fire Bolt', 'damage': '2d10 fire', 'attackRoll': True}],
+        '1': [{'name': 'Magic Missile', 'damage': '3d4+3 force', 'prepared': True},
+              {'name': 'Cure Wounds', 'damage': '1d8+3', 'prepared': True, 'description': 'Regain hit points'},
+              {'name': 'Thunderwave', 'damage': '2d8', 'prepared': False, 'save': 'Constitution'}],
+        '2': [{'name': 'Scorching Ray', 'damage': '6d6 fire', 'prepared': True, 'attackRoll': True}],
+        '3': [{'name': 'Fireball', 'damage': '8d6 fire', 'prepared': True, 'save': 'Dexterity'},
+              {'name': 'Blink Strike', 'damage': '1d6', 'prepared': True, 'castingTime': '1 bonus action'}],
+    },
+}
+
+
+def actions(character):
+    return {action.name: action for action in character.actions}
+
+
+def test_actions_follow_the_page_rules():
+    character = character_from_page(CHAR)
+    by_name = actions(character)
+    assert list(by_name) == ['Staff', 'Melee Attack', 'Ranged Attack', 'Fire Bolt (dice popup)', 'Fire Bolt',
+                             'Magic Missile', 'Scorching Ray', 'Fireball']
+    assert (by_name['Staff'].formula, by_name['Staff'].bonus) == ('1d6-1', 2)
+    assert (by_name['Melee Attack'].formula, by_name['Ranged Attack'].formula) == ('1d8-1', '1d8+2')
+    popup = by_name['Fire Bolt (dice popup)']
+    assert (popup.formula, popup.bonus, popup.crit_doubles) == ('2d10', 3 + rules.proficiency_bonus(5), False)
+    assert (by_name['Fire Bolt'].bonus, by_name['Fire Bolt'].slot_level) == (6, 0)
+    assert by_name['Magic Missile'].bonus is None and not by_name['Magic Missile'].save
+    assert by_name['Fireball'].save and by_name['Fireball'].half_on_save and by_name['Fireball'].slot_level == 3
+    assert character.slots[1:4] == tuple(rules.spell_slots(rules.FULL, 5, level) for level in (1, 2, 3))
+    assert character.save_dc == 14 and not character.warlock
+
+
+def test_expected_damage():
+    by_name = actions(character_from_page(CHAR))
+    target = Target(ac=15, save_bonus=2)
+    assert expected_damage(by_name['Magic Missile'], target, 14) == Fraction(21, 2)
+    fail = Fraction(14 - 2 - 1, 20)
+    assert expected_damage(by_name['Fireball'], target, 14) == pytest.approx(float(28 * (fail + (1 - fail) / 2)))
+    assert expected_damage(by_name['Staff'], target, 14) == Fraction(7, 20) * Fraction(5, 2) + Fraction(1, 20) * 6
+
+
+def test_roll_totals_match_the_distribution_and_double_dice_on_crits():
+    rng = np.random.default_rng(1)
+    expr = dice.parse('2d6+3')
+    totals = roll_totals(rng, expr, 200_000)
+    assert totals.mean() == pytest.approx(10, abs=0.05)
+    assert (totals.min(), totals.max()) == (5, 15)
+    crit = np.ones(50_000, dtype=bool)
+    crits = roll_totals(rng, expr, 50_000, crit)
+    assert (crits.min(), crits.max()) == (7, 27)
+    assert crits.mean() == pytest.approx(17, abs=0.1)
+
+
+def test_natural_one_misses_and_natural_twenty_hits():
+    rng = np.random.default_rng(2)
+    sure = combat._action('Sure', 'test', '1', bonus=100)
+    never = combat._action('Never', 'test', '1', bonus=-100)
+    assert (combat.resolve(rng, sure, 100_000, Target(), 15) > 0).mean() == pytest.approx(0.95, abs=0.005)
+    assert (combat.resolve(rng, never, 100_000, Target(), 15) > 0).mean() == pytest.approx(0.05, abs=0.005)
+
+
+def test_slots_run_out_and_only_warlocks_get_them_back():
+    character = character_from_page(CHAR)
+    plan = Plan(encounters=3, rounds=5, short_rests=frozenset({1}))
+    tally = simulate(character, Target(hp=1000), plan, trials=500, seed=3)
+    uses = dict(zip((action.name for action in character.actions), tally.uses.tolist()))
+    assert sum(character.slots) == 9  # one per round: 5 in the first encounter, 4 in the second
+    for name, level in (('Magic Missile', 1), ('Scorching Ray', 2), ('Fireball', 3)):
+        assert uses[name] == 500 * character.slots[level], name
+    assert tally.out_of_slots.tolist() == [0, 0, 500]
+
+    warlock = character_from_page({**CHAR, 'class': 'Warlock'})
+    tally = simulate(warlock, Target(hp=1000), plan, trials=500, seed=3)
+    assert tally.out_of_slots.tolist() == [0, 0, 0]  # refilled by the short rest after the first
+
+
+def test_results_depend_on_the_seed_not_the_chunking(monkeypatch):
+    character = character_from_page(CHAR)
+    plan = Plan(encounters=2, rounds=10)
+    monkeypatch.setattr(combat, 'CHUNK_TRIALS', 250)
+    serial = simulate(character, Target(), plan, trials=1000, seed=7)
+    parallel = simulate(character, Target(), plan, trials=1000, seed=7, jobs=2)
+    assert serial.trials == parallel.trials == 1000
+    for name in ('kills', 'damage', 'active', 'out_of_slots', 'slots_left', 'uses'):
+        assert np.array_equal(getattr(serial, name), getattr(parallel, name)), name
+    assert not np.array_equal(serial.damage, simulate(character, Target(), plan, trials=1000, seed=8).damage)
+
+
+def test_curves():
+    character = character_from_page(CHAR)
+    plan = Plan(encounters=2, rounds=10)
+    result = combat.curves(character, simulate(character, Target(hp=30), plan, trials=2000, seed=1))
+    pmf = result['time_to_kill']['pmf']
+    assert len(pmf) == plan.rounds
+    assert result['time_to_kill']['cdf'][-1] == pytest.approx(sum(pmf))
+    assert sum(result['action_share'].values()) == pytest.approx(1)
+    assert result['mean_damage_per_round'] > 0
+
+
+def test_page_characters_load():
+    with open(rules.PAGE_PATH, 'r', encoding='utf-8') as f:
+        characters = combat.load_characters(f.read())
+    assert characters and all(character.actions for character in characters)
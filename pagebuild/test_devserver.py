@@ -0,0 +1,59 @@
+"""Spell query API index (python3 -m pytest pagebuild)."""
+
+import json
+
+import pytest
+
+from .devserver import QueryError, SpellIndex
+
+
+def spell(index, name, level, school, classes):
+    return {'index': index, 'name': name, 'level': level, 'school': {'name': school}, 'classes': classes,
+            'desc': f'{name} description'}
+
+
+SPELLS = [
+    spell('fire-bolt', 'Fire Bolt', 0, 'Evocation', ['wizard', 'sorcerer']),
+    spell('shield', 'Shield', 1, 'Abjuration', ['wizard']),
+    spell('cure-wounds', 'Cure Wounds', 1, 'Evocation', ['cleric', 'druid']),
+    spell('fireball', 'Fireball', 3, 'Evocation', ['wizard', 'sorcerer']),
+]
+
+
+@pytest.fixture
+def index():
+    return SpellIndex(SPELLS, 'v1')
+
+
+def answer(index, query):
+    body, _ = index.query(index.parse_query(query))
+    return json.loads(body)
+
+
+def test_filters_combine(index):
+    assert [s['index'] for s in answer(index, 'class=wizard&level=1')['results']] == ['shield']
+    assert [s['index'] for s in answer(index, 'school=evocation&q=fire')['results']] == ['fire-bolt', 'fireball']
+    assert answer(index, 'q=abjur')['count'] == 1
+
+
+def test_offset_past_the_end_is_an_empty_page(index):
+    page = answer(index, 'school=evocation&offset=1000')
+    assert page['results'] == []
+    assert page['count'] == 3
+    assert index.parse_query('offset=1000') == index.parse_query('offset=5')
+
+
+def test_paging(index):
+    page = answer(index, 'offset=1&limit=2')
+    assert [s['index'] for s in page['results']] == ['shield', 'cure-wounds']
+    assert (page['count'], page['offset'], page['limit']) == (4, 1, 2)
+
+
+@pytest.mark.parametrize('query', ['offset=-1', 'offset=x', 'limit=501', 'level=10', 'fields=nope'])
+def test_malformed_queries_raise(index, query):
+    with pytest.raises(QueryError):
+        index.parse_query(query)
+
+
+def test_fields_select_what_results_carry(index):
+    assert answer(index, 'q=shield&fields=name,desc')['results'] == [{'name': 'Shield', 'desc': 'Shield description'}]
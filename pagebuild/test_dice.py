@@ -0,0 +1,122 @@
+"""Dice expressions, and the JS engines against the exact distributions (python3 -m pytest pagebuild)."""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+from fractions import Fraction
+
+import pytest
+
+from . import rules
+from .dice import DiceTerm, distribution, mean, parse, roll, total_variation
+from .jsindex import script_index
+
+NODE = shutil.which('node')
+HARNESS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'roll-dice.mjs')
+ENGINE_DECLARATIONS = ('DICE_TERM', 'diceCache', 'parseDice', 'rollDiceTerm', 'buildDiceRoller', 'compileDice')
+ROLLS = 40_000
+
+
+def test_parse_terms_and_modifiers():
+    expr = parse('2d6 + 1d4 - 1 + 3')
+    assert expr.dice == (DiceTerm(1, 2, 6, 2), DiceTerm(1, 1, 4, 1))
+    assert expr.modifier == 2
+    assert parse('D20').dice == (DiceTerm(1, 1, 20, 1),)
+    assert parse('-1d4').dice == (DiceTerm(-1, 1, 4, 1),)
+
+
+def test_parse_keep_highest_and_lowest():
+    assert parse('4d6kh3').dice == (DiceTerm(1, 4, 6, 3, True),)
+    assert parse('2d20kl1').dice == (DiceTerm(1, 2, 20, 1, False),)
+    assert parse('2d6kh5').dice[0].keep == 2  # clamped to the dice rolled
+
+
+@pytest.mark.parametrize('expression', ['', '+', '2d6+', '1d0', '2x6', 'd20kh'])
+def test_parse_rejects(expression):
+    with pytest.raises(ValueError):
+        parse(expression)
+
+
+def test_distribution_of_a_sum():
+    pmf = distribution('2d6+3')
+    assert (min(pmf), max(pmf)) == (5, 15)
+    assert pmf[10] == Fraction(1, 6)
+    assert sum(pmf.values()) == 1
+
+
+def test_advantage_and_disadvantage_roll_the_lone_d20_twice():
+    assert mean(distribution('1d20')) == Fraction(21, 2)
+    assert mean(distribution('1d20', advantage=True)) == Fraction(553, 40)
+    assert mean(distribution('1d20', disadvantage=True)) == Fraction(287, 40)
+    assert distribution('1d20', advantage=True, disadvantage=True) == distribution('1d20')
+    assert distribution('2d20', advantage=True) == distribution('2d20')  # no lone d20
+
+
+def test_crit_doubles_dice_not_modifiers():
+    assert distribution('1d8+3', crit=True) == distribution('2d8+3')
+    assert distribution('4d6kh3', crit=True) == distribution('8d6kh6')
+
+
+def test_keep_highest_mean():
+    assert mean(distribution('4d6kh3')) == Fraction(15869, 1296)
+    assert mean(distribution('2d20kl1')) == mean(distribution('1d20', disadvantage=True))
+
+
+def test_python_sampler_matches_the_exact_distribution():
+    rng = random.Random(5)
+    totals = [roll('2d6+1d4+3', rng) for _ in range(ROLLS)]
+    assert total_variation(distribution('2d6+1d4+3'), totals) < 0.03
+
+
+def page_engine(tmp_path):
+    with open(rules.PAGE_PATH, 'r', encoding='utf-8') as f:
+        content = f.read()
+    by_name = {span.name: span for span in script_index(content).spans}
+    path = tmp_path / 'dice-engine.js'
+    path.write_text('\n'.join(content[by_name[name].start:by_name[name].end] for name in ENGINE_DECLARATIONS),
+                    encoding='utf-8')
+    return ['--engine', str(path)]
+
+
+@pytest.fixture(params=['src', 'page'])
+def engine(request, tmp_path):
+    if NODE is None:
+        pytest.skip('needs node')
+    return page_engine(tmp_path) if request.param == 'page' else []
+
+
+def run_harness(engine, *args):
+    completed = subprocess.run([NODE, HARNESS, *args, *engine], capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+@pytest.mark.parametrize('expression, options', [
+    ('2d6+1d4+3', {}),
+    ('1d20+5', {'advantage': True}),
+    ('1d20', {'disadvantage': True}),
+    ('1d8+3', {'crit': True}),
+    ('4d6kh3', {}),
+    ('2d20kl1-1', {}),
+])
+def test_js_engine_matches_the_exact_distribution(engine, expression, options):
+    totals = run_harness(engine, expression, str(ROLLS), *(f'--{name}' for name in options))
+    pmf = distribution(expression, **options)
+    assert len(totals) == ROLLS
+    assert set(totals) <= set(pmf)
+    assert total_variation(pmf, totals) < 0.03
+
+
+@pytest.mark.parametrize('expression', ['2d6 + 1d4 - 1', 'd20', '4d6kh3', '2d20kl1', '2d6kh5', '-1d4+2',
+                                        '', '+', '2d6+', '1d0', 'd20kh'])
+def test_js_parser_agrees_with_python(engine, expression):
+    parsed = run_harness(engine, expression, '--parse')
+    try:
+        expr = parse(expression)
+    except ValueError:
+        assert 'error' in parsed
+        return
+    assert parsed['modifier'] == expr.modifier
+    assert [(d['sign'], d['count'], d['sides'], d['keep'], d['keepHighest']) for d in parsed['dice']] == \
+        [tuple(term) for term in expr.dice]
@@ -0,0 +1,35 @@
+"""Embedded fallback projection (python3 -m pytest pagebuild)."""
+
+from .fallback import project, shorten
+
+SACRED_FLAME = {
+    'index': 'sacred-flame', 'name': 'Sacred Flame', 'level': 0, 'school': {'name': 'Evocation'},
+    'classes': ['cleric'], 'desc': ['Flame-like radiance descends on a creature. ' * 12],
+    'casting_time': '1 action', 'range': '60 feet', 'components': 'V, S', 'duration': 'Instantaneous',
+    'concentration': False, 'damage': '1d8', 'dc': {'dc_type': {'name': 'Dexterity'}}, 'attack_roll': False,
+    'mechanics': {'attack': None, 'healing': None, 'save': 'Dexterity',
+                  'scaling': {'by': 'character', 'levels': {'1': '1d8', '5': '2d8'}}},
+}
+
+
+def test_project_keeps_a_null_attack_next_to_scaling():
+    record = project(SACRED_FLAME)
+    assert record['mechanics'] == {'scaling': SACRED_FLAME['mechanics']['scaling'], 'attack': None}
+    assert 'attack_roll' not in record and 'concentration' not in record
+    assert record['dc'] == SACRED_FLAME['dc']
+
+
+def test_project_leaves_out_empty_mechanics():
+    record = project(dict(SACRED_FLAME, mechanics={'attack': None, 'healing': None, 'scaling': None}))
+    assert 'mechanics' not in record
+
+
+def test_project_keeps_an_attack():
+    record = project(dict(SACRED_FLAME, mechanics={'attack': 'ranged', 'healing': None, 'scaling': None}))
+    assert record['mechanics'] == {'attack': 'ranged'}
+
+
+def test_shorten_cuts_at_a_sentence():
+    text = shorten(SACRED_FLAME['desc'][0], 100)
+    assert len(text) <= 100 and text.endswith('creature.')
+    assert shorten('First paragraph.\n\nSecond one.') == 'First paragraph.'
@@ -0,0 +1,89 @@
+"""Script index and tokenizer (python3 -m pytest pagebuild)."""
+
+import pytest
+
+from . import jsindex
+from .jsindex import REGEX, ScriptIndex, TokenizeError, find_script, literal_value, script_index, tokenize
+from .manifest import changed_region
+
+
+def page(script):
+    return f'<html><body>\n<script>\n{script}\n</script>\n</body></html>\n'
+
+
+SCRIPT = '''
+const table = { a: [1, 2], b: 'x' };
+let counter = 0;
+function first(x) {
+  if (x) { return x / 2; }
+  return table.a;
+}
+async function second() {
+  const inner = 1;
+  return inner;
+}
+const third = () => counter++;
+'''
+
+
+def spans(index):
+    return [(span.name, span.kind) for span in index.spans]
+
+
+def test_top_level_declarations():
+    index = ScriptIndex(page(SCRIPT))
+    assert spans(index) == [('table', 'const'), ('counter', 'let'), ('first', 'function'),
+                            ('second', 'function'), ('third', 'const')]
+    assert 'inner' not in index
+
+
+@pytest.mark.parametrize('statement', [
+    "if (ready) /\\)/.test(text);",
+    "while (busy) /[}]/.exec(text);",
+    "function noop() {}\n/=\\)/.test(text);",
+])
+def test_regex_after_a_statement_closer(statement):
+    content = page(statement + '\nconst after = 1;')
+    assert any(token.kind == REGEX for token in tokenize(content, *find_script(content)))
+    assert 'after' in ScriptIndex(content)
+
+
+def test_division_after_an_expression_closer():
+    tokens = tokenize('const half = (a + b) / 2 / c;')
+    assert not any(token.kind == REGEX for token in tokens)
+
+
+@pytest.mark.parametrize('script', ['function broken() {', 'const x = [1, 2));'])
+def test_unbalanced_brackets_raise(script):
+    with pytest.raises(TokenizeError):
+        ScriptIndex(page(script))
+
+
+def test_edited_matches_a_full_index():
+    content = page(SCRIPT)
+    index = ScriptIndex(content)
+    for old, new in [
+        ('let counter = 0;', 'let counter = 0;\nconst added = [1, 2, 3];'),
+        ('  return table.a;\n', '  return table.b;\n'),
+        ('const third = () => counter++;', ''),
+        ('async function second', 'function renamed() {}\nasync function second'),
+    ]:
+        edited_content = content.replace(old, new)
+        edited = index.edited(edited_content, *changed_region(content, edited_content))
+        full = ScriptIndex(edited_content)
+        assert edited.spans == full.spans, old
+        assert edited.tokens == full.tokens, old
+
+
+def test_script_index_updates_from_the_last_index(monkeypatch):
+    monkeypatch.setattr(jsindex, '_LAST', None)
+    monkeypatch.setattr(jsindex, '_CACHE', type(jsindex._CACHE)())
+    content = page(SCRIPT)
+    first = script_index(content)
+    assert script_index(content) is first
+    edited = content.replace('let counter = 0;', 'let counter = 0;\nlet more = 1;')
+    assert spans(script_index(edited)) == spans(ScriptIndex(edited))
+
+
+def test_literal_value():
+    assert literal_value(page(SCRIPT), 'table') == {'a': [1, 2], 'b': 'x'}
@@ -0,0 +1,133 @@
+"""Manifest regions and changed_hunks (python3 -m pytest pagebuild)."""
+
+import random
+
+import pytest
+
+from .manifest import Manifest, ManifestError, changed_hunks, changed_region
+
+
+def manifest_with(*regions):
+    manifest = Manifest('page.html.manifest.json')
+    for i, region in enumerate(regions):
+        manifest.record(f'patch-{i}', 'sha', 'applied', [region])
+    return manifest
+
+
+def regions(manifest):
+    return [entry.regions[0] for entry in manifest.entries.values()]
+
+
+def test_changed_region():
+    assert changed_region('abcdef', 'abXYef') == (2, 4, 4)
+    assert changed_region('abc', 'abc') == (3, 3, 3)
+    assert changed_region('aaa', 'aaaa') == (3, 3, 4)
+
+
+def test_changed_hunks_one_per_changed_run_of_lines():
+    before = ''.join(f'line {i}\n' for i in range(20))
+    after = before.replace('line 3\n', 'line three\n').replace('line 15\n', 'line 15\nextra\n')
+    hunks = changed_hunks(before, after)
+    assert len(hunks) == 2
+    (s1, e1, n1, m1), (_, _, n2, m2) = hunks
+    assert before[s1:e1] == 'line 3\n' and after[n1:m1] == 'line three\n'
+    assert after[n2:m2].endswith('extra\n')
+
+
+def test_changed_hunks_rebuild_the_new_text():
+    rng = random.Random(3)
+    for _ in range(300):
+        lines = [rng.choice(['a\n', 'b\n', 'c\n', 'dd\n']) for _ in range(rng.randint(0, 12))]
+        before = ''.join(lines)
+        for _ in range(rng.randint(1, 3)):
+            at = rng.randint(0, len(lines))
+            lines[at:at + rng.randint(0, 2)] = [rng.choice(['x\n', 'a\n', 'yy\n'])] * rng.randint(0, 2)
+        after = ''.join(lines)
+        pieces, last = [], 0
+        for start, old_end, new_start, new_end in changed_hunks(before, after):
+            pieces += [before[last:start], after[new_start:new_end]]
+            last = old_end
+        assert ''.join(pieces) + before[last:] == after, (before, after)
+
+
+def test_shift_moves_regions_after_the_edit_only():
+    manifest = manifest_with([0, 10], [20, 30], [40, 50])
+    manifest.shift(12, 15, 19)  # replace 3 characters with 7, between regions
+    assert regions(manifest) == [[0, 10], [24, 34], [44, 54]]
+
+
+def test_shift_keeps_an_edit_inside_a_region_inside_it():
+    manifest = manifest_with([20, 30])
+    manifest.shift(22, 25, 23)
+    assert regions(manifest) == [[20, 28]]
+
+
+def test_shift_extends_a_region_only_over_the_edit():
+    manifest = manifest_with([20, 30], [40, 50])
+    manifest.shift(28, 42, 30)  # straddles the end of one and the start of the other
+    assert regions(manifest) == [[20, 30], [28, 38]]
+    assert manifest.entries['patch-0'].regions != [[0, 50]]
+
+
+def test_apply_hunks_then_regions_still_match():
+    before = ''.join(f'line {i}\n' for i in range(30))
+    first = before.replace('line 10\n', 'patched 10\n')
+    manifest = Manifest('page.html.manifest.json')
+    manifest.record('first', 'sha', 'applied', [(s, e) for _, _, s, e in changed_hunks(before, first)])
+    manifest.finalize(first)
+    assert manifest.can_skip('first', 'sha', first, page_unchanged=True)
+
+    second = first.replace('line 2\n', 'line 2\nnew\n').replace('line 25\n', '')
+    manifest.apply_hunks(changed_hunks(first, second))
+    assert manifest.entries['first'].region_matches(second)
+    assert manifest.can_skip('first', 'sha', second, page_unchanged=False)
+    assert not manifest.can_skip('first', 'other sha', second, page_unchanged=False)
+
+
+def recorded(before, after):
+    """A manifest with one patch that turned `before` into `after`."""
+    manifest = Manifest('page.html.manifest.json')
+    manifest.record('patch', 'sha', 'applied', [(s, e) for _, _, s, e in changed_hunks(before, after)])
+    manifest.finalize(after)
+    return manifest
+
+
+def test_locate_finds_regions_moved_by_an_outside_edit():
+    before = ''.join(f'line {i}\n' for i in range(30))
+    after = before.replace('line 10\n', 'patched 10\n').replace('line 20\n', 'patched 20\n')
+    manifest = recorded(before, after)
+    edited = 'a new first line\n' + after.replace('line 15\n', '')
+    assert not manifest.entries['patch'].region_matches(edited)
+    assert manifest.locate(edited) == []
+    assert manifest.can_skip('patch', 'sha', edited, page_unchanged=False)
+    assert [edited[start:end] for start, end in manifest.entries['patch'].regions] == ['patched 10\n', 'patched 20\n']
+
+
+def test_locate_prefers_the_copy_nearest_the_recorded_place():
+    before = 'x\n' * 10 + 'y\n' * 10
+    after = before.replace('y\n', 'patched\ny\n', 1)
+    manifest = recorded(before, after)
+    edited = 'patched\n' + after
+    assert manifest.locate(edited) == []
+    assert manifest.entries['patch'].regions == [[28, 36]]  # not the new copy at 0
+
+
+def test_drifted_region_is_an_error_not_a_rerun():
+    before = ''.join(f'line {i}\n' for i in range(10))
+    after = before.replace('line 5\n', 'patched 5\n')
+    manifest = recorded(before, after)
+    edited = after.replace('patched 5', 'edited 5')
+    assert manifest.locate(edited) == ['patch']
+    with pytest.raises(ManifestError):
+        manifest.can_skip('patch', 'sha', edited, page_unchanged=False)
+    assert not manifest.can_skip('patch', 'new sha', edited, page_unchanged=False)
+
+
+def test_regionless_applied_patch_is_checked_by_its_probe():
+    manifest = Manifest('page.html.manifest.json')
+    manifest.mark_applied('legacy', 'sha', probe_sha256='same change')
+    manifest.finalize('page')
+    assert manifest.can_skip('legacy', 'sha', 'page', page_unchanged=True, probe=lambda: 1 / 0)
+    assert manifest.can_skip('legacy', 'sha', 'edited page', page_unchanged=False, probe=lambda: 'same change')
+    with pytest.raises(ManifestError):
+        manifest.can_skip('legacy', 'sha', 'edited page', page_unchanged=False, probe=lambda: 'another change')
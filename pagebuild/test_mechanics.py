@@ -0,0 +1,95 @@
+"""Mechanics extraction on SRD excerpts (python3 -m pytest pagebuild)."""
+
+import pytest
+
+from .mechanics import Dice, extract
+
+
+def spell(description, level=3, higher_levels='', range_text='60 feet'):
+    return {'description': description, 'level': level, 'higher_levels': higher_levels, 'range': range_text}
+
+
+FIREBALL = spell(
+    'Each creature in a 20-foot-radius sphere centered on that point must make a Dexterity saving throw. '
+    'A target takes 8d6 fire damage on a failed save, or half as much damage on a successful one.',
+    higher_levels='When you cast this spell using a spell slot of 4th level or higher, '
+                  'the damage increases by 1d6 for each slot level above 3rd.',
+    range_text='150 feet')
+
+
+def test_damage_save_area_and_slot_scaling():
+    mechanics = extract(FIREBALL)
+    assert mechanics['damage'] == [{'dice': '8d6', 'type': 'fire'}]
+    assert mechanics['dice'] == '8d6'
+    assert mechanics['save'] == 'Dexterity'
+    assert mechanics['half_on_save']
+    assert mechanics['attack'] is None
+    assert mechanics['area'] == {'shape': 'sphere', 'size': 20}
+    assert mechanics['scaling']['by'] == 'slot'
+    assert mechanics['scaling']['levels']['3'] == '8d6'
+    assert mechanics['scaling']['levels']['9'] == '14d6'
+
+
+def test_projectiles_multiply_the_total():
+    mechanics = extract(spell(
+        'You create three glowing darts of magical force. Each dart hits a creature of your choice '
+        'that you can see within range. A dart deals 1d4 + 1 force damage to its target.', level=1))
+    assert mechanics['projectiles'] == 3
+    assert mechanics['dice'] == '3d4+3'
+
+
+@pytest.mark.parametrize('name, description', [
+    ('dimension door', 'If you would arrive in a place already occupied by an object or a creature, you and any '
+                       'creature travelling with you each take 4d6 force damage, and the spell fails to teleport you.'),
+    ('contact other plane', 'When you cast this spell, make a DC 15 Intelligence saving throw. On a failure, '
+                            'you take 6d6 psychic damage and are insane until you finish a long rest.'),
+    ('geas', 'If the creature can understand you, it must succeed on a Wisdom saving throw or become charmed by you '
+             'for the duration. While the creature is charmed by you, it takes 5d10 psychic damage each time it acts '
+             'in a manner directly counter to your instructions, but no more than once each day.'),
+    ('animate objects', 'Choose up to ten nonmagical objects within range.\n\n'
+                        '| Size   | HP | AC | Attack                   | Str | Dex |\n'
+                        '|---|---|---|---|---|---|\n'
+                        '| Tiny   | 20 | 18 | +8 to hit, 1d4+4 damage  |   4 |  18 |\n'
+                        '| Small  | 25 | 16 | +6 to hit, 1d8+2 damage  |   6 |  14 |\n\n'
+                        'It makes a slam attack with an attack bonus and bludgeoning damage determined by its size.'),
+])
+def test_damage_the_spell_does_not_deal_to_its_targets(name, description):
+    mechanics = extract(spell(description, level=5))
+    assert mechanics['damage'] == [], name
+    assert mechanics['dice'] is None, name
+
+
+@pytest.mark.parametrize('name, description, level, save', [
+    ('light', 'You touch one object that is no larger than 10 feet in any dimension.\n\nIf you target an object '
+              'held or worn by a hostile creature, that creature must succeed on a Dexterity saving throw to avoid '
+              'the spell.', 0, None),
+    ('contact other plane', 'When you cast this spell, make a DC 15 Intelligence saving throw.', 5, None),
+    ('haste', 'Until the spell ends, the target’s speed is doubled, it gains a +2 bonus to AC, it has advantage '
+              'on Dexterity saving throws, and it gains an additional action on each of its turns.', 3, None),
+    ('geas', 'If the creature can understand you, it must succeed on a Wisdom saving throw or become charmed.',
+     5, 'Wisdom'),
+    ('bane', 'Up to three creatures of your choice that you can see within range must make Charisma saving throws.',
+     1, 'Charisma'),
+    ('faerie fire', 'Any creature in the area when the spell is cast is also outlined in light if it fails a '
+                    'Dexterity saving throw.', 1, 'Dexterity'),
+    ('feeblemind', 'The target takes 4d6 psychic damage and must amke an Intelligence saving throw.',
+     8, 'Intelligence'),
+])
+def test_save_is_the_one_a_target_makes(name, description, level, save):
+    assert extract(spell(description, level=level))['save'] == save, name
+
+
+def test_feeblemind_keeps_its_damage():
+    mechanics = extract(spell('The target takes 4d6 psychic damage and must amke an Intelligence saving throw.',
+                              level=8))
+    assert mechanics['damage'] == [{'dice': '4d6', 'type': 'psychic'}]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('3d4+3', '3d4+3'),
+    ('1d4 + 1', '1d4+1'),
+    ('2d6+1d6', '3d6'),
+    ('70', '70'),
+])
+def test_dice_round_trip(text, expected):
+    assert str(Dice.parse(text)) == expected
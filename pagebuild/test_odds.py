@@ -0,0 +1,121 @@
+"""Attack odds, damage stats and the page's JS mirror of them (python3 -m pytest pagebuild)."""
+
+import json
+import shutil
+import subprocess
+from fractions import Fraction
+
+import pytest
+
+from . import dice, odds, rules
+from .jsindex import script_index
+from .odds import ADVANTAGE, DISADVANTAGE, attack_odds, damage_expressions, damage_stats, expected_damage, formula_in
+
+NODE = shutil.which('node')
+
+# The page's odds code and what it needs from the dice engine
+ODDS_DECLARATIONS = ('DICE_TERM', 'diceCache', 'parseDice', 'rollDiceTerm', 'buildDiceRoller', 'compileDice',
+                     'd20AtLeast', 'diceStatsTable', 'DICE_ENUMERATION_LIMIT', 'diceDistributionCache',
+                     'diceStatsCache', 'convolvePmf', 'diceTermPmf', 'diceDistribution', 'diceStats',
+                     'attackOdds', 'expectedAttackDamage')
+
+JS_CASES = [
+    ('1d8+3', 5, 15, {}),
+    ('2d6+1d4-1', 3, 18, {'advantage': True}),
+    ('4d6kh3', 0, 12, {'disadvantage': True}),
+    ('3d4kl2-1d6+2', 7, 10, {}),
+    ('1d20', 30, 10, {'advantage': True, 'disadvantage': True}),
+]
+
+
+def test_attack_odds():
+    assert attack_odds(5, 15) == (Fraction(11, 20), Fraction(1, 20))
+    assert attack_odds(5, 15, ADVANTAGE)[0] == 1 - Fraction(9, 20) ** 2
+    assert attack_odds(5, 15, DISADVANTAGE)[0] == Fraction(11, 20) ** 2
+    assert attack_odds(30, 10)[0] == Fraction(19, 20)  # a natural 1 still misses
+    assert attack_odds(0, 30)[0] == Fraction(1, 20)  # a natural 20 still hits
+
+
+def test_expected_damage_doubles_only_the_dice_on_a_crit():
+    assert damage_stats('1d8+3') == (Fraction(15, 2), 12, 4, 11)
+    assert expected_damage('1d8+3', 5, 15) == Fraction(10, 20) * Fraction(15, 2) + Fraction(1, 20) * 12
+
+
+def test_formula_in():
+    assert formula_in('2d6 + 3 fire, or 4d6 at 5th level') == '2d6+3'
+    assert formula_in('D10 Necrotic') == 'd10'
+    assert formula_in('Heals 10 HP') is None
+    assert formula_in(None) is None
+
+
+def test_damage_expressions():
+    content = "{ damage: '1d8+3 slashing' }, { damage: \"2d6\" }, { damage: '1d8 + 3' }, { damage: 'none' }"
+    spells = [{'damage': '8d6 fire'}, {'damage': None}, {'damage': '1d0'}]
+    assert damage_expressions(content, spells) == ['2d6', '8d6', '1d8+3']
+
+
+def test_render_js_tables():
+    block = odds.render_js("{ damage: '1d8+3' }", compiled_spells=[])
+    assert block.startswith(odds.GENERATED_BEGIN) and block.endswith(odds.GENERATED_END)
+    at_least = json.loads(block.split('new Uint16Array(')[1].split(')')[0])
+    assert len(at_least) == 3 * 22
+    assert at_least[:2] == [400, 400] and at_least[21] == 0
+    assert at_least[22 + 20] == 400 - 19 * 19  # advantage: either d20 shows 20
+    assert '"1d8+3":[7.5,12,4,11]' in block
+
+
+def test_page_block_is_up_to_date():
+    with open(rules.PAGE_PATH, 'r', encoding='utf-8') as f:
+        content = f.read()
+    assert odds.replace_generated(content) == (content, True)
+
+
+HARNESS = r'''
+const vm = require('vm');
+const fs = require('fs');
+const context = vm.createContext({});
+vm.runInContext(fs.readFileSync(process.argv[1], 'utf8'), context);
+const cases = JSON.parse(process.argv[2]);
+console.log(JSON.stringify(cases.map(([expression, bonus, ac, options]) => {
+  const distribution = context.diceDistribution(expression, options);
+  return {
+    min: distribution.min,
+    max: distribution.max,
+    mean: distribution.mean,
+    p: Array.from(distribution.p),
+    odds: context.attackOdds(bonus, ac, options),
+    expected: context.expectedAttackDamage(expression, bonus, ac, options),
+  };
+})));
+'''
+
+
+@pytest.fixture(scope='module')
+def page_odds(tmp_path_factory):
+    if NODE is None:
+        pytest.skip('needs node')
+    with open(rules.PAGE_PATH, 'r', encoding='utf-8') as f:
+        content = f.read()
+    by_name = {span.name: span for span in script_index(content).spans}
+    path = tmp_path_factory.mktemp('odds') / 'odds.js'
+    path.write_text('\n'.join(content[by_name[name].start:by_name[name].end] for name in ODDS_DECLARATIONS),
+                    encoding='utf-8')
+    completed = subprocess.run([NODE, '-e', HARNESS, str(path), json.dumps(JS_CASES)],
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout)
+
+
+@pytest.mark.parametrize('case', range(len(JS_CASES)))
+def test_page_odds_match_python(page_odds, case):
+    expression, bonus, ac, options = JS_CASES[case]
+    got = page_odds[case]
+    pmf = dice.distribution(expression, **options)
+    assert (got['min'], got['max']) == (min(pmf), max(pmf))
+    assert got['mean'] == pytest.approx(float(dice.mean(pmf)))
+    assert got['p'] == pytest.approx([float(pmf.get(total, 0)) for total in range(min(pmf), max(pmf) + 1)])
+
+    mode = odds.NORMAL if options.get('advantage') == options.get('disadvantage') else \
+        ADVANTAGE if options.get('advantage') else DISADVANTAGE
+    hit, crit = attack_odds(bonus, ac, mode)
+    assert (got['odds']['hit'], got['odds']['crit']) == (float(hit), float(crit))
+    assert got['expected'] == pytest.approx(float(expected_damage(expression, bonus, ac, mode)))
@@ -0,0 +1,59 @@
+"""Rules tables and the page's accessors for them (python3 -m pytest pagebuild)."""
+
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from . import rules
+from .jsindex import script_index
+
+NODE = shutil.which('node')
+
+KNOWN_DECLARATIONS = ('RULES_MAX_LEVEL', 'rulesLevel', 'spellsKnownTable', 'spellsKnownRows', 'cantripsKnownTable',
+                      'cantripsKnownRows', 'spellsKnown', 'cantripsKnown')
+
+CLASSES = sorted({*rules.SPELLS_KNOWN, *rules.CANTRIPS_KNOWN, rules.THIRD_CASTER_ROW, 'paladin', 'toString'})
+LEVELS = list(range(0, rules.MAX_LEVEL + 2))
+
+
+def test_known_mirrors():
+    assert rules.spells_known('wizard', 1) == 6
+    assert rules.spells_known(rules.THIRD_CASTER_ROW, 3) == 3
+    assert rules.cantrips_known(rules.THIRD_CASTER_ROW, 20) == 3
+    assert rules.spells_known('cleric', 5) == 0  # prepares instead
+    assert rules.cantrips_known('bard', 0) == rules.cantrips_known('bard', 21) == 0
+
+
+def test_page_block_is_up_to_date():
+    with open(rules.PAGE_PATH, 'r', encoding='utf-8') as f:
+        content = f.read()
+    assert rules.replace_generated(content) == (content, True)
+
+
+HARNESS = r'''
+const vm = require('vm');
+const fs = require('fs');
+const context = vm.createContext({});
+vm.runInContext(fs.readFileSync(process.argv[1], 'utf8'), context);
+const [classes, levels] = JSON.parse(process.argv[2]);
+console.log(JSON.stringify(classes.map(charClass => levels.map(level =>
+  [context.spellsKnown(charClass, level), context.cantripsKnown(charClass, level)]))));
+'''
+
+
+def test_page_accessors_match_python(tmp_path):
+    if NODE is None:
+        pytest.skip('needs node')
+    with open(rules.PAGE_PATH, 'r', encoding='utf-8') as f:
+        content = f.read()
+    by_name = {span.name: span for span in script_index(content).spans}
+    path = tmp_path / 'rules.js'
+    path.write_text('\n'.join(content[by_name[name].start:by_name[name].end] for name in KNOWN_DECLARATIONS),
+                    encoding='utf-8')
+    completed = subprocess.run([NODE, '-e', HARNESS, str(path), json.dumps([CLASSES, LEVELS])],
+                               capture_output=True, text=True, check=True)
+    expected = [[[rules.spells_known(char_class, level), rules.cantrips_known(char_class, level)] for level in LEVELS]
+                for char_class in CLASSES]
+    assert json.loads(completed.stdout) == expected
@@ -0,0 +1,79 @@
+"""The patch build as a fresh clone runs it (python3 -m pytest pagebuild)."""
+
+import os
+import shutil
+
+import pytest
+
+from . import loadouts
+from .manifest import manifest_path
+from .runner import PAGE_NAME, PATCHES, REPO_ROOT, main, select_patches
+
+SKIPPED_ALL = f'{len(PATCHES)} patches, 0 applied, {len(PATCHES)} skipped, 0 failed'
+
+
+@pytest.fixture
+def page(tmp_path):
+    """A copy of the committed page and manifest."""
+    source = os.path.join(REPO_ROOT, PAGE_NAME)
+    page = tmp_path / PAGE_NAME
+    shutil.copyfile(source, page)
+    shutil.copyfile(manifest_path(source), manifest_path(str(page)))
+    return page
+
+
+def build(page, capsys):
+    status = main(['--source', str(page)])
+    return status, capsys.readouterr().out
+
+
+def test_clean_build_is_a_byte_identical_no_op(page, capsys):
+    status, report = build(page, capsys)
+    assert status == 0
+    assert SKIPPED_ALL in report
+    with open(os.path.join(REPO_ROOT, PAGE_NAME), 'rb') as f:
+        assert page.read_bytes() == f.read()
+
+
+def test_edit_ahead_of_the_patches_leaves_them_applied(page, capsys):
+    edited = page.read_text(encoding='utf-8').replace('<title>', '<title>A ', 1)
+    page.write_text(edited, encoding='utf-8')
+    for _ in range(2):  # the second build runs against the refreshed manifest
+        status, report = build(page, capsys)
+        assert status == 0
+        assert SKIPPED_ALL in report
+        assert page.read_text(encoding='utf-8') == edited
+
+
+def test_edit_inside_a_patch_output_stops_the_build(page, capsys):
+    edited = page.read_text(encoding='utf-8').replace('const CHARACTER_STORE_VERSION', 'const STORE_VERSION', 1)
+    page.write_text(edited, encoding='utf-8')
+    recorded = manifest_path(str(page))
+    with open(recorded, 'rb') as f:
+        manifest = f.read()
+
+    status, report = build(page, capsys)
+    assert status == 1
+    assert 'add-character-store' in report and 'Nothing was rewritten' in report
+    assert page.read_text(encoding='utf-8') == edited
+    with open(recorded, 'rb') as f:
+        assert f.read() == manifest
+
+
+def test_generator_update_moves_the_manifest_with_its_edit(page, capsys, monkeypatch):
+    render_js = loadouts.render_js
+    monkeypatch.setattr(loadouts, 'render_js', lambda content: render_js(content).replace(
+        '    const spellLoadouts', '    // Regenerated\n    const spellLoadouts', 1))
+    assert loadouts.main(['--update', '--page', str(page)]) == 0
+    updated = page.read_text(encoding='utf-8')
+
+    status, report = build(page, capsys)
+    assert status == 0
+    assert SKIPPED_ALL in report
+    assert page.read_text(encoding='utf-8') == updated
+    assert updated.count('const spellLoadouts') == 1
+
+
+def test_select_patches_keeps_declared_order():
+    names = [patch.name for patch in select_patches(['add-character-store.py', 'add-compiled-spells'])]
+    assert names == ['add-compiled-spells', 'add-character-store']
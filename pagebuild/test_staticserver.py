@@ -0,0 +1,121 @@
+"""Static file server: ranges, encodings and validators (python3 -m pytest pagebuild)."""
+
+import http.client
+import http.server
+import threading
+
+import pytest
+
+from .staticserver import StaticRequestHandler, make_handler, parse_range, variant_etag
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-99', (0, 100)),
+    ('bytes=100-', (100, 1000)),
+    ('bytes=900-5000', (900, 1000)),
+    ('bytes=-100', (900, 1000)),  # suffix: the last 100 bytes
+    ('bytes=-5000', (0, 1000)),
+    ('bytes= 10-19 ', (10, 20)),
+    ('bytes=1000-', 'unsatisfiable'),
+    ('bytes=-0', 'unsatisfiable'),
+    (None, None),
+    ('bytes=0-1,5-6', None),  # multiple ranges: the whole file
+    ('bytes=20-10', None),
+    ('bytes=-', None),
+    ('bytes=--3', None),
+    ('items=0-1', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+def test_suffix_range_of_an_empty_file_is_unsatisfiable():
+    assert parse_range('bytes=-10', 0) == 'unsatisfiable'
+    assert parse_range('bytes=0-', 0) == 'unsatisfiable'
+
+
+def test_variant_etag():
+    assert variant_etag('"abc"', None) == '"abc"'
+    assert variant_etag('"abc"', 'gzip') == '"abc-gzip"'
+
+
+def handler(**headers):
+    instance = StaticRequestHandler.__new__(StaticRequestHandler)
+    instance.headers = http.client.HTTPMessage()
+    for name, value in headers.items():
+        instance.headers[name.replace('_', '-')] = value
+    return instance
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, br', {'gzip', 'br'}),
+    ('GZIP;q=0.5, br;q=0', {'gzip'}),
+    ('br; q=0.000, gzip', {'gzip'}),
+    ('br;q=0., gzip;Q=0', set()),
+    ('*', {'*', 'br', 'gzip'}),
+    ('*;q=0.1, br;q=0', {'*', 'gzip'}),
+    ('identity', {'identity'}),
+    ('', set()),
+])
+def test_accepted_encodings(header, expected):
+    assert handler(Accept_Encoding=header)._accepted_encodings() == expected
+
+
+@pytest.mark.parametrize('if_none_match, expected', [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", W/"abc"', True),
+    ('*', True),
+    ('"other"', False),
+    ('"abc-gzip"', False),
+])
+def test_if_none_match(if_none_match, expected):
+    assert handler(If_None_Match=if_none_match)._not_modified('"abc"', 1_000_000) is expected
+
+
+def test_if_none_match_wins_over_if_modified_since():
+    since = 'Thu, 01 Jan 2099 00:00:00 GMT'
+    assert handler(If_Modified_Since=since)._not_modified('"abc"', 1_000_000)
+    assert not handler(If_None_Match='"other"', If_Modified_Since=since)._not_modified('"abc"', 1_000_000)
+    assert not handler(If_Modified_Since='not a date')._not_modified('"abc"', 1_000_000)
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / 'data.bin').write_bytes(bytes(range(256)) * 4)
+    handler_class = make_handler(directory=str(tmp_path), log_message=lambda self, *args: None)
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(port, path, **headers):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('GET', path, headers={name.replace('_', '-'): value for name, value in headers.items()})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_ranges_over_http(server):
+    response, body = get(server, '/data.bin', Range='bytes=-4')
+    assert response.status == 206
+    assert response.getheader('Content-Range') == 'bytes 1020-1023/1024'
+    assert body == bytes([252, 253, 254, 255])
+
+    response, body = get(server, '/data.bin', Range='bytes=2000-')
+    assert response.status == 416
+    assert response.getheader('Content-Range') == 'bytes */1024'
+    assert body == b''
+
+
+def test_weak_etag_revalidates_over_http(server):
+    response, _ = get(server, '/data.bin')
+    etag = response.getheader('ETag')
+    assert get(server, '/data.bin', If_None_Match=f'W/{etag}')[0].status == 304
+    assert get(server, '/data.bin', If_None_Match='*')[0].status == 304
+    assert get(server, '/data.bin', If_None_Match='"stale"')[0].status == 200
@@ -0,0 +1,170 @@
+"""SQLite spell and item store (python3 -m pytest pagebuild)."""
+
+import json
+
+import pytest
+
+from . import store
+from .store import build, connect, get_item, get_spell, match_query, parse_level, search_items, search_spells
+
+SRD = [
+    {'name': 'Fire Bolt', 'level': 'cantrip', 'school': 'evocation', 'classes': ['sorcerer', 'wizard'],
+     'casting_time': '1 action', 'range': '120 feet', 'components': {'raw': 'V, S'}, 'duration': 'Instantaneous',
+     'ritual': False,
+     'description': 'Make a ranged spell attack against the target. On a hit, the target takes 1d10 fire damage.'},
+    {'name': 'Fireball', 'level': '3', 'school': 'evocation', 'classes': ['sorcerer', 'wizard'],
+     'casting_time': '1 action', 'range': '150 feet', 'components': {'raw': 'V, S, M'}, 'duration': 'Instantaneous',
+     'ritual': False,
+     'description': 'Each creature in a 20-foot-radius sphere must make a Dexterity saving throw. A target takes '
+                    '8d6 fire damage on a failed save, or half as much damage on a successful one.'},
+    {'name': 'Detect Magic', 'level': '1', 'school': 'divination', 'classes': ['cleric', 'wizard'],
+     'casting_time': '1 action', 'range': 'Self', 'components': {'raw': 'V, S'},
+     'duration': 'Concentration, up to 10 minutes', 'ritual': True,
+     'description': 'For the duration, you sense the presence of magic within 30 feet of you. Fire is not involved.'},
+]
+
+SEED = [
+    {'name': 'Fireball', 'level': '3rd', 'school': 'Evocation', 'longDescription': 'A duplicate.'},
+    {'name': 'Burning Wall', 'level': '4th', 'school': 'Evocation', 'classes': ['Wizard', 'Druid'],
+     'castingTime': '1 action', 'range': '120 feet', 'components': 'V, S, M',
+     'duration': 'Concentration, up to 1 minute',
+     'longDescription': 'Casting Time: 1 action\nRange: 120 feet\n\nA wall of flames springs up.\n\n'
+                        'At Higher Levels: The wall grows by 10 feet for each slot level above 4th.',
+     'damageFormula': '5d8', 'savingThrow': {'ability': 'DEX'}, 'source': 'XYZ', 'page': 12},
+]
+
+SAMPLE = [
+    {'name': 'Cure Wounds', 'level': '1st', 'school': 'Evocation', 'classes': ['Cleric'],
+     'longDescription': 'A creature you touch regains a number of hit points equal to 1d8 + your spellcasting '
+                        'ability modifier.',
+     'damageFormula': '1d8', 'savingThrow': None, 'attackBonus': None},
+]
+
+ITEMS = [
+    {'name': 'Longsword', 'type': 'Weapon', 'rarity': 'Common', 'itemSlot': 'Weapon', 'damage': '1d8',
+     'properties': ['Versatile'], 'shortDescription': 'A versatile martial melee weapon'},
+    {'name': 'Shield', 'type': 'Armor', 'armor': '2', 'longDescription': 'A shield is carried in one hand.'},
+    {'name': 'Flame Tongue', 'type': 'Weapon', 'rarity': 'Rare', 'shortDescription': 'A sword wreathed in fire'},
+]
+
+
+@pytest.fixture(scope='module')
+def database(tmp_path_factory):
+    root = tmp_path_factory.mktemp('store')
+    sources = {}
+    for name, data in (('srd', SRD), ('seed', SEED), ('sample', SAMPLE), ('items', ITEMS), ('more', ITEMS[:1])):
+        sources[name] = str(root / f'{name}.json')
+        with open(sources[name], 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    path = str(root / 'dnd-data.sqlite')
+    counts = build(path,
+                   spell_sources=(('srd', sources['srd']), ('seed', sources['seed']), ('sample', sources['sample']),
+                                  ('missing', str(root / 'missing.json'))),
+                   item_sources=(('seed', sources['items']), ('sample', sources['more'])))
+    conn = connect(path)
+    yield path, counts, conn
+    conn.close()
+
+
+def names(rows):
+    return [row['name'] for row in rows]
+
+
+def test_parse_level():
+    assert [parse_level(level) for level in ('cantrip', 'Cantrip', '3', '3rd', 9)] == [0, 0, 3, 3, 9]
+
+
+def test_split_long_description():
+    assert store.split_long_description('Range: Self\nDuration: 1 hour\n\nBody.\n\nAt Higher Levels. More.') == \
+        ('Body.', 'More.')
+    assert store.split_long_description('Not: a header\nbecause this line is not\n\nBody.') == \
+        ('Not: a header\nbecause this line is not\n\nBody.', '')
+
+
+def test_match_query():
+    assert match_query('fire bol') == '"fire"* "bol"*'
+    assert match_query('  "; drop') == '"drop"*'
+    assert match_query('') is None
+
+
+def test_build_counts_and_precedence(database):
+    _, counts, conn = database
+    assert counts == {'spells': 5, 'items': 3, 'duplicates': 2}
+    assert get_spell(conn, 'fireball')['origin'] == 'srd'
+    assert get_item(conn, 'longsword')['origin'] == 'seed'
+
+
+def test_spell_rows_are_normalized(database):
+    _, _, conn = database
+    fireball = get_spell(conn, 'fireball')
+    assert (fireball['level'], fireball['school'], fireball['save'], fireball['damage']) == \
+        (3, 'Evocation', 'Dexterity', '8d6')
+    assert fireball['classes'] == ['sorcerer', 'wizard']
+    assert fireball['mechanics']['half_on_save'] is True
+
+    wall = get_spell(conn, 'burning-wall')
+    assert (wall['level'], wall['save'], wall['damage'], wall['concentration']) == (4, 'Dexterity', '5d8', True)
+    assert (wall['description'], wall['higher_levels']) == ('A wall of flames springs up.',
+                                                            'The wall grows by 10 feet for each slot level above 4th.')
+    assert (wall['source'], wall['page'], wall['classes']) == ('XYZ', 12, ['druid', 'wizard'])
+
+    detect = get_spell(conn, 'detect-magic')
+    assert detect['ritual'] is True and detect['concentration'] is True
+
+    cure = get_spell(conn, 'cure-wounds')
+    assert cure['damage'] is None and cure['healing']  # healing dice are not damage
+    assert get_spell(conn, 'wish') is None
+
+
+def test_spell_filters(database):
+    _, _, conn = database
+    assert names(search_spells(conn, class_name='Wizard')) == ['Fire Bolt', 'Detect Magic', 'Fireball',
+                                                                'Burning Wall']
+    assert names(search_spells(conn, class_name='wizard', level=3, school='EVOCATION')) == ['Fireball']
+    assert names(search_spells(conn, school='divination')) == ['Detect Magic']
+    assert names(search_spells(conn, level=1)) == ['Cure Wounds', 'Detect Magic']
+    assert names(search_spells(conn, limit=2, offset=1)) == ['Cure Wounds', 'Detect Magic']
+
+
+def test_spell_search_prefers_name_hits(database):
+    _, _, conn = database
+    found = names(search_spells(conn, 'fire'))
+    assert found[-1] == 'Detect Magic'  # only its description mentions fire
+    assert set(found[:2]) == {'Fire Bolt', 'Fireball'}
+    assert names(search_spells(conn, 'fire bol')) == ['Fire Bolt']
+    assert names(search_spells(conn, 'fire', class_name='cleric')) == ['Detect Magic']
+
+
+def test_items(database):
+    _, _, conn = database
+    assert names(search_items(conn)) == ['Flame Tongue', 'Longsword', 'Shield']
+    assert names(search_items(conn, item_type='Weapon', rarity='Rare')) == ['Flame Tongue']
+    assert names(search_items(conn, 'sword')) == ['Flame Tongue']  # words match by prefix only
+    assert names(search_items(conn, 'long')) == ['Longsword']
+    shield = get_item(conn, 'shield')
+    assert (shield['armor'], shield['rarity'], shield['properties'], shield['description']) == \
+        (2, 'Common', [], 'A shield is carried in one hand.')
+    assert get_item(conn, 'longsword')['properties'] == ['Versatile']
+    assert get_item(conn, 'nothing') is None
+
+
+def test_meta(database):
+    _, _, conn = database
+    meta = dict(conn.execute('SELECT key, value FROM meta'))
+    assert meta['schema_version'] == str(store.SCHEMA_VERSION)
+    assert len(json.loads(meta['sources'])) == 5  # the missing source is skipped
+
+
+def test_rebuild_replaces_the_file_under_open_connections(tmp_path):
+    source = tmp_path / 'srd.json'
+    source.write_text(json.dumps(SRD))
+    path = str(tmp_path / 'dnd-data.sqlite')
+    build(path, spell_sources=(('srd', str(source)),), item_sources=())
+    conn = connect(path)
+    assert build(path, spell_sources=(), item_sources=()) == {'spells': 0, 'items': 0, 'duplicates': 0}
+    assert names(search_spells(conn)) == ['Fire Bolt', 'Detect Magic', 'Fireball']  # still the old file
+    conn.close()
+    conn = connect(path)
+    assert names(search_spells(conn)) == []
+    conn.close()
+    assert not (tmp_path / 'dnd-data.sqlite.tmp').exists()
@@ -0,0 +1,50 @@
+#!/usr/bin/env node
+/**
+ * Roll a dice expression with the JS dice engine and print the totals as a
+ * JSON list, to check against the exact distribution from pagebuild/dice.py:
+ *
+ *   node scripts/roll-dice.mjs 1d20 100000 --advantage | python3 -m pagebuild.dice 1d20 --advantage --compare -
+ *
+ * Options:
+ *   --advantage, --disadvantage, --crit   passed to the roller
+ *   --engine FILE   roll with a script declaring compileDice (the page's copy
+ *                   of the engine) instead of src/utils/dice.js
+ *   --parse         print the parsed expression ({ dice, modifier } or
+ *                   { error }) instead of rolling
+ */
+
+import { readFileSync } from 'fs'
+import vm from 'vm'
+import { compileDice as srcCompileDice, parseDice as srcParseDice } from '../src/utils/dice.js'
+
+const args = process.argv.slice(2)
+const engineAt = args.indexOf('--engine')
+const engine = engineAt === -1 ? null : args[engineAt + 1]
+const [expression, times = '100000'] = args.filter(
+  (arg, i) => !arg.startsWith('--') && (engineAt === -1 || i !== engineAt + 1)
+)
+
+let compileDice = srcCompileDice
+let parseDice = srcParseDice
+if (engine) {
+  const context = vm.createContext({})
+  vm.runInContext(readFileSync(engine, 'utf8'), context)
+  ;({ compileDice, parseDice } = context)
+}
+
+if (args.includes('--parse')) {
+  let parsed
+  try {
+    parsed = parseDice(expression)
+  } catch (error) {
+    parsed = { error: error.message }
+  }
+  console.log(JSON.stringify(parsed))
+} else {
+  const options = {
+    advantage: args.includes('--advantage'),
+    disadvantage: args.includes('--disadvantage'),
+    crit: args.includes('--crit'),
+  }
+  console.log(JSON.stringify(Array.from(compileDice(expression).totals(Number(times), options))))
+}
@@ -12,6 +12,178 @@ export const rollDie = (sides) => {
   return Math.floor(Math.random() * sides) + 1
 }
 
+/**
+ * Dice expressions
+ *
+ * Expressions are sums of dice terms and flat modifiers: `1d8+3`, `2d6+1d4+3`,
+ * `d20`, `4d6kh3` (keep highest 3), `2d20kl1` (keep lowest 1). Each expression
+ * is parsed once and compiled into a roller closure, cached by its normalized
+ * text, so rolling the same formula again skips parsing entirely.
+ *
+ * A roller accepts `{ advantage, disadvantage, crit }`: advantage/disadvantage
+ * roll a lone d20 twice and keep the higher/lower, crit doubles every dice
+ * term (modifiers are not doubled).
+ */
+
+const DICE_TERM = /([+-])(?:(\d*)d(\d+)(?:(kh|kl)(\d+))?|(\d+))/y
+const diceCache = new Map()
+
+/**
+ * Parse a dice expression
+ * @param {string} expression - e.g. '2d6+1d4+3'
+ * @returns {Object} { dice: [{ sign, count, sides, keep, keepHighest }], modifier }
+ */
+export const parseDice = expression => {
+  let text = String(expression).replace(/\s+/g, '').toLowerCase()
+  if (!/^[+-]/.test(text)) text = '+' + text
+
+  const dice = []
+  let modifier = 0
+  DICE_TERM.lastIndex = 0
+  while (DICE_TERM.lastIndex < text.length) {
+    const match = DICE_TERM.exec(text)
+    if (!match) throw new Error(`Invalid dice expression: ${expression}`)
+
+    const sign = match[1] === '-' ? -1 : 1
+    if (match[6] !== undefined) {
+      modifier += sign * parseInt(match[6], 10)
+      continue
+    }
+
+    const count = match[2] === '' ? 1 : parseInt(match[2], 10)
+    const sides = parseInt(match[3], 10)
+    const keep = match[4] ? Math.min(parseInt(match[5], 10), count) : count
+    if (sides < 1) throw new Error(`Invalid dice expression: ${expression}`)
+    dice.push({ sign, count, sides, keep, keepHighest: match[4] !== 'kl' })
+  }
+
+  return { dice, modifier }
+}
+
+/**
+ * Roll one dice term; kept dice are pushed onto `rolls`, the rest onto `dropped`
+ */
+const rollTerm = (count, sides, keep, keepHighest, rolls, dropped) => {
+  if (keep === count) {
+    let sum = 0
+    for (let i = 0; i < count; i++) {
+      const roll = Math.floor(Math.random() * sides) + 1
+      if (rolls) rolls.push(roll)
+      sum += roll
+    }
+    return sum
+  }
+
+  const values = []
+  for (let i = 0; i < count; i++) values.push(Math.floor(Math.random() * sides) + 1)
+  values.sort(keepHighest ? (a, b) => b - a : (a, b) => a - b)
+  let sum = 0
+  for (let i = 0; i < keep; i++) sum += values[i]
+  if (rolls) rolls.push(...values.slice(0, keep))
+  if (dropped) dropped.push(...values.slice(keep))
+  return sum
+}
+
+const buildRoller = (parsed, formula) => {
+  const { dice, modifier } = parsed
+  const d20Term = dice.findIndex(term => term.sides === 20 && term.count === 1)
+
+  // One roll: { total, rolls, dropped, natural, formula }
+  const roller = (options = {}) => {
+    const crit = options.crit ? 2 : 1
+    const rolls = []
+    const dropped = []
+    let total = modifier
+    let natural = null
+
+    const adv = options.advantage && !options.disadvantage
+    const dis = options.disadvantage && !options.advantage
+
+    for (let i = 0; i < dice.length; i++) {
+      const term = dice[i]
+      if (i === d20Term && (adv || dis)) {
+        const value = rollTerm(2, 20, 1, adv, rolls, dropped)
+        natural = value
+        total += term.sign * value
+        continue
+      }
+      const start = rolls.length
+      const count = term.count * crit
+      total += term.sign * rollTerm(count, term.sides, term.keep * crit, term.keepHighest, rolls, dropped)
+      if (i === d20Term) natural = rolls[start]
+    }
+
+    return { total, rolls, dropped, natural, formula }
+  }
+
+  // Many rolls, totals only (no per-roll allocation)
+  roller.totals = (times, options = {}) => {
+    const crit = options.crit ? 2 : 1
+    const adv = options.advantage && !options.disadvantage
+    const dis = options.disadvantage && !options.advantage
+    const out = new Int32Array(times)
+    for (let n = 0; n < times; n++) {
+      let total = modifier
+      for (let i = 0; i < dice.length; i++) {
+        const term = dice[i]
+        const value =
+          i === d20Term && (adv || dis)
+            ? rollTerm(2, 20, 1, adv, null, null)
+            : rollTerm(term.count * crit, term.sides, term.keep * crit, term.keepHighest, null, null)
+        total += term.sign * value
+      }
+      out[n] = total
+    }
+    return out
+  }
+
+  roller.parsed = parsed
+  roller.formula = formula
+  return roller
+}
+
+/**
+ * Compile a dice expression into a cached roller
+ * @param {string} expression - Dice expression
+ * @returns {Function} roller(options) => { total, rolls, dropped, natural, formula }
+ */
+export const compileDice = expression => {
+  const key = String(expression).replace(/\s+/g, '').toLowerCase()
+  let roller = diceCache.get(key)
+  if (!roller) {
+    roller = buildRoller(parseDice(key), key)
+    diceCache.set(key, roller)
+  }
+  return roller
+}
+
+/**
+ * Roll a dice expression once
+ * @param {string} expression - Dice expression
+ * @param {Object} options - { advantage, disadvantage, crit }
+ * @returns {Object} { total, rolls, dropped, natural, formula }
+ */
+export const rollExpression = (expression, options) => compileDice(expression)(options)
+
+/**
+ * Roll many expressions in one call
+ * @param {Array<string|Object>} requests - Expressions, or { expression, advantage, disadvantage, crit }
+ * @returns {Array<Object>} One roll result per request
+ */
+export const rollBatch = requests =>
+  requests.map(request =>
+    typeof request === 'string' ? compileDice(request)() : compileDice(request.expression)(request)
+  )
+
+/**
+ * Roll one expression many times
+ * @param {string} expression - Dice expression
+ * @param {number} times - Number of rolls
+ * @param {Object} options - { advantage, disadvantage, crit }
+ * @returns {Int32Array} Totals
+ */
+export const rollTotals = (expression, times, options) => compileDice(expression).totals(times, options)
+
 /**
  * Roll multiple dice and sum the results
  * @param {number} count - Number of dice to roll
@@ -20,16 +192,8 @@ export const rollDie = (sides) => {
  * @returns {Object} { total, rolls, formula }
  */
 export const rollDamage = (count, sides, bonus = 0) => {
-  let total = bonus
-  let rolls = []
-
-  for (let i = 0; i < count; i++) {
-    const roll = rollDie(sides)
-    rolls.push(roll)
-    total += roll
-  }
-
   const formula = `${count}d${sides}${bonus > 0 ? '+' + bonus : bonus < 0 ? bonus : ''}`
+  const { total, rolls } = compileDice(formula)()
 
   return { total, rolls, formula }
 }
@@ -1,5 +1,17 @@
 import { describe, it, expect, vi } from 'vitest'
-import { rollDie, rollDamage, rollD20, rollAttack, formatRollResult, getNarration } from './dice'
+import {
+  rollDie,
+  rollDamage,
+  rollD20,
+  rollAttack,
+  formatRollResult,
+  getNarration,
+  parseDice,
+  compileDice,
+  rollExpression,
+  rollBatch,
+  rollTotals,
+} from './dice'
 
 describe('Dice Rolling Utilities', () => {
   describe('rollDie', () => {
@@ -43,6 +55,82 @@ describe('Dice Rolling Utilities', () => {
     })
   })
 
+  describe('parseDice', () => {
+    it('parses dice terms and flat modifiers', () => {
+      expect(parseDice('2d6 + 1d4 + 3')).toEqual({
+        dice: [
+          { sign: 1, count: 2, sides: 6, keep: 2, keepHighest: true },
+          { sign: 1, count: 1, sides: 4, keep: 1, keepHighest: true },
+        ],
+        modifier: 3,
+      })
+    })
+
+    it('parses keep-highest/lowest and implicit counts', () => {
+      expect(parseDice('4d6kh3').dice[0]).toMatchObject({ count: 4, keep: 3, keepHighest: true })
+      expect(parseDice('2d20kl1').dice[0]).toMatchObject({ count: 2, keep: 1, keepHighest: false })
+      expect(parseDice('d20-1')).toEqual({
+        dice: [{ sign: 1, count: 1, sides: 20, keep: 1, keepHighest: true }],
+        modifier: -1,
+      })
+    })
+
+    it('rejects malformed expressions', () => {
+      expect(() => parseDice('')).toThrow('Invalid dice expression')
+      expect(() => parseDice('2d')).toThrow('Invalid dice expression')
+      expect(() => parseDice('fireball')).toThrow('Invalid dice expression')
+    })
+  })
+
+  describe('compileDice', () => {
+    it('caches rollers by normalized expression', () => {
+      expect(compileDice('1d8+3')).toBe(compileDice('1D8 + 3'))
+    })
+
+    it('rolls all dice terms plus modifiers', () => {
+      vi.spyOn(Math, 'random').mockReturnValue(0.99) // Always roll max
+      const result = rollExpression('2d6+1d4+3')
+      expect(result.total).toBe(19) // 6 + 6 + 4 + 3
+      expect(result.rolls).toEqual([6, 6, 4])
+      vi.restoreAllMocks()
+    })
+
+    it('keeps the higher d20 with advantage and the lower with disadvantage', () => {
+      const values = [0.2, 0.7, 0.2, 0.7] // 5, 15, 5, 15
+      vi.spyOn(Math, 'random').mockImplementation(() => values.shift())
+      expect(rollExpression('1d20+2', { advantage: true })).toMatchObject({ total: 17, natural: 15 })
+      expect(rollExpression('1d20+2', { disadvantage: true })).toMatchObject({
+        total: 7,
+        natural: 5,
+        dropped: [15],
+      })
+      vi.restoreAllMocks()
+    })
+
+    it('doubles dice but not modifiers on a crit', () => {
+      vi.spyOn(Math, 'random').mockReturnValue(0.99)
+      const result = rollExpression('2d6+3', { crit: true })
+      expect(result.rolls).toHaveLength(4)
+      expect(result.total).toBe(27)
+      vi.restoreAllMocks()
+    })
+  })
+
+  describe('batch rolling', () => {
+    it('rolls one result per request', () => {
+      const results = rollBatch(['1d8+2', { expression: '2d6', crit: true }])
+      expect(results).toHaveLength(2)
+      expect(results[1].rolls).toHaveLength(4)
+    })
+
+    it('returns totals within the expression range', () => {
+      const totals = rollTotals('2d6+1d4+3', 1000)
+      expect(totals).toHaveLength(1000)
+      expect(Math.min(...totals)).toBeGreaterThanOrEqual(6)
+      expect(Math.max(...totals)).toBeLessThanOrEqual(19)
+    })
+  })
+
   describe('rollD20', () => {
     it('detects critical hits', () => {
       vi.spyOn(Math, 'random').mockReturnValue(0.99) // Roll 20
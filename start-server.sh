@@ -9,5 +9,7 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo ""
 
-# Start Python HTTP server
-python3 -m http.server 8000
+# Start the Python dev server: threaded keep-alive static serving with
+# compression, ETags and ranges (pagebuild/staticserver.py) plus the
+# /api/spells query API. python3 -m pagebuild.staticserver serves files only.
+python3 -m pagebuild.devserver --port 8000